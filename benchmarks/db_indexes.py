@@ -0,0 +1,206 @@
+"""
+EXPLAIN antes/depois dos índices da migração 002 num Postgres local.
+
+Recria o schema (src/db/schema.sql) no banco indicado, remove os índices da
+002, gera um volume sintético (padrão: 1M eventos) com generate_series, roda
+EXPLAIN (ANALYZE, BUFFERS) nas queries quentes, aplica a 002 e repete.
+
+ATENÇÃO: o schema.sql faz DROP de todas as tabelas. Use só um banco local.
+
+Uso:
+    python -m benchmarks.db_indexes --dsn postgresql://postgres@localhost/eproc_bench
+    python -m benchmarks.db_indexes --dsn ... --processos 5000 --eventos 200 --out idx.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.migrate import psql, MIGRATIONS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(ROOT, "src", "db", "schema.sql")
+MIGRATION = os.path.join(MIGRATIONS_DIR, "002_indices.sql")
+
+CNJ_ALVO = "0002500-00.2025.8.21.0001"
+
+# Queries do write path (sync.py) e da seção "Queries uteis" do DATABASE_SPEC
+QUERIES = {
+    "ultimo_evento_do_processo": f"""
+        SELECT numero_evento FROM eventos
+        WHERE cnj = '{CNJ_ALVO}' ORDER BY numero_evento DESC LIMIT 1""",
+    "eventos_prazo_aberto": """
+        SELECT e.cnj, e.numero_evento, e.descricao, e.prazo_data_final, e.evento_referencia
+        FROM eventos e WHERE e.prazo_aberto = true ORDER BY e.prazo_data_final ASC""",
+    "eventos_urgentes_recentes": """
+        SELECT cnj, numero_evento, data_hora FROM eventos
+        WHERE urgente ORDER BY data_hora DESC LIMIT 50""",
+    "documentos_do_processo": f"""
+        SELECT d.nome_original, d.tipo, d.tamanho_bytes, d.storage_url, e.numero_evento, e.data_hora
+        FROM documentos d
+        JOIN eventos e ON d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+        WHERE d.cnj = '{CNJ_ALVO}' ORDER BY e.numero_evento DESC""",
+    "documento_por_hash": """
+        SELECT cnj, numero_evento, storage_url FROM documentos
+        WHERE hash_sha256 = md5('0001234-00.2025.8.21.0001/30') LIMIT 1""",
+    "documentos_sem_storage": """
+        SELECT cnj, numero_evento, nome_original FROM documentos WHERE storage_url IS NULL""",
+    "prazos_proximos_3_dias": """
+        SELECT p.cnj, p.classe, pa.evento_descricao, pa.prazo_final, pa.prazo_final - NOW() AS tempo_restante
+        FROM prazos_abertos pa JOIN processos p ON pa.cnj = p.cnj
+        WHERE pa.prazo_final BETWEEN NOW() AND NOW() + INTERVAL '3 days'
+        ORDER BY pa.prazo_final ASC""",
+    "ultimo_sync_log": """
+        SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5""",
+    "fila_tier_processos": """
+        SELECT cnj, last_synced_at FROM processos
+        ORDER BY last_synced_at ASC NULLS FIRST LIMIT 200""",
+}
+
+
+def _seed_sql(n_processos: int, eventos_por_processo: int, n_logs: int) -> str:
+    """Volume sintético com proporções próximas do real (poucos prazos/urgentes)."""
+    return f"""
+INSERT INTO processos (cnj, classe, juizo, last_synced_at)
+SELECT lpad(i::text, 7, '0') || '-00.2025.8.21.0001', 'Classe ' || (i % 12), 'Vara ' || (i % 30),
+       CASE WHEN i % 50 = 0 THEN NULL ELSE NOW() - (i % 72) * INTERVAL '1 hour' END
+FROM generate_series(1, {n_processos}) i;
+
+INSERT INTO prazos_abertos (cnj, evento_descricao, data_envio, prazo_inicio, prazo_final)
+SELECT lpad(i::text, 7, '0') || '-00.2025.8.21.0001', 'Evento ' || k || ' - INTIMAÇÃO',
+       NOW() - INTERVAL '5 days', NOW() - INTERVAL '3 days',
+       NOW() + ((i * 7 + k) % 60 - 10) * INTERVAL '1 day'
+FROM generate_series(1, {n_processos}) i, generate_series(1, 1 + i % 3) k;
+
+INSERT INTO eventos (cnj, numero_evento, data_hora, descricao, usuario,
+                     prazo_aberto, prazo_data_final, urgente)
+SELECT lpad(i::text, 7, '0') || '-00.2025.8.21.0001', e,
+       NOW() - ({eventos_por_processo} - e) * INTERVAL '6 hours' - i * INTERVAL '1 minute',
+       'Evento ' || e || ' - JUNTADA DE PETIÇÃO / INTIMAÇÃO ELETRÔNICA',
+       'USUARIO' || (e % 40),
+       (i * 31 + e) % 200 = 0,
+       CASE WHEN (i * 31 + e) % 200 = 0 THEN NOW() + ((i + e) % 30) * INTERVAL '1 day' END,
+       (i * 17 + e) % 100 = 0
+FROM generate_series(1, {n_processos}) i, generate_series(1, {eventos_por_processo}) e;
+
+INSERT INTO documentos (cnj, numero_evento, nome_original, tipo, url_eproc,
+                        storage_path, storage_url, tamanho_bytes, hash_sha256)
+SELECT cnj, numero_evento, 'DOC1', 'PDF',
+       'controlador.php?acao=acessar_documento&doc=' || cnj || '_' || numero_evento,
+       CASE WHEN numero_evento % 199 <> 0 THEN cnj || '/evt_' || numero_evento || '/DOC1.pdf' END,
+       CASE WHEN numero_evento % 199 <> 0 THEN 'https://x.supabase.co/' || cnj || '/' || numero_evento END,
+       50000 + numero_evento, md5(cnj || '/' || numero_evento)
+FROM eventos WHERE numero_evento % 3 = 0;
+
+INSERT INTO sync_log (started_at, finished_at, status, tipo)
+SELECT NOW() - i * INTERVAL '30 minutes', NOW() - i * INTERVAL '30 minutes' + INTERVAL '5 minutes',
+       'success', (ARRAY['full', 'prazos', 'processos'])[1 + i % 3]
+FROM generate_series(1, {n_logs}) i;
+"""
+
+
+def _index_names() -> list[str]:
+    with open(MIGRATION, encoding="utf-8") as f:
+        return re.findall(r"CREATE INDEX(?: IF NOT EXISTS)? (\w+)", f.read())
+
+
+def _drop_indexes_sql() -> str:
+    """Estado anterior à 002: só PKs e o índice simples de prazos."""
+    drops = "".join(f"DROP INDEX IF EXISTS {name};\n" for name in _index_names())
+    return drops + "CREATE INDEX idx_prazos_abertos_final ON prazos_abertos (prazo_final);\n"
+
+
+def _explain(dsn: str, sql: str, repeat: int) -> dict:
+    """Menor tempo de execução em `repeat` rodadas (cache quente), com o seu plano."""
+    best = None
+    for _ in range(repeat):
+        out = psql(dsn, f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql};")
+        plan = json.loads(out)[0]
+        if best is None or plan["Execution Time"] < best["Execution Time"]:
+            best = plan
+    root = best["Plan"]
+    return {
+        "ms": round(best["Execution Time"], 3),
+        "plano": _node_summary(root),
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+    }
+
+
+def _node_summary(node: dict) -> str:
+    """Tipos de nó com índice usado, ex.: 'Limit > Index Only Scan(idx_x)'."""
+    parts = []
+    while node:
+        label = node["Node Type"]
+        if node.get("Index Name"):
+            label += f"({node['Index Name']})"
+        parts.append(label)
+        children = node.get("Plans") or []
+        node = children[0] if children else None
+    return " > ".join(parts)
+
+
+def _run_queries(dsn: str, repeat: int, label: str) -> dict:
+    results = {}
+    for name, sql in QUERIES.items():
+        results[name] = _explain(dsn, sql, repeat)
+        print(f"[DBIDX] {label:<6} {name:<28} {results[name]['ms']:>10.3f} ms  {results[name]['plano']}")
+    return results
+
+
+def run(args) -> dict:
+    print("[DBIDX] Recriando schema...")
+    with open(SCHEMA, encoding="utf-8") as f:
+        psql(args.dsn, "SET client_min_messages = warning;\n" + f.read())
+    psql(args.dsn, _drop_indexes_sql())
+
+    total = args.processos * args.eventos
+    print(f"[DBIDX] Gerando {args.processos} processos x {args.eventos} eventos = {total} eventos...")
+    psql(args.dsn, _seed_sql(args.processos, args.eventos, args.logs))
+    psql(args.dsn, "VACUUM ANALYZE;")
+    counts = psql(args.dsn, "SELECT (SELECT COUNT(*) FROM eventos), (SELECT COUNT(*) FROM documentos);")
+    print(f"[DBIDX] eventos|documentos = {counts.strip()}")
+
+    antes = _run_queries(args.dsn, args.repeat, "antes")
+
+    print("[DBIDX] Aplicando 002_indices.sql...")
+    with open(MIGRATION, encoding="utf-8") as f:
+        psql(args.dsn, f.read())
+    psql(args.dsn, "VACUUM ANALYZE;")
+    depois = _run_queries(args.dsn, args.repeat, "depois")
+
+    print(f"\n[DBIDX] {'query':<28} {'antes (ms)':>12} {'depois (ms)':>12} {'ganho':>8}")
+    for name in QUERIES:
+        a, d = antes[name]["ms"], depois[name]["ms"]
+        ganho = f"{a / d:.1f}x" if d else "-"
+        print(f"[DBIDX] {name:<28} {a:>12.3f} {d:>12.3f} {ganho:>8}")
+
+    return {
+        "params": {"processos": args.processos, "eventos_por_processo": args.eventos,
+                   "eventos": total, "logs": args.logs, "repeat": args.repeat},
+        "antes": antes,
+        "depois": depois,
+    }
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN antes/depois dos índices (migração 002)")
+    parser.add_argument("--dsn", required=True, help="Postgres LOCAL descartável (o schema é recriado)")
+    parser.add_argument("--processos", type=int, default=5000)
+    parser.add_argument("--eventos", type=int, default=200, help="eventos por processo")
+    parser.add_argument("--logs", type=int, default=20000, help="linhas de sync_log")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por query (vale a menor)")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[DBIDX] Resultado salvo em {args.out}")
@@ -0,0 +1,196 @@
+"""
+Busca por parte (CPF/CNPJ, OAB, nome) no JSONB de processos.partes x na
+tabela normalizada processo_partes (migração 011), num Postgres local.
+
+Recria o schema (src/db/schema.sql), gera N processos (padrão: 50k) com partes
+sintéticas — poucas empresas/órgãos que aparecem em muitos processos, pessoas
+físicas quase sempre únicas e um conjunto de advogados (OAB) — e:
+
+- mede a carga inicial de processo_partes (a mesma da migração);
+- roda EXPLAIN (ANALYZE, BUFFERS) de cada busca varrendo o JSONB e pela RPC
+  (buscar_partes / conflito_partes), com os documentos e OABs formatados de
+  outro jeito que o gravado, e confere que os dois acham os mesmos processos;
+- mede o sync_processo de uma amostra com as partes iguais (diff pulado) e
+  com uma parte nova (diff de uma linha).
+
+Sem o pg_trgm no servidor (ex: Postgres local sem contrib) a busca por nome
+não tem índice e varre a tabela; no Supabase o índice trigram é criado.
+
+ATENÇÃO: o schema.sql faz DROP de todas as tabelas. Use só um banco local.
+
+Uso:
+    python -m benchmarks.db_partes --dsn postgresql://postgres@localhost/eproc_bench
+    python -m benchmarks.db_partes --dsn ... --processos 50000 --amostra 500 --out partes.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.migrate import psql
+from benchmarks.db_indexes import _explain
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(ROOT, "src", "db", "schema.sql")
+
+# Alvos (gravados como no eProc, buscados em outro formato)
+CPF_ALVO = "000.000.042-42"     # pessoa física do processo 42 (CPF = i * 101)
+CNPJ_ALVO = "00000000000013"    # empresa 13: ~1 a cada 200 processos
+OAB_ALVO = "OAB/RS 1.234"       # gravada como RS001234
+NOME_ALVO = "PESSOA 4242"
+
+
+def _seed_sql(n_processos: int) -> str:
+    """Partes por processo: autor pessoa física (CPF único), réu empresa (200
+    empresas) e, em 1/3, um terceiro; cada parte com 1-2 advogados de 3000."""
+    return f"""
+INSERT INTO processos (cnj, classe, situacao, partes)
+SELECT lpad(i::text, 7, '0') || '-00.2025.8.21.0001', 'Classe ' || (i % 12), 'MOVIMENTO',
+       jsonb_build_array(
+           jsonb_build_object(
+               'tipo', 'AUTOR', 'nome', 'PESSOA ' || i || ' DA SILVA',
+               'cpf_cnpj', regexp_replace(lpad((i * 101)::text, 11, '0'),
+                                          '(\\d{{3}})(\\d{{3}})(\\d{{3}})(\\d{{2}})', '\\1.\\2.\\3-\\4'),
+               'qualificacao', '',
+               'representantes', jsonb_build_array(
+                   jsonb_build_object('nome', 'ADVOGADO ' || (i % 3000), 'oab', 'RS' || lpad((i % 3000)::text, 6, '0'),
+                                      'tipo', 'Advogado'))),
+           jsonb_build_object(
+               'tipo', 'RÉU', 'nome', 'EMPRESA ' || (i % 200) || ' LTDA',
+               'cpf_cnpj', regexp_replace(lpad((i % 200)::text, 14, '0'),
+                                          '(\\d{{2}})(\\d{{3}})(\\d{{3}})(\\d{{4}})(\\d{{2}})', '\\1.\\2.\\3/\\4-\\5'),
+               'qualificacao', '',
+               'representantes', jsonb_build_array(
+                   jsonb_build_object('nome', 'ADVOGADO ' || ((i * 7) % 3000), 'oab', 'RS' || lpad(((i * 7) % 3000)::text, 6, '0'),
+                                      'tipo', 'Advogado'),
+                   jsonb_build_object('nome', 'ADVOGADO ' || ((i * 11) % 3000), 'oab', 'SC' || lpad(((i * 11) % 3000)::text, 6, '0'),
+                                      'tipo', 'Advogado')))
+       ) || CASE WHEN i % 3 = 0 THEN jsonb_build_array(jsonb_build_object(
+               'tipo', 'TERCEIRO', 'nome', 'TERCEIRO ' || i, 'cpf_cnpj', '', 'qualificacao', 'Interessado',
+               'representantes', '[]'::jsonb))
+            ELSE '[]'::jsonb END
+FROM generate_series(1, {n_processos}) i;
+"""
+
+
+# Mesma pergunta respondida varrendo o JSONB ("jsonb") e pela tabela ("tabela")
+CONSULTAS = {
+    "cpf": (
+        f"""SELECT DISTINCT p.cnj FROM processos p, jsonb_array_elements(p.partes) x
+            WHERE regexp_replace(x->>'cpf_cnpj', '\\D', '', 'g') = regexp_replace('{CPF_ALVO}', '\\D', '', 'g')""",
+        f"SELECT DISTINCT cnj FROM buscar_partes(p_cpf_cnpj => '{CPF_ALVO}', p_limite => 100000)",
+    ),
+    "cnpj_frequente": (
+        f"""SELECT DISTINCT p.cnj FROM processos p, jsonb_array_elements(p.partes) x
+            WHERE regexp_replace(x->>'cpf_cnpj', '\\D', '', 'g') = '{CNPJ_ALVO}'""",
+        f"SELECT DISTINCT cnj FROM buscar_partes(p_cpf_cnpj => '{CNPJ_ALVO}', p_limite => 100000)",
+    ),
+    "oab": (
+        f"""SELECT DISTINCT p.cnj FROM processos p, jsonb_array_elements(p.partes) x,
+                   jsonb_array_elements(x->'representantes') r
+            WHERE normalizar_oab(r->>'oab') = normalizar_oab('{OAB_ALVO}')""",
+        f"SELECT DISTINCT cnj FROM buscar_partes(p_oab => '{OAB_ALVO}', p_limite => 100000)",
+    ),
+    "nome": (
+        f"""SELECT DISTINCT p.cnj FROM processos p, jsonb_array_elements(p.partes) x
+            WHERE x->>'nome' ILIKE '%{NOME_ALVO}%'""",
+        f"SELECT DISTINCT cnj FROM buscar_partes(p_nome => '{NOME_ALVO}', p_limite => 100000)",
+    ),
+    "conflito": (
+        f"""SELECT DISTINCT p.cnj FROM processos p, jsonb_array_elements(p.partes) x
+            WHERE regexp_replace(x->>'cpf_cnpj', '\\D', '', 'g') IN
+                  (regexp_replace('{CPF_ALVO}', '\\D', '', 'g'), '{CNPJ_ALVO}')
+               OR EXISTS (SELECT 1 FROM jsonb_array_elements(x->'representantes') r
+                          WHERE normalizar_oab(r->>'oab') = normalizar_oab('{OAB_ALVO}'))""",
+        f"""SELECT cnj FROM conflito_partes(p_documentos => ARRAY['{CPF_ALVO}', '{CNPJ_ALVO}'],
+                                           p_oabs => ARRAY['{OAB_ALVO}'])""",
+    ),
+}
+
+
+def _cnjs(dsn: str, sql: str) -> set[str]:
+    return {line for line in psql(dsn, f"{sql};").splitlines() if line}
+
+
+def _sync_amostra(dsn: str, amostra: int, extra: str) -> float:
+    """ms por processo de sync_processo para `amostra` processos, com as partes
+    gravadas `|| extra` (JSONB vazio = iguais)."""
+    plan = json.loads(psql(dsn, f"""
+        EXPLAIN (ANALYZE, FORMAT JSON)
+        SELECT sync_processo(jsonb_build_object(
+            'cnj', cnj, 'processo', jsonb_build_object('classe', classe, 'partes', partes || '{extra}'::jsonb),
+            'eventos', '[]'::jsonb))
+        FROM (SELECT cnj, classe, partes FROM processos ORDER BY cnj LIMIT {amostra}) s;"""))[0]
+    return plan["Execution Time"] / amostra
+
+
+def run(args) -> dict:
+    print("[PARTES] Recriando schema...")
+    with open(SCHEMA, encoding="utf-8") as f:
+        psql(args.dsn, "SET client_min_messages = warning;\n" + f.read())
+    trgm = psql(args.dsn, "SELECT COUNT(*) FROM pg_indexes WHERE indexname = 'idx_processo_partes_nome_trgm';").strip() == "1"
+
+    print(f"[PARTES] Gerando {args.processos} processos...")
+    psql(args.dsn, _seed_sql(args.processos))
+    t0 = time.perf_counter()
+    linhas = int(psql(args.dsn, "SELECT SUM(processo_partes_atualizar(cnj, partes)) FROM processos;").strip())
+    carga = time.perf_counter() - t0
+    psql(args.dsn, "VACUUM ANALYZE;")
+    print(f"[PARTES] Carga de processo_partes: {linhas} linhas em {carga:.2f}s "
+          f"(índice trigram: {'sim' if trgm else 'não, sem pg_trgm'})")
+
+    consultas = {}
+    ok = True
+    for nome, (sql_jsonb, sql_tabela) in CONSULTAS.items():
+        jsonb = _explain(args.dsn, sql_jsonb, args.repeat)
+        tabela = _explain(args.dsn, sql_tabela, args.repeat)
+        achados = _cnjs(args.dsn, sql_tabela)
+        iguais = achados == _cnjs(args.dsn, sql_jsonb) and bool(achados)
+        ok = ok and iguais
+        consultas[nome] = {"jsonb": jsonb, "tabela": tabela, "processos": len(achados), "iguais": iguais}
+        ganho = f"{jsonb['ms'] / tabela['ms']:.0f}x" if tabela["ms"] else "-"
+        print(f"[PARTES] {nome:<15} jsonb {jsonb['ms']:>10.3f} ms | tabela {tabela['ms']:>8.3f} ms | "
+              f"{ganho:>6} | {len(achados):>4} processos | {'OK' if iguais else 'DIVERGE'}")
+
+    antes = psql(args.dsn, "SELECT COUNT(*) FROM processo_partes;").strip()
+    iguais_ms = _sync_amostra(args.dsn, args.amostra, "[]")
+    nova = json.dumps([{"tipo": "TERCEIRO", "nome": "NOVO INTERESSADO", "cpf_cnpj": "111.222.333-44",
+                        "representantes": []}], ensure_ascii=False)
+    mudou_ms = _sync_amostra(args.dsn, args.amostra, nova)
+    depois = int(psql(args.dsn, "SELECT COUNT(*) FROM processo_partes;").strip())
+    diff_ok = depois == int(antes) + args.amostra
+    ok = ok and diff_ok
+    print(f"[PARTES] sync_processo: {iguais_ms:.3f} ms/processo com partes iguais | "
+          f"{mudou_ms:.3f} ms/processo com 1 parte nova | +{depois - int(antes)} linhas "
+          f"({'OK' if diff_ok else 'FALHOU'})")
+
+    return {
+        "params": {"processos": args.processos, "amostra": args.amostra, "repeat": args.repeat},
+        "processo_partes": {"linhas": linhas, "carga_seconds": round(carga, 3), "trigram": trgm},
+        "consultas": consultas,
+        "sync_processo_ms": {"partes_iguais": round(iguais_ms, 3), "parte_nova": round(mudou_ms, 3)},
+        "ok": ok,
+    }
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Busca por parte: JSONB x processo_partes (migração 011)")
+    parser.add_argument("--dsn", required=True, help="Postgres LOCAL descartável (o schema é recriado)")
+    parser.add_argument("--processos", type=int, default=50000)
+    parser.add_argument("--amostra", type=int, default=500, help="processos no teste de sync_processo")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por query (vale a menor)")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[PARTES] Resultado salvo em {args.out}")
+    sys.exit(0 if report["ok"] else 1)
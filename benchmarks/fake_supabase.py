@@ -0,0 +1,387 @@
+"""
+Substituto em memória do client do Supabase para testes de carga do write path.
+
+Implementa o subconjunto da API do supabase-py usado pelo projeto:
+`table(...).select/insert/upsert/update/delete` com filtros `eq/neq/in_/gt/gte/
+lt/lte/is_`, `order`, `limit`, `range`, `execute()`, `rpc(...)` e
+`storage.from_(...)` com `upload/get_public_url/list/remove`. Latência e erros
+são injetáveis e cada requisição é contada por (tabela, operação). Como o
+PostgREST, um select devolve no máximo `max_rows` linhas (padrão 1000).
+
+Uso:
+    from src.db.client import set_supabase
+    fake = FakeSupabase(latency=0.02, error_rate=0.01)
+    set_supabase(fake)
+"""
+import os
+import time
+import uuid
+import random
+from collections import Counter
+from datetime import datetime, timezone
+
+# Chave primária de cada tabela (usada quando o upsert não informa on_conflict)
+PRIMARY_KEYS = {
+    "processos": ("cnj",),
+    "prazos_abertos": ("cnj", "evento_descricao", "prazo_final"),
+    "eventos": ("cnj", "numero_evento"),
+    "documentos": ("cnj", "numero_evento", "url_eproc"),
+    "documentos_texto": ("hash_sha256",),
+    "documentos_pendentes": ("cnj", "numero_evento", "url_eproc"),
+    "sync_log": ("id",),
+    "sync_metrics": ("id",),
+    "sync_changes": ("id",),
+    "sync_changes_consumidores": ("consumidor",),
+}
+
+# ON DELETE CASCADE do schema.sql (apenas pela coluna cnj)
+CASCADES = {
+    "processos": ("prazos_abertos", "eventos", "documentos", "documentos_pendentes"),
+    "eventos": ("documentos", "documentos_pendentes"),
+}
+
+
+_ANY = object()
+
+
+class FakeTable:
+    """Linhas agrupadas por cnj (como um índice) e indexadas pela PK."""
+
+    def __init__(self, keys: tuple):
+        self.keys = keys
+        self.by_cnj: dict = {}
+
+    def pk(self, row: dict) -> tuple:
+        return tuple(row.get(k) for k in self.keys) if self.keys else (id(row),)
+
+    def rows(self, cnj=_ANY):
+        if cnj is not _ANY:
+            return list(self.by_cnj.get(cnj, {}).values())
+        return [r for bucket in self.by_cnj.values() for r in bucket.values()]
+
+    def get(self, row: dict, keys: tuple | None = None) -> dict | None:
+        keys = keys or self.keys
+        bucket = self.by_cnj.get(row.get("cnj"), {})
+        if keys == self.keys:
+            return bucket.get(self.pk(row))
+        want = tuple(row.get(k) for k in keys)
+        return next((r for r in bucket.values() if tuple(r.get(k) for k in keys) == want), None)
+
+    def put(self, row: dict):
+        self.by_cnj.setdefault(row.get("cnj"), {})[self.pk(row)] = row
+
+    def remove(self, row: dict):
+        bucket = self.by_cnj.get(row.get("cnj"), {})
+        bucket.pop(self.pk(row), None)
+        if not bucket:
+            self.by_cnj.pop(row.get("cnj"), None)
+
+    def __len__(self):
+        return sum(len(b) for b in self.by_cnj.values())
+
+
+class FakeSupabaseError(Exception):
+    """Erro injetado (equivalente ao APIError do postgrest)."""
+
+
+class FakeResponse:
+    def __init__(self, data: list[dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, storage_dir: str | None = None, max_rows: int | None = 1000):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tables: dict[str, FakeTable] = {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.rpcs: dict = {}
+        self.storage = FakeStorage(self, storage_dir)
+        self._rng = random.Random(seed)
+
+    # --- API do client ---
+
+    def table(self, name: str) -> "FakeQuery":
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> "FakeRpc":
+        return FakeRpc(self, name, params or {})
+
+    def register_rpc(self, name: str, fn):
+        """Registra uma implementação Python de uma função SQL: fn(fake, params) -> data."""
+        self.rpcs[name] = fn
+
+    # --- Simulação de rede ---
+
+    def _roundtrip(self, key: tuple):
+        self.requests[key] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors[key] += 1
+            raise FakeSupabaseError(f"erro injetado em {key[0]}.{key[1]}")
+
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def get_table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            self.tables[name] = FakeTable(PRIMARY_KEYS.get(name, ()))
+        return self.tables[name]
+
+    def rows(self, table: str) -> list[dict]:
+        return self.get_table(table).rows()
+
+
+class FakeQuery:
+    def __init__(self, fake: FakeSupabase, table: str):
+        self.fake = fake
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload = None
+        self.on_conflict = ""
+        self.filters = []
+        self.cnj = _ANY  # filtro eq("cnj", x) usa o agrupamento por cnj
+        self.orders = []
+        self.limit_n = None
+        self.offset = 0
+        self.count_mode = None
+
+    # --- operações ---
+
+    def select(self, columns: str = "*", count: str | None = None):
+        self.op, self.columns, self.count_mode = "select", columns, count
+        return self
+
+    def insert(self, rows):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", **_):
+        self.op, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: dict):
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # --- filtros ---
+
+    def eq(self, col, val):
+        if col == "cnj":
+            self.cnj = val
+        self.filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def neq(self, col, val):
+        self.filters.append(lambda r: r.get(col) != val)
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filters.append(lambda r: r.get(col) in vals)
+        return self
+
+    def gt(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) > val)
+        return self
+
+    def gte(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) >= val)
+        return self
+
+    def lt(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) < val)
+        return self
+
+    def lte(self, col, val):
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) <= val)
+        return self
+
+    def is_(self, col, val):
+        want_null = str(val).lower() == "null"
+        self.filters.append(lambda r: (r.get(col) is None) == want_null)
+        return self
+
+    def order(self, col, desc: bool = False, nullsfirst: bool = False, **_):
+        self.orders.append((col, desc, nullsfirst))
+        return self
+
+    def limit(self, n: int):
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    # --- execução ---
+
+    def execute(self) -> FakeResponse:
+        self.fake._roundtrip((self.table, self.op))
+        return getattr(self, f"_exec_{self.op}")()
+
+    def _match(self, row: dict) -> bool:
+        return all(f(row) for f in self.filters)
+
+    def _candidates(self) -> list[dict]:
+        return [r for r in self.fake.get_table(self.table).rows(self.cnj) if self._match(r)]
+
+    def _exec_select(self):
+        rows = self._candidates()
+        for col, desc, nullsfirst in reversed(self.orders):
+            present = [r for r in rows if r.get(col) is not None]
+            nulls = [r for r in rows if r.get(col) is None]
+            present.sort(key=lambda r: r[col], reverse=desc)
+            rows = nulls + present if nullsfirst else present + nulls
+        total = len(rows)
+        limites = [n for n in (self.limit_n, self.fake.max_rows) if n is not None]
+        rows = rows[self.offset:self.offset + min(limites)] if limites else rows[self.offset:]
+        if self.columns != "*":
+            cols = [c.strip() for c in self.columns.split(",")]
+            rows = [{c: r.get(c) for c in cols} for r in rows]
+        else:
+            rows = [dict(r) for r in rows]
+        return FakeResponse(rows, total if self.count_mode else None)
+
+    def _defaults(self, row: dict) -> dict:
+        row = dict(row)
+        if PRIMARY_KEYS.get(self.table) == ("id",) and "id" not in row:
+            row["id"] = str(uuid.uuid4())
+        if self.table == "sync_log":
+            row.setdefault("started_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    def _exec_insert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        table = self.fake.get_table(self.table)
+        inserted = []
+        for row in rows:
+            row = self._defaults(row)
+            if table.keys and table.get(row) is not None:
+                raise FakeSupabaseError(f"duplicate key em {self.table}")
+            table.put(row)
+            inserted.append(dict(row))
+        return FakeResponse(inserted)
+
+    def _exec_upsert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        table = self.fake.get_table(self.table)
+        keys = tuple(k.strip() for k in self.on_conflict.split(",") if k.strip()) or table.keys
+        out = []
+        for row in rows:
+            row = self._defaults(row)
+            existing = table.get(row, keys)
+            if existing is not None:
+                existing.update(row)
+                out.append(dict(existing))
+            else:
+                table.put(row)
+                out.append(dict(row))
+        return FakeResponse(out)
+
+    def _exec_update(self):
+        table = self.fake.get_table(self.table)
+        out = []
+        for r in self._candidates():
+            table.remove(r)
+            r.update(self.payload)
+            table.put(r)
+            out.append(dict(r))
+        return FakeResponse(out)
+
+    def _exec_delete(self):
+        table = self.fake.get_table(self.table)
+        removed = self._candidates()
+        for r in removed:
+            table.remove(r)
+        for child_name in CASCADES.get(self.table, ()):
+            child = self.fake.get_table(child_name)
+            for r in removed:
+                for c in child.rows(r.get("cnj")):
+                    if self.table == "processos" or c.get("numero_evento") == r.get("numero_evento"):
+                        child.remove(c)
+        return FakeResponse([dict(r) for r in removed])
+
+
+class FakeRpc:
+    def __init__(self, fake: FakeSupabase, name: str, params: dict):
+        self.fake = fake
+        self.name = name
+        self.params = params
+
+    def execute(self) -> FakeResponse:
+        self.fake._roundtrip(("rpc", self.name))
+        fn = self.fake.rpcs.get(self.name)
+        if fn is None:
+            raise FakeSupabaseError(f"função {self.name} não registrada no fake")
+        data = fn(self.fake, self.params)
+        return FakeResponse(data)
+
+
+class FakeStorage:
+    """Storage em memória ou em disco (`storage_dir`), por bucket."""
+
+    def __init__(self, fake: FakeSupabase, storage_dir: str | None):
+        self.fake = fake
+        self.storage_dir = storage_dir
+        self.objects: dict[str, dict[str, int]] = {}
+
+    def from_(self, bucket: str) -> "FakeBucket":
+        return FakeBucket(self, bucket)
+
+
+class FakeBucket:
+    def __init__(self, storage: FakeStorage, bucket: str):
+        self.storage = storage
+        self.bucket = bucket
+
+    @property
+    def _objects(self) -> dict[str, int]:
+        return self.storage.objects.setdefault(self.bucket, {})
+
+    def upload(self, path: str, file, file_options: dict | None = None):
+        self.storage.fake._roundtrip(("storage", "upload"))
+        data = file.read() if hasattr(file, "read") else file
+        if self.storage.storage_dir:
+            full = os.path.join(self.storage.storage_dir, self.bucket, path)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "wb") as f:
+                f.write(data)
+        self._objects[path] = len(data)
+        return {"Key": f"{self.bucket}/{path}"}
+
+    def get_public_url(self, path: str) -> str:
+        return f"http://fake-supabase.local/storage/v1/object/public/{self.bucket}/{path}"
+
+    def list(self, path: str = "") -> list[dict]:
+        self.storage.fake._roundtrip(("storage", "list"))
+        prefix = path.rstrip("/") + "/" if path else ""
+        names = set()
+        for key in self._objects:
+            if key.startswith(prefix):
+                names.add(key[len(prefix):].split("/", 1)[0])
+        return [{"name": n} for n in sorted(names)]
+
+    def remove(self, paths: "list[str]") -> "list[dict]":
+        self.storage.fake._roundtrip(("storage", "remove"))
+        removed = []
+        for p in paths:
+            if self._objects.pop(p, None) is not None:
+                removed.append({"name": p})
+                if self.storage.storage_dir:
+                    full = os.path.join(self.storage.storage_dir, self.bucket, p)
+                    if os.path.exists(full):
+                        os.remove(full)
+        return removed
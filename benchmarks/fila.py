@@ -0,0 +1,160 @@
+"""
+Teste de concorrência da fila distribuída (fila_processos) num Postgres local.
+
+Recria o schema, enfileira N processos e sobe W workers simulados (threads,
+cada chamada via psql = uma conexão própria). Cada worker reserva lotes com
+fila_reservar (FOR UPDATE SKIP LOCKED), "scrapeia" (sleep) e conclui; uma
+fração deles "cai" sem concluir, para exercitar a retomada por lease vencido.
+Verifica que nenhum CNJ foi concluído por dois workers, que todos terminaram
+e que fila_finalizar fechou o sync_log.
+
+ATENÇÃO: o schema.sql faz DROP de todas as tabelas. Use só um banco local.
+
+Uso:
+    python -m benchmarks.fila --dsn postgresql://postgres@localhost/eproc_bench --processos 500 --workers 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.migrate import psql
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(ROOT, "src", "db", "schema.sql")
+CONTAS = ["ana", "bia", "caio"]
+
+
+def _setup(dsn: str, n: int) -> str:
+    with open(SCHEMA, encoding="utf-8") as f:
+        psql(dsn, "SET client_min_messages = warning;\n" + f.read())
+    itens = [{"cnj": f"P{i:06d}", "advogados": random.sample(CONTAS, random.randint(1, 2))}
+             for i in range(n)]
+    log_id = psql(dsn, f"""
+        INSERT INTO processos (cnj) SELECT 'P' || lpad(i::text, 6, '0') FROM generate_series(0, {n - 1}) i;
+        INSERT INTO sync_log (status, tipo) VALUES ('running', 'fila') RETURNING id;
+    """).strip()
+    psql(dsn, f"SELECT fila_enfileirar('{log_id}', '{json.dumps(itens)}');")
+    return log_id
+
+
+class SimWorker(threading.Thread):
+    def __init__(self, dsn: str, nome: str, contas: list[str], args, resultados: dict, lock: threading.Lock):
+        super().__init__(daemon=True)
+        self.dsn = dsn
+        self.nome = nome
+        self.contas = contas
+        self.args = args
+        self.resultados = resultados
+        self.lock = lock
+        self.reservas = 0
+        self.quedas = 0
+        self.rng = random.Random(nome)
+
+    def run(self):
+        contas = "ARRAY[" + ",".join(f"'{c}'" for c in self.contas) + "]"
+        vazio_desde = None
+        while True:
+            out = psql(self.dsn, f"SELECT cnj FROM fila_reservar('{self.nome}', {contas}, "
+                                 f"{self.args.lote}, {self.args.lease}, {self.args.tentativas});")
+            cnjs = [line for line in out.splitlines() if line]
+            if not cnjs:
+                # Fila vazia para este worker: espera leases vencidos antes de sair
+                vazio_desde = vazio_desde or time.monotonic()
+                if time.monotonic() - vazio_desde > self.args.lease * 2:
+                    return
+                time.sleep(0.2)
+                continue
+            vazio_desde = None
+            self.reservas += len(cnjs)
+
+            time.sleep(self.rng.uniform(0, self.args.trabalho_ms * 2) / 1000)
+            if self.rng.random() < self.args.quedas:
+                # Worker "caiu": não conclui; os CNJs voltam quando o lease vencer
+                self.quedas += len(cnjs)
+                continue
+
+            for cnj in cnjs:
+                ok = self.rng.random() >= self.args.erros
+                out = psql(self.dsn, f"SELECT fila_concluir('{self.nome}', '{cnj}', {str(ok).lower()}, {int(ok)}, "
+                                     f"{'NULL' if ok else repr('erro simulado')}, {self.args.tentativas});")
+                if out.strip() == "t" and ok:
+                    with self.lock:
+                        self.resultados.setdefault(cnj, []).append(self.nome)
+
+
+def run(args) -> dict:
+    print(f"[FILA] Recriando schema e enfileirando {args.processos} processos...")
+    log_id = _setup(args.dsn, args.processos)
+
+    resultados: dict[str, list[str]] = {}
+    lock = threading.Lock()
+    workers = [
+        SimWorker(args.dsn, f"w{i}", random.sample(CONTAS, 2), args, resultados, lock)
+        for i in range(args.workers)
+    ]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+
+    status = dict(Counter(
+        line for line in psql(args.dsn, "SELECT status FROM fila_processos;").splitlines() if line
+    ))
+    retomados = int(psql(args.dsn, "SELECT COUNT(*) FROM fila_processos WHERE tentativas > 1;").strip())
+    finalizados = psql(args.dsn, "SELECT row_to_json(f) FROM fila_finalizar() f;").strip()
+    log = json.loads(psql(args.dsn, f"SELECT row_to_json(s) FROM sync_log s WHERE id = '{log_id}';"))
+    duplicados = {cnj: ws for cnj, ws in resultados.items() if len(ws) > 1}
+
+    report = {
+        "params": vars(args) | {"dsn": "(omitido)"},
+        "segundos": round(elapsed, 2),
+        "reservas": sum(w.reservas for w in workers),
+        "abandonados_por_queda": sum(w.quedas for w in workers),
+        "retomados_apos_lease": retomados,
+        "status": status,
+        "concluidos_por_mais_de_um_worker": len(duplicados),
+        "sync_log": {k: log[k] for k in ("status", "processos_total", "documentos_baixados", "erros")},
+        "lote_finalizado": bool(finalizados),
+    }
+    print(f"[FILA] {args.workers} workers | {report['segundos']}s | {report['reservas']} reservas | "
+          f"{report['abandonados_por_queda']} abandonados | {retomados} retomados após lease")
+    print(f"[FILA] status: {status} | duplicados: {len(duplicados)} | sync_log: {report['sync_log']}")
+    pendentes = status.get("pendente", 0) + status.get("em_andamento", 0)
+    if duplicados or pendentes or not finalizados:
+        print("[FILA] FALHA: fila inconsistente")
+    else:
+        print("[FILA] OK: cada CNJ concluído por um único worker e lote fechado")
+    return report
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Teste de concorrência da fila distribuída")
+    parser.add_argument("--dsn", required=True, help="Postgres LOCAL descartável (o schema é recriado)")
+    parser.add_argument("--processos", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--lote", type=int, default=4, help="CNJs por reserva")
+    parser.add_argument("--lease", type=int, default=2, help="lease em segundos")
+    parser.add_argument("--tentativas", type=int, default=3)
+    parser.add_argument("--trabalho-ms", type=float, default=20, help="tempo médio de 'scrape' por lote")
+    parser.add_argument("--quedas", type=float, default=0.05, help="probabilidade de um lote ser abandonado")
+    parser.add_argument("--erros", type=float, default=0.02, help="probabilidade de erro por CNJ")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[FILA] Resultado salvo em {args.out}")
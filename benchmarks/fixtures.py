@@ -0,0 +1,206 @@
+"""
+Geradores de páginas eProc sintéticas e anonimizadas para o benchmark offline.
+
+As páginas reproduzem apenas a estrutura que os scrapers leem (ids, classes,
+colunas e textos), com dados fictícios determinísticos (seed fixa). Páginas
+gravadas do eProc real podem substituir qualquer rota: ver `server.py`.
+"""
+import random
+from datetime import datetime, timedelta
+from html import escape
+
+_CLASSES = ["Inventário", "Cumprimento de Sentença", "Procedimento Comum Cível", "Execução de Título Extrajudicial"]
+_ASSUNTOS = [("14815", "Inventário e Partilha"), ("7780", "Indenização por Dano Moral"), ("10433", "Alimentos")]
+_TIPOS_PARTE = ["AUTOR", "RÉU", "REQUERENTE", "REQUERIDO", "EXEQUENTE", "EXECUTADO", "HERDEIRO"]
+_UFS = ["RS", "SC", "PR", "SP"]
+DOC_VARIANTS = ["direto", "botao", "embed", "html"]
+
+# PDF mínimo válido (1 página em branco) usado pelos downloads
+MINI_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def fake_cnj(i: int) -> str:
+    return f"{5000000 + i:07d}-{i % 97:02d}.2025.8.21.{i % 10000:04d}"
+
+
+def _fmt(dt: datetime, with_time: bool = True) -> str:
+    return dt.strftime("%d/%m/%Y %H:%M:%S" if with_time else "%d/%m/%Y")
+
+
+def _page(title: str, body: str, style: str = "") -> str:
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{escape(title)}</title>{f'<style>{style}</style>' if style else ''}</head><body>"
+        "<div id='divInfraBarraSistema'>eProc</div>"
+        f"{body}</body></html>"
+    )
+
+
+def painel() -> str:
+    return _page("Painel do Advogado", (
+        "<div id='divInfraAreaTelaD'>"
+        "<a href='controlador.php?acao=citacao_intimacao_prazo_aberto_listar&pagina=1'>"
+        "Citações/Intimações com prazo aberto</a></div>"
+    ))
+
+
+def prazos_page(n_prazos: int, pagina: int, por_pagina: int, seed: int = 1) -> str:
+    """Página `pagina` (1-based) da listagem de prazos abertos, com `n_prazos` no total."""
+    rng = random.Random(seed + pagina)
+    base = datetime(2026, 2, 1, 9, 0, 0)
+    inicio = (pagina - 1) * por_pagina
+    fim = min(n_prazos, inicio + por_pagina)
+
+    rows = [
+        "<tr><th></th><th>Processo</th><th>Classe</th><th>Assunto</th><th>Evento e Prazo</th>"
+        "<th>Data envio</th><th>Início Prazo</th><th>Final Prazo</th></tr>"
+    ]
+    for i in range(inicio, fim):
+        # ~20% dos processos têm 2 prazos (linhas consecutivas com o mesmo CNJ)
+        cnj = fake_cnj(i if i % 5 else max(0, i - 1))
+        envio = base + timedelta(hours=i)
+        rows.append(
+            "<tr>"
+            "<td><input type='checkbox'></td>"
+            f"<td><a href='controlador.php?acao=processo_selecionar&num_processo={cnj}'>{cnj}</a>"
+            f"<br>Juízo: {rng.randint(1, 5)}ª Vara Cível de Comarca {i % 40}\nCadastrar lembrete"
+            f"<br>PARTE AUTORA {i:05d} x PARTE RÉ {i:05d}</td>"
+            f"<td>{escape(rng.choice(_CLASSES))}</td>"
+            f"<td>{escape(rng.choice(_ASSUNTOS)[1])}</td>"
+            f"<td>Evento {rng.randint(1, 300)} - INTIMAÇÃO ELETRÔNICA - Prazo {rng.choice([5, 15, 30])} dias</td>"
+            f"<td>{_fmt(envio)}</td>"
+            f"<td>{_fmt(envio + timedelta(days=3), with_time=False)}</td>"
+            f"<td>{_fmt(envio + timedelta(days=18), with_time=False)}</td>"
+            "</tr>"
+        )
+
+    paginacao = ""
+    if fim < n_prazos:
+        paginacao = (
+            "<div id='divInfraAreaPaginacaoSuperior'>"
+            f"<a id='lnkInfraProximaPaginaSuperior' "
+            f"href='controlador.php?acao=citacao_intimacao_prazo_aberto_listar&pagina={pagina + 1}'>"
+            "Próxima Página</a></div>"
+        )
+    caption = f"Lista de Prazos ({n_prazos} registros - {inicio + 1} a {fim}):"
+    return _page("Prazos Abertos", (
+        f"{paginacao}<table class='infraTable'><caption class='infraCaption'>{caption}</caption>"
+        + "".join(rows) + "</table>"
+    ))
+
+
+def _partes_html(cnj: str, n_partes: int, rng: random.Random) -> str:
+    rows = []
+    for i in range(n_partes):
+        tipo = _TIPOS_PARTE[i % len(_TIPOS_PARTE)]
+        cpf = f"{rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}-{rng.randint(10, 99)}"
+        uf = rng.choice(_UFS)
+        adv = f"ADVOGADO FICTICIO {i:03d}"
+        rows.append(
+            "<tr><td>"
+            f"<a class='infraNomeParte' data-parte='{tipo}'>PARTE {i:04d} DO PROCESSO {cnj[:7]}</a> "
+            f"<span id='spnCpfParte{i}'>{cpf}</span> (Inventariante) - Pessoa Física<br>"
+            f"{adv}&nbsp;&nbsp;{uf}{rng.randint(10000, 99999):06d}"
+            "</td></tr>"
+        )
+    return f"<table id='tblPartesERepresentantes' class='infraTable'>{''.join(rows)}</table>"
+
+
+def _evento_row(cnj: str, numero: int, rng: random.Random, base: datetime, prazo_css: bool = False) -> str:
+    dt = base + timedelta(days=numero)
+    prazo = numero % 7 == 0
+    desc = f"Evento {numero} - JUNTADA DE PETIÇÃO"
+    style = ""
+    if prazo:
+        ini = dt + timedelta(days=2)
+        fim = dt + timedelta(days=17)
+        desc = (
+            f"Intimação Eletrônica - Refer. ao Evento {max(1, numero - 1)} "
+            f"Prazo: 15 dias Status:ABERTO "
+            f"Data inicial da contagem do prazo: {_fmt(ini)} Data final: {_fmt(fim)}"
+        )
+        style = " class='infraEventoPrazo'" if prazo_css else " style='background-color: yellow'"
+    if numero % 50 == 0:
+        desc += " URGENTE"
+    docs = "".join(
+        f"<a href='controlador.php?acao=acessar_documento&doc={cnj}_{numero}_{d}"
+        f"&variant={DOC_VARIANTS[(numero + d) % len(DOC_VARIANTS)]}'>DOC{d + 1}</a> "
+        for d in range(numero % 3)
+    )
+    return (
+        f"<tr><td>{numero}</td><td>{_fmt(dt)}</td><td{style}>{escape(desc)}</td>"
+        f"<td>USUARIO{rng.randint(1, 20)}</td><td>{docs}</td></tr>"
+    )
+
+
+def processo_page(cnj: str, n_eventos: int, n_partes: int, visiveis: int = 20, seed: int = 1,
+                  carregar_todos: str = "js", prazo_css: bool = False) -> str:
+    """Página do processo: capa, assuntos, partes e eventos (mais novos primeiro).
+    Apenas `visiveis` eventos vêm renderizados; o restante entra no DOM ao
+    clicar em "Carregar TODOS os eventos", como no eProc. Com carregar_todos="link"
+    o link é uma URL (&todos=1) que devolve a página com todos os eventos; com
+    prazo_css o amarelo do prazo aberto vem de uma classe da <style> da página."""
+    rng = random.Random(f"{seed}:{cnj}")
+    base = datetime(2015, 1, 1, 10, 0, 0)
+    numeros = list(range(n_eventos, 0, -1))
+    first = "".join(_evento_row(cnj, n, rng, base, prazo_css) for n in numeros[:visiveis])
+    rest = "".join(_evento_row(cnj, n, rng, base, prazo_css) for n in numeros[visiveis:])
+
+    load_all = ""
+    if rest and carregar_todos == "link":
+        load_all = (
+            f"<a href='controlador.php?acao=processo_selecionar&num_processo={cnj}&todos=1'>"
+            "Carregar TODOS os eventos</a>"
+        )
+    elif rest:
+        load_all = (
+            "<a href='#' onclick=\"var t=document.getElementById('tplEventos');"
+            "document.querySelector('#tblEventos tbody').insertAdjacentHTML('beforeend', t.innerHTML);"
+            "this.remove();return false;\">Carregar TODOS os eventos</a>"
+            f"<template id='tplEventos'>{rest}</template>"
+        )
+
+    assuntos = "".join(
+        f"<tr><td>{cod}</td><td>{escape(desc)}</td></tr>" for cod, desc in _ASSUNTOS[:2]
+    )
+    capa = (
+        "<div id='divCapaProcesso'>"
+        f"<span id='txtNumProcesso'>{cnj}</span>"
+        f"<span id='txtClasse'>{escape(rng.choice(_CLASSES))}</span>"
+        "<span id='txtCompetencia'>Cível</span>\n"
+        "Data de autuação: 10/03/2015\n"
+        "Situação MOVIMENTO\n"
+        "Órgão Julgador:\n 1ª Vara Cível de Comarca Fictícia\n"
+        "Juiz(a):\n JUIZ FICTICIO\nProcessos relacionados\n"
+        "</div>"
+    )
+    return _page(f"Processo {cnj}", (
+        capa
+        + f"<table class='infraTable table-not-hover mb-0'>{assuntos}</table>"
+        + _partes_html(cnj, n_partes, rng)
+        + load_all
+        + f"<table id='tblEventos' class='infraTable'><tbody>{first}</tbody></table>"
+    ), style="#tblEventos td.infraEventoPrazo { background-color: #FFFF00; }" if prazo_css else "")
+
+
+def documento_viewer(doc_id: str, variant: str) -> str:
+    """Variantes do visualizador de documentos do eProc (exceto download direto)."""
+    raw = f"controlador.php?acao=acessar_documento_implementacao&doc={doc_id}"
+    if variant == "botao":
+        return _page("Documento", (
+            f"<a id='download' href='{raw}&attach=1'>Download</a>"
+            f"<div>Visualizador do documento {escape(doc_id)}</div>"
+        ))
+    if variant == "embed":
+        return _page("Documento", f"<embed type='application/pdf' src='{raw}'>")
+    # html: certidão/despacho gerado pelo sistema → html->pdf
+    paragrafos = "".join(f"<p>Parágrafo {i} do documento {escape(doc_id)}.</p>" for i in range(40))
+    return _page("Certidão", (
+        "<div id='divInfraBarraComandosSuperior'>Comandos</div>"
+        f"<div id='divDocumento'><h1>CERTIDÃO</h1>{paragrafos}</div>"
+    ))
@@ -0,0 +1,179 @@
+"""
+Benchmark da engine HTTP (src/scrapers/http_engine.py) contra o eProc sintético.
+
+Sem browser: o EprocHttp é montado direto sobre um httpx.AsyncClient (no
+scraper ele herda os cookies do BrowserContext logado). Cenários:
+
+- lista de prazos paginada por HTTP (confere linhas == registros do caption);
+- N páginas de processo com "Carregar TODOS os eventos" como URL e prazo aberto
+  marcado por classe CSS (confere eventos e prazos abertos de cada processo);
+- as mesmas páginas com o "Carregar TODOS" só em JavaScript: todas devem
+  levantar HtmlInesperado (o sync cai no Playwright);
+- extração incremental (since_numero = 2 eventos antes do último), nos dois
+  servidores: a página inicial já chega até ele, então uma requisição por
+  processo, só os 2 eventos novos completos (os já gravados da página vêm só
+  como resumo) e nenhum fallback, mesmo com o JavaScript.
+
+Uso:
+    python -m benchmarks.http_engine --prazos 1000 --processos 200 --eventos 300 --conexoes 8
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import Config
+from src.metrics import metrics
+from src.scrapers.http_engine import EprocHttp, HtmlInesperado, scrape_prazos_http, fetch_processo_http
+from benchmarks import fixtures
+from benchmarks.server import FakeEproc
+
+
+def _cliente() -> EprocHttp:
+    return EprocHttp(httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=Config.HTTP_TIMEOUT_SEC,
+        limits=httpx.Limits(max_connections=Config.HTTP_CONEXOES,
+                            max_keepalive_connections=Config.HTTP_CONEXOES),
+    ))
+
+
+async def _processos(http: EprocHttp, cnjs: list[str], since_numero: int | None = None) -> tuple[list, int, float]:
+    """(dados por processo, fallbacks, segundos) buscando até HTTP_CONEXOES ao mesmo tempo."""
+    sem = asyncio.Semaphore(Config.HTTP_CONEXOES)
+    fallbacks = 0
+
+    async def _one(cnj):
+        nonlocal fallbacks
+        async with sem:
+            try:
+                _, dados = await fetch_processo_http(
+                    http, f"controlador.php?acao=processo_selecionar&num_processo={cnj}", since_numero)
+                return dados
+            except HtmlInesperado:
+                fallbacks += 1
+                return None
+
+    t0 = time.perf_counter()
+    dados = await asyncio.gather(*(_one(c) for c in cnjs))
+    return dados, fallbacks, time.perf_counter() - t0
+
+
+async def run(args) -> dict:
+    Config.HTTP_CONEXOES = args.conexoes
+    Config.METRICS_BACKEND = ""
+    Config.METRICS_PROM_FILE = ""
+    cnjs = [fixtures.fake_cnj(i) for i in range(args.processos)]
+    esperado_prazos = sum(1 for n in range(1, args.eventos + 1) if n % 7 == 0)
+    novos = min(2, args.eventos)
+    since = args.eventos - novos
+    report = {"prazos": args.prazos, "processos": args.processos, "eventos": args.eventos,
+              "conexoes": args.conexoes, "cenarios": []}
+
+    # 1) Lista de prazos + processos com "Carregar TODOS" por URL e prazo por classe
+    server = FakeEproc(n_prazos=args.prazos, n_eventos=args.eventos, n_partes=args.partes,
+                       carregar_todos="link", prazo_css=True).start()
+    Config.EPROC_BASE_URL = server.base_url
+    http = _cliente()
+    try:
+        metrics.reset()
+        info = {"conta": "bench"}
+        t0 = time.perf_counter()
+        por_cnj = await scrape_prazos_http(http, info)
+        elapsed = time.perf_counter() - t0
+        ok = info["completo"] and info["linhas"] == args.prazos
+        report["cenarios"].append({
+            "nome": "prazos", "seconds": round(elapsed, 3), "paginas": info["paginas"],
+            "linhas": info["linhas"], "processos": len(por_cnj), "ok": ok,
+        })
+        print(f"[HTTP] prazos: {info['linhas']} linhas em {info['paginas']} páginas, "
+              f"{elapsed:.2f}s | {'OK' if ok else 'FALHOU'}")
+
+        dados, fallbacks, elapsed = await _processos(http, cnjs)
+        ok = fallbacks == 0 and all(
+            d and len(d["eventos"]) == args.eventos
+            and sum(1 for e in d["eventos"] if e["prazo_aberto"]) == esperado_prazos
+            for d in dados
+        )
+        report["cenarios"].append({
+            "nome": "processos_link", "seconds": round(elapsed, 3),
+            "processos_por_seg": round(len(cnjs) / elapsed, 1) if elapsed else None,
+            "requisicoes": server.requests.get("processo_selecionar", 0),
+            "fallbacks": fallbacks, "ok": ok,
+        })
+        print(f"[HTTP] processos (Carregar TODOS por URL, prazo por classe): {len(cnjs)} em {elapsed:.2f}s "
+              f"({report['cenarios'][-1]['processos_por_seg']} proc/s) | {fallbacks} fallbacks | "
+              f"{'OK' if ok else 'FALHOU'}")
+
+        antes = server.requests.get("processo_selecionar", 0)
+        dados, fallbacks, elapsed = await _processos(http, cnjs, since)
+        _incremental(report, "processos_incremental_link", dados, fallbacks, elapsed,
+                     server.requests.get("processo_selecionar", 0) - antes, len(cnjs), novos)
+    finally:
+        await http.close()
+        server.stop()
+
+    # 2) "Carregar TODOS" só em JavaScript: toda página com mais de 20 eventos cai no
+    # browser, exceto na extração incremental
+    server = FakeEproc(n_eventos=args.eventos, n_partes=args.partes, carregar_todos="js").start()
+    Config.EPROC_BASE_URL = server.base_url
+    http = _cliente()
+    try:
+        dados, fallbacks, elapsed = await _processos(http, cnjs)
+        ok = fallbacks == (len(cnjs) if args.eventos > 20 else 0)
+        report["cenarios"].append({
+            "nome": "processos_js", "seconds": round(elapsed, 3), "fallbacks": fallbacks, "ok": ok,
+        })
+        print(f"[HTTP] processos (Carregar TODOS em JS): {fallbacks}/{len(cnjs)} fallbacks para o browser | "
+              f"{'OK' if ok else 'FALHOU'}")
+
+        antes = server.requests.get("processo_selecionar", 0)
+        dados, fallbacks, elapsed = await _processos(http, cnjs, since)
+        _incremental(report, "processos_incremental_js", dados, fallbacks, elapsed,
+                     server.requests.get("processo_selecionar", 0) - antes, len(cnjs), novos)
+    finally:
+        await http.close()
+        server.stop()
+
+    report["stages"] = metrics.summary()["timings"]
+    return report
+
+
+def _incremental(report, nome, dados, fallbacks, elapsed, requisicoes, n, novos):
+    ok = fallbacks == 0 and requisicoes == n and all(
+        d and sum(1 for e in d["eventos"] if not e.get("conhecido")) == novos for d in dados
+    )
+    report["cenarios"].append({
+        "nome": nome, "seconds": round(elapsed, 3),
+        "processos_por_seg": round(n / elapsed, 1) if elapsed else None,
+        "requisicoes": requisicoes, "fallbacks": fallbacks, "ok": ok,
+    })
+    print(f"[HTTP] {nome} (só os {novos} mais novos): {n} em {elapsed:.2f}s "
+          f"({report['cenarios'][-1]['processos_por_seg']} proc/s) | {requisicoes} requisições | "
+          f"{fallbacks} fallbacks | {'OK' if ok else 'FALHOU'}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark da engine HTTP contra o eProc sintético")
+    parser.add_argument("--prazos", type=int, default=1000)
+    parser.add_argument("--processos", type=int, default=100)
+    parser.add_argument("--eventos", type=int, default=200)
+    parser.add_argument("--partes", type=int, default=6)
+    parser.add_argument("--conexoes", type=int, default=8)
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[HTTP] Resultado salvo em {args.out}")
+    sys.exit(0 if all(c["ok"] for c in report["cenarios"]) else 1)
@@ -0,0 +1,141 @@
+"""
+Simulação do limitador (src/limitador.py) contra um eProc sintético em memória.
+
+O "eProc" atende bem até `--capacidade` requisições simultâneas; acima disso a
+latência cresce com a fila e, com o dobro, passa a dar timeout. No meio da
+rodada ele cai por `--queda` segundos (toda requisição espera o timeout e
+falha). Compara:
+
+- fixo: concorrência constante = LIMITADOR_MAX, sem disjuntor (como antes);
+- adaptativo: AIMD + disjuntor com os parâmetros do .env (escala de tempo
+  reduzida: latências em centésimos de segundo).
+
+Mede requisições completadas, falhas e tempo gasto em timeouts durante a queda.
+
+Uso:
+    python -m benchmarks.limitador --requisicoes 600 --capacidade 4 --max 16
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.metrics import metrics
+from src.limitador import limitador
+
+
+class EprocSimulado:
+    def __init__(self, capacidade: int, latencia: float, timeout: float, queda: tuple[float, float]):
+        self.capacidade = capacidade
+        self.latencia = latencia
+        self.timeout = timeout
+        self.queda = queda
+        self.em_uso = 0
+        self.pico = 0
+        self.t0 = time.monotonic()
+        self.tempo_em_timeout = 0.0
+
+    async def requisicao(self):
+        self.em_uso += 1
+        self.pico = max(self.pico, self.em_uso)
+        try:
+            agora = time.monotonic() - self.t0
+            fora = self.queda[0] <= agora < self.queda[1]
+            excesso = max(0, self.em_uso - self.capacidade) / self.capacidade
+            if fora or excesso >= 1:
+                await asyncio.sleep(self.timeout)
+                self.tempo_em_timeout += self.timeout
+                raise TimeoutError("timeout")
+            await asyncio.sleep(self.latencia * (1 + 4 * excesso))
+        finally:
+            self.em_uso -= 1
+
+
+async def _rodada(args, adaptativo: bool) -> dict:
+    Config.LIMITADOR_MIN = 1
+    Config.LIMITADOR_MAX = args.max
+    Config.LIMITADOR_LATENCIA_ALVO_SEC = args.latencia * 3
+    Config.LIMITADOR_PAUSA_SEC = args.queda / 4
+    Config.LIMITADOR_PAUSA_MAX_SEC = args.queda
+    if not adaptativo:
+        # Sem AIMD nem disjuntor: limite fixo, nunca reduz nem abre
+        Config.LIMITADOR_MIN = args.max
+        Config.LIMITADOR_LATENCIA_ALVO_SEC = 1e9
+        Config.LIMITADOR_FALHAS_SEGUIDAS = 10 ** 9
+        Config.LIMITADOR_ERRO_MAX = 2.0
+    else:
+        Config.LIMITADOR_FALHAS_SEGUIDAS = 5
+        Config.LIMITADOR_ERRO_MAX = 0.5
+    limitador.reset()
+    metrics.reset()
+
+    inicio_queda = args.requisicoes / args.capacidade * args.latencia / 3
+    eproc = EprocSimulado(args.capacidade, args.latencia, args.timeout,
+                          (inicio_queda, inicio_queda + args.queda))
+    ok = falhas = 0
+
+    async def _one():
+        nonlocal ok, falhas
+        try:
+            async with limitador.requisicao("sim"):
+                await eproc.requisicao()
+            ok += 1
+        except TimeoutError:
+            falhas += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(args.requisicoes)))
+    elapsed = time.perf_counter() - t0
+    resumo = metrics.summary()
+    return {
+        "modo": "adaptativo" if adaptativo else "fixo",
+        "seconds": round(elapsed, 3),
+        "ok": ok,
+        "falhas": falhas,
+        "tempo_em_timeout": round(eproc.tempo_em_timeout, 2),
+        "pico_simultaneas": eproc.pico,
+        "aberturas_disjuntor": resumo["counters"].get("limitador.disjuntor_aberto", 0),
+        "reducoes": resumo["counters"].get("limitador.reducoes", 0),
+        "gauges": resumo["gauges"],
+    }
+
+
+async def run(args) -> dict:
+    Config.METRICS_BACKEND = ""
+    rodadas = [await _rodada(args, adaptativo=False), await _rodada(args, adaptativo=True)]
+    for r in rodadas:
+        print(f"[LIMITADOR] {r['modo']:<10} {r['seconds']:6.2f}s | {r['ok']} ok | {r['falhas']} falhas | "
+              f"{r['tempo_em_timeout']}s em timeouts | pico {r['pico_simultaneas']} simultâneas | "
+              f"{r['aberturas_disjuntor']} aberturas, {r['reducoes']} reduções")
+    fixo, adaptativo = rodadas
+    melhor = adaptativo["falhas"] < fixo["falhas"] and adaptativo["tempo_em_timeout"] < fixo["tempo_em_timeout"]
+    print(f"[LIMITADOR] Adaptativo {'evitou' if melhor else 'NÃO evitou'} as falhas em série "
+          f"({fixo['falhas']} -> {adaptativo['falhas']})")
+    return {"parametros": vars(args), "rodadas": rodadas, "ok": melhor}
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Simulação do limitador AIMD + disjuntor")
+    parser.add_argument("--requisicoes", type=int, default=600)
+    parser.add_argument("--capacidade", type=int, default=4, help="simultâneas que o eProc aguenta")
+    parser.add_argument("--max", type=int, default=16, help="LIMITADOR_MAX")
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência base (s)")
+    parser.add_argument("--timeout", type=float, default=0.3, help="tempo até o timeout (s)")
+    parser.add_argument("--queda", type=float, default=1.0, help="duração da queda do eProc (s)")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[LIMITADOR] Resultado salvo em {args.out}")
+    sys.exit(0 if report["ok"] else 1)
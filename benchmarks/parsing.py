@@ -0,0 +1,228 @@
+"""
+Micro-benchmark do parsing puro dos scrapers (src/scrapers/parsing.py).
+
+Gera N linhas sintéticas (linhas da lista de prazos, descrições de eventos e
+células de partes) e mede o custo por linha da implementação atual contra a
+anterior (regex recompiladas/literais no loop e strptime duplo), conferindo
+que as duas produzem o mesmo resultado.
+
+Uso:
+    python -m benchmarks.parsing --linhas 100000 --out parsing.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scrapers import parsing
+from benchmarks import fixtures
+
+_BR_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+# --- Implementação anterior (referência) -------------------------------------
+
+def _antes_datetime(text: str):
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, "%d/%m/%Y %H:%M:%S").replace(tzinfo=_BR_TZ)
+    except ValueError:
+        try:
+            return datetime.strptime(text, "%d/%m/%Y").replace(tzinfo=_BR_TZ)
+        except ValueError:
+            return None
+
+
+def _antes_prazo_row(cells: list[str], href: str):
+    if len(cells) < 5:
+        return None
+    proc_text = cells[1].strip()
+    match = re.search(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}", proc_text)
+    if not match:
+        return None
+    juizo = ""
+    juizo_match = re.search(r"Ju[ií]zo:\s*(.+?)(?:\n|Cadastrar)", proc_text)
+    if juizo_match:
+        juizo = juizo_match.group(1).strip()
+
+    def _cell(i: int) -> str:
+        return cells[i].strip() if i < len(cells) else ""
+
+    data_envio = _antes_datetime(_cell(5))
+    prazo_inicio = _antes_datetime(_cell(6))
+    prazo_final = _antes_datetime(_cell(7))
+    return {
+        "cnj": match.group(0),
+        "classe": _cell(2),
+        "assunto": _cell(3),
+        "juizo": juizo,
+        "evento_descricao": _cell(4),
+        "data_envio": data_envio.isoformat() if data_envio else None,
+        "prazo_inicio": prazo_inicio.isoformat() if prazo_inicio else None,
+        "prazo_final": prazo_final.isoformat() if prazo_final else None,
+        "proc_href": href,
+        "partes_raw": proc_text,
+    }
+
+
+def _antes_evento(descricao: str) -> dict:
+    prazo_dias = prazo_status = prazo_data_inicial = prazo_data_final = evento_referencia = None
+    if "Prazo:" in descricao and "Status:" in descricao:
+        m = re.search(r"Prazo:\s*(\d+)\s*dias?", descricao)
+        if m:
+            prazo_dias = int(m.group(1))
+        m = re.search(r"Status:\s*(\w+)", descricao)
+        if m:
+            prazo_status = m.group(1)
+        m = re.search(r"Data inicial[^:]*:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})", descricao)
+        if m:
+            prazo_data_inicial = _antes_datetime(m.group(1))
+        m = re.search(r"Data final:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})", descricao)
+        if m:
+            prazo_data_final = _antes_datetime(m.group(1))
+    m = re.search(r"Refer\.\s*ao\s*Evento:?\s*(\d+)", descricao)
+    if m:
+        evento_referencia = int(m.group(1))
+    return {
+        "prazo_dias": prazo_dias,
+        "prazo_status": prazo_status,
+        "prazo_data_inicial": prazo_data_inicial.isoformat() if prazo_data_inicial else None,
+        "prazo_data_final": prazo_data_final.isoformat() if prazo_data_final else None,
+        "evento_referencia": evento_referencia,
+        "urgente": "URGENTE" in descricao,
+    }
+
+
+def _antes_representantes(td_text: str, nome: str) -> list[dict]:
+    estados = (
+        "RS|SC|PR|SP|RJ|MG|BA|PE|CE|GO|MT|MS|PA|AM|MA|PI|RN|PB|SE|AL|ES|"
+        "RO|AC|AP|RR|TO|DF|OAB"
+    )
+    rep_regex = re.compile(
+        rf"([A-ZÀ-Ú][A-ZÀ-Ú\s\.]+?)\s{{2,}}((?:{estados}|DPE)[-]?\d+)", re.UNICODE
+    )
+    reps = []
+    for m in rep_regex.finditer(td_text):
+        rep_nome = re.sub(
+            r"^(?:Procurador\(es\):\s*|ADVOGADO\s*|ADVOGADA\s*|"
+            r"Pessoa\s+F[ií]sica\s*|Pessoa\s+Jur[ií]dica\s*)",
+            "", m.group(1).strip(), flags=re.IGNORECASE
+        ).strip()
+        registro = m.group(2).strip()
+        if rep_nome and rep_nome.upper() != nome.upper():
+            reps.append({"nome": rep_nome, "oab": registro,
+                         "tipo": "DPE" if "DPE" in registro.upper() else "Advogado"})
+    return reps
+
+
+# --- Dados sintéticos --------------------------------------------------------
+
+def _data(rng: random.Random, com_hora: bool = True) -> str:
+    d = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2026)}"
+    if not com_hora:
+        return d
+    return f"{d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+
+
+def gerar(n: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    prazos, eventos, partes = [], [], []
+    for i in range(n):
+        cnj = fixtures.fake_cnj(i)
+        prazos.append(([
+            "",
+            f"{cnj}\nJuízo: {rng.randint(1, 20)}ª Vara Cível de Porto Alegre\nCadastrar lembrete\nAUTOR X vs RÉU Y",
+            "Procedimento Comum Cível",
+            "Indenização por Dano Moral",
+            f"Intimação Eletrônica - Prazo {rng.choice([5, 10, 15])} dias",
+            _data(rng), _data(rng, com_hora=False), _data(rng),
+        ], f"controlador.php?acao=processo_selecionar&num_processo={cnj}"))
+
+        if rng.random() < 0.3:
+            descricao = (f"Intimação Eletrônica - Expedida/Certificada Refer. ao Evento: {rng.randint(1, 300)} "
+                         f"Prazo: {rng.choice([5, 10, 15])} dias Status:{rng.choice(['ABERTO', 'FECHADO'])} "
+                         f"Data inicial da contagem do prazo: {_data(rng)} Data final: {_data(rng)}")
+        else:
+            descricao = rng.choice(["Juntada de Petição", "Conclusos para decisão/despacho",
+                                    "Despacho URGENTE", "Remessa Externa"])
+        eventos.append(descricao)
+
+        nome = f"PARTE {i}"
+        partes.append((
+            f"{nome} (123.456.789-0{i % 10}) - Pessoa Física  Procurador(es): "
+            f"ADVOGADO FULANO DE TAL   RS{rng.randint(10000, 99999):06d} "
+            f"BELTRANA DA SILVA   OAB{rng.randint(1000, 9999)} DEFENSORIA   DPE-{rng.randint(100000, 999999)}",
+            nome,
+        ))
+    return {"prazos": prazos, "eventos": eventos, "partes": partes}
+
+
+# --- Medição -----------------------------------------------------------------
+
+def _medir(nome: str, fn, itens: list, repeticoes: int) -> tuple[float, list]:
+    melhor, saida = float("inf"), None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        saida = [fn(*item) if isinstance(item, tuple) else fn(item) for item in itens]
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor, saida
+
+
+def run(args) -> dict:
+    print(f"[PARSE] Gerando {args.linhas} linhas sintéticas...")
+    dados = gerar(args.linhas)
+    datas = [cells[5] for cells, _ in dados["prazos"]] + [cells[6] for cells, _ in dados["prazos"]]
+    casos = [
+        ("parse_datetime_br", _antes_datetime, parsing.parse_datetime_br, datas),
+        ("linha_prazo", _antes_prazo_row, parsing.parse_prazo_row, dados["prazos"]),
+        ("descricao_evento", _antes_evento, parsing.parse_evento_descricao, dados["eventos"]),
+        ("representantes", _antes_representantes, parsing.parse_representantes, dados["partes"]),
+    ]
+
+    report = {"linhas": args.linhas, "repeticoes": args.repeticoes, "casos": []}
+    print(f"[PARSE] {'caso':<20} {'antes µs/linha':>15} {'depois µs/linha':>16} {'ganho':>7}  iguais")
+    for nome, antes, depois, itens in casos:
+        t_antes, saida_antes = _medir(nome, antes, itens, args.repeticoes)
+        t_depois, saida_depois = _medir(nome, depois, itens, args.repeticoes)
+        if nome == "parse_datetime_br":
+            saida_antes = [d.isoformat() if d else None for d in saida_antes]
+            saida_depois = [d.isoformat() if d else None for d in saida_depois]
+        iguais = saida_antes == saida_depois
+        caso = {
+            "caso": nome,
+            "n": len(itens),
+            "antes_us": round(t_antes / len(itens) * 1e6, 3),
+            "depois_us": round(t_depois / len(itens) * 1e6, 3),
+            "ganho": round(t_antes / t_depois, 2) if t_depois else None,
+            "resultados_iguais": iguais,
+        }
+        report["casos"].append(caso)
+        print(f"[PARSE] {nome:<20} {caso['antes_us']:>15.2f} {caso['depois_us']:>16.2f} "
+              f"{caso['ganho']:>6.1f}x  {'sim' if iguais else 'NÃO'}")
+    return report
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmark do parsing dos scrapers")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=3, help="melhor de N execuções")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[PARSE] Resultado salvo em {args.out}")
@@ -0,0 +1,223 @@
+"""
+Benchmark do pool de proxies (src/proxies.py) com proxies HTTP locais.
+
+Cada proxy de mentira (ProxyLocal) encaminha as requisições ao eProc
+sintético com uma latência própria e pode ser derrubado no meio da rodada
+(passa a recusar conexões). As páginas dos processos são baixadas pela engine
+HTTP, uma sessão (EprocHttp) por proxy ativo, e cada processo vai para o proxy
+escolhido pelo pool. Processos que falham voltam no ciclo seguinte; entre
+ciclos o pool troca os proxies que falharam pelos de reserva. Cenários:
+
+- unico: só o proxy lento (como um PROXY_SERVER único);
+- pool: dois rápidos + o lento, todos ativos (o lento deve receber menos);
+- failover: os mesmos três ativos + um de reserva; um rápido cai depois de
+  1/3 dos processos e deve ser substituído sem travar a rodada.
+
+Uso:
+    python -m benchmarks.proxies --processos 300 --simultaneos 12
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from src.config import Config
+from src.metrics import metrics
+from src.limitador import limitador, Indisponivel
+from src.proxies import ProxyPool, parse_proxy
+from src.scrapers.http_engine import EprocHttp, HtmlInesperado, _proxy_url, fetch_processo_http
+from benchmarks import fixtures
+from benchmarks.server import FakeEproc
+
+
+class ProxyLocal:
+    """Proxy HTTP de encaminhamento (só http://, sem CONNECT) com latência fixa."""
+
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.requisicoes = 0
+        self._server = None
+        self._conexoes: set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> "ProxyLocal":
+        self._server = await asyncio.start_server(self._atender, "127.0.0.1", 0)
+        return self
+
+    async def derrubar(self):
+        """Fecha a porta e corta as conexões em andamento."""
+        self._server.close()
+        for w in list(self._conexoes):
+            w.transport.abort()
+        await self._server.wait_closed()
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._conexoes.add(writer)
+        try:
+            while True:
+                cabecalho = await reader.readuntil(b"\r\n\r\n")
+                linhas = cabecalho.decode("latin-1").split("\r\n")
+                metodo, alvo, _ = linhas[0].split(" ", 2)
+                headers = [l for l in linhas[1:] if l and not l.lower().startswith(("proxy-", "connection"))]
+                tamanho = next((int(l.split(":", 1)[1]) for l in headers
+                                if l.lower().startswith("content-length")), 0)
+                corpo = await reader.readexactly(tamanho) if tamanho else b""
+                self.requisicoes += 1
+                await asyncio.sleep(self.latencia)
+
+                url = urlsplit(alvo)
+                up_reader, up_writer = await asyncio.open_connection(url.hostname, url.port)
+                caminho = url.path + (f"?{url.query}" if url.query else "")
+                up_writer.write((f"{metodo} {caminho} HTTP/1.0\r\n" + "\r\n".join(headers)
+                                 + "\r\nConnection: close\r\n\r\n").encode("latin-1") + corpo)
+                await up_writer.drain()
+                resposta = await up_reader.read()
+                up_writer.close()
+                writer.write(resposta)
+                await writer.drain()
+                break   # HTTP/1.0: uma requisição por conexão
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._conexoes.discard(writer)
+            writer.close()
+
+
+def _cliente(proxy) -> EprocHttp:
+    http = EprocHttp(httpx.AsyncClient(
+        proxy=_proxy_url(proxy.config),
+        timeout=Config.HTTP_TIMEOUT_SEC,
+        limits=httpx.Limits(max_connections=Config.HTTP_CONEXOES,
+                            max_keepalive_connections=Config.HTTP_CONEXOES),
+    ))
+    proxy.vincular(http)
+    return http
+
+
+async def _cenario(nome: str, latencias: list[float], ativos: int, args,
+                   derrubar: int | None = None) -> dict:
+    """Processa todos os CNJs em ciclos até acabar (ou MAX_CICLOS)."""
+    Config.PROXY_MAX_CONCORRENCIA = args.por_proxy
+    limitador.reset()
+    metrics.reset()
+    locais = [await ProxyLocal(l).start() for l in latencias]
+    pool = ProxyPool([parse_proxy(p.url) for p in locais], ativos)
+    por_nome = {p.nome: local for p, local in zip(pool.proxies, locais)}
+    clientes: dict[str, EprocHttp] = {}
+
+    pendentes = [fixtures.fake_cnj(i) for i in range(args.processos)]
+    falhas = ciclos = feitos = 0
+    caido = None
+    sem = asyncio.Semaphore(args.simultaneos)
+
+    async def _one(cnj):
+        nonlocal falhas, feitos, caido
+        async with sem:
+            proxy = pool.escolher(pool.ativos())
+            try:
+                await fetch_processo_http(
+                    clientes[proxy.nome], f"controlador.php?acao=processo_selecionar&num_processo={cnj}")
+                feitos += 1
+            except (HtmlInesperado, Indisponivel):
+                falhas += 1
+                return cnj
+            if derrubar is not None and caido is None and feitos >= derrubar:
+                caido = pool.proxies[0].nome
+                await por_nome[caido].derrubar()
+                print(f"[PROXY] {nome}: {caido} derrubado após {feitos} processos")
+        return None
+
+    t0 = time.perf_counter()
+    while pendentes and ciclos < args.max_ciclos:
+        ciclos += 1
+        for proxy in pool.rotacionar():
+            await clientes.pop(proxy.nome).close()
+        for proxy in pool.ativos():
+            if proxy.nome not in clientes:
+                clientes[proxy.nome] = _cliente(proxy)
+        pendentes = [c for c in await asyncio.gather(*(_one(c) for c in pendentes)) if c]
+    elapsed = time.perf_counter() - t0
+
+    for http in clientes.values():
+        await http.close()
+    for local in locais:
+        if local._server.is_serving():
+            await local.derrubar()
+
+    resultado = {
+        "nome": nome, "seconds": round(elapsed, 3), "ciclos": ciclos,
+        "processos_por_seg": round(args.processos / elapsed, 1) if elapsed else None,
+        "concluidos": args.processos - len(pendentes), "falhas": falhas,
+        "requisicoes_por_proxy": {p.nome: por_nome[p.nome].requisicoes for p in pool.proxies},
+        "latencias": {p.nome: l for p, l in zip(pool.proxies, latencias)},
+        "substituicoes": metrics.summary()["counters"].get("proxy.substituicoes", 0),
+        "ok": not pendentes,
+    }
+    dist = " ".join(f"{n.split(':')[-1]}({resultado['latencias'][n]}s)={r}"
+                    for n, r in resultado["requisicoes_por_proxy"].items())
+    print(f"[PROXY] {nome:<9} {elapsed:6.2f}s | {resultado['processos_por_seg']} proc/s | "
+          f"{ciclos} ciclo(s) | {falhas} falhas | {resultado['substituicoes']} substituições | {dist}")
+    return resultado
+
+
+async def run(args) -> dict:
+    Config.METRICS_BACKEND = ""
+    Config.METRICS_PROM_FILE = ""
+    Config.LIMITADOR_MAX = 10 ** 4       # só os limitadores dos proxies limitam
+    Config.PROXY_QUARENTENA_SEC = 3600
+    server = FakeEproc(n_eventos=args.eventos, carregar_todos="link").start()
+    Config.EPROC_BASE_URL = server.base_url
+    rapido, lento = args.latencia, args.latencia * args.lento
+    try:
+        cenarios = [
+            await _cenario("unico", [lento], 1, args),
+            await _cenario("pool", [rapido, rapido, lento], 3, args),
+            await _cenario("failover", [rapido, rapido, lento, rapido], 3, args,
+                           derrubar=args.processos // 3),
+        ]
+    finally:
+        server.stop()
+
+    unico, pool, failover = cenarios
+    pool["ok"] = pool["ok"] and pool["seconds"] < unico["seconds"]
+    lento_nome = list(failover["latencias"])[2]
+    failover["ok"] = (failover["ok"] and failover["substituicoes"] == 1
+                      and failover["falhas"] <= args.simultaneos + Config.LIMITADOR_FALHAS_SEGUIDAS
+                      and failover["requisicoes_por_proxy"][list(failover["latencias"])[3]] > 0)
+    print(f"[PROXY] pool {unico['seconds'] / pool['seconds']:.1f}x mais rápido que o proxy único | "
+          f"failover {'OK' if failover['ok'] else 'FALHOU'} "
+          f"({failover['falhas']} falhas, lento recebeu {failover['requisicoes_por_proxy'][lento_nome]} req)")
+    return {"parametros": vars(args), "cenarios": cenarios}
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de proxies com proxies locais")
+    parser.add_argument("--processos", type=int, default=300)
+    parser.add_argument("--eventos", type=int, default=50)
+    parser.add_argument("--simultaneos", type=int, default=12, help="processos simultâneos (MAX_TABS)")
+    parser.add_argument("--por-proxy", type=int, default=4, help="PROXY_MAX_CONCORRENCIA")
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência dos proxies rápidos (s)")
+    parser.add_argument("--lento", type=float, default=5.0, help="quantas vezes mais lento é o proxy lento")
+    parser.add_argument("--max-ciclos", type=int, default=5)
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[PROXY] Resultado salvo em {args.out}")
+    sys.exit(0 if all(c["ok"] for c in report["cenarios"]) else 1)
@@ -0,0 +1,115 @@
+"""
+Benchmark do reparse offline (snapshots HTML → DB) sem browser nem rede.
+
+Grava N snapshots sintéticos de páginas de processo (fixtures, com todos os
+eventos já carregados, como após "Carregar TODOS os eventos") e uma listagem
+de prazos em SNAPSHOTS_DIR temporário, roda src.db.sync.reparse contra o
+FakeSupabase com 1 e com W workers de parsing e confere o que foi gravado
+(eventos por processo, prazos abertos pela cor e prazos_abertos).
+
+Uso:
+    python -m benchmarks.reparse --processos 500 --eventos 200 --workers 4
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src import snapshots
+from src.db import sync as sync_module
+from src.db.client import set_supabase
+from src.metrics import metrics
+from benchmarks import fixtures
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.write_path import _fake_sync_processo, _fake_sync_changes_registrar
+
+
+def gerar(n: int, eventos: int, partes: int) -> list[str]:
+    cnjs = [fixtures.fake_cnj(i) for i in range(n)]
+    for cnj in cnjs:
+        snapshots.salvar_processo(cnj, fixtures.processo_page(cnj, eventos, partes, visiveis=eventos))
+    execucao = snapshots.carimbo()
+    por_pagina = 100
+    for pagina in range(1, (n + por_pagina - 1) // por_pagina + 1):
+        snapshots.salvar_prazos("bench", execucao, pagina, fixtures.prazos_page(n, pagina, por_pagina))
+    return cnjs
+
+
+def _fake() -> FakeSupabase:
+    fake = FakeSupabase()
+    fake.register_rpc("sync_processo", _fake_sync_processo)
+    fake.register_rpc("sync_changes_registrar", _fake_sync_changes_registrar)
+    fake.register_rpc("refresh_processo_completo", lambda f, params: len(params.get("p_cnjs") or []))
+    set_supabase(fake)
+    return fake
+
+
+def run(args) -> dict:
+    base = tempfile.mkdtemp(prefix="eproc_snap_")
+    Config.SNAPSHOTS_DIR = base
+    Config.METRICS_BACKEND = ""
+    Config.METRICS_PROM_FILE = ""
+    report = {"processos": args.processos, "eventos": args.eventos, "rodadas": []}
+    try:
+        t0 = time.perf_counter()
+        gerar(args.processos, args.eventos, args.partes)
+        tamanho = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(base) for f in fs)
+        report["gerar_seconds"] = round(time.perf_counter() - t0, 3)
+        report["snapshots_mb"] = round(tamanho / 1024 / 1024, 2)
+        print(f"[REPARSE] {args.processos} snapshots ({report['snapshots_mb']} MB comprimidos) em {base}")
+
+        for workers in sorted({1, args.workers}):
+            fake = _fake()
+            metrics.reset()
+            t0 = time.perf_counter()
+            stats = sync_module.reparse(prazos=True, workers=workers)
+            elapsed = time.perf_counter() - t0
+
+            eventos = fake.rows("eventos")
+            esperado_prazo = sum(1 for n in range(1, args.eventos + 1) if n % 7 == 0) * args.processos
+            ok = (len(fake.rows("processos")) == args.processos
+                  and len(eventos) == args.processos * args.eventos
+                  and sum(1 for e in eventos if e["prazo_aberto"]) == esperado_prazo
+                  and len(fake.rows("prazos_abertos")) > 0
+                  and stats["erros"] == 0)
+            rodada = {
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "processos_por_seg": round(args.processos / elapsed, 1) if elapsed else None,
+                "eventos_gravados": len(eventos),
+                "prazos_abertos": len(fake.rows("prazos_abertos")),
+                "erros": stats["erros"],
+                "ok": ok,
+            }
+            report["rodadas"].append(rodada)
+            print(f"[REPARSE] {workers} worker(s): {elapsed:.2f}s ({rodada['processos_por_seg']} proc/s) | "
+                  f"{len(eventos)} eventos | {rodada['prazos_abertos']} prazos | {'OK' if ok else 'FALHOU'}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return report
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do reparse offline dos snapshots")
+    parser.add_argument("--processos", type=int, default=200)
+    parser.add_argument("--eventos", type=int, default=200)
+    parser.add_argument("--partes", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[REPARSE] Resultado salvo em {args.out}")
+    sys.exit(0 if all(r["ok"] for r in report["rodadas"]) else 1)
@@ -0,0 +1,225 @@
+"""
+Benchmark offline dos scrapers contra o eProc sintético de `server.py`.
+
+Uso:
+    python -m benchmarks.run --prazos 500 --eventos 900 --partes 30 --out bench.json
+    python -m benchmarks.run --compare bench_anterior.json
+
+Para cada cenário mede tempo de parede, pico de memória Python (tracemalloc),
+chamadas ao protocolo do Playwright (por método) e requisições HTTP servidas.
+O resultado é JSON para comparar versões (`--compare`).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+from src.config import Config
+from src.metrics import metrics
+from src.scrapers.prazos import scrape_prazos_abertos
+from src.scrapers.processo import open_process_page, extract_header, extract_assuntos, extract_partes, extract_eventos
+from src.scrapers.documentos import download_document
+from src.scrapers.render import render_pool
+from benchmarks import fixtures
+from benchmarks.server import FakeEproc
+
+
+class PlaywrightCallCounter:
+    """Conta mensagens enviadas ao driver do Playwright (API interna, só p/ benchmark)."""
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self._restore = None
+
+    def install(self):
+        try:
+            from playwright._impl._connection import Channel
+        except ImportError:
+            print("[BENCH] AVISO: contagem de chamadas do Playwright indisponível")
+            return
+        original = Channel.send
+        counter = self
+
+        async def send(channel, method, *args, **kwargs):
+            counter.calls[method] = counter.calls.get(method, 0) + 1
+            return await original(channel, method, *args, **kwargs)
+
+        Channel.send = send
+        self._restore = lambda: setattr(Channel, "send", original)
+
+    def uninstall(self):
+        if self._restore:
+            self._restore()
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(self.calls)
+
+
+def _diff(after: dict, before: dict) -> dict:
+    return {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+
+
+async def _measure(name: str, n: int, fn, counter: PlaywrightCallCounter, server: FakeEproc) -> dict:
+    calls_before = counter.snapshot()
+    server.reset_counters()
+    metrics.reset()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    calls = _diff(counter.snapshot(), calls_before)
+    result = {
+        "name": name,
+        "n": n,
+        "seconds": round(elapsed, 4),
+        "per_item_ms": round(elapsed / max(n, 1) * 1000, 3),
+        "peak_python_kb": peak // 1024,
+        "playwright_calls": sum(calls.values()),
+        "playwright_calls_by_method": calls,
+        "http_requests": dict(server.requests),
+        "stages": metrics.summary()["timings"],
+    }
+    print(f"[BENCH] {name:<24} n={n:<6} {elapsed:8.2f}s  {result['playwright_calls']:>7} chamadas PW  pico {result['peak_python_kb']} KB")
+    return result
+
+
+async def run_benchmarks(args) -> dict:
+    server = FakeEproc(
+        n_prazos=args.prazos,
+        n_eventos=args.eventos,
+        n_partes=args.partes,
+        por_pagina=args.por_pagina,
+        fixtures_dir=args.fixtures,
+    ).start()
+    Config.EPROC_BASE_URL = server.base_url
+    Config.TEMP_DIR = tempfile.mkdtemp(prefix="eproc_bench_")
+
+    counter = PlaywrightCallCounter()
+    counter.install()
+    results = []
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context(viewport={"width": 1366, "height": 900})
+            page = await context.new_page()
+
+            async def bench_prazos():
+                await scrape_prazos_abertos(page)
+
+            results.append(await _measure("scrape_prazos_abertos", args.prazos, bench_prazos, counter, server))
+
+            cnjs = [fixtures.fake_cnj(i) for i in range(args.processos)]
+
+            async def bench_processos():
+                for cnj in cnjs:
+                    proc_page = await open_process_page(
+                        context, page, f"controlador.php?acao=processo_selecionar&num_processo={cnj}"
+                    )
+                    try:
+                        await extract_header(proc_page)
+                        await extract_assuntos(proc_page)
+                        await extract_partes(proc_page)
+                        await extract_eventos(proc_page)
+                    finally:
+                        await proc_page.close()
+
+            results.append(await _measure(
+                f"processo({args.eventos}ev,{args.partes}pt)", len(cnjs), bench_processos, counter, server
+            ))
+
+            for variant in fixtures.DOC_VARIANTS:
+                async def bench_docs(variant=variant):
+                    for i in range(args.documentos):
+                        doc = await download_document(
+                            context, f"controlador.php?acao=acessar_documento&doc=bench_{variant}_{i}&variant={variant}"
+                        )
+                        if doc and os.path.exists(doc["local_path"]):
+                            os.remove(doc["local_path"])
+
+                results.append(await _measure(f"download_document.{variant}", args.documentos, bench_docs, counter, server))
+
+            await render_pool.close()
+            await context.close()
+            await browser.close()
+    finally:
+        counter.uninstall()
+        server.stop()
+
+    return {
+        "version": _git_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "prazos": args.prazos,
+            "por_pagina": args.por_pagina,
+            "processos": args.processos,
+            "eventos": args.eventos,
+            "partes": args.partes,
+            "documentos": args.documentos,
+            "fixtures": args.fixtures,
+        },
+        "results": results,
+    }
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "desconhecida"
+
+
+def compare(current: dict, baseline: dict):
+    """Imprime a variação de tempo e de chamadas do Playwright entre duas execuções."""
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    print(f"\n[BENCH] Comparação: {baseline.get('version')} -> {current.get('version')}")
+    for r in current["results"]:
+        b = base.get(r["name"])
+        if not b:
+            print(f"[BENCH] {r['name']:<24} (sem baseline)")
+            continue
+        dt = (r["seconds"] - b["seconds"]) / b["seconds"] * 100 if b["seconds"] else 0.0
+        dc = r["playwright_calls"] - b["playwright_calls"]
+        print(f"[BENCH] {r['name']:<24} tempo {dt:+6.1f}%  chamadas PW {dc:+d}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos scrapers eProc")
+    parser.add_argument("--prazos", type=int, default=500, help="prazos na listagem")
+    parser.add_argument("--por-pagina", type=int, default=100, help="linhas por página da listagem")
+    parser.add_argument("--processos", type=int, default=5, help="páginas de processo abertas")
+    parser.add_argument("--eventos", type=int, default=300, help="eventos por processo")
+    parser.add_argument("--partes", type=int, default=20, help="partes por processo")
+    parser.add_argument("--documentos", type=int, default=5, help="downloads por variante")
+    parser.add_argument("--fixtures", help="diretório com páginas gravadas ({acao}.html)")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de execução anterior para comparar")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(run_benchmarks(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[BENCH] Resultado salvo em {args.out}")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
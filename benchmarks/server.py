@@ -0,0 +1,123 @@
+"""
+Servidor HTTP local que imita as rotas do eProc usadas pelos scrapers.
+
+Rotas (todas sob /eproc/controlador.php?acao=...):
+- painel_adv_listar                      painel com link para prazos
+- citacao_intimacao_prazo_aberto_listar  listagem paginada (&pagina=N)
+- processo_selecionar                    página do processo (&num_processo=CNJ, &todos=1)
+- acessar_documento                      visualizador (&variant=direto|botao|embed|html)
+- acessar_documento_implementacao        PDF cru (&attach=1 força download)
+
+Se `fixtures_dir` for informado, um arquivo `{acao}.html` gravado do eProc
+real (anonimizado) substitui a página gerada daquela rota.
+"""
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from benchmarks import fixtures
+
+
+class FakeEproc:
+    def __init__(self, n_prazos: int = 100, n_eventos: int = 100, n_partes: int = 10,
+                 por_pagina: int = 100, fixtures_dir: str | None = None,
+                 carregar_todos: str = "js", prazo_css: bool = False):
+        self.n_prazos = n_prazos
+        self.n_eventos = n_eventos
+        self.n_partes = n_partes
+        self.por_pagina = por_pagina
+        self.fixtures_dir = fixtures_dir
+        self.carregar_todos = carregar_todos
+        self.prazo_css = prazo_css
+        self.requests: dict[str, int] = {}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        handler = _make_handler(self)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def reset_counters(self):
+        self.requests = {}
+
+    def route(self, acao: str, qs: dict) -> tuple[int, dict, bytes]:
+        """Retorna (status, headers, body) para uma requisição."""
+        self.requests[acao] = self.requests.get(acao, 0) + 1
+        recorded = self._recorded(acao)
+        if recorded is not None:
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, recorded
+
+        arg = lambda k, d="": qs.get(k, [d])[0]
+        html = None
+        if acao == "painel_adv_listar":
+            html = fixtures.painel()
+        elif acao == "citacao_intimacao_prazo_aberto_listar":
+            pagina = int(arg("pagina", "1") or 1)
+            html = fixtures.prazos_page(self.n_prazos, pagina, self.por_pagina)
+        elif acao == "processo_selecionar":
+            html = fixtures.processo_page(
+                arg("num_processo"), self.n_eventos, self.n_partes,
+                visiveis=self.n_eventos if arg("todos") else 20,
+                carregar_todos=self.carregar_todos, prazo_css=self.prazo_css,
+            )
+        elif acao == "acessar_documento":
+            variant = arg("variant", "html")
+            if variant == "direto":
+                return 200, {
+                    "Content-Type": "application/pdf",
+                    "Content-Disposition": f"attachment; filename={arg('doc')}.pdf",
+                }, fixtures.MINI_PDF
+            html = fixtures.documento_viewer(arg("doc"), variant)
+        elif acao == "acessar_documento_implementacao":
+            headers = {"Content-Type": "application/pdf"}
+            if arg("attach"):
+                headers["Content-Disposition"] = f"attachment; filename={arg('doc')}.pdf"
+            return 200, headers, fixtures.MINI_PDF
+
+        if html is None:
+            return 404, {"Content-Type": "text/plain"}, b"not found"
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, html.encode("utf-8")
+
+    def _recorded(self, acao: str) -> bytes | None:
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, f"{acao}.html")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def _make_handler(server: FakeEproc):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            qs = parse_qs(url.query)
+            acao = qs.get("acao", [""])[0]
+            status, headers, body = server.route(acao, qs)
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_POST = do_GET
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,181 @@
+"""
+Teste do dispatcher de sync_changes (src/webhook.py) contra um receptor HTTP local.
+
+Gera mudanças em várias "rodadas" de sync (FakeSupabase, ids como o BIGSERIAL)
+e, entre elas, roda o dispatcher como o scheduler faz. O receptor falha uma
+fração das requisições (500, conexão derrubada, ou aceita e responde depois do
+timeout — caso que gera reenvio) e o FakeSupabase injeta erros no avanço do
+cursor. Verifica, após deduplicar por cursor como um receptor deve fazer, que
+cada mudança chegou exatamente uma vez e em ordem, e que a assinatura HMAC
+confere.
+
+Uso:
+    python -m benchmarks.webhook --mudancas 5000 --lote 200 --falhas 0.2
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src import webhook
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.write_path import _fake_sync_changes_registrar
+
+_SECRET = "segredo-de-teste"
+
+
+class Receptor:
+    """Receptor de webhook com falhas injetadas; guarda os lotes aceitos."""
+
+    def __init__(self, falhas: float, timeout: float, seed: int = 0):
+        self.falhas = falhas
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.aceitos: list[dict] = []      # lotes processados (inclusive reenvios)
+        self.recusados = 0
+        self.assinaturas_invalidas = 0
+        self._httpd = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def start(self):
+        receptor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                esperado = "sha256=" + hmac.new(_SECRET.encode(), corpo, hashlib.sha256).hexdigest()
+                with receptor.lock:
+                    sorteio = receptor.rng.random()
+                    if not hmac.compare_digest(esperado, self.headers.get("X-Eproc-Signature", "")):
+                        receptor.assinaturas_invalidas += 1
+                if sorteio < receptor.falhas / 3:
+                    receptor.recusados += 1
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                if sorteio < receptor.falhas * 2 / 3:
+                    receptor.recusados += 1
+                    self.close_connection = True
+                    self.connection.close()     # conexão derrubada sem resposta
+                    return
+                with receptor.lock:
+                    receptor.aceitos.append(json.loads(corpo))
+                if sorteio < receptor.falhas:
+                    time.sleep(receptor.timeout * 1.5)   # aceitou, mas o cliente desiste
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def entregues(self) -> tuple[list[int], int]:
+        """Ids na ordem em que um receptor idempotente os aplicaria, e duplicados ignorados."""
+        ultimo, ids, duplicados = 0, [], 0
+        for lote in self.aceitos:
+            for c in lote["changes"]:
+                if c["id"] <= ultimo:
+                    duplicados += 1
+                    continue
+                ids.append(c["id"])
+                ultimo = c["id"]
+        return ids, duplicados
+
+
+def run(args) -> dict:
+    Config.WEBHOOK_SECRET = _SECRET
+    Config.WEBHOOK_LOTE = args.lote
+    Config.WEBHOOK_TIMEOUT_SEC = args.timeout
+    fake = FakeSupabase(error_rate=args.erros_db, seed=1)
+    receptor = Receptor(args.falhas, args.timeout, seed=2)
+    receptor.start()
+    rng = random.Random(3)
+
+    t0 = time.perf_counter()
+    gerados, ciclos = 0, 0
+    try:
+        # Rodadas de sync intercaladas com o dispatcher (como no scheduler)
+        while gerados < args.mudancas or ciclos == 0 or _pendentes(fake, gerados):
+            if gerados < args.mudancas:
+                n = min(args.mudancas - gerados, rng.randint(1, args.lote * 3))
+                _fake_sync_changes_registrar(fake, {"p_sync_log_id": None, "p_changes": [
+                    {"tipo": "prazo_novo", "cnj": f"C{gerados + i:06d}", "dados": {"i": gerados + i}}
+                    for i in range(n)
+                ]})
+                gerados += n
+            try:
+                webhook.despachar(fake, receptor.url)
+            except Exception as e:
+                # Erro ao ler o cursor/lote: o scheduler só registra e tenta no próximo ciclo
+                print(f"[WEBHOOK] ciclo {ciclos}: {e}")
+            ciclos += 1
+            if ciclos > args.mudancas * 10:
+                break
+    finally:
+        receptor.stop()
+    elapsed = time.perf_counter() - t0
+
+    ids, duplicados = receptor.entregues()
+    ok = ids == list(range(1, gerados + 1)) and receptor.assinaturas_invalidas == 0
+    report = {
+        "mudancas": gerados,
+        "lote": args.lote,
+        "ciclos": ciclos,
+        "lotes_enviados": len(receptor.aceitos) + receptor.recusados,
+        "lotes_recusados": receptor.recusados,
+        "reenvios_ignorados": duplicados,
+        "erros_db_injetados": sum(fake.errors.values()),
+        "assinaturas_invalidas": receptor.assinaturas_invalidas,
+        "seconds": round(elapsed, 3),
+        "exatamente_uma_vez_em_ordem": ok,
+    }
+    print(f"[WEBHOOK] {gerados} mudanças em {ciclos} ciclos | {report['lotes_enviados']} POSTs "
+          f"({receptor.recusados} recusados) | {duplicados} reenvios ignorados | "
+          f"{report['erros_db_injetados']} erros de banco | {'OK' if ok else 'FALHOU'}")
+    return report
+
+
+def _pendentes(fake: FakeSupabase, gerados: int) -> bool:
+    rows = fake.rows("sync_changes_consumidores")
+    return not rows or rows[0]["cursor"] < gerados
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Teste do dispatcher de webhook de sync_changes")
+    parser.add_argument("--mudancas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--falhas", type=float, default=0.2, help="fração de POSTs que falham")
+    parser.add_argument("--erros-db", type=float, default=0.02, help="fração de chamadas ao banco que falham")
+    parser.add_argument("--timeout", type=float, default=0.2, help="WEBHOOK_TIMEOUT_SEC do teste")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[WEBHOOK] Resultado salvo em {args.out}")
+    sys.exit(0 if report["exatamente_uma_vez_em_ordem"] else 1)
@@ -0,0 +1,336 @@
+"""
+Teste de carga do write path (sync.py + storage.py) contra o FakeSupabase.
+
+O scraping é substituído por dados sintéticos (sem browser); todo o resto do
+`sync()` roda de verdade: diff de CNJs, prazos_abertos, processos, eventos,
+documentos, Storage e sync_log. Mede requisições por sync (por tabela/operação),
+tempo total de escrita e o efeito de latência/erros injetados. Com --doc-falhas
+uma fração dos downloads falha (a cada tentativa) e o retry de
+documentos_pendentes, sem backoff, roda no fim de cada sync.
+
+Os eventos sintéticos têm um por mês de histórico: com a política "niveis"
+(--politica) só os recentes são baixados no scrape e o resto fica para o
+backfill do fim do sync, limitado por --backfill-mb.
+
+Uso:
+    python -m benchmarks.write_path --sizes 10 500 5000 --latency 0.005 --error-rate 0.01
+    python -m benchmarks.write_path --sizes 500 --doc-falhas 0.3
+    python -m benchmarks.write_path --sizes 500 --politica todos
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.db import sync as sync_module
+from src.db.client import set_supabase
+from src.metrics import metrics
+from benchmarks import fixtures
+from benchmarks.fake_supabase import FakeSupabase
+
+
+class SyntheticEproc:
+    """Respostas sintéticas para as funções de scraping usadas pelo sync."""
+
+    def __init__(self, n_processos: int, n_eventos: int, docs_por_evento: int, doc_falhas: float = 0.0):
+        self.n_processos = n_processos
+        self.n_eventos = n_eventos
+        self.docs_por_evento = docs_por_evento
+        self.doc_falhas = doc_falhas
+        self.rodada = 0  # a cada rodada, cada processo ganha 2 eventos novos
+        self._rng = random.Random(n_processos)
+
+    async def scrape_prazos_abertos(self, page, info=None):
+        if info is not None:
+            info.update({"paginas": 1, "linhas": self.n_processos,
+                         "registros_esperados": self.n_processos, "completo": True})
+        out = {}
+        for i in range(self.n_processos):
+            cnj = fixtures.fake_cnj(i)
+            out[cnj] = [{
+                "cnj": cnj,
+                "classe": "Procedimento Comum Cível",
+                "juizo": "1ª Vara Cível",
+                "evento_descricao": f"Evento {i} - INTIMAÇÃO",
+                "data_envio": "2026-02-01T09:00:00-03:00",
+                "prazo_inicio": "2026-02-03T00:00:00-03:00",
+                "prazo_final": f"2026-02-{1 + i % 28:02d}T23:59:59-03:00",
+                "proc_href": f"controlador.php?acao=processo_selecionar&num_processo={cnj}",
+            }]
+        return out
+
+    async def open_process_page(self, context, page, proc_href):
+        return _FakePage(proc_href.rsplit("=", 1)[-1])
+
+    async def extract_header(self, page):
+        return {"cnj": page.cnj, "classe": "Procedimento Comum Cível", "competencia": "Cível",
+                "data_autuacao": "2020-01-01", "situacao": "MOVIMENTO",
+                "orgao_julgador": "1ª Vara Cível", "juiz": "JUIZ FICTICIO",
+                "processos_relacionados": []}
+
+    async def extract_assuntos(self, page):
+        return [{"codigo": "14815", "descricao": "Inventário e Partilha"}]
+
+    async def extract_partes(self, page):
+        return [{"tipo": "AUTOR", "nome": "PARTE FICTICIA", "cpf_cnpj": "000.000.000-00",
+                 "qualificacao": "", "representantes": []}]
+
+    async def extract_eventos(self, page, since_numero=None):
+        total = self.n_eventos + 2 * self.rodada
+        agora = datetime.now(timezone.utc)
+        return [{
+            "numero": n,
+            # Um evento por mês até hoje (o mais novo tem a data atual)
+            "data_hora": (agora - timedelta(days=30 * (total - n))).isoformat(),
+            "descricao": f"Evento {n}",
+            "usuario": "USUARIO",
+            "prazo_aberto": False,
+            "urgente": False,
+            "documentos": [
+                {"nome": f"DOC{d + 1}", "url_eproc": f"controlador.php?acao=acessar_documento&doc={page.cnj}_{n}_{d}"}
+                for d in range(self.docs_por_evento)
+            ],
+        } for n in range(total, since_numero or 0, -1)]
+
+    async def download_document(self, context, url_eproc, *args, **kwargs):
+        if self.doc_falhas and self._rng.random() < self.doc_falhas:
+            return None
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=Config.TEMP_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(fixtures.MINI_PDF)
+        return {"local_path": path, "tipo": "PDF", "tamanho_bytes": len(fixtures.MINI_PDF),
+                "hash_sha256": "0" * 64}
+
+    def install(self):
+        for name in ("scrape_prazos_abertos", "open_process_page", "extract_header",
+                     "extract_assuntos", "extract_partes", "extract_eventos", "download_document"):
+            setattr(sync_module, name, getattr(self, name))
+
+
+class _FakePage:
+    def __init__(self, cnj: str):
+        self.cnj = cnj
+
+    async def close(self):
+        pass
+
+
+async def _run_once(fake: FakeSupabase, label: str) -> dict:
+    fake.requests.clear()
+    fake.errors.clear()
+    metrics.reset()
+    metrics.last_summary = None
+    t0 = time.perf_counter()
+    try:
+        stats = await sync_module.sync(None, None)
+        status = "ok"
+    except Exception as e:
+        stats, status = {}, f"erro fatal: {e}"
+    elapsed = time.perf_counter() - t0
+
+    # O sync grava (flush) e zera as métricas ao terminar: usar o último resumo
+    timings = (metrics.last_summary or metrics.summary())["timings"]
+    write_time = sum(t["total"] for name, t in timings.items() if name.startswith("db."))
+    upload_time = timings.get("upload_document", {}).get("total", 0.0)
+    return {
+        "rodada": label,
+        "status": status,
+        "seconds": round(elapsed, 3),
+        "db_write_seconds": round(write_time, 3),
+        "upload_seconds": round(upload_time, 3),
+        "requests": fake.total_requests(),
+        "requests_by_op": {f"{t}.{op}": n for (t, op), n in sorted(fake.requests.items())},
+        "injected_errors": sum(fake.errors.values()),
+        "documentos_pendentes": len(fake.get_table("documentos_pendentes")),
+        "documentos_adiados": sum(1 for d in fake.get_table("documentos").rows() if d.get("status") != "disponivel"),
+        "stats": stats,
+    }
+
+
+async def run(args) -> list[dict]:
+    Config.TEMP_DIR = tempfile.mkdtemp(prefix="eproc_write_")
+    Config.METRICS_BACKEND = ""
+    Config.METRICS_PROM_FILE = ""
+    Config.DOCS_PENDENTES_BACKOFF_MIN = 0
+    Config.DOCS_POLITICA = args.politica
+    Config.DOCS_BACKFILL_MAX_MB = args.backfill_mb
+    Config.EVENTOS_VERIFICAR_DIAS = 0   # contagem de requisições independente do dia
+
+    results = []
+    for size in args.sizes:
+        fake = FakeSupabase(latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, seed=size)
+        # Funções SQL chamadas pelo sync: no fake só contam a requisição
+        fake.register_rpc("refresh_processo_completo", lambda f, params: len(params.get("p_cnjs") or []))
+        fake.register_rpc("sync_processo", _fake_sync_processo)
+        fake.register_rpc("sync_documentos", _fake_sync_documentos)
+        fake.register_rpc("documentos_backfill", _fake_documentos_backfill)
+        fake.register_rpc("sync_changes_registrar", _fake_sync_changes_registrar)
+        set_supabase(fake)
+        eproc = SyntheticEproc(size, args.eventos, args.docs, args.doc_falhas)
+        eproc.install()
+
+        for rodada in ("inicial", "incremental"):
+            result = await _run_once(fake, rodada)
+            result["processos"] = size
+            results.append(result)
+            print(f"[WRITE] {size:>5} processos | {rodada:<11} | {result['requests']:>7} req "
+                  f"({result['requests'] / size:.1f}/proc) | db {result['db_write_seconds']:.2f}s "
+                  f"| total {result['seconds']:.2f}s | erros injetados {result['injected_errors']}"
+                  + (f" | docs pendentes {result['documentos_pendentes']}" if args.doc_falhas else "")
+                  + (f" | docs adiados {result['documentos_adiados']}" if args.politica != "todos" else ""))
+            eproc.rodada += 1
+    return results
+
+
+def _fake_sync_processo(fake: FakeSupabase, params: dict) -> list[int]:
+    """Equivalente em Python da função SQL sync_processo (sem a transação)."""
+    payload = params["p_payload"]
+    cnj = payload["cnj"]
+    processo = dict(payload["processo"], cnj=cnj, last_synced_at=datetime.now(timezone.utc).isoformat())
+    processos = fake.get_table("processos")
+    existing = processos.get(processo)
+    if existing is not None:
+        existing.update(processo)
+    else:
+        processos.put(processo)
+
+    eventos = fake.get_table("eventos")
+    novos = []
+    for e in payload.get("eventos", []):
+        row = dict(e, cnj=cnj)
+        existing = eventos.get(row)
+        if existing is not None:
+            existing.update(row)
+        else:
+            eventos.put(row)
+            novos.append(row["numero_evento"])
+
+    changes = [{"tipo": "evento_novo", "cnj": cnj, "dados": {"numero_evento": n}} for n in novos]
+    changes += _fake_gravar_documentos(fake, cnj, payload)
+
+    pendentes = fake.get_table("documentos_pendentes")
+    for f in payload.get("pendentes", []):
+        row = dict(f, cnj=cnj)
+        existing = pendentes.get(row)
+        if existing is not None:
+            existing.update(row, tentativas=existing["tentativas"] + 1)
+        else:
+            pendentes.put(dict(row, tentativas=1))
+    solicitar = set(payload.get("solicitar") or ())
+    for d in fake.get_table("documentos").rows(cnj):
+        if d["numero_evento"] in solicitar and d.get("status") != "disponivel":
+            d.setdefault("solicitado_em", datetime.now(timezone.utc).isoformat())
+    _fake_sync_changes_registrar(fake, {"p_sync_log_id": payload.get("sync_log_id"), "p_changes": changes})
+    return sorted(novos)
+
+
+def _fake_sync_documentos(fake: FakeSupabase, params: dict) -> int:
+    """Equivalente da função SQL sync_documentos (retry e backfill)."""
+    payload = params["p_payload"]
+    changes = _fake_gravar_documentos(fake, payload["cnj"], payload)
+    _fake_sync_changes_registrar(fake, {"p_sync_log_id": payload.get("sync_log_id"), "p_changes": changes})
+    return len(changes)
+
+
+def _fake_gravar_documentos(fake: FakeSupabase, cnj: str, payload: dict) -> list[dict]:
+    """Equivalente de gravar_documentos: documentos + documentos_texto do payload;
+    os baixados saem de documentos_pendentes."""
+    documentos = fake.get_table("documentos")
+    pendentes = fake.get_table("documentos_pendentes")
+    changes = []
+    for d in payload.get("documentos", []):
+        row = dict(d, cnj=cnj, status=d.get("status") or "disponivel")
+        dados = {"numero_evento": row["numero_evento"], "nome_original": row["nome_original"],
+                 "status": row["status"]}
+        existing = documentos.get(row)
+        if existing is None:
+            documentos.put(row)
+            changes.append({"tipo": "documento_novo", "cnj": cnj, "dados": dados})
+        elif existing.get("status") != "disponivel":
+            if row["status"] == "disponivel":
+                row["solicitado_em"] = None
+                changes.append({"tipo": "documento_disponivel", "cnj": cnj, "dados": dados})
+            existing.update({k: v for k, v in row.items() if v is not None or k == "solicitado_em"})
+        if row["status"] == "disponivel":
+            pendentes.remove(row)
+
+    textos = fake.get_table("documentos_texto")
+    for t in payload.get("textos", []):
+        if textos.get(t) is None:
+            textos.put(dict(t))
+    return changes
+
+
+def _fake_documentos_backfill(fake: FakeSupabase, params: dict) -> list[dict]:
+    """Equivalente da função SQL documentos_backfill (fila do backfill)."""
+    cnjs, solicitados = params.get("p_cnjs"), params.get("p_solicitados")
+    pendentes = fake.get_table("documentos_pendentes")
+    eventos = fake.get_table("eventos")
+    fila = []
+    for d in fake.get_table("documentos").rows():
+        if d.get("status") == "disponivel" or pendentes.get(d) is not None:
+            continue
+        if cnjs is not None and d["cnj"] not in cnjs:
+            continue
+        if (solicitados or d["status"] == "metadados") and not d.get("solicitado_em") and cnjs is None:
+            continue
+        data = eventos.get(d)["data_hora"]
+        fila.append((d.get("solicitado_em") is None, d.get("solicitado_em") or "", _neg(data), d))
+    fila.sort(key=lambda f: f[:3])
+    limite = params.get("p_limite")
+    return [{"cnj": d["cnj"], "numero_evento": d["numero_evento"], "url_eproc": d["url_eproc"],
+             "nome_original": d["nome_original"], "status": d["status"], "tentativas": 0}
+            for *_, d in fila[:limite]]
+
+
+def _neg(data: str) -> float:
+    """Chave de ordenação decrescente por data (ISO)."""
+    return -datetime.fromisoformat(data).timestamp()
+
+
+def _fake_sync_changes_registrar(fake: FakeSupabase, params: dict) -> int | None:
+    """Equivalente da função SQL sync_changes_registrar: ids sequenciais."""
+    changes = params.get("p_changes") or []
+    if not changes:
+        return None
+    tabela = fake.get_table("sync_changes")
+    for c in changes:
+        # Como o BIGSERIAL: o id nunca é reaproveitado, mesmo depois de um purge
+        fake.sync_changes_seq = getattr(fake, "sync_changes_seq", 0) + 1
+        tabela.put({"id": fake.sync_changes_seq, "sync_log_id": params.get("p_sync_log_id"),
+                    "tipo": c["tipo"], "cnj": c.get("cnj"), "dados": c.get("dados") or {},
+                    "created_at": datetime.now(timezone.utc).isoformat()})
+    return fake.sync_changes_seq
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Teste de carga do write path contra FakeSupabase")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 500, 5000])
+    parser.add_argument("--eventos", type=int, default=20, help="eventos por processo na 1a rodada")
+    parser.add_argument("--docs", type=int, default=1, help="documentos por evento")
+    parser.add_argument("--latency", type=float, default=0.0, help="latência por requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latência extra aleatória (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilidade de erro por requisição")
+    parser.add_argument("--doc-falhas", type=float, default=0.0, help="probabilidade de falha por download")
+    parser.add_argument("--politica", choices=["niveis", "todos"], default="niveis", help="DOCS_POLITICA")
+    parser.add_argument("--backfill-mb", type=float, default=500.0, help="DOCS_BACKFILL_MAX_MB por sync")
+    parser.add_argument("--out", help="arquivo JSON de saída")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"[WRITE] Resultado salvo em {args.out}")
@@ -1,121 +1,156 @@
-"""Audit script: verifica dados extraídos no Supabase."""
+"""Audit script: verifica dados extraídos no Supabase.
+
+O resumo vem de uma única chamada à função SQL `audit_resumo()` (ver
+src/db/schema.sql); as contagens por processo vêm de `audit_por_cnj()` em
+páginas de PAGINA processos, impressas à medida que chegam.
+
+    python scripts/audit_db.py           # relatório legível
+    python scripts/audit_db.py --json    # JSON para rodar agendado
+"""
 import sys
 import os
+import json
+import argparse
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.db.client import get_supabase
 
-def main():
+
+# Processos por chamada a audit_por_cnj (abaixo do limite de linhas do PostgREST)
+PAGINA = 500
+
+
+def fetch_audit() -> dict:
     sb = get_supabase()
+    return sb.rpc("audit_resumo").execute().data
+
+
+def fetch_por_cnj(pagina: int = PAGINA):
+    """Páginas (listas) de contagens por processo, em ordem de CNJ."""
+    sb = get_supabase()
+    depois = None
+    while True:
+        linhas = sb.rpc("audit_por_cnj", {"p_depois": depois, "p_limite": pagina}).execute().data or []
+        if linhas:
+            yield linhas
+        if len(linhas) < pagina:
+            return
+        depois = linhas[-1]["cnj"]
+
 
-    # === PROCESSOS ===
-    procs = sb.table("processos").select("*").execute().data
+def _section(title: str):
     print(f"\n{'='*60}")
-    print(f"  PROCESSOS: {len(procs)}")
+    print(f"  {title}")
     print(f"{'='*60}")
 
-    lados = {"AUTOR": 0, "RÉU": 0, "": 0}
-    for p in procs:
-        lado = p.get("lado_advogado") or ""
-        lados[lado] = lados.get(lado, 0) + 1
-        print(f"\n  CNJ: {p['cnj']}  [{lado or 'sem lado'}]")
-        print(f"  Classe: {p.get('classe') or '(vazio)'}")
-        print(f"  Competência: {p.get('competencia') or '(vazio)'}")
-        print(f"  Data Autuação: {p.get('data_autuacao') or '(vazio)'}")
-        print(f"  Situação: {p.get('situacao') or '(vazio)'}")
-        print(f"  Órgão Julgador: {p.get('orgao_julgador') or '(vazio)'}")
-        print(f"  Juiz: {p.get('juiz') or '(vazio)'}")
-        print(f"  Juízo: {p.get('juizo') or '(vazio)'}")
-        print(f"  Proc. Relacionados: {p.get('processos_relacionados') or '(vazio)'}")
-
-        assuntos = p.get("assuntos") or []
-        partes = p.get("partes") or []
-        # Handle double-serialized JSONB (string instead of list)
-        if isinstance(assuntos, str):
-            print(f"  *** ASSUNTOS DOUBLE-SERIALIZED (string) ***")
-        else:
-            print(f"  Assuntos ({len(assuntos)}):")
-            for a in assuntos:
-                print(f"    - {a}")
-        if isinstance(partes, str):
-            print(f"  *** PARTES DOUBLE-SERIALIZED (string) ***")
+
+def print_report(audit: dict):
+    totais = audit["totais"]
+    _section(f"TOTAIS ({audit['gerado_em'][:19]})")
+    print(f"  Processos: {totais['processos']}")
+    print(f"  Prazos abertos: {totais['prazos_abertos']}")
+    print(f"  Eventos: {totais['eventos']}")
+    print(f"  Documentos: {totais['documentos']} ({totais['bytes'] / 1024 / 1024:.1f} MB)")
+
+    lados = " | ".join(f"{k}={v}" for k, v in sorted(audit["lados"].items()))
+    print(f"\n  --- Resumo lados: {lados or '(nenhum)'} ---")
+
+    _section("COBERTURA DE CAMPOS (% preenchido)")
+    print("  Processos:")
+    for campo, pct in audit["cobertura_processos"].items():
+        print(f"    {campo:<18} {_pct(pct)}")
+    json_string = audit["json_string"]
+    if json_string["assuntos"] or json_string["partes"]:
+        print(f"  *** JSONB DOUBLE-SERIALIZED (string): assuntos={json_string['assuntos']} partes={json_string['partes']} ***")
+    print("  Eventos:")
+    for campo, val in audit["cobertura_eventos"].items():
+        if campo in ("prazo_aberto", "urgente"):
+            print(f"    {campo:<18} {val} eventos")
         else:
-            print(f"  Partes ({len(partes)}):")
-            for pt in partes:
-                qual = pt.get('qualificacao', '')
-                qual_str = f" [{qual}]" if qual else ""
-                reps = pt.get('representantes', [])
-                reps_str = ", ".join(f"{r.get('nome','')} ({r.get('oab','')}/{r.get('tipo','')})" for r in reps) if reps else "sem advogado"
-                print(f"    - {pt.get('tipo','?')}: {pt.get('nome','?')} ({pt.get('cpf_cnpj','sem doc')}){qual_str} -> {reps_str}")
-
-        print(f"  Prazo evento: {p.get('prazo_evento_descricao') or '(vazio)'}")
-        print(f"  Prazo envio: {p.get('prazo_data_envio') or '(vazio)'}")
-        print(f"  Prazo início: {p.get('prazo_inicio') or '(vazio)'}")
-        print(f"  Prazo final: {p.get('prazo_final') or '(vazio)'}")
-
-    # Resumo de lados
-    print(f"\n  --- Resumo lados: AUTOR={lados.get('AUTOR',0)} | RÉU={lados.get('RÉU',0)} | sem lado={lados.get('',0)} ---")
-
-    # === EVENTOS ===
-    for p in procs:
-        pid = p["id"]
-        eventos = sb.table("eventos").select("*").eq("processo_id", pid).order("numero_evento").execute().data
-        print(f"\n{'='*60}")
-        print(f"  EVENTOS de {p['cnj']}: {len(eventos)}")
-        print(f"{'='*60}")
-
-        campos_vazios = {"usuario": 0, "tem_prazo_true": 0, "prazo_dias": 0, "evento_referencia": 0, "urgente_true": 0}
-        for e in eventos:
-            if e.get("usuario"): campos_vazios["usuario"] += 1
-            if e.get("tem_prazo"): campos_vazios["tem_prazo_true"] += 1
-            if e.get("prazo_dias"): campos_vazios["prazo_dias"] += 1
-            if e.get("evento_referencia"): campos_vazios["evento_referencia"] += 1
-            if e.get("urgente"): campos_vazios["urgente_true"] += 1
-
-        print(f"  Com usuário: {campos_vazios['usuario']}/{len(eventos)}")
-        print(f"  Com prazo: {campos_vazios['tem_prazo_true']}")
-        print(f"  Com prazo_dias: {campos_vazios['prazo_dias']}")
-        print(f"  Com evento_referencia: {campos_vazios['evento_referencia']}")
-        print(f"  Urgentes: {campos_vazios['urgente_true']}")
-
-        # Mostrar primeiros e últimos eventos
-        if eventos:
-            print(f"\n  Primeiro: evt {eventos[0]['numero_evento']} - {eventos[0]['data_hora'][:10]} - {eventos[0]['descricao'][:60]}")
-            print(f"  Último:   evt {eventos[-1]['numero_evento']} - {eventos[-1]['data_hora'][:10]} - {eventos[-1]['descricao'][:60]}")
-
-    # === DOCUMENTOS ===
-    for p in procs:
-        pid = p["id"]
-        docs = sb.table("documentos").select("*").eq("processo_id", pid).execute().data
-        print(f"\n{'='*60}")
-        print(f"  DOCUMENTOS de {p['cnj']}: {len(docs)}")
-        print(f"{'='*60}")
-
-        tipos = {}
-        total_bytes = 0
-        sem_storage = 0
-        for d in docs:
-            t = d.get("tipo") or "?"
-            tipos[t] = tipos.get(t, 0) + 1
-            total_bytes += d.get("tamanho_bytes") or 0
-            if not d.get("storage_url"):
-                sem_storage += 1
-
-        print(f"  Tipos: {tipos}")
-        print(f"  Tamanho total: {total_bytes / 1024 / 1024:.1f} MB")
-        print(f"  Sem storage_url: {sem_storage}")
-
-    # === SYNC LOG ===
-    logs = sb.table("sync_log").select("*").order("started_at", desc=True).limit(5).execute().data
-    print(f"\n{'='*60}")
-    print(f"  SYNC LOG (últimos 5)")
-    print(f"{'='*60}")
-    for log in logs:
-        print(f"  {log['started_at'][:19]} | {log['status']} | +{log.get('processos_added',0)} -{log.get('processos_removed',0)} ~{log.get('processos_updated',0)} docs:{log.get('documentos_uploaded',0)}")
+            print(f"    {campo:<18} {_pct(val)}")
+
+    _section("DOCUMENTOS POR TIPO")
+    for tipo, d in sorted(audit["bytes_por_tipo"].items()):
+        print(f"  {tipo:<8} {d['documentos']:>7} docs  {d['bytes'] / 1024 / 1024:>10.1f} MB")
+    sem_storage = audit["documentos_sem_storage"]
+    print(f"  Sem storage_url: {len(sem_storage)}")
+    for d in sem_storage:
+        print(f"    - {d['cnj']} evt {d['numero_evento']}: {d['nome']}")
+
+    por_status = audit.get("documentos_por_status") or {}
+    _section("DOCUMENTOS POR STATUS")
+    for status, d in sorted(por_status.items()):
+        print(f"  {status:<10} {d['documentos']:>7} docs  ({d['solicitados']} solicitados)")
+
+    pendentes = audit.get("documentos_pendentes") or {}
+    _section(f"DOCUMENTOS PENDENTES ({pendentes.get('total', 0)})")
+    for erro_tipo, n in sorted((pendentes.get("por_erro") or {}).items()):
+        print(f"  {erro_tipo:<8} {n:>7} docs")
+    persistentes = pendentes.get("persistentes") or []
+    print(f"  Falhando há 3+ tentativas: {len(persistentes)}")
+    for d in persistentes:
+        print(f"    - {d['cnj']} evt {d['numero_evento']}: {d['nome']} [{d['erro_tipo']}] "
+              f"{d['tentativas']}x desde {d['primeira_falha'][:19]} | {(d.get('erro') or '')[:80]}")
+
+    _section("SYNC LOG (últimos 5)")
+    for log in audit["sync_log"]:
+        print(
+            f"  {log['started_at'][:19]} | {log.get('tipo') or 'full'} | {log['status']} | "
+            f"total={log.get('processos_total', 0)} +{log.get('processos_novos', 0)} "
+            f"-{log.get('processos_removidos', 0)} docs:{log.get('documentos_baixados', 0)} "
+            f"erros:{log.get('erros', 0)}"
+        )
         if log.get("error_message"):
             print(f"    ERRO: {log['error_message'][:100]}")
 
 
+def print_por_cnj(total: int, paginas):
+    _section(f"POR PROCESSO ({total})")
+    for pagina in paginas:
+        for p in pagina:
+            synced = (p.get("last_synced_at") or "nunca")[:19]
+            print(
+                f"  {p['cnj']}  [{p.get('lado') or 'sem lado'}]  prazos={p['prazos']} "
+                f"eventos={p['eventos']} (#{p.get('primeiro_evento') or '-'}..#{p.get('ultimo_evento') or '-'}, "
+                f"usuario={p['eventos_com_usuario']}, prazo_aberto={p['eventos_prazo_aberto']}, "
+                f"urgentes={p['eventos_urgentes']}) docs={p['documentos']} "
+                f"({p['bytes'] / 1024 / 1024:.1f} MB, sem storage={p['documentos_sem_storage']}, "
+                f"não disponíveis={p.get('documentos_nao_disponiveis', 0)}) sync={synced}"
+            )
+        sys.stdout.flush()
+
+
+def dump_json(audit: dict, paginas):
+    """O resumo com `por_cnj` no fim, escrito página a página (o mesmo JSON que
+    `audit | {"por_cnj": [...]}`, sem juntar todos os processos na memória)."""
+    sys.stdout.write(json.dumps(audit, ensure_ascii=False, indent=2)[:-2] + ',\n  "por_cnj": [')
+    primeiro = True
+    for pagina in paginas:
+        for p in pagina:
+            item = json.dumps(p, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            sys.stdout.write(("\n    " if primeiro else ",\n    ") + item)
+            primeiro = False
+        sys.stdout.flush()
+    sys.stdout.write("\n  ]\n}\n")
+
+
+def _pct(value) -> str:
+    return "   -" if value is None else f"{float(value):5.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoria dos dados do scraper no Supabase")
+    parser.add_argument("--json", action="store_true", help="imprime o resumo como JSON")
+    args = parser.parse_args()
+
+    audit = fetch_audit()
+    if args.json:
+        dump_json(audit, fetch_por_cnj())
+    else:
+        print_report(audit)
+        print_por_cnj(audit["totais"]["processos"], fetch_por_cnj())
+
+
 if __name__ == "__main__":
     if sys.stdout.encoding != "utf-8":
         sys.stdout.reconfigure(encoding="utf-8", errors="replace")
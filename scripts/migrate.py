@@ -0,0 +1,105 @@
+"""Aplica as migrações pendentes de src/db/migrations/ no Postgres.
+
+Cada arquivo `NNN_nome.sql` roda uma vez, numa transação, e fica registrado
+na tabela `schema_migrations`. Um banco criado do zero com schema.sql já
+vem com as migrações incorporadas marcadas como aplicadas.
+
+Usa o `psql` e a conexão direta `DATABASE_URL` (a API REST do Supabase não
+executa DDL).
+
+    python scripts/migrate.py              # aplica as pendentes
+    python scripts/migrate.py --status     # lista aplicadas / pendentes
+    python scripts/migrate.py --dsn postgresql://...
+"""
+import sys
+import os
+import shutil
+import argparse
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "db", "migrations"
+)
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version     TEXT PRIMARY KEY,
+    applied_at  TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+
+def psql(dsn: str, sql: str, single_transaction: bool = False) -> str:
+    """Roda SQL via psql (stdin) e retorna a saída sem cabeçalhos."""
+    cmd = ["psql", dsn, "-X", "-q", "-At", "-v", "ON_ERROR_STOP=1", "-f", "-"]
+    if single_transaction:
+        cmd.insert(2, "--single-transaction")
+    result = subprocess.run(cmd, input=sql, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"psql saiu com código {result.returncode}")
+    return result.stdout
+
+
+def list_migrations() -> list[tuple[str, str]]:
+    """[(versão, caminho)] ordenado pelo prefixo numérico."""
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f[:-4], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def applied_versions(dsn: str) -> set[str]:
+    psql(dsn, _CREATE_TABLE)
+    out = psql(dsn, "SELECT version FROM schema_migrations;")
+    return {line for line in out.splitlines() if line}
+
+
+def apply(dsn: str, version: str, path: str):
+    sql = (
+        f"\\i '{path}'\n"
+        f"INSERT INTO schema_migrations (version) VALUES ('{version}');\n"
+    )
+    psql(dsn, sql, single_transaction=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do schema do eProc scraper")
+    parser.add_argument("--dsn", default=Config.DATABASE_URL, help="conexão Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--status", action="store_true", help="só lista o estado das migrações")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        print("[MIGRATE] Configure DATABASE_URL no .env ou use --dsn")
+        sys.exit(1)
+    if not shutil.which("psql"):
+        print("[MIGRATE] psql não encontrado no PATH")
+        sys.exit(1)
+
+    applied = applied_versions(args.dsn)
+    pending = [(v, p) for v, p in list_migrations() if v not in applied]
+
+    if args.status:
+        for version, _ in list_migrations():
+            mark = "aplicada" if version in applied else "PENDENTE"
+            print(f"[MIGRATE] {version:<40} {mark}")
+        return
+
+    if not pending:
+        print("[MIGRATE] Nenhuma migração pendente")
+        return
+
+    for version, path in pending:
+        print(f"[MIGRATE] Aplicando {version}...")
+        try:
+            apply(args.dsn, version, path)
+        except RuntimeError as e:
+            print(f"[MIGRATE] ERRO em {version} (transação desfeita): {e}")
+            sys.exit(1)
+    print(f"[MIGRATE] {len(pending)} migração(ões) aplicada(s)")
+
+
+if __name__ == "__main__":
+    if sys.stdout.encoding != "utf-8":
+        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+    main()
@@ -0,0 +1,37 @@
+"""Reconstrói a DB a partir dos snapshots HTML gravados com SNAPSHOTS=true.
+
+Não acessa o eProc: parseia (em N processos) o snapshot mais recente de cada
+processo e grava via sync_processo — útil depois de corrigir um parser.
+
+    python scripts/reparse.py                       # todos os processos com snapshot
+    python scripts/reparse.py --cnj 5001531-15.2025.8.21.0094 --dry-run
+    python scripts/reparse.py --prazos --workers 8  # inclui prazos_abertos da última listagem
+"""
+import os
+import sys
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.db.sync import reparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparse offline dos snapshots HTML do eProc")
+    parser.add_argument("--dir", default=Config.SNAPSHOTS_DIR, help="pasta dos snapshots (SNAPSHOTS_DIR)")
+    parser.add_argument("--cnj", action="append", help="só este CNJ (pode repetir)")
+    parser.add_argument("--prazos", action="store_true", help="reconstrói também prazos_abertos")
+    parser.add_argument("--workers", type=int, default=Config.PARSE_WORKERS, help="processos de parsing")
+    parser.add_argument("--dry-run", action="store_true", help="só parseia e mostra, sem gravar")
+    args = parser.parse_args()
+
+    Config.SNAPSHOTS_DIR = args.dir
+    if not args.dry_run and (not Config.SUPABASE_URL or not Config.SUPABASE_KEY):
+        print("[ERRO] SUPABASE_URL e SUPABASE_KEY são necessários (ou use --dry-run)")
+        sys.exit(1)
+    stats = reparse(args.cnj, prazos=args.prazos, dry_run=args.dry_run, workers=args.workers)
+    sys.exit(1 if stats["erros"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import json
+from dataclasses import dataclass
+from src.config import Config
+
+
+@dataclass
+class Account:
+    nome: str           # identificador da conta (chave em processos.advogados)
+    username: str
+    password: str
+    totp_secret: str
+    adv_name: str       # nome ou OAB como aparece nas partes (identify_adv_side)
+
+    @classmethod
+    def from_config(cls) -> "Account":
+        """Conta única configurada pelas variáveis EPROC_* do .env."""
+        return cls(
+            nome=Config.ADV_NAME or Config.EPROC_USERNAME,
+            username=Config.EPROC_USERNAME,
+            password=Config.EPROC_PASSWORD,
+            totp_secret=Config.TOTP_SECRET,
+            adv_name=Config.ADV_NAME,
+        )
+
+
+def load_accounts() -> list[Account]:
+    """
+    Contas do ACCOUNTS_FILE (lista JSON de objetos com nome, username,
+    password, totp_secret e adv_name) ou, sem arquivo, a conta única do .env.
+    """
+    if not Config.ACCOUNTS_FILE:
+        return [Account.from_config()]
+
+    with open(Config.ACCOUNTS_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+
+    accounts = []
+    for i, item in enumerate(data, 1):
+        missing = [k for k in ("username", "password", "totp_secret") if not item.get(k)]
+        if missing:
+            raise ValueError(f"Conta #{i} em {Config.ACCOUNTS_FILE} sem: {', '.join(missing)}")
+        accounts.append(Account(
+            nome=item.get("nome") or item.get("adv_name") or item["username"],
+            username=item["username"],
+            password=item["password"],
+            totp_secret=item["totp_secret"],
+            adv_name=item.get("adv_name", ""),
+        ))
+
+    nomes = [a.nome for a in accounts]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError(f"Nomes de conta repetidos em {Config.ACCOUNTS_FILE}")
+    return accounts
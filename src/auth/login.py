@@ -3,6 +3,8 @@ import re
 import pyotp
 from playwright.async_api import Page, BrowserContext
 from src.config import Config
+from src.accounts import Account
+from src.metrics import metrics
 
 
 def _clean_totp_secret(secret: str) -> str:
@@ -10,22 +12,25 @@ def _clean_totp_secret(secret: str) -> str:
     return re.sub(r"[^A-Za-z2-7=]", "", secret)
 
 
-async def login(context: BrowserContext) -> Page:
+@metrics.timed("login")
+async def login(context: BrowserContext, account: Account | None = None) -> Page:
     """
     Autentica no eProc TJRS via Keycloak SSO + TOTP.
+    Sem `account`, usa a conta única do .env.
     Retorna a page autenticada.
     """
+    account = account or Account.from_config()
     page = await context.new_page()
 
-    print("[LOGIN] Navegando para o eProc...")
+    print(f"[LOGIN] Navegando para o eProc ({account.nome})...")
     await page.goto(Config.EPROC_LOGIN_URL, wait_until="networkidle")
 
     # Verificar se foi redirecionado para Keycloak
     current_url = page.url
     if "keycloak" in current_url or "login" in current_url.lower():
         print("[LOGIN] Tela de login Keycloak detectada")
-        await _fill_credentials(page)
-        await _handle_2fa(page)
+        await _fill_credentials(page, account)
+        await _handle_2fa(page, account)
     else:
         print("[LOGIN] Já autenticado (sessão ativa)")
 
@@ -36,15 +41,15 @@ async def login(context: BrowserContext) -> Page:
     return page
 
 
-async def _fill_credentials(page: Page):
+async def _fill_credentials(page: Page, account: Account):
     """Preenche usuário e senha no form do Keycloak."""
     print("[LOGIN] Preenchendo credenciais...")
 
     # Aguardar o formulário de login
     await page.wait_for_selector("#username", timeout=15000)
 
-    await page.fill("#username", Config.EPROC_USERNAME)
-    await page.fill("#password", Config.EPROC_PASSWORD)
+    await page.fill("#username", account.username)
+    await page.fill("#password", account.password)
 
     print("[LOGIN] Submetendo formulário...")
     await page.click("#kc-login")
@@ -53,7 +58,7 @@ async def _fill_credentials(page: Page):
     await asyncio.sleep(2)
 
 
-async def _handle_2fa(page: Page):
+async def _handle_2fa(page: Page, account: Account):
     """Detecta e preenche o código TOTP se a tela de 2FA aparecer."""
     # Aguardar um pouco para a página carregar
     await asyncio.sleep(2)
@@ -76,7 +81,7 @@ async def _handle_2fa(page: Page):
     print("[LOGIN] Tela de 2FA detectada, gerando código TOTP...")
 
     # Gerar código TOTP
-    clean_secret = _clean_totp_secret(Config.TOTP_SECRET)
+    clean_secret = _clean_totp_secret(account.totp_secret)
     totp = pyotp.TOTP(clean_secret)
     code = totp.now()
     print(f"[LOGIN] Código TOTP gerado: {code}")
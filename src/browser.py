@@ -0,0 +1,177 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from playwright.async_api import Playwright, Browser, BrowserContext, Page
+from src.config import Config
+from src.accounts import Account
+from src.auth.login import login
+from src.scrapers.render import render_pool
+from src.scrapers.http_engine import EprocHttp
+from src.proxies import Proxy, ProxyPool, parse_proxy
+
+
+@dataclass
+class Session:
+    """Sessão logada de uma conta: um BrowserContext próprio (cookies isolados)."""
+    account: Account
+    context: BrowserContext
+    page: Page
+    ok: bool = True     # False = falhou no último uso; o scheduler refaz o login
+    http: EprocHttp | None = None   # SCRAPER_ENGINE=http: cookies desta sessão
+    proxy: Proxy | None = None      # proxy de saída (SessionPool)
+
+
+def build_proxy():
+    if not Config.PROXY_SERVER:
+        return None
+    proxy = {"server": Config.PROXY_SERVER}
+    if Config.PROXY_USERNAME:
+        proxy["username"] = Config.PROXY_USERNAME
+        proxy["password"] = Config.PROXY_PASSWORD
+    return proxy
+
+
+def build_proxies() -> list[dict | None]:
+    """Proxies de PROXIES (URLs separadas por vírgula) ou o PROXY_SERVER único."""
+    if Config.PROXIES:
+        return [parse_proxy(url) for url in Config.PROXIES]
+    return [build_proxy()]
+
+
+async def launch_browser(p: Playwright) -> Browser:
+    return await p.chromium.launch(headless=Config.HEADLESS)
+
+
+async def open_session(browser: Browser, account: Account, proxy: Proxy | None = None,
+                       estado: dict | None = None) -> Session:
+    """Sessão da conta saindo por `proxy`. Com `estado` (storage_state de outra
+    sessão da mesma conta) o context já nasce com os cookies e o login só
+    confirma a sessão — sem novo TOTP."""
+    config = proxy.config if proxy else None
+    context = await browser.new_context(
+        viewport={"width": 1366, "height": 900},
+        proxy=config,
+        storage_state=estado,
+    )
+    if proxy:
+        proxy.vincular(context)
+    try:
+        page = await login(context, account)
+    except Exception:
+        await close_context(context)
+        raise
+    session = Session(account, context, page, proxy=proxy)
+    if Config.SCRAPER_ENGINE == "http":
+        session.http = await EprocHttp.from_context(context, page, config)
+        if proxy:
+            proxy.vincular(session.http)
+    return session
+
+
+async def close_session(session: Session):
+    if session.http is not None:
+        await session.http.close()
+    await close_context(session.context)
+
+
+async def close_context(context: BrowserContext):
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+async def close_browser(browser: Browser):
+    try:
+        await browser.close()
+    except Exception:
+        pass
+
+
+class SessionPool:
+    """Um Chromium com uma sessão logada (BrowserContext) por conta em cada
+    proxy ativo (src/proxies.py). `sessions` escolhe o proxy a cada acesso."""
+
+    def __init__(self, p: Playwright, proxies: ProxyPool, accounts: list[Account]):
+        self.p = p
+        self.proxies = proxies
+        self.accounts = accounts
+        self.browser = None
+        self._sessoes: dict[tuple[str, str], Session] = {}   # (conta, proxy)
+
+    @property
+    def sessions(self) -> "Sessoes":
+        return Sessoes(self)
+
+    async def ensure(self) -> "Sessoes":
+        """Abre o browser, troca os proxies que falharam e loga as contas sem
+        sessão (ou cuja sessão falhou) em cada proxy ativo."""
+        if self.browser is None:
+            self.browser = await launch_browser(self.p)
+        for proxy in self.proxies.rotacionar():
+            for chave in [c for c in self._sessoes if c[1] == proxy.nome]:
+                await close_session(self._sessoes.pop(chave))
+
+        for account in self.accounts:
+            for proxy in self.proxies.ativos():
+                chave = (account.nome, proxy.nome)
+                session = self._sessoes.get(chave)
+                if session is not None and session.ok:
+                    continue
+                if session is not None:
+                    await close_session(self._sessoes.pop(chave))
+                try:
+                    estado = await self._estado(account.nome)
+                    self._sessoes[chave] = await open_session(self.browser, account, proxy, estado)
+                    via = f" via {proxy.nome}" if proxy.config else ""
+                    print(f"[OK] {account.nome}{via}: logado no Painel do Advogado\n")
+                except Exception as e:
+                    print(f"[LOGIN] Falha no login de {account.nome} ({proxy.nome}): {e}")
+        if not self._sessoes:
+            raise RuntimeError("Nenhuma conta conseguiu logar")
+        return self.sessions
+
+    async def _estado(self, conta: str) -> dict | None:
+        """Cookies de uma sessão ativa da conta em outro proxy, se houver."""
+        for (nome, _), session in self._sessoes.items():
+            if nome == conta and session.ok:
+                try:
+                    return await session.context.storage_state()
+                except Exception:
+                    continue
+        return None
+
+    async def reset(self):
+        for session in self._sessoes.values():
+            await close_session(session)
+        self._sessoes = {}
+        await render_pool.close()
+        if self.browser is not None:
+            await close_browser(self.browser)
+        self.browser = None
+
+
+class Sessoes(Mapping):
+    """{conta: Session} do pool. Cada acesso devolve a sessão da conta no proxy
+    ativo mais saudável (ProxyPool.escolher), então cada processo, listagem ou
+    retry vai para o proxy de menor custo naquele momento."""
+
+    def __init__(self, pool: SessionPool):
+        self._pool = pool
+
+    def _da_conta(self, nome: str) -> list[Session]:
+        return [s for (conta, _), s in self._pool._sessoes.items()
+                if conta == nome and s.proxy is not None and s.proxy.estado == "ativo"]
+
+    def __getitem__(self, nome: str) -> Session:
+        sessoes = self._da_conta(nome)
+        if not sessoes:
+            raise KeyError(nome)
+        sessoes = [s for s in sessoes if s.ok] or sessoes
+        proxy = self._pool.proxies.escolher([s.proxy for s in sessoes])
+        return next(s for s in sessoes if s.proxy is proxy)
+
+    def __iter__(self):
+        return (a.nome for a in self._pool.accounts if self._da_conta(a.nome))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -10,6 +10,9 @@ class Config:
     EPROC_PASSWORD = os.getenv("EPROC_PASSWORD", "")
     TOTP_SECRET = os.getenv("TOTP_SECRET", "")
     ADV_NAME = os.getenv("ADV_NAME", "")
+    # Várias contas num só processo: JSON com a lista de contas (ver src/accounts.py).
+    # Se informado, substitui EPROC_USERNAME/EPROC_PASSWORD/TOTP_SECRET/ADV_NAME.
+    ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "")
     HEADLESS = os.getenv("HEADLESS", "false").lower() == "true"
 
     EPROC_BASE_URL = "https://eproc1g.tjrs.jus.br"
@@ -17,6 +20,8 @@ class Config:
 
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+    # Conexão Postgres direta (só para scripts/migrate.py e benchmarks de banco)
+    DATABASE_URL = os.getenv("DATABASE_URL", "")
     TEMP_DIR = os.getenv("TEMP_DIR", "./tmp_docs")
     STORAGE_BUCKET = "process-documents"
 
@@ -24,16 +29,145 @@ class Config:
     PROXY_SERVER = os.getenv("PROXY_SERVER", "")
     PROXY_USERNAME = os.getenv("PROXY_USERNAME", "")
     PROXY_PASSWORD = os.getenv("PROXY_PASSWORD", "")
+    # Pool de proxies (src/proxies.py): URLs separadas por vírgula, no lugar do
+    # PROXY_SERVER. Cada proxy ativo tem uma sessão por conta e limitador próprio
+    PROXIES = [u.strip() for u in os.getenv("PROXIES", "").split(",") if u.strip()]
+    PROXY_ATIVOS = int(os.getenv("PROXY_ATIVOS", "0"))       # 0 = todos; o resto é reserva
+    PROXY_MAX_CONCORRENCIA = int(os.getenv("PROXY_MAX_CONCORRENCIA", "4"))
+    PROXY_QUARENTENA_SEC = float(os.getenv("PROXY_QUARENTENA_SEC", "900"))
+
+    # Scheduler: tier rápido (só lista de prazos) e tier profundo (scrape completo)
+    PRAZOS_INTERVAL_MIN = float(os.getenv("PRAZOS_INTERVAL_MIN", "30"))
+    PRAZOS_JITTER_SEC = float(os.getenv("PRAZOS_JITTER_SEC", "120"))
+    PRAZOS_CONCURRENCY = int(os.getenv("PRAZOS_CONCURRENCY", "1"))
+    PROCESSOS_INTERVAL_MIN = float(os.getenv("PROCESSOS_INTERVAL_MIN", "30"))
+    PROCESSOS_JITTER_SEC = float(os.getenv("PROCESSOS_JITTER_SEC", "300"))
+    PROCESSOS_CONCURRENCY = int(os.getenv("PROCESSOS_CONCURRENCY", "2"))
+    PROCESSOS_REFRESH_HOURS = float(os.getenv("PROCESSOS_REFRESH_HOURS", "24"))
+    # Limite global de abas simultâneas, somando todas as contas
+    MAX_TABS = int(os.getenv("MAX_TABS", "4"))
+
+    # Limitador de requisições ao eProc (src/limitador.py): concorrência AIMD entre
+    # LIMITADOR_MIN e LIMITADOR_MAX guiada por latência e erros, e disjuntor que
+    # pausa o ciclo quando o eProc está fora em vez de cada processo dar timeout
+    LIMITADOR_MIN = int(os.getenv("LIMITADOR_MIN", "1"))
+    LIMITADOR_MAX = int(os.getenv("LIMITADOR_MAX", "8"))
+    LIMITADOR_LATENCIA_ALVO_SEC = float(os.getenv("LIMITADOR_LATENCIA_ALVO_SEC", "15"))
+    LIMITADOR_JANELA = int(os.getenv("LIMITADOR_JANELA", "20"))
+    LIMITADOR_ERRO_MAX = float(os.getenv("LIMITADOR_ERRO_MAX", "0.5"))
+    LIMITADOR_FALHAS_SEGUIDAS = int(os.getenv("LIMITADOR_FALHAS_SEGUIDAS", "5"))
+    LIMITADOR_PAUSA_SEC = float(os.getenv("LIMITADOR_PAUSA_SEC", "60"))
+    LIMITADOR_PAUSA_MAX_SEC = float(os.getenv("LIMITADOR_PAUSA_MAX_SEC", "900"))
+
+    # Fila distribuída (tabela fila_processos): o scheduler só enfileira o tier de
+    # processos e workers (`python -m src.main --worker`) em N containers scrapeiam
+    FILA_PROCESSOS = os.getenv("FILA_PROCESSOS", "false").lower() == "true"
+    FILA_LEASE_SEC = int(os.getenv("FILA_LEASE_SEC", "600"))
+    FILA_MAX_TENTATIVAS = int(os.getenv("FILA_MAX_TENTATIVAS", "3"))
+    FILA_POLL_SEC = float(os.getenv("FILA_POLL_SEC", "15"))
+    WORKER_ID = os.getenv("WORKER_ID", "")
+
+    # Render HTML → PDF dos documentos do sistema (src/scrapers/render.py): pool de
+    # páginas dedicadas, por padrão num Chromium headless separado do das sessões
+    RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", "2"))
+    RENDER_BROWSER_PROPRIO = os.getenv("RENDER_BROWSER_PROPRIO", "true").lower() == "true"
+    # Seletores removidos antes do render (barras, menus, anexos), separados por vírgula
+    RENDER_HIDE_SELECTORS = [s.strip() for s in (
+        os.getenv("RENDER_HIDE_SELECTORS") or
+        "#divInfraBarraNavegacao,#divInfraBarraSistema,#divInfraBarraComandosSuperior,"
+        "#divInfraBarraLocalizacao,.infraBarraComandos,#divInfraAreaMenu,header,nav,"
+        "#fldAnexos,#divInfraBarraComandosInferior"
+    ).split(",") if s.strip()]
+
+    # Otimização de PDFs antes do upload (src/pdf_otimizar.py, requer pikepdf e Pillow)
+    PDF_OTIMIZAR = os.getenv("PDF_OTIMIZAR", "false").lower() == "true"
+    PDF_OTIMIZAR_MIN_BYTES = int(os.getenv("PDF_OTIMIZAR_MIN_BYTES", "524288"))
+    # Imagens acima desse DPI são reamostradas (0 = só otimizações sem perda)
+    PDF_OTIMIZAR_DPI = float(os.getenv("PDF_OTIMIZAR_DPI", "150"))
+    PDF_OTIMIZAR_JPEG_QUALIDADE = int(os.getenv("PDF_OTIMIZAR_JPEG_QUALIDADE", "80"))
+    PDF_OTIMIZAR_WORKERS = int(os.getenv("PDF_OTIMIZAR_WORKERS", "2"))
+
+    # Extração de texto dos documentos para documentos_texto (src/texto.py, requer pypdf)
+    TEXTO_EXTRAIR = os.getenv("TEXTO_EXTRAIR", "true").lower() == "true"
+    TEXTO_WORKERS = int(os.getenv("TEXTO_WORKERS", "2"))
+    # Limite por documento (o tsvector do Postgres tem teto de 1 MB)
+    TEXTO_MAX_CHARS = int(os.getenv("TEXTO_MAX_CHARS", "500000"))
+
+    # Fila de retry de documentos (documentos_pendentes): download/render/upload que
+    # falhou é tentado de novo em cada sync, sem reabrir o processo, com backoff
+    # exponencial a partir de DOCS_PENDENTES_BACKOFF_MIN (teto em horas)
+    DOCS_PENDENTES_LOTE = int(os.getenv("DOCS_PENDENTES_LOTE", "200"))
+    DOCS_PENDENTES_BACKOFF_MIN = float(os.getenv("DOCS_PENDENTES_BACKOFF_MIN", "30"))
+    DOCS_PENDENTES_BACKOFF_MAX_HORAS = float(os.getenv("DOCS_PENDENTES_BACKOFF_MAX_HORAS", "24"))
+    DOCS_PENDENTES_MAX_TENTATIVAS = int(os.getenv("DOCS_PENDENTES_MAX_TENTATIVAS", "10"))
+
+    # Política de download (src/politica_documentos.py): "niveis" baixa na hora só
+    # os documentos urgentes/recentes/com prazo e adia o resto para o backfill;
+    # "todos" baixa tudo no scrape. DOCS_METADADOS_NOMES = prefixos de nome
+    # (ex: VIDEO,AUDIO) que nunca são baixados automaticamente; DOCS_METADADOS_DIAS
+    # = eventos mais antigos que isso também não (0 = desligado)
+    DOCS_POLITICA = os.getenv("DOCS_POLITICA", "niveis").lower()
+    DOCS_RECENTES_DIAS = float(os.getenv("DOCS_RECENTES_DIAS", "30"))
+    DOCS_METADADOS_DIAS = float(os.getenv("DOCS_METADADOS_DIAS", "0"))
+    DOCS_METADADOS_NOMES = [n.strip().upper() for n in os.getenv("DOCS_METADADOS_NOMES", "").split(",") if n.strip()]
+    # Backfill dos adiados no fim de cada ciclo: para de iniciar downloads ao
+    # passar do orçamento de MB ou minutos; o resto fica para o próximo ciclo
+    DOCS_BACKFILL_LOTE = int(os.getenv("DOCS_BACKFILL_LOTE", "500"))
+    DOCS_BACKFILL_MAX_MB = float(os.getenv("DOCS_BACKFILL_MAX_MB", "500"))
+    DOCS_BACKFILL_MAX_MIN = float(os.getenv("DOCS_BACKFILL_MAX_MIN", "15"))
+
+    # Extração incremental dos eventos: só os acima do último gravado, sem
+    # "Carregar TODOS" quando a página inicial já chega até ele. Cada processo tem
+    # uma extração completa (verificação de eventos faltando) a cada
+    # EVENTOS_VERIFICAR_DIAS (0 = nunca); com SNAPSHOTS=true é sempre completa
+    EVENTOS_INCREMENTAL = os.getenv("EVENTOS_INCREMENTAL", "true").lower() == "true"
+    EVENTOS_VERIFICAR_DIAS = int(os.getenv("EVENTOS_VERIFICAR_DIAS", "7"))
+
+    # Snapshots HTML das páginas do eProc (src/snapshots.py): com SNAPSHOTS=true a
+    # página do processo é capturada, a aba fecha e o parsing roda offline em
+    # PARSE_WORKERS processos; scripts/reparse.py reconstrói a DB dos snapshots
+    SNAPSHOTS = os.getenv("SNAPSHOTS", "false").lower() == "true"
+    SNAPSHOTS_DIR = os.getenv("SNAPSHOTS_DIR", "./snapshots")
+    SNAPSHOTS_COMPRESSAO = os.getenv("SNAPSHOTS_COMPRESSAO", "zstd").lower()
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+
+    # Engine do scraper: "browser" (Playwright) ou "http" — lista de prazos e páginas
+    # dos processos baixadas com os cookies da sessão (httpx) e parseadas com lxml,
+    # caindo no Playwright quando o HTML não bate (src/scrapers/http_engine.py)
+    SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "browser").lower()
+    HTTP_CONEXOES = int(os.getenv("HTTP_CONEXOES", "8"))
+    HTTP_TIMEOUT_SEC = float(os.getenv("HTTP_TIMEOUT_SEC", "60"))
+    # Classes CSS extras que marcam prazo aberto (fundo amarelo), separadas por vírgula
+    HTTP_CLASSES_PRAZO = [c.strip() for c in os.getenv("HTTP_CLASSES_PRAZO", "").split(",") if c.strip()]
+
+    # Outbox de mudanças (sync_changes): dias de retenção (0 = mantém tudo) e
+    # webhook opcional que recebe as mudanças em lotes (src/webhook.py)
+    SYNC_CHANGES_RETENCAO_DIAS = float(os.getenv("SYNC_CHANGES_RETENCAO_DIAS", "30"))
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_LOTE = int(os.getenv("WEBHOOK_LOTE", "500"))
+    WEBHOOK_TIMEOUT_SEC = float(os.getenv("WEBHOOK_TIMEOUT_SEC", "10"))
+    WEBHOOK_CONSUMIDOR = os.getenv("WEBHOOK_CONSUMIDOR", "webhook")
+
+    # Métricas por ciclo: "db" (tabela sync_metrics), "json", "both" ou "" (só console)
+    METRICS_BACKEND = os.getenv("METRICS_BACKEND", "db").lower()
+    METRICS_DIR = os.getenv("METRICS_DIR", "./metrics")
+    # Caminho do textfile para o node_exporter (vazio = não exporta)
+    METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")
 
     @classmethod
     def validate(cls):
         missing = []
-        if not cls.EPROC_USERNAME:
-            missing.append("EPROC_USERNAME")
-        if not cls.EPROC_PASSWORD:
-            missing.append("EPROC_PASSWORD")
-        if not cls.TOTP_SECRET:
-            missing.append("TOTP_SECRET")
+        if cls.ACCOUNTS_FILE:
+            if not os.path.exists(cls.ACCOUNTS_FILE):
+                missing.append(f"ACCOUNTS_FILE (arquivo {cls.ACCOUNTS_FILE} não encontrado)")
+        else:
+            if not cls.EPROC_USERNAME:
+                missing.append("EPROC_USERNAME")
+            if not cls.EPROC_PASSWORD:
+                missing.append("EPROC_PASSWORD")
+            if not cls.TOTP_SECRET:
+                missing.append("TOTP_SECRET")
         if not cls.SUPABASE_URL:
             missing.append("SUPABASE_URL")
         if not cls.SUPABASE_KEY:
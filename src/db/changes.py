@@ -0,0 +1,97 @@
+"""
+Outbox de mudanças (tabela sync_changes): o que cada sync realmente mudou.
+
+Consumidores (N8N, webhook) leem as linhas com id > último cursor em vez de
+refazer o polling de v_processo_completo. eventos/documentos novos são
+registrados pelo próprio sync_processo; processos e prazos pelo tier de prazos.
+"""
+from datetime import datetime, timedelta, timezone
+from src.metrics import metrics
+
+
+def registrar(sb, log_id: str | None, changes: list[dict]) -> int | None:
+    """Grava `changes` ({tipo, cnj, dados}) em ordem. Retorna o último id (cursor)."""
+    if not changes:
+        return None
+    result = metrics.execute("sync_changes.registrar", sb.rpc("sync_changes_registrar", {
+        "p_sync_log_id": log_id,
+        "p_changes": changes,
+    }))
+    return result.data
+
+
+def ler(sb, cursor: int, limite: int) -> list[dict]:
+    """Próximas `limite` mudanças depois de `cursor`, em ordem de id."""
+    result = metrics.execute("sync_changes.ler", sb.table("sync_changes")
+                             .select("id,sync_log_id,tipo,cnj,dados,created_at")
+                             .gt("id", cursor)
+                             .order("id")
+                             .limit(limite))
+    return result.data or []
+
+
+def cursor(sb, consumidor: str) -> int:
+    """Último id já entregue ao consumidor (0 se nunca consumiu)."""
+    result = metrics.execute("sync_changes.cursor", sb.table("sync_changes_consumidores")
+                             .select("cursor")
+                             .eq("consumidor", consumidor)
+                             .limit(1))
+    return result.data[0]["cursor"] if result.data else 0
+
+
+def avancar(sb, consumidor: str, novo_cursor: int):
+    metrics.execute("sync_changes.avancar", sb.table("sync_changes_consumidores").upsert({
+        "consumidor": consumidor,
+        "cursor": novo_cursor,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="consumidor"))
+
+
+def purgar(sb, dias: float) -> int:
+    """Remove mudanças mais antigas que `dias` (0 = mantém tudo)."""
+    if dias <= 0:
+        return 0
+    limite = (datetime.now(timezone.utc) - timedelta(days=dias)).isoformat()
+    result = metrics.execute("sync_changes.purgar", sb.table("sync_changes")
+                             .delete()
+                             .lt("created_at", limite))
+    return len(result.data or [])
+
+
+def diff_prazos(cnj: str, antes: list[dict], depois: list[dict]) -> list[dict]:
+    """
+    prazo_novo / prazo_alterado / prazo_removido entre as linhas antigas de
+    prazos_abertos (devolvidas pelo delete) e a lista nova. Um prazo é
+    identificado por (evento_descricao, data_envio); mudou se o início ou o
+    final mudou. Timestamps são comparados como datetime (o banco devolve
+    UTC, o scraper -03:00).
+    """
+    def _ts(v):
+        if not v:
+            return None
+        try:
+            return datetime.fromisoformat(v)
+        except ValueError:
+            return v
+
+    def _chave(p):
+        return p.get("evento_descricao", ""), _ts(p.get("data_envio"))
+
+    def _dados(p):
+        return {k: p.get(k) for k in ("evento_descricao", "data_envio", "prazo_inicio", "prazo_final")}
+
+    velhos = {_chave(p): p for p in antes}
+    novos = {_chave(p): p for p in depois}
+    changes = []
+    for chave, p in novos.items():
+        v = velhos.get(chave)
+        if v is None:
+            changes.append({"tipo": "prazo_novo", "cnj": cnj, "dados": _dados(p)})
+        elif (_ts(v.get("prazo_inicio")), _ts(v.get("prazo_final"))) != \
+                (_ts(p.get("prazo_inicio")), _ts(p.get("prazo_final"))):
+            changes.append({"tipo": "prazo_alterado", "cnj": cnj,
+                            "dados": _dados(p) | {"prazo_final_anterior": v.get("prazo_final")}})
+    for chave, v in velhos.items():
+        if chave not in novos:
+            changes.append({"tipo": "prazo_removido", "cnj": cnj, "dados": _dados(v)})
+    return changes
@@ -1,11 +1,34 @@
 from supabase import create_client, Client
 from src.config import Config
+from src.metrics import metrics
 
 _client: Client | None = None
 
+# Máximo de linhas que o PostgREST devolve por requisição (max-rows do Supabase)
+PAGINA = 1000
+
 
 def get_supabase() -> Client:
     global _client
     if _client is None:
         _client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
     return _client
+
+
+def set_supabase(client):
+    """Substitui o client global (ex: FakeSupabase em testes de carga)."""
+    global _client
+    _client = client
+
+
+def selecionar_tudo(nome: str, consulta, pagina: int = PAGINA) -> list[dict]:
+    """Todas as linhas de um select, em páginas de `pagina` (.range) até vir uma
+    página incompleta — sem isso o PostgREST corta em PAGINA linhas.
+    `consulta()` monta o select do zero a cada página e precisa de um order
+    por colunas únicas (senão as páginas podem repetir ou pular linhas)."""
+    linhas = []
+    while True:
+        dados = metrics.execute(nome, consulta().range(len(linhas), len(linhas) + pagina - 1)).data or []
+        linhas += dados
+        if len(dados) < pagina:
+            return linhas
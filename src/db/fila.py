@@ -0,0 +1,57 @@
+"""Cliente da fila distribuída do tier de processos (funções fila_* do schema.sql)."""
+from src.config import Config
+from src.metrics import metrics
+
+
+def enfileirar(sb, log_id: str, eproc: dict[str, list[dict]], cnjs: list[str]) -> int:
+    """Publica os CNJs do lote com as contas que veem cada um. Retorna quantos entraram
+    (os que ainda estão pendentes de um lote anterior ficam onde estão)."""
+    itens = [{
+        "cnj": cnj,
+        "advogados": sorted({p["advogado"] for p in eproc[cnj] if p.get("advogado")}),
+    } for cnj in cnjs]
+    result = metrics.execute("fila.enfileirar", sb.rpc("fila_enfileirar", {
+        "p_sync_log_id": log_id,
+        "p_itens": itens,
+    }))
+    return result.data or 0
+
+
+def reservar(sb, worker: str, contas: list[str], limite: int) -> list[dict]:
+    """Reserva até `limite` CNJs (FOR UPDATE SKIP LOCKED + lease)."""
+    result = metrics.execute("fila.reservar", sb.rpc("fila_reservar", {
+        "p_worker": worker,
+        "p_contas": contas,
+        "p_limite": limite,
+        "p_lease_sec": Config.FILA_LEASE_SEC,
+        "p_max_tentativas": Config.FILA_MAX_TENTATIVAS,
+    }))
+    return result.data or []
+
+
+def renovar(sb, worker: str, cnjs: list[str]) -> int:
+    result = metrics.execute("fila.renovar", sb.rpc("fila_renovar", {
+        "p_worker": worker,
+        "p_cnjs": cnjs,
+        "p_lease_sec": Config.FILA_LEASE_SEC,
+    }))
+    return result.data or 0
+
+
+def concluir(sb, worker: str, cnj: str, ok: bool, documentos: int = 0, erro: str | None = None) -> bool:
+    """Registra o resultado. False = o lease venceu e outro worker reservou o CNJ."""
+    result = metrics.execute("fila.concluir", sb.rpc("fila_concluir", {
+        "p_worker": worker,
+        "p_cnj": cnj,
+        "p_ok": ok,
+        "p_documentos": documentos,
+        "p_erro": erro,
+        "p_max_tentativas": Config.FILA_MAX_TENTATIVAS,
+    }))
+    return bool(result.data)
+
+
+def finalizar(sb) -> list[dict]:
+    """Fecha os sync_log dos lotes sem CNJs pendentes; retorna os lotes fechados."""
+    result = metrics.execute("fila.finalizar", sb.rpc("fila_finalizar"))
+    return result.data or []
@@ -0,0 +1,323 @@
+-- =============================================
+-- 001: scheduler em tiers, métricas, auditoria e projeção materializada
+-- Leva um banco criado pelo schema v3 original ao estado do schema.sql atual.
+-- Idempotente: pode rodar sobre um banco já criado pelo schema.sql novo.
+-- =============================================
+
+-- sync_log.tipo: full | prazos | processos
+ALTER TABLE sync_log ADD COLUMN IF NOT EXISTS tipo TEXT DEFAULT 'full';
+
+-- last_synced_at passa a significar "último scrape completo" (NULL = nunca)
+ALTER TABLE processos ALTER COLUMN last_synced_at DROP DEFAULT;
+
+-- Métricas de cada execução (timers p50/p95/max e contadores por etapa)
+CREATE TABLE IF NOT EXISTS sync_metrics (
+    id              UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE CASCADE,
+    tipo            TEXT,
+    created_at      TIMESTAMPTZ DEFAULT NOW(),
+    metrics         JSONB NOT NULL
+);
+
+-- Auditoria: todo o resumo do banco em 1 chamada (scripts/audit_db.py)
+CREATE OR REPLACE FUNCTION audit_resumo()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+WITH ev AS (
+    SELECT cnj,
+           COUNT(*) AS eventos,
+           COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') AS com_usuario,
+           COUNT(*) FILTER (WHERE prazo_aberto) AS prazo_aberto,
+           COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) AS com_prazo_dias,
+           COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) AS com_referencia,
+           COUNT(*) FILTER (WHERE urgente) AS urgentes,
+           MIN(numero_evento) AS primeiro_evento,
+           MAX(numero_evento) AS ultimo_evento
+    FROM eventos GROUP BY cnj
+), dc AS (
+    SELECT cnj,
+           COUNT(*) AS documentos,
+           COALESCE(SUM(tamanho_bytes), 0) AS bytes,
+           COUNT(*) FILTER (WHERE COALESCE(storage_url, '') = '') AS sem_storage
+    FROM documentos GROUP BY cnj
+), pz AS (
+    SELECT cnj, COUNT(*) AS prazos, MIN(prazo_final) AS prazo_mais_proximo
+    FROM prazos_abertos GROUP BY cnj
+)
+SELECT jsonb_build_object(
+    'gerado_em', NOW(),
+    'totais', jsonb_build_object(
+        'processos', (SELECT COUNT(*) FROM processos),
+        'prazos_abertos', (SELECT COUNT(*) FROM prazos_abertos),
+        'eventos', (SELECT COUNT(*) FROM eventos),
+        'documentos', (SELECT COUNT(*) FROM documentos),
+        'bytes', (SELECT COALESCE(SUM(tamanho_bytes), 0) FROM documentos)
+    ),
+    -- % de processos com cada campo preenchido
+    'cobertura_processos', (
+        SELECT jsonb_build_object(
+            'classe',         ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(classe, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'competencia',    ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(competencia, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'data_autuacao',  ROUND(100.0 * COUNT(*) FILTER (WHERE data_autuacao IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'situacao',       ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(situacao, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'orgao_julgador', ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(orgao_julgador, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juiz',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juiz, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juizo',          ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juizo, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'lado_advogado',  ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(lado_advogado, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'assuntos',       ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'array' AND jsonb_array_length(assuntos) > 0) / NULLIF(COUNT(*), 0), 1),
+            'partes',         ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'array' AND jsonb_array_length(partes) > 0) / NULLIF(COUNT(*), 0), 1),
+            'last_synced_at', ROUND(100.0 * COUNT(*) FILTER (WHERE last_synced_at IS NOT NULL) / NULLIF(COUNT(*), 0), 1)
+        ) FROM processos
+    ),
+    -- JSONB gravado como string (double-serialized)
+    'json_string', (
+        SELECT jsonb_build_object(
+            'assuntos', COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'string'),
+            'partes',   COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'string')
+        ) FROM processos
+    ),
+    'lados', (
+        SELECT COALESCE(jsonb_object_agg(lado, n), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(NULLIF(lado_advogado, ''), '(sem lado)') AS lado, COUNT(*) AS n
+            FROM processos GROUP BY 1
+        ) l
+    ),
+    -- % de eventos com cada campo preenchido
+    'cobertura_eventos', (
+        SELECT jsonb_build_object(
+            'usuario',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'prazo_dias',        ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_status',      ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_status IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'evento_referencia', ROUND(100.0 * COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_aberto',      COUNT(*) FILTER (WHERE prazo_aberto),
+            'urgente',           COUNT(*) FILTER (WHERE urgente)
+        ) FROM eventos
+    ),
+    'bytes_por_tipo', (
+        SELECT COALESCE(jsonb_object_agg(tipo, jsonb_build_object('documentos', n, 'bytes', b)), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(tipo, '?') AS tipo, COUNT(*) AS n, COALESCE(SUM(tamanho_bytes), 0) AS b
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    'documentos_sem_storage', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original, 'url_eproc', url_eproc
+        ) ORDER BY cnj, numero_evento), '[]'::jsonb)
+        FROM documentos WHERE COALESCE(storage_url, '') = ''
+    ),
+    'por_cnj', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', p.cnj,
+            'classe', p.classe,
+            'lado', p.lado_advogado,
+            'last_synced_at', p.last_synced_at,
+            'prazos', COALESCE(pz.prazos, 0),
+            'prazo_mais_proximo', pz.prazo_mais_proximo,
+            'eventos', COALESCE(ev.eventos, 0),
+            'primeiro_evento', ev.primeiro_evento,
+            'ultimo_evento', ev.ultimo_evento,
+            'eventos_com_usuario', COALESCE(ev.com_usuario, 0),
+            'eventos_prazo_aberto', COALESCE(ev.prazo_aberto, 0),
+            'eventos_com_prazo_dias', COALESCE(ev.com_prazo_dias, 0),
+            'eventos_com_referencia', COALESCE(ev.com_referencia, 0),
+            'eventos_urgentes', COALESCE(ev.urgentes, 0),
+            'documentos', COALESCE(dc.documentos, 0),
+            'bytes', COALESCE(dc.bytes, 0),
+            'documentos_sem_storage', COALESCE(dc.sem_storage, 0)
+        ) ORDER BY p.cnj), '[]'::jsonb)
+        FROM processos p
+        LEFT JOIN ev ON ev.cnj = p.cnj
+        LEFT JOIN dc ON dc.cnj = p.cnj
+        LEFT JOIN pz ON pz.cnj = p.cnj
+    ),
+    'sync_log', (
+        SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.started_at DESC), '[]'::jsonb)
+        FROM (SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5) s
+    )
+);
+$$;
+
+DROP VIEW IF EXISTS v_processo_completo;
+DROP VIEW IF EXISTS v_processo_resumo;
+
+-- Projeção materializada de v_processo_completo (1 linha por processo).
+-- Atualizada só para os CNJs tocados em cada sync via refresh_processo_completo();
+-- as views abaixo leem desta tabela em vez de agregar eventos/documentos a cada request.
+CREATE TABLE IF NOT EXISTS processo_completo (
+    cnj                     TEXT PRIMARY KEY REFERENCES processos(cnj) ON DELETE CASCADE,
+    classe                  TEXT,
+    competencia             TEXT,
+    data_autuacao           DATE,
+    situacao                TEXT,
+    orgao_julgador          TEXT,
+    juiz                    TEXT,
+    juizo                   TEXT,
+    lado_advogado           TEXT,
+    assuntos                JSONB,
+    partes                  JSONB,
+    last_synced_at          TIMESTAMPTZ,
+    prazos                  JSON,
+    eventos                 JSON,
+    -- Campos de resumo (cards do Trello / v_processo_resumo)
+    total_prazos            INTEGER DEFAULT 0,
+    prazo_mais_proximo      TIMESTAMPTZ,
+    total_eventos           INTEGER DEFAULT 0,
+    eventos_prazo_aberto    INTEGER DEFAULT 0,
+    ultimo_evento           JSON,
+    total_documentos        INTEGER DEFAULT 0,
+    refreshed_at            TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_processo_completo_prazo ON processo_completo (prazo_mais_proximo);
+
+-- Recalcula a projeção dos CNJs informados (NULL = todos). Retorna linhas gravadas.
+CREATE OR REPLACE FUNCTION refresh_processo_completo(p_cnjs TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO processo_completo AS pc (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz, juizo,
+        lado_advogado, assuntos, partes, last_synced_at, prazos, eventos,
+        total_prazos, prazo_mais_proximo, total_eventos, eventos_prazo_aberto,
+        ultimo_evento, total_documentos, refreshed_at
+    )
+    SELECT
+        p.cnj,
+        p.classe,
+        p.competencia,
+        p.data_autuacao,
+        p.situacao,
+        p.orgao_julgador,
+        p.juiz,
+        p.juizo,
+        p.lado_advogado,
+        p.assuntos,
+        p.partes,
+        p.last_synced_at,
+        pz.prazos,
+        ev.eventos,
+        pz.total_prazos,
+        pz.prazo_mais_proximo,
+        ev.total_eventos,
+        ev.eventos_prazo_aberto,
+        ev.ultimo_evento,
+        dc.total_documentos,
+        NOW()
+    FROM processos p
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'evento_descricao', pa.evento_descricao,
+                   'data_envio', pa.data_envio,
+                   'prazo_inicio', pa.prazo_inicio,
+                   'prazo_final', pa.prazo_final
+               ) ORDER BY pa.prazo_final ASC), '[]'::json) AS prazos,
+               COUNT(*)::INTEGER AS total_prazos,
+               MIN(pa.prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao,
+                   'usuario', e.usuario,
+                   'prazo_aberto', e.prazo_aberto,
+                   'prazo_status', e.prazo_status,
+                   'prazo_data_final', e.prazo_data_final,
+                   'urgente', e.urgente,
+                   'evento_referencia', e.evento_referencia,
+                   'documentos', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                           'nome', d.nome_original,
+                           'tipo', d.tipo,
+                           'storage_url', d.storage_url
+                       )), '[]'::json) FROM documentos d
+                       WHERE d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+                   )
+               ) ORDER BY e.numero_evento DESC), '[]'::json) AS eventos,
+               COUNT(*)::INTEGER AS total_eventos,
+               (COUNT(*) FILTER (WHERE e.prazo_aberto))::INTEGER AS eventos_prazo_aberto,
+               (array_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao
+               ) ORDER BY e.numero_evento DESC))[1] AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::INTEGER AS total_documentos FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    WHERE p_cnjs IS NULL OR p.cnj = ANY(p_cnjs)
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        juizo = EXCLUDED.juizo,
+        lado_advogado = EXCLUDED.lado_advogado,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        prazos = EXCLUDED.prazos,
+        eventos = EXCLUDED.eventos,
+        total_prazos = EXCLUDED.total_prazos,
+        prazo_mais_proximo = EXCLUDED.prazo_mais_proximo,
+        total_eventos = EXCLUDED.total_eventos,
+        eventos_prazo_aberto = EXCLUDED.eventos_prazo_aberto,
+        ultimo_evento = EXCLUDED.ultimo_evento,
+        total_documentos = EXCLUDED.total_documentos,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- View completa: 1 query = tudo do processo (lida da projeção materializada)
+CREATE VIEW v_processo_completo AS
+SELECT
+    cnj,
+    classe,
+    competencia,
+    data_autuacao,
+    situacao,
+    orgao_julgador,
+    juiz,
+    juizo,
+    lado_advogado,
+    assuntos,
+    partes,
+    last_synced_at,
+    prazos,
+    eventos
+FROM processo_completo;
+
+-- View resumo: dados de card, sem a lista de eventos
+CREATE VIEW v_processo_resumo AS
+SELECT
+    cnj,
+    classe,
+    situacao,
+    juizo,
+    lado_advogado,
+    last_synced_at,
+    prazos,
+    total_prazos,
+    prazo_mais_proximo,
+    total_eventos,
+    eventos_prazo_aberto,
+    ultimo_evento,
+    total_documentos,
+    refreshed_at
+FROM processo_completo;
+
+-- Carga inicial da projeção
+SELECT refresh_processo_completo();
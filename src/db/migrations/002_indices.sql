@@ -0,0 +1,47 @@
+-- =============================================
+-- 002: índices para as queries quentes
+-- A busca do último evento de um processo (eq cnj + order numero_evento desc
+-- + limit 1) já é atendida pela PK (cnj, numero_evento) com scan reverso.
+-- =============================================
+
+-- Eventos com prazo aberto ordenados por prazo final (parcial: ~poucos % das linhas)
+CREATE INDEX IF NOT EXISTS idx_eventos_prazo_aberto
+    ON eventos (prazo_data_final) INCLUDE (cnj, numero_evento)
+    WHERE prazo_aberto;
+
+-- Eventos urgentes mais recentes
+CREATE INDEX IF NOT EXISTS idx_eventos_urgente
+    ON eventos (data_hora DESC) INCLUDE (cnj, numero_evento)
+    WHERE urgente;
+
+-- Deduplicação de documentos pelo hash
+CREATE INDEX IF NOT EXISTS idx_documentos_hash
+    ON documentos (hash_sha256)
+    WHERE hash_sha256 IS NOT NULL;
+
+-- Documentos sem arquivo no Storage (auditoria / reprocessamento)
+CREATE INDEX IF NOT EXISTS idx_documentos_sem_storage
+    ON documentos (cnj, numero_evento)
+    WHERE storage_url IS NULL;
+
+-- Prazos vencendo: índice cobrindo as colunas do card (index-only scan)
+DROP INDEX IF EXISTS idx_prazos_abertos_final;
+CREATE INDEX idx_prazos_abertos_final
+    ON prazos_abertos (prazo_final) INCLUDE (cnj, evento_descricao, prazo_inicio);
+
+-- Último sync / histórico
+CREATE INDEX IF NOT EXISTS idx_sync_log_started
+    ON sync_log (started_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_sync_metrics_log
+    ON sync_metrics (sync_log_id);
+
+-- Ordem do tier de processos (nunca scrapeados primeiro, depois os mais antigos)
+CREATE INDEX IF NOT EXISTS idx_processos_last_synced
+    ON processos (last_synced_at NULLS FIRST);
+
+ANALYZE processos;
+ANALYZE prazos_abertos;
+ANALYZE eventos;
+ANALYZE documentos;
+ANALYZE sync_log;
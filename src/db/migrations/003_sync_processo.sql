@@ -0,0 +1,86 @@
+-- =============================================
+-- 003: sync_processo(jsonb) - gravação do scrape completo em 1 round trip
+-- Depende de refresh_processo_completo (001).
+-- =============================================
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos e documentos, e atualiza a projeção.
+-- p_payload = {cnj, processo: {...colunas de processos}, eventos: [...], documentos: [...]}
+-- (chaves = nomes das colunas). Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'), NOW(), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos (
+        cnj, numero_evento, nome_original, tipo, url_eproc,
+        storage_path, storage_url, tamanho_bytes, hash_sha256
+    )
+    SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+           d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+    FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        nome_original = EXCLUDED.nome_original,
+        tipo = EXCLUDED.tipo,
+        storage_path = EXCLUDED.storage_path,
+        storage_url = EXCLUDED.storage_url,
+        tamanho_bytes = EXCLUDED.tamanho_bytes,
+        hash_sha256 = EXCLUDED.hash_sha256;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    RETURN v_novos;
+END;
+$$;
@@ -0,0 +1,245 @@
+-- =============================================
+-- 004: várias contas por processo do scheduler
+-- processos.advogados = {conta: lado} de cada conta que vê o processo.
+-- =============================================
+
+ALTER TABLE processos ADD COLUMN IF NOT EXISTS advogados JSONB DEFAULT '{}';
+ALTER TABLE processo_completo ADD COLUMN IF NOT EXISTS advogados JSONB;
+
+-- Recalcula a projeção dos CNJs informados (NULL = todos). Retorna linhas gravadas.
+CREATE OR REPLACE FUNCTION refresh_processo_completo(p_cnjs TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO processo_completo AS pc (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz, juizo,
+        lado_advogado, advogados, assuntos, partes, last_synced_at, prazos, eventos,
+        total_prazos, prazo_mais_proximo, total_eventos, eventos_prazo_aberto,
+        ultimo_evento, total_documentos, refreshed_at
+    )
+    SELECT
+        p.cnj,
+        p.classe,
+        p.competencia,
+        p.data_autuacao,
+        p.situacao,
+        p.orgao_julgador,
+        p.juiz,
+        p.juizo,
+        p.lado_advogado,
+        p.advogados,
+        p.assuntos,
+        p.partes,
+        p.last_synced_at,
+        pz.prazos,
+        ev.eventos,
+        pz.total_prazos,
+        pz.prazo_mais_proximo,
+        ev.total_eventos,
+        ev.eventos_prazo_aberto,
+        ev.ultimo_evento,
+        dc.total_documentos,
+        NOW()
+    FROM processos p
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'evento_descricao', pa.evento_descricao,
+                   'data_envio', pa.data_envio,
+                   'prazo_inicio', pa.prazo_inicio,
+                   'prazo_final', pa.prazo_final
+               ) ORDER BY pa.prazo_final ASC), '[]'::json) AS prazos,
+               COUNT(*)::INTEGER AS total_prazos,
+               MIN(pa.prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao,
+                   'usuario', e.usuario,
+                   'prazo_aberto', e.prazo_aberto,
+                   'prazo_status', e.prazo_status,
+                   'prazo_data_final', e.prazo_data_final,
+                   'urgente', e.urgente,
+                   'evento_referencia', e.evento_referencia,
+                   'documentos', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                           'nome', d.nome_original,
+                           'tipo', d.tipo,
+                           'storage_url', d.storage_url
+                       )), '[]'::json) FROM documentos d
+                       WHERE d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+                   )
+               ) ORDER BY e.numero_evento DESC), '[]'::json) AS eventos,
+               COUNT(*)::INTEGER AS total_eventos,
+               (COUNT(*) FILTER (WHERE e.prazo_aberto))::INTEGER AS eventos_prazo_aberto,
+               (array_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao
+               ) ORDER BY e.numero_evento DESC))[1] AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::INTEGER AS total_documentos FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    WHERE p_cnjs IS NULL OR p.cnj = ANY(p_cnjs)
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        juizo = EXCLUDED.juizo,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        prazos = EXCLUDED.prazos,
+        eventos = EXCLUDED.eventos,
+        total_prazos = EXCLUDED.total_prazos,
+        prazo_mais_proximo = EXCLUDED.prazo_mais_proximo,
+        total_eventos = EXCLUDED.total_eventos,
+        eventos_prazo_aberto = EXCLUDED.eventos_prazo_aberto,
+        ultimo_evento = EXCLUDED.ultimo_evento,
+        total_documentos = EXCLUDED.total_documentos,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos e documentos, e atualiza a projeção.
+-- p_payload = {cnj, processo: {...colunas de processos}, eventos: [...], documentos: [...]}
+-- (chaves = nomes das colunas). Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'), NOW(), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos (
+        cnj, numero_evento, nome_original, tipo, url_eproc,
+        storage_path, storage_url, tamanho_bytes, hash_sha256
+    )
+    SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+           d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+    FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        nome_original = EXCLUDED.nome_original,
+        tipo = EXCLUDED.tipo,
+        storage_path = EXCLUDED.storage_path,
+        storage_url = EXCLUDED.storage_url,
+        tamanho_bytes = EXCLUDED.tamanho_bytes,
+        hash_sha256 = EXCLUDED.hash_sha256;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    RETURN v_novos;
+END;
+$$;
+
+DROP VIEW IF EXISTS v_processo_completo;
+DROP VIEW IF EXISTS v_processo_resumo;
+
+-- View completa: 1 query = tudo do processo (lida da projeção materializada)
+CREATE VIEW v_processo_completo AS
+SELECT
+    cnj,
+    classe,
+    competencia,
+    data_autuacao,
+    situacao,
+    orgao_julgador,
+    juiz,
+    juizo,
+    lado_advogado,
+    advogados,
+    assuntos,
+    partes,
+    last_synced_at,
+    prazos,
+    eventos
+FROM processo_completo;
+
+-- View resumo: dados de card, sem a lista de eventos
+CREATE VIEW v_processo_resumo AS
+SELECT
+    cnj,
+    classe,
+    situacao,
+    juizo,
+    lado_advogado,
+    advogados,
+    last_synced_at,
+    prazos,
+    total_prazos,
+    prazo_mais_proximo,
+    total_eventos,
+    eventos_prazo_aberto,
+    ultimo_evento,
+    total_documentos,
+    refreshed_at
+FROM processo_completo;
+
+SELECT refresh_processo_completo();
@@ -0,0 +1,166 @@
+-- =============================================
+-- 005: fila distribuída do tier de processos (workers em vários containers)
+-- =============================================
+
+-- Fila distribuída do tier de processos (1 linha por CNJ, estado da última execução).
+-- O coordenador enfileira, os workers reservam com FOR UPDATE SKIP LOCKED e um
+-- lease; lease vencido (worker caiu) volta a ser reservável.
+CREATE TABLE IF NOT EXISTS fila_processos (
+    cnj             TEXT PRIMARY KEY REFERENCES processos(cnj) ON DELETE CASCADE,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE SET NULL,
+    advogados       TEXT[] NOT NULL DEFAULT '{}',   -- contas que veem o processo
+    status          TEXT NOT NULL DEFAULT 'pendente', -- pendente | em_andamento | ok | erro
+    worker          TEXT,
+    tentativas      INTEGER NOT NULL DEFAULT 0,
+    lease_until     TIMESTAMPTZ,
+    documentos      INTEGER NOT NULL DEFAULT 0,
+    error_message   TEXT,
+    enqueued_at     TIMESTAMPTZ DEFAULT NOW(),
+    finished_at     TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_fila_processos_ativos ON fila_processos (enqueued_at)
+    WHERE status IN ('pendente', 'em_andamento');
+CREATE INDEX IF NOT EXISTS idx_fila_processos_log ON fila_processos (sync_log_id);
+
+-- Enfileira CNJs de um lote. p_itens = [{cnj, advogados: [conta, ...]}].
+-- CNJs ainda pendentes/em andamento de um lote anterior ficam onde estão.
+CREATE OR REPLACE FUNCTION fila_enfileirar(p_sync_log_id UUID, p_itens JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO fila_processos AS f (cnj, sync_log_id, advogados)
+    SELECT i->>'cnj', p_sync_log_id,
+           ARRAY(SELECT jsonb_array_elements_text(COALESCE(i->'advogados', '[]')))
+    FROM jsonb_array_elements(p_itens) i
+    ON CONFLICT (cnj) DO UPDATE SET
+        sync_log_id = EXCLUDED.sync_log_id,
+        advogados = EXCLUDED.advogados,
+        status = 'pendente',
+        worker = NULL,
+        tentativas = 0,
+        lease_until = NULL,
+        documentos = 0,
+        error_message = NULL,
+        enqueued_at = NOW(),
+        finished_at = NULL
+    WHERE f.status IN ('ok', 'erro');
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- Reserva até p_limite CNJs visíveis por alguma das contas do worker.
+-- Pega pendentes e leases vencidos; quem já esgotou as tentativas vira erro.
+CREATE OR REPLACE FUNCTION fila_reservar(
+    p_worker TEXT,
+    p_contas TEXT[],
+    p_limite INTEGER DEFAULT 1,
+    p_lease_sec INTEGER DEFAULT 600,
+    p_max_tentativas INTEGER DEFAULT 3
+)
+RETURNS TABLE (cnj TEXT, advogados TEXT[], tentativas INTEGER, sync_log_id UUID)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE fila_processos f SET
+        status = 'erro',
+        finished_at = NOW(),
+        error_message = COALESCE(f.error_message, 'lease expirado (' || f.worker || ')')
+    WHERE f.status = 'em_andamento'
+      AND f.lease_until < NOW()
+      AND f.tentativas >= p_max_tentativas;
+
+    RETURN QUERY
+    UPDATE fila_processos f SET
+        status = 'em_andamento',
+        worker = p_worker,
+        tentativas = f.tentativas + 1,
+        lease_until = NOW() + make_interval(secs => p_lease_sec)
+    FROM (
+        SELECT q.cnj FROM fila_processos q
+        WHERE (q.status = 'pendente' OR (q.status = 'em_andamento' AND q.lease_until < NOW()))
+          AND q.advogados && p_contas
+        ORDER BY q.enqueued_at, q.cnj
+        LIMIT p_limite
+        FOR UPDATE SKIP LOCKED
+    ) livre
+    WHERE f.cnj = livre.cnj
+    RETURNING f.cnj, f.advogados, f.tentativas, f.sync_log_id;
+END;
+$$;
+
+-- Estende o lease dos CNJs que o worker ainda está processando.
+CREATE OR REPLACE FUNCTION fila_renovar(p_worker TEXT, p_cnjs TEXT[], p_lease_sec INTEGER DEFAULT 600)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH renovados AS (
+        UPDATE fila_processos SET lease_until = NOW() + make_interval(secs => p_lease_sec)
+        WHERE cnj = ANY(p_cnjs) AND worker = p_worker AND status = 'em_andamento'
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM renovados;
+$$;
+
+-- Resultado de um CNJ reservado. Falha volta para pendente até p_max_tentativas.
+-- Retorna FALSE se o lease já não é deste worker (outro reservou após vencer).
+CREATE OR REPLACE FUNCTION fila_concluir(
+    p_worker TEXT,
+    p_cnj TEXT,
+    p_ok BOOLEAN,
+    p_documentos INTEGER DEFAULT 0,
+    p_erro TEXT DEFAULT NULL,
+    p_max_tentativas INTEGER DEFAULT 3
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE fila_processos f SET
+        status = CASE
+            WHEN p_ok THEN 'ok'
+            WHEN f.tentativas < p_max_tentativas THEN 'pendente'
+            ELSE 'erro'
+        END,
+        worker = CASE WHEN p_ok OR f.tentativas >= p_max_tentativas THEN f.worker END,
+        lease_until = NULL,
+        documentos = f.documentos + COALESCE(p_documentos, 0),
+        error_message = CASE WHEN p_ok THEN NULL ELSE LEFT(p_erro, 500) END,
+        finished_at = CASE WHEN p_ok OR f.tentativas >= p_max_tentativas THEN NOW() END
+    WHERE f.cnj = p_cnj AND f.worker = p_worker AND f.status = 'em_andamento';
+    RETURN FOUND;
+END;
+$$;
+
+-- Fecha os sync_log de lotes da fila sem CNJs pendentes/em andamento.
+-- Retorna os lotes finalizados com os totais gravados.
+CREATE OR REPLACE FUNCTION fila_finalizar()
+RETURNS TABLE (id UUID, status TEXT, processos_total INTEGER, documentos_baixados INTEGER, erros INTEGER)
+LANGUAGE sql
+AS $$
+    WITH lotes AS (
+        SELECT f.sync_log_id,
+               COUNT(*)::INTEGER AS total,
+               COALESCE(SUM(f.documentos), 0)::INTEGER AS docs,
+               (COUNT(*) FILTER (WHERE f.status = 'erro'))::INTEGER AS erros,
+               MAX(f.finished_at) AS terminado
+        FROM fila_processos f
+        JOIN sync_log s ON s.id = f.sync_log_id AND s.status = 'running'
+        GROUP BY f.sync_log_id
+        HAVING COUNT(*) FILTER (WHERE f.status IN ('pendente', 'em_andamento')) = 0
+    )
+    UPDATE sync_log s SET
+        finished_at = COALESCE(l.terminado, NOW()),
+        status = CASE WHEN l.erros = 0 THEN 'success' ELSE 'partial' END,
+        processos_total = l.total,
+        documentos_baixados = l.docs,
+        erros = l.erros
+    FROM lotes l
+    WHERE s.id = l.sync_log_id
+    RETURNING s.id, s.status, s.processos_total, s.documentos_baixados, s.erros;
+$$;
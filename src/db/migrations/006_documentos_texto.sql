@@ -0,0 +1,134 @@
+-- =============================================
+-- 006: texto extraído dos documentos (documentos_texto) + busca full-text
+-- sync_processo passa a gravar também payload.textos.
+-- =============================================
+
+-- Texto extraído dos documentos (camada de texto do PDF ou HTML do sistema),
+-- por hash: o mesmo arquivo em vários processos/eventos é extraído uma vez só.
+-- Sem FK para documentos (hash não é único lá); junte por hash_sha256.
+CREATE TABLE IF NOT EXISTS documentos_texto (
+    hash_sha256     TEXT PRIMARY KEY,
+    origem          TEXT NOT NULL,          -- pdf | html | sem_texto | erro
+    texto           TEXT NOT NULL DEFAULT '',
+    tsv             TSVECTOR GENERATED ALWAYS AS (to_tsvector('portuguese', texto)) STORED,
+    extracted_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_documentos_texto_tsv ON documentos_texto USING GIN (tsv);
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, processo: {...colunas de processos}, eventos: [...], documentos: [...],
+-- textos: [{hash_sha256, origem, texto}]} (chaves = nomes das colunas).
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'), NOW(), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos (
+        cnj, numero_evento, nome_original, tipo, url_eproc,
+        storage_path, storage_url, tamanho_bytes, hash_sha256
+    )
+    SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+           d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+    FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        nome_original = EXCLUDED.nome_original,
+        tipo = EXCLUDED.tipo,
+        storage_path = EXCLUDED.storage_path,
+        storage_url = EXCLUDED.storage_url,
+        tamanho_bytes = EXCLUDED.tamanho_bytes,
+        hash_sha256 = EXCLUDED.hash_sha256;
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_payload->'textos', '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    RETURN v_novos;
+END;
+$$;
+
+-- Busca full-text nos documentos (sintaxe websearch: "frase exata", -termo, OR).
+-- Um documento por linha, com o trecho que casou; p_cnj restringe a um processo.
+CREATE OR REPLACE FUNCTION buscar_documentos(p_query TEXT, p_cnj TEXT DEFAULT NULL, p_limite INTEGER DEFAULT 50)
+RETURNS TABLE (
+    cnj TEXT, numero_evento INTEGER, nome_original TEXT, storage_url TEXT,
+    rank REAL, trecho TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('portuguese', p_query) AS q),
+    top AS (
+        SELECT d.cnj, d.numero_evento, d.nome_original, d.storage_url,
+               ts_rank(t.tsv, q.q) AS rank, t.texto
+        FROM documentos_texto t
+        CROSS JOIN q
+        JOIN documentos d ON d.hash_sha256 = t.hash_sha256
+        WHERE t.tsv @@ q.q AND (p_cnj IS NULL OR d.cnj = p_cnj)
+        ORDER BY rank DESC, d.cnj, d.numero_evento
+        LIMIT p_limite
+    )
+    -- ts_headline só nas linhas devolvidas (é caro em textos longos)
+    SELECT top.cnj, top.numero_evento, top.nome_original, top.storage_url, top.rank,
+           ts_headline('portuguese', top.texto, q.q, 'MaxFragments=2, MaxWords=25, MinWords=10')
+    FROM top CROSS JOIN q
+    ORDER BY top.rank DESC, top.cnj, top.numero_evento;
+$$;
@@ -0,0 +1,169 @@
+-- =============================================
+-- 007: outbox de mudanças (sync_changes) + cursores dos consumidores
+-- sync_processo passa a registrar eventos e documentos novos.
+-- =============================================
+
+-- Outbox de mudanças: o que cada execução realmente mudou, para consumidores
+-- (N8N, webhook) lerem só o que veio depois do último `id` visto (cursor).
+-- tipo: processo_novo | processo_removido | prazo_novo | prazo_alterado |
+--       prazo_removido | evento_novo | documento_novo
+CREATE TABLE IF NOT EXISTS sync_changes (
+    id              BIGSERIAL PRIMARY KEY,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE SET NULL,
+    tipo            TEXT NOT NULL,
+    cnj             TEXT NOT NULL,          -- sem FK: processo_removido não existe mais
+    dados           JSONB NOT NULL DEFAULT '{}',
+    created_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_changes_created ON sync_changes (created_at);
+
+-- Último id processado por cada consumidor (webhook, N8N, ...)
+CREATE TABLE IF NOT EXISTS sync_changes_consumidores (
+    consumidor      TEXT PRIMARY KEY,
+    cursor          BIGINT NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Registra mudanças. p_changes = [{tipo, cnj, dados}], na ordem. Retorna o último id.
+-- O lock (até o commit) serializa quem grava no outbox: ids ficam na ordem de
+-- commit e um consumidor que avançou o cursor não perde linha commitada depois.
+CREATE OR REPLACE FUNCTION sync_changes_registrar(p_sync_log_id UUID, p_changes JSONB)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ultimo BIGINT;
+BEGIN
+    IF jsonb_array_length(COALESCE(p_changes, '[]')) = 0 THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('sync_changes'));
+
+    INSERT INTO sync_changes (sync_log_id, tipo, cnj, dados)
+    SELECT p_sync_log_id, c->>'tipo', c->>'cnj', COALESCE(c->'dados', '{}')
+    FROM jsonb_array_elements(p_changes) WITH ORDINALITY AS t(c, i)
+    ORDER BY i;
+
+    SELECT currval(pg_get_serial_sequence('sync_changes', 'id')) INTO v_ultimo;
+    RETURN v_ultimo;
+END;
+$$;
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, sync_log_id, processo: {...colunas de processos}, eventos: [...],
+-- documentos: [...], textos: [{hash_sha256, origem, texto}]} (chaves = nomes das colunas).
+-- Eventos e documentos novos vão para o outbox (sync_changes).
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+    v_changes JSONB;
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'), NOW(), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    -- Outbox: eventos novos (na ordem) ...
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'evento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', e.numero_evento, 'data_hora', e.data_hora,
+                   'descricao', e.descricao, 'prazo_aberto', COALESCE(e.prazo_aberto, FALSE),
+                   'prazo_data_final', e.prazo_data_final, 'urgente', COALESCE(e.urgente, FALSE))
+           ) ORDER BY e.numero_evento), '[]')
+    INTO v_changes
+    FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+    WHERE e.numero_evento = ANY(v_novos);
+
+    -- ... e documentos inseridos (não os regravados)
+    WITH gravados AS (
+        INSERT INTO documentos (
+            cnj, numero_evento, nome_original, tipo, url_eproc,
+            storage_path, storage_url, tamanho_bytes, hash_sha256
+        )
+        SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+               d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+        FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+        ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+            nome_original = EXCLUDED.nome_original,
+            tipo = EXCLUDED.tipo,
+            storage_path = EXCLUDED.storage_path,
+            storage_url = EXCLUDED.storage_url,
+            tamanho_bytes = EXCLUDED.tamanho_bytes,
+            hash_sha256 = EXCLUDED.hash_sha256
+        RETURNING numero_evento, nome_original, tipo, storage_url, (xmax = 0) AS inserido
+    )
+    SELECT v_changes || COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'documento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', numero_evento, 'nome_original', nome_original,
+                   'tipo', tipo, 'storage_url', storage_url)
+           ) ORDER BY numero_evento, nome_original), '[]')
+    INTO v_changes
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_payload->'textos', '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    -- Por último: o lock do outbox fica preso só até o commit
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN v_novos;
+END;
+$$;
@@ -0,0 +1,356 @@
+-- =============================================
+-- 009: fila de retry de documentos (documentos_pendentes). sync_processo grava
+-- as falhas do scrape, sync_documentos grava o que o retry recuperou e
+-- audit_resumo lista os que continuam falhando.
+-- =============================================
+
+-- Documentos cujo download, render ou upload falhou. Cada sync tenta de novo os
+-- vencidos (proxima_tentativa), sem reabrir o processo, com backoff exponencial;
+-- quem continua falhando aparece no audit_resumo().
+CREATE TABLE IF NOT EXISTS documentos_pendentes (
+    cnj                 TEXT NOT NULL,
+    numero_evento       INTEGER NOT NULL,
+    url_eproc           TEXT NOT NULL,
+    nome_original       TEXT NOT NULL,
+    erro_tipo           TEXT NOT NULL,          -- download | render | upload
+    erro                TEXT,
+    tentativas          INTEGER NOT NULL DEFAULT 1,
+    proxima_tentativa   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    primeira_falha      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ultima_falha        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (cnj, numero_evento, url_eproc),
+    FOREIGN KEY (cnj, numero_evento) REFERENCES eventos(cnj, numero_evento) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_documentos_pendentes_proxima ON documentos_pendentes (proxima_tentativa);
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, sync_log_id, processo: {...colunas de processos}, eventos: [...],
+-- documentos: [...], textos: [{hash_sha256, origem, texto}], pendentes: [...]}
+-- (chaves = nomes das colunas). pendentes = documentos que falharam neste scrape
+-- (documentos_pendentes); os que agora foram gravados saem de lá.
+-- synced_at (opcional) = momento dos dados em last_synced_at (reparse de snapshots); padrão NOW().
+-- Eventos e documentos novos vão para o outbox (sync_changes).
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+    v_changes JSONB;
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'),
+           COALESCE((p_payload->>'synced_at')::TIMESTAMPTZ, NOW()), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    -- Outbox: eventos novos (na ordem) ...
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'evento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', e.numero_evento, 'data_hora', e.data_hora,
+                   'descricao', e.descricao, 'prazo_aberto', COALESCE(e.prazo_aberto, FALSE),
+                   'prazo_data_final', e.prazo_data_final, 'urgente', COALESCE(e.urgente, FALSE))
+           ) ORDER BY e.numero_evento), '[]')
+    INTO v_changes
+    FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+    WHERE e.numero_evento = ANY(v_novos);
+
+    -- ... e documentos inseridos (não os regravados)
+    WITH gravados AS (
+        INSERT INTO documentos (
+            cnj, numero_evento, nome_original, tipo, url_eproc,
+            storage_path, storage_url, tamanho_bytes, hash_sha256
+        )
+        SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+               d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+        FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+        ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+            nome_original = EXCLUDED.nome_original,
+            tipo = EXCLUDED.tipo,
+            storage_path = EXCLUDED.storage_path,
+            storage_url = EXCLUDED.storage_url,
+            tamanho_bytes = EXCLUDED.tamanho_bytes,
+            hash_sha256 = EXCLUDED.hash_sha256
+        RETURNING numero_evento, nome_original, tipo, storage_url, (xmax = 0) AS inserido
+    )
+    SELECT v_changes || COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'documento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', numero_evento, 'nome_original', nome_original,
+                   'tipo', tipo, 'storage_url', storage_url)
+           ) ORDER BY numero_evento, nome_original), '[]')
+    INTO v_changes
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_payload->'textos', '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    DELETE FROM documentos_pendentes dp
+    USING jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+    WHERE dp.cnj = v_cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc;
+
+    INSERT INTO documentos_pendentes AS dp (
+        cnj, numero_evento, url_eproc, nome_original, erro_tipo, erro, proxima_tentativa
+    )
+    SELECT v_cnj, f.numero_evento, f.url_eproc, f.nome_original, f.erro_tipo, f.erro,
+           COALESCE(f.proxima_tentativa, NOW())
+    FROM jsonb_populate_recordset(NULL::documentos_pendentes, COALESCE(p_payload->'pendentes', '[]')) f
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        erro_tipo = EXCLUDED.erro_tipo,
+        erro = EXCLUDED.erro,
+        tentativas = dp.tentativas + 1,
+        proxima_tentativa = EXCLUDED.proxima_tentativa,
+        ultima_falha = NOW();
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    -- Por último: o lock do outbox fica preso só até o commit
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN v_novos;
+END;
+$$;
+
+-- Grava os documentos recuperados pelo retry de documentos_pendentes de um processo:
+-- p_payload = {cnj, sync_log_id, documentos: [...], textos: [...]}. Os gravados saem
+-- da fila, os novos vão para o outbox (documento_novo) e a projeção é atualizada.
+-- Retorna quantos documentos foram inseridos.
+CREATE OR REPLACE FUNCTION sync_documentos(p_payload JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_changes JSONB;
+BEGIN
+    WITH gravados AS (
+        INSERT INTO documentos (
+            cnj, numero_evento, nome_original, tipo, url_eproc,
+            storage_path, storage_url, tamanho_bytes, hash_sha256
+        )
+        SELECT v_cnj, d.numero_evento, d.nome_original, d.tipo, d.url_eproc,
+               d.storage_path, d.storage_url, d.tamanho_bytes, d.hash_sha256
+        FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+        ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+            nome_original = EXCLUDED.nome_original,
+            tipo = EXCLUDED.tipo,
+            storage_path = EXCLUDED.storage_path,
+            storage_url = EXCLUDED.storage_url,
+            tamanho_bytes = EXCLUDED.tamanho_bytes,
+            hash_sha256 = EXCLUDED.hash_sha256
+        RETURNING numero_evento, nome_original, tipo, storage_url, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'documento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', numero_evento, 'nome_original', nome_original,
+                   'tipo', tipo, 'storage_url', storage_url)
+           ) ORDER BY numero_evento, nome_original), '[]')
+    INTO v_changes
+    FROM gravados WHERE inserido;
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_payload->'textos', '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    DELETE FROM documentos_pendentes dp
+    USING jsonb_populate_recordset(NULL::documentos, COALESCE(p_payload->'documentos', '[]')) d
+    WHERE dp.cnj = v_cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN jsonb_array_length(v_changes);
+END;
+$$;
+
+-- Auditoria: todo o resumo do banco em 1 chamada (scripts/audit_db.py)
+CREATE OR REPLACE FUNCTION audit_resumo()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+WITH ev AS (
+    SELECT cnj,
+           COUNT(*) AS eventos,
+           COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') AS com_usuario,
+           COUNT(*) FILTER (WHERE prazo_aberto) AS prazo_aberto,
+           COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) AS com_prazo_dias,
+           COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) AS com_referencia,
+           COUNT(*) FILTER (WHERE urgente) AS urgentes,
+           MIN(numero_evento) AS primeiro_evento,
+           MAX(numero_evento) AS ultimo_evento
+    FROM eventos GROUP BY cnj
+), dc AS (
+    SELECT cnj,
+           COUNT(*) AS documentos,
+           COALESCE(SUM(tamanho_bytes), 0) AS bytes,
+           COUNT(*) FILTER (WHERE COALESCE(storage_url, '') = '') AS sem_storage
+    FROM documentos GROUP BY cnj
+), pz AS (
+    SELECT cnj, COUNT(*) AS prazos, MIN(prazo_final) AS prazo_mais_proximo
+    FROM prazos_abertos GROUP BY cnj
+)
+SELECT jsonb_build_object(
+    'gerado_em', NOW(),
+    'totais', jsonb_build_object(
+        'processos', (SELECT COUNT(*) FROM processos),
+        'prazos_abertos', (SELECT COUNT(*) FROM prazos_abertos),
+        'eventos', (SELECT COUNT(*) FROM eventos),
+        'documentos', (SELECT COUNT(*) FROM documentos),
+        'bytes', (SELECT COALESCE(SUM(tamanho_bytes), 0) FROM documentos)
+    ),
+    -- % de processos com cada campo preenchido
+    'cobertura_processos', (
+        SELECT jsonb_build_object(
+            'classe',         ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(classe, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'competencia',    ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(competencia, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'data_autuacao',  ROUND(100.0 * COUNT(*) FILTER (WHERE data_autuacao IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'situacao',       ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(situacao, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'orgao_julgador', ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(orgao_julgador, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juiz',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juiz, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juizo',          ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juizo, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'lado_advogado',  ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(lado_advogado, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'assuntos',       ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'array' AND jsonb_array_length(assuntos) > 0) / NULLIF(COUNT(*), 0), 1),
+            'partes',         ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'array' AND jsonb_array_length(partes) > 0) / NULLIF(COUNT(*), 0), 1),
+            'last_synced_at', ROUND(100.0 * COUNT(*) FILTER (WHERE last_synced_at IS NOT NULL) / NULLIF(COUNT(*), 0), 1)
+        ) FROM processos
+    ),
+    -- JSONB gravado como string (double-serialized)
+    'json_string', (
+        SELECT jsonb_build_object(
+            'assuntos', COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'string'),
+            'partes',   COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'string')
+        ) FROM processos
+    ),
+    'lados', (
+        SELECT COALESCE(jsonb_object_agg(lado, n), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(NULLIF(lado_advogado, ''), '(sem lado)') AS lado, COUNT(*) AS n
+            FROM processos GROUP BY 1
+        ) l
+    ),
+    -- % de eventos com cada campo preenchido
+    'cobertura_eventos', (
+        SELECT jsonb_build_object(
+            'usuario',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'prazo_dias',        ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_status',      ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_status IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'evento_referencia', ROUND(100.0 * COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_aberto',      COUNT(*) FILTER (WHERE prazo_aberto),
+            'urgente',           COUNT(*) FILTER (WHERE urgente)
+        ) FROM eventos
+    ),
+    'bytes_por_tipo', (
+        SELECT COALESCE(jsonb_object_agg(tipo, jsonb_build_object('documentos', n, 'bytes', b)), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(tipo, '?') AS tipo, COUNT(*) AS n, COALESCE(SUM(tamanho_bytes), 0) AS b
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    'documentos_sem_storage', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original, 'url_eproc', url_eproc
+        ) ORDER BY cnj, numero_evento), '[]'::jsonb)
+        FROM documentos WHERE COALESCE(storage_url, '') = ''
+    ),
+    -- Fila de retry de documentos: total por tipo de erro e os que continuam
+    -- falhando (3+ tentativas), do mais tentado para o menos
+    'documentos_pendentes', jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM documentos_pendentes),
+        'por_erro', (
+            SELECT COALESCE(jsonb_object_agg(erro_tipo, n), '{}'::jsonb)
+            FROM (SELECT erro_tipo, COUNT(*) AS n FROM documentos_pendentes GROUP BY 1) t
+        ),
+        'persistentes', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original,
+                'erro_tipo', erro_tipo, 'erro', erro, 'tentativas', tentativas,
+                'primeira_falha', primeira_falha, 'proxima_tentativa', proxima_tentativa
+            ) ORDER BY tentativas DESC, cnj, numero_evento), '[]'::jsonb)
+            FROM documentos_pendentes WHERE tentativas >= 3
+        )
+    ),
+    'por_cnj', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', p.cnj,
+            'classe', p.classe,
+            'lado', p.lado_advogado,
+            'last_synced_at', p.last_synced_at,
+            'prazos', COALESCE(pz.prazos, 0),
+            'prazo_mais_proximo', pz.prazo_mais_proximo,
+            'eventos', COALESCE(ev.eventos, 0),
+            'primeiro_evento', ev.primeiro_evento,
+            'ultimo_evento', ev.ultimo_evento,
+            'eventos_com_usuario', COALESCE(ev.com_usuario, 0),
+            'eventos_prazo_aberto', COALESCE(ev.prazo_aberto, 0),
+            'eventos_com_prazo_dias', COALESCE(ev.com_prazo_dias, 0),
+            'eventos_com_referencia', COALESCE(ev.com_referencia, 0),
+            'eventos_urgentes', COALESCE(ev.urgentes, 0),
+            'documentos', COALESCE(dc.documentos, 0),
+            'bytes', COALESCE(dc.bytes, 0),
+            'documentos_sem_storage', COALESCE(dc.sem_storage, 0)
+        ) ORDER BY p.cnj), '[]'::jsonb)
+        FROM processos p
+        LEFT JOIN ev ON ev.cnj = p.cnj
+        LEFT JOIN dc ON dc.cnj = p.cnj
+        LEFT JOIN pz ON pz.cnj = p.cnj
+    ),
+    'sync_log', (
+        SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.started_at DESC), '[]'::jsonb)
+        FROM (SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5) s
+    )
+);
+$$;
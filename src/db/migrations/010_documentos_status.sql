@@ -0,0 +1,528 @@
+-- =============================================
+-- 010: política de download de documentos. documentos.status diz se o arquivo
+-- está no Storage (disponivel) ou ainda não (adiado = fila do backfill,
+-- metadados = só sob demanda); solicitar_documentos() é o pedido sob demanda
+-- por CNJ e documentos_backfill() a fila do backfill. sync_processo e
+-- sync_documentos passam a gravar por gravar_documentos() (documento adiado
+-- que fica disponível vai para o outbox como documento_disponivel).
+-- =============================================
+
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'disponivel';
+ALTER TABLE documentos ADD COLUMN IF NOT EXISTS solicitado_em TIMESTAMPTZ;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'documentos_status_check') THEN
+        ALTER TABLE documentos ADD CONSTRAINT documentos_status_check
+            CHECK (status IN ('disponivel', 'adiado', 'metadados'));
+    END IF;
+END;
+$$;
+
+-- Linhas antigas sem arquivo no Storage entram na fila do backfill
+UPDATE documentos SET status = 'adiado'
+WHERE status = 'disponivel' AND COALESCE(storage_url, '') = '';
+
+CREATE INDEX IF NOT EXISTS idx_documentos_backfill ON documentos (solicitado_em, cnj, numero_evento)
+    WHERE status <> 'disponivel';
+
+-- Recalcula a projeção dos CNJs informados (NULL = todos). Retorna linhas gravadas.
+CREATE OR REPLACE FUNCTION refresh_processo_completo(p_cnjs TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO processo_completo AS pc (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz, juizo,
+        lado_advogado, advogados, assuntos, partes, last_synced_at, prazos, eventos,
+        total_prazos, prazo_mais_proximo, total_eventos, eventos_prazo_aberto,
+        ultimo_evento, total_documentos, refreshed_at
+    )
+    SELECT
+        p.cnj,
+        p.classe,
+        p.competencia,
+        p.data_autuacao,
+        p.situacao,
+        p.orgao_julgador,
+        p.juiz,
+        p.juizo,
+        p.lado_advogado,
+        p.advogados,
+        p.assuntos,
+        p.partes,
+        p.last_synced_at,
+        pz.prazos,
+        ev.eventos,
+        pz.total_prazos,
+        pz.prazo_mais_proximo,
+        ev.total_eventos,
+        ev.eventos_prazo_aberto,
+        ev.ultimo_evento,
+        dc.total_documentos,
+        NOW()
+    FROM processos p
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'evento_descricao', pa.evento_descricao,
+                   'data_envio', pa.data_envio,
+                   'prazo_inicio', pa.prazo_inicio,
+                   'prazo_final', pa.prazo_final
+               ) ORDER BY pa.prazo_final ASC), '[]'::json) AS prazos,
+               COUNT(*)::INTEGER AS total_prazos,
+               MIN(pa.prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao,
+                   'usuario', e.usuario,
+                   'prazo_aberto', e.prazo_aberto,
+                   'prazo_status', e.prazo_status,
+                   'prazo_data_final', e.prazo_data_final,
+                   'urgente', e.urgente,
+                   'evento_referencia', e.evento_referencia,
+                   'documentos', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                           'nome', d.nome_original,
+                           'tipo', d.tipo,
+                           'storage_url', d.storage_url,
+                           'status', d.status
+                       )), '[]'::json) FROM documentos d
+                       WHERE d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+                   )
+               ) ORDER BY e.numero_evento DESC), '[]'::json) AS eventos,
+               COUNT(*)::INTEGER AS total_eventos,
+               (COUNT(*) FILTER (WHERE e.prazo_aberto))::INTEGER AS eventos_prazo_aberto,
+               (array_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao
+               ) ORDER BY e.numero_evento DESC))[1] AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::INTEGER AS total_documentos FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    WHERE p_cnjs IS NULL OR p.cnj = ANY(p_cnjs)
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        juizo = EXCLUDED.juizo,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        prazos = EXCLUDED.prazos,
+        eventos = EXCLUDED.eventos,
+        total_prazos = EXCLUDED.total_prazos,
+        prazo_mais_proximo = EXCLUDED.prazo_mais_proximo,
+        total_eventos = EXCLUDED.total_eventos,
+        eventos_prazo_aberto = EXCLUDED.eventos_prazo_aberto,
+        ultimo_evento = EXCLUDED.ultimo_evento,
+        total_documentos = EXCLUDED.total_documentos,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, sync_log_id, processo: {...colunas de processos}, eventos: [...],
+-- documentos: [...], textos: [{hash_sha256, origem, texto}], pendentes: [...]}
+-- (chaves = nomes das colunas). pendentes = documentos que falharam neste scrape
+-- (documentos_pendentes); os que agora foram gravados saem de lá. solicitar =
+-- numero_evento já gravados cujos documentos não disponíveis vão para a frente
+-- do backfill (solicitar_documentos).
+-- synced_at (opcional) = momento dos dados em last_synced_at (reparse de snapshots); padrão NOW().
+-- Eventos e documentos novos vão para o outbox (sync_changes).
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+    v_changes JSONB;
+BEGIN
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'),
+           COALESCE((p_payload->>'synced_at')::TIMESTAMPTZ, NOW()), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    -- Outbox: eventos novos (na ordem) ...
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'evento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', e.numero_evento, 'data_hora', e.data_hora,
+                   'descricao', e.descricao, 'prazo_aberto', COALESCE(e.prazo_aberto, FALSE),
+                   'prazo_data_final', e.prazo_data_final, 'urgente', COALESCE(e.urgente, FALSE))
+           ) ORDER BY e.numero_evento), '[]')
+    INTO v_changes
+    FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+    WHERE e.numero_evento = ANY(v_novos);
+
+    -- ... e documentos novos / que ficaram disponíveis
+    v_changes := v_changes || gravar_documentos(v_cnj, p_payload->'documentos', p_payload->'textos');
+
+    INSERT INTO documentos_pendentes AS dp (
+        cnj, numero_evento, url_eproc, nome_original, erro_tipo, erro, proxima_tentativa
+    )
+    SELECT v_cnj, f.numero_evento, f.url_eproc, f.nome_original, f.erro_tipo, f.erro,
+           COALESCE(f.proxima_tentativa, NOW())
+    FROM jsonb_populate_recordset(NULL::documentos_pendentes, COALESCE(p_payload->'pendentes', '[]')) f
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        erro_tipo = EXCLUDED.erro_tipo,
+        erro = EXCLUDED.erro,
+        tentativas = dp.tentativas + 1,
+        proxima_tentativa = EXCLUDED.proxima_tentativa,
+        ultima_falha = NOW();
+
+    IF jsonb_array_length(COALESCE(p_payload->'solicitar', '[]')) > 0 THEN
+        PERFORM solicitar_documentos(v_cnj, ARRAY(
+            SELECT jsonb_array_elements_text(p_payload->'solicitar')::INTEGER));
+    END IF;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    -- Por último: o lock do outbox fica preso só até o commit
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN v_novos;
+END;
+$$;
+
+-- Documentos de um processo (upsert em documentos e documentos_texto); os gravados
+-- saem de documentos_pendentes. Linha sem arquivo (status adiado/metadados) não
+-- sobrescreve um documento já disponível. Retorna as mudanças para o outbox:
+-- documento_novo (linha inserida, com o status) e documento_disponivel (adiado ou
+-- metadados que agora foi baixado).
+CREATE OR REPLACE FUNCTION gravar_documentos(p_cnj TEXT, p_documentos JSONB, p_textos JSONB DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changes JSONB;
+BEGIN
+    -- antes = status anterior (o CTE vê a tabela antes do INSERT);
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH novos AS (
+        SELECT * FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_documentos, '[]'))
+    ), antes AS (
+        SELECT d.numero_evento, d.url_eproc, d.status
+        FROM documentos d JOIN novos n USING (numero_evento, url_eproc)
+        WHERE d.cnj = p_cnj
+    ), gravados AS (
+        INSERT INTO documentos AS d (
+            cnj, numero_evento, nome_original, tipo, url_eproc,
+            storage_path, storage_url, tamanho_bytes, hash_sha256, status
+        )
+        SELECT p_cnj, n.numero_evento, n.nome_original, n.tipo, n.url_eproc,
+               n.storage_path, n.storage_url, n.tamanho_bytes, n.hash_sha256,
+               COALESCE(n.status, 'disponivel')
+        FROM novos n
+        ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+            nome_original = EXCLUDED.nome_original,
+            tipo = COALESCE(EXCLUDED.tipo, d.tipo),
+            storage_path = COALESCE(EXCLUDED.storage_path, d.storage_path),
+            storage_url = COALESCE(EXCLUDED.storage_url, d.storage_url),
+            tamanho_bytes = COALESCE(EXCLUDED.tamanho_bytes, d.tamanho_bytes),
+            hash_sha256 = COALESCE(EXCLUDED.hash_sha256, d.hash_sha256),
+            status = CASE WHEN d.status = 'disponivel' THEN d.status ELSE EXCLUDED.status END,
+            solicitado_em = CASE WHEN EXCLUDED.status = 'disponivel' THEN NULL ELSE d.solicitado_em END
+        RETURNING d.numero_evento, d.url_eproc, d.nome_original, d.tipo, d.storage_url, d.status,
+                  (d.xmax = 0) AS inserido
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', CASE WHEN g.inserido THEN 'documento_novo' ELSE 'documento_disponivel' END,
+               'cnj', p_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', g.numero_evento, 'nome_original', g.nome_original,
+                   'tipo', g.tipo, 'storage_url', g.storage_url, 'status', g.status)
+           ) ORDER BY g.numero_evento, g.nome_original), '[]')
+    INTO v_changes
+    FROM gravados g LEFT JOIN antes a USING (numero_evento, url_eproc)
+    WHERE g.inserido OR (g.status = 'disponivel' AND a.status <> 'disponivel');
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_textos, '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    DELETE FROM documentos_pendentes dp
+    USING jsonb_populate_recordset(NULL::documentos, COALESCE(p_documentos, '[]')) d
+    WHERE dp.cnj = p_cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc
+      AND COALESCE(d.status, 'disponivel') = 'disponivel';
+
+    RETURN v_changes;
+END;
+$$;
+
+-- Grava os documentos baixados pelo retry de documentos_pendentes ou pelo backfill
+-- de um processo: p_payload = {cnj, sync_log_id, documentos: [...], textos: [...]}.
+-- Os gravados saem da fila de retry, as mudanças vão para o outbox e a projeção
+-- é atualizada. Retorna quantos documentos ficaram disponíveis.
+CREATE OR REPLACE FUNCTION sync_documentos(p_payload JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_changes JSONB;
+BEGIN
+    v_changes := gravar_documentos(v_cnj, p_payload->'documentos', p_payload->'textos');
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN jsonb_array_length(v_changes);
+END;
+$$;
+
+-- Documentos a baixar pelo backfill: não disponíveis e fora da fila de retry, os
+-- solicitados primeiro e depois os dos eventos mais recentes. "metadados" só entram
+-- se solicitados ou com p_cnjs (backfill sob demanda de processos específicos).
+-- p_limite NULL = todos.
+CREATE OR REPLACE FUNCTION documentos_backfill(
+    p_limite INTEGER DEFAULT 500,
+    p_cnjs TEXT[] DEFAULT NULL,
+    p_solicitados BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (cnj TEXT, numero_evento INTEGER, url_eproc TEXT, nome_original TEXT,
+               status TEXT, tentativas INTEGER)
+LANGUAGE sql STABLE
+AS $$
+    SELECT d.cnj, d.numero_evento, d.url_eproc, d.nome_original, d.status, 0
+    FROM documentos d
+    JOIN eventos e ON e.cnj = d.cnj AND e.numero_evento = d.numero_evento
+    WHERE d.status <> 'disponivel'
+      AND (d.status = 'adiado' OR d.solicitado_em IS NOT NULL OR p_cnjs IS NOT NULL)
+      AND (p_cnjs IS NULL OR d.cnj = ANY(p_cnjs))
+      AND (NOT p_solicitados OR d.solicitado_em IS NOT NULL)
+      AND NOT EXISTS (
+          SELECT 1 FROM documentos_pendentes dp
+          WHERE dp.cnj = d.cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc
+      )
+    ORDER BY d.solicitado_em NULLS LAST, e.data_hora DESC, d.cnj, d.numero_evento
+    LIMIT p_limite;
+$$;
+
+-- Pedido sob demanda (N8N): os documentos não disponíveis do processo (ou só dos
+-- p_eventos) passam à frente no backfill do próximo ciclo, inclusive os "metadados".
+-- Retorna quantos documentos foram solicitados.
+CREATE OR REPLACE FUNCTION solicitar_documentos(p_cnj TEXT, p_eventos INTEGER[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH solicitados AS (
+        UPDATE documentos SET solicitado_em = NOW()
+        WHERE cnj = p_cnj AND status <> 'disponivel' AND solicitado_em IS NULL
+          AND (p_eventos IS NULL OR numero_evento = ANY(p_eventos))
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM solicitados;
+$$;
+
+-- Auditoria: todo o resumo do banco em 1 chamada (scripts/audit_db.py)
+CREATE OR REPLACE FUNCTION audit_resumo()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+WITH ev AS (
+    SELECT cnj,
+           COUNT(*) AS eventos,
+           COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') AS com_usuario,
+           COUNT(*) FILTER (WHERE prazo_aberto) AS prazo_aberto,
+           COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) AS com_prazo_dias,
+           COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) AS com_referencia,
+           COUNT(*) FILTER (WHERE urgente) AS urgentes,
+           MIN(numero_evento) AS primeiro_evento,
+           MAX(numero_evento) AS ultimo_evento
+    FROM eventos GROUP BY cnj
+), dc AS (
+    SELECT cnj,
+           COUNT(*) AS documentos,
+           COALESCE(SUM(tamanho_bytes), 0) AS bytes,
+           COUNT(*) FILTER (WHERE status = 'disponivel' AND COALESCE(storage_url, '') = '') AS sem_storage,
+           COUNT(*) FILTER (WHERE status <> 'disponivel') AS nao_disponiveis
+    FROM documentos GROUP BY cnj
+), pz AS (
+    SELECT cnj, COUNT(*) AS prazos, MIN(prazo_final) AS prazo_mais_proximo
+    FROM prazos_abertos GROUP BY cnj
+)
+SELECT jsonb_build_object(
+    'gerado_em', NOW(),
+    'totais', jsonb_build_object(
+        'processos', (SELECT COUNT(*) FROM processos),
+        'prazos_abertos', (SELECT COUNT(*) FROM prazos_abertos),
+        'eventos', (SELECT COUNT(*) FROM eventos),
+        'documentos', (SELECT COUNT(*) FROM documentos),
+        'bytes', (SELECT COALESCE(SUM(tamanho_bytes), 0) FROM documentos)
+    ),
+    -- % de processos com cada campo preenchido
+    'cobertura_processos', (
+        SELECT jsonb_build_object(
+            'classe',         ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(classe, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'competencia',    ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(competencia, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'data_autuacao',  ROUND(100.0 * COUNT(*) FILTER (WHERE data_autuacao IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'situacao',       ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(situacao, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'orgao_julgador', ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(orgao_julgador, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juiz',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juiz, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juizo',          ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juizo, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'lado_advogado',  ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(lado_advogado, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'assuntos',       ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'array' AND jsonb_array_length(assuntos) > 0) / NULLIF(COUNT(*), 0), 1),
+            'partes',         ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'array' AND jsonb_array_length(partes) > 0) / NULLIF(COUNT(*), 0), 1),
+            'last_synced_at', ROUND(100.0 * COUNT(*) FILTER (WHERE last_synced_at IS NOT NULL) / NULLIF(COUNT(*), 0), 1)
+        ) FROM processos
+    ),
+    -- JSONB gravado como string (double-serialized)
+    'json_string', (
+        SELECT jsonb_build_object(
+            'assuntos', COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'string'),
+            'partes',   COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'string')
+        ) FROM processos
+    ),
+    'lados', (
+        SELECT COALESCE(jsonb_object_agg(lado, n), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(NULLIF(lado_advogado, ''), '(sem lado)') AS lado, COUNT(*) AS n
+            FROM processos GROUP BY 1
+        ) l
+    ),
+    -- % de eventos com cada campo preenchido
+    'cobertura_eventos', (
+        SELECT jsonb_build_object(
+            'usuario',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'prazo_dias',        ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_status',      ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_status IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'evento_referencia', ROUND(100.0 * COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_aberto',      COUNT(*) FILTER (WHERE prazo_aberto),
+            'urgente',           COUNT(*) FILTER (WHERE urgente)
+        ) FROM eventos
+    ),
+    'bytes_por_tipo', (
+        SELECT COALESCE(jsonb_object_agg(tipo, jsonb_build_object('documentos', n, 'bytes', b)), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(tipo, '?') AS tipo, COUNT(*) AS n, COALESCE(SUM(tamanho_bytes), 0) AS b
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    'documentos_sem_storage', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original, 'url_eproc', url_eproc
+        ) ORDER BY cnj, numero_evento), '[]'::jsonb)
+        FROM documentos WHERE status = 'disponivel' AND COALESCE(storage_url, '') = ''
+    ),
+    -- Política de download: documentos por status (adiado = fila do backfill)
+    'documentos_por_status', (
+        SELECT COALESCE(jsonb_object_agg(status, jsonb_build_object('documentos', n, 'solicitados', sol)), '{}'::jsonb)
+        FROM (
+            SELECT status, COUNT(*) AS n, COUNT(*) FILTER (WHERE solicitado_em IS NOT NULL) AS sol
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    -- Fila de retry de documentos: total por tipo de erro e os que continuam
+    -- falhando (3+ tentativas), do mais tentado para o menos
+    'documentos_pendentes', jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM documentos_pendentes),
+        'por_erro', (
+            SELECT COALESCE(jsonb_object_agg(erro_tipo, n), '{}'::jsonb)
+            FROM (SELECT erro_tipo, COUNT(*) AS n FROM documentos_pendentes GROUP BY 1) t
+        ),
+        'persistentes', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original,
+                'erro_tipo', erro_tipo, 'erro', erro, 'tentativas', tentativas,
+                'primeira_falha', primeira_falha, 'proxima_tentativa', proxima_tentativa
+            ) ORDER BY tentativas DESC, cnj, numero_evento), '[]'::jsonb)
+            FROM documentos_pendentes WHERE tentativas >= 3
+        )
+    ),
+    'por_cnj', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', p.cnj,
+            'classe', p.classe,
+            'lado', p.lado_advogado,
+            'last_synced_at', p.last_synced_at,
+            'prazos', COALESCE(pz.prazos, 0),
+            'prazo_mais_proximo', pz.prazo_mais_proximo,
+            'eventos', COALESCE(ev.eventos, 0),
+            'primeiro_evento', ev.primeiro_evento,
+            'ultimo_evento', ev.ultimo_evento,
+            'eventos_com_usuario', COALESCE(ev.com_usuario, 0),
+            'eventos_prazo_aberto', COALESCE(ev.prazo_aberto, 0),
+            'eventos_com_prazo_dias', COALESCE(ev.com_prazo_dias, 0),
+            'eventos_com_referencia', COALESCE(ev.com_referencia, 0),
+            'eventos_urgentes', COALESCE(ev.urgentes, 0),
+            'documentos', COALESCE(dc.documentos, 0),
+            'bytes', COALESCE(dc.bytes, 0),
+            'documentos_sem_storage', COALESCE(dc.sem_storage, 0),
+            'documentos_nao_disponiveis', COALESCE(dc.nao_disponiveis, 0)
+        ) ORDER BY p.cnj), '[]'::jsonb)
+        FROM processos p
+        LEFT JOIN ev ON ev.cnj = p.cnj
+        LEFT JOIN dc ON dc.cnj = p.cnj
+        LEFT JOIN pz ON pz.cnj = p.cnj
+    ),
+    'sync_log', (
+        SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.started_at DESC), '[]'::jsonb)
+        FROM (SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5) s
+    )
+);
+$$;
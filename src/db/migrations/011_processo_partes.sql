@@ -0,0 +1,304 @@
+-- =============================================
+-- 011: partes normalizadas (processo_partes) para busca por CPF/CNPJ, OAB ou
+-- nome sem varrer processos.partes. sync_processo passa a manter a tabela por
+-- diff quando partes muda; buscar_partes() e conflito_partes() são as buscas.
+-- =============================================
+
+-- Partes e representantes de processos.partes normalizados, 1 linha por
+-- (papel, tipo, nome, documento, OAB), para busca por CPF/CNPJ, OAB ou nome
+-- sem varrer o JSONB. Mantida por sync_processo (diff, só quando partes muda).
+-- Colunas ausentes são '' (não NULL) para entrarem na PK.
+CREATE TABLE IF NOT EXISTS processo_partes (
+    cnj         TEXT NOT NULL REFERENCES processos(cnj) ON DELETE CASCADE,
+    papel       TEXT NOT NULL CHECK (papel IN ('parte', 'representante')),
+    tipo        TEXT NOT NULL DEFAULT '',   -- AUTOR/RÉU/... (representante: o da parte representada)
+    nome        TEXT NOT NULL,
+    cpf_cnpj    TEXT NOT NULL DEFAULT '',   -- só dígitos (normalizar_documento)
+    oab         TEXT NOT NULL DEFAULT '',   -- UF + número sem zeros à esquerda (normalizar_oab)
+    PRIMARY KEY (cnj, papel, tipo, nome, cpf_cnpj, oab)
+);
+
+CREATE INDEX IF NOT EXISTS idx_processo_partes_cpf_cnpj ON processo_partes (cpf_cnpj) WHERE cpf_cnpj <> '';
+CREATE INDEX IF NOT EXISTS idx_processo_partes_oab ON processo_partes (oab) WHERE oab <> '';
+
+-- Busca por nome (ILIKE '%...%'): índice trigram, se o pg_trgm existir no servidor
+-- (no Supabase existe; sem ele a busca por nome funciona, mas varre a tabela)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_processo_partes_nome_trgm
+            ON processo_partes USING GIN (nome gin_trgm_ops);
+    END IF;
+END;
+$$;
+
+-- CPF/CNPJ só com dígitos ('' se vazio)
+CREATE OR REPLACE FUNCTION normalizar_documento(p TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT COALESCE(regexp_replace(p, '\D', '', 'g'), '');
+$$;
+
+-- OAB como UF + número sem zeros à esquerda: "RS053253", "OAB/RS 53.253" e
+-- "53253/RS" viram "RS53253"; outros registros (DPE-4594967) só perdem a pontuação
+CREATE OR REPLACE FUNCTION normalizar_oab(p TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT regexp_replace(
+               regexp_replace(
+                   regexp_replace(upper(COALESCE(regexp_replace(p, '[^A-Za-z0-9]', '', 'g'), '')),
+                                  '^OAB', ''),
+                   '^([0-9]+)([A-Z]{2})$', '\2\1'),
+               '^([A-Z]*)0+([0-9])', '\1\2');
+$$;
+
+-- Linhas de processo_partes de um JSONB de partes (formato de extract_partes):
+-- cada parte e cada representante dela. JSONB que não é array = nenhuma linha.
+CREATE OR REPLACE FUNCTION processo_partes_linhas(p_partes JSONB)
+RETURNS TABLE (papel TEXT, tipo TEXT, nome TEXT, cpf_cnpj TEXT, oab TEXT)
+LANGUAGE sql IMMUTABLE
+AS $$
+    WITH partes AS (
+        SELECT p
+        FROM jsonb_array_elements(CASE WHEN jsonb_typeof(p_partes) = 'array' THEN p_partes ELSE '[]' END) p
+        WHERE jsonb_typeof(p) = 'object'
+    ),
+    linhas AS (
+        SELECT 'parte' AS papel, upper(btrim(COALESCE(p->>'tipo', ''))) AS tipo,
+               btrim(COALESCE(p->>'nome', '')) AS nome,
+               normalizar_documento(p->>'cpf_cnpj') AS cpf_cnpj, '' AS oab
+        FROM partes
+        UNION
+        SELECT 'representante', upper(btrim(COALESCE(p->>'tipo', ''))),
+               btrim(COALESCE(r->>'nome', '')), '', normalizar_oab(r->>'oab')
+        FROM partes, jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p->'representantes') = 'array' THEN p->'representantes' ELSE '[]' END) r
+    )
+    SELECT * FROM linhas WHERE nome <> '';
+$$;
+
+-- Diff de processo_partes do CNJ contra p_partes: remove as linhas que saíram e
+-- insere as novas (as que continuam não são tocadas). Retorna linhas alteradas.
+CREATE OR REPLACE FUNCTION processo_partes_atualizar(p_cnj TEXT, p_partes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_removidas INTEGER;
+    v_inseridas INTEGER;
+BEGIN
+    DELETE FROM processo_partes pp
+    WHERE pp.cnj = p_cnj
+      AND NOT EXISTS (
+          SELECT 1 FROM processo_partes_linhas(p_partes) l
+          WHERE (l.papel, l.tipo, l.nome, l.cpf_cnpj, l.oab) = (pp.papel, pp.tipo, pp.nome, pp.cpf_cnpj, pp.oab));
+    GET DIAGNOSTICS v_removidas = ROW_COUNT;
+
+    INSERT INTO processo_partes (cnj, papel, tipo, nome, cpf_cnpj, oab)
+    SELECT p_cnj, l.papel, l.tipo, l.nome, l.cpf_cnpj, l.oab
+    FROM processo_partes_linhas(p_partes) l
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS v_inseridas = ROW_COUNT;
+
+    RETURN v_removidas + v_inseridas;
+END;
+$$;
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, sync_log_id, processo: {...colunas de processos}, eventos: [...],
+-- documentos: [...], textos: [{hash_sha256, origem, texto}], pendentes: [...]}
+-- (chaves = nomes das colunas). pendentes = documentos que falharam neste scrape
+-- (documentos_pendentes); os que agora foram gravados saem de lá. solicitar =
+-- numero_evento já gravados cujos documentos não disponíveis vão para a frente
+-- do backfill (solicitar_documentos).
+-- synced_at (opcional) = momento dos dados em last_synced_at (reparse de snapshots); padrão NOW().
+-- Eventos e documentos novos vão para o outbox (sync_changes). processo_partes só
+-- é recalculada (diff) quando partes muda.
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+    v_changes JSONB;
+    v_partes_antes JSONB;
+    v_partes JSONB;
+BEGIN
+    SELECT partes INTO v_partes_antes FROM processos WHERE cnj = v_cnj;
+
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'),
+           COALESCE((p_payload->>'synced_at')::TIMESTAMPTZ, NOW()), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at
+    RETURNING partes INTO v_partes;
+
+    IF v_partes IS DISTINCT FROM v_partes_antes THEN
+        PERFORM processo_partes_atualizar(v_cnj, v_partes);
+    END IF;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    -- Outbox: eventos novos (na ordem) ...
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'evento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', e.numero_evento, 'data_hora', e.data_hora,
+                   'descricao', e.descricao, 'prazo_aberto', COALESCE(e.prazo_aberto, FALSE),
+                   'prazo_data_final', e.prazo_data_final, 'urgente', COALESCE(e.urgente, FALSE))
+           ) ORDER BY e.numero_evento), '[]')
+    INTO v_changes
+    FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+    WHERE e.numero_evento = ANY(v_novos);
+
+    -- ... e documentos novos / que ficaram disponíveis
+    v_changes := v_changes || gravar_documentos(v_cnj, p_payload->'documentos', p_payload->'textos');
+
+    INSERT INTO documentos_pendentes AS dp (
+        cnj, numero_evento, url_eproc, nome_original, erro_tipo, erro, proxima_tentativa
+    )
+    SELECT v_cnj, f.numero_evento, f.url_eproc, f.nome_original, f.erro_tipo, f.erro,
+           COALESCE(f.proxima_tentativa, NOW())
+    FROM jsonb_populate_recordset(NULL::documentos_pendentes, COALESCE(p_payload->'pendentes', '[]')) f
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        erro_tipo = EXCLUDED.erro_tipo,
+        erro = EXCLUDED.erro,
+        tentativas = dp.tentativas + 1,
+        proxima_tentativa = EXCLUDED.proxima_tentativa,
+        ultima_falha = NOW();
+
+    IF jsonb_array_length(COALESCE(p_payload->'solicitar', '[]')) > 0 THEN
+        PERFORM solicitar_documentos(v_cnj, ARRAY(
+            SELECT jsonb_array_elements_text(p_payload->'solicitar')::INTEGER));
+    END IF;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    -- Por último: o lock do outbox fica preso só até o commit
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN v_novos;
+END;
+$$;
+
+-- Processos onde aparece o CPF/CNPJ, a OAB ou o nome (ILIKE, mín. 3 letras)
+-- informados — qualquer um deles; entradas em qualquer formato (normalizadas
+-- aqui). Uma linha por parte/representante que casou.
+CREATE OR REPLACE FUNCTION buscar_partes(
+    p_cpf_cnpj TEXT DEFAULT NULL, p_oab TEXT DEFAULT NULL, p_nome TEXT DEFAULT NULL,
+    p_limite INTEGER DEFAULT 200
+)
+RETURNS TABLE (
+    cnj TEXT, papel TEXT, tipo TEXT, nome TEXT, cpf_cnpj TEXT, oab TEXT,
+    classe TEXT, situacao TEXT, lado_advogado TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH achados AS (
+        -- Um ramo por critério: cada um usa o seu índice (a condição <> '' é a
+        -- do índice parcial)
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.cpf_cnpj = normalizar_documento(p_cpf_cnpj) AND pp.cpf_cnpj <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.oab = normalizar_oab(p_oab) AND pp.oab <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE length(btrim(p_nome)) >= 3 AND pp.nome ILIKE '%' || btrim(p_nome) || '%'
+    )
+    SELECT a.cnj, a.papel, a.tipo, a.nome, a.cpf_cnpj, a.oab, p.classe, p.situacao, p.lado_advogado
+    FROM achados a
+    JOIN processos p ON p.cnj = a.cnj
+    ORDER BY a.cnj, a.papel, a.tipo, a.nome
+    LIMIT p_limite;
+$$;
+
+-- Checagem de conflito de um cliente novo: processos onde aparece qualquer um
+-- dos documentos, OABs ou nomes (ILIKE) informados, 1 linha por processo com o
+-- que casou em `partes` ([{papel, tipo, nome, cpf_cnpj, oab}]).
+CREATE OR REPLACE FUNCTION conflito_partes(
+    p_documentos TEXT[] DEFAULT '{}', p_oabs TEXT[] DEFAULT '{}', p_nomes TEXT[] DEFAULT '{}'
+)
+RETURNS TABLE (
+    cnj TEXT, classe TEXT, situacao TEXT, lado_advogado TEXT, partes JSONB
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH docs AS (
+        SELECT DISTINCT normalizar_documento(d) AS v FROM unnest(p_documentos) d
+    ),
+    oabs AS (
+        SELECT DISTINCT normalizar_oab(o) AS v FROM unnest(p_oabs) o
+    ),
+    achados AS (
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.cpf_cnpj IN (SELECT v FROM docs WHERE v <> '') AND pp.cpf_cnpj <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.oab IN (SELECT v FROM oabs WHERE v <> '') AND pp.oab <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp, unnest(p_nomes) n
+        WHERE length(btrim(n)) >= 3 AND pp.nome ILIKE '%' || btrim(n) || '%'
+    )
+    SELECT a.cnj, p.classe, p.situacao, p.lado_advogado,
+           jsonb_agg(jsonb_build_object('papel', a.papel, 'tipo', a.tipo, 'nome', a.nome,
+                                        'cpf_cnpj', a.cpf_cnpj, 'oab', a.oab)
+                     ORDER BY a.papel, a.tipo, a.nome)
+    FROM achados a
+    JOIN processos p ON p.cnj = a.cnj
+    GROUP BY a.cnj, p.classe, p.situacao, p.lado_advogado
+    ORDER BY a.cnj;
+$$;
+
+-- Carga inicial a partir do JSONB já gravado
+SELECT COALESCE(SUM(processo_partes_atualizar(cnj, partes)), 0) AS linhas_processo_partes
+FROM processos
+WHERE jsonb_typeof(partes) = 'array' AND partes <> '[]';
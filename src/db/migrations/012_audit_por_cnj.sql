@@ -0,0 +1,156 @@
+-- =============================================
+-- 012: audit_resumo() deixa de trazer por_cnj (um JSONB com todos os processos,
+-- montado inteiro antes de sair); as contagens por processo vêm paginadas de
+-- audit_por_cnj(), que o audit_db.py imprime à medida que chegam.
+-- =============================================
+
+-- Auditoria: resumo do banco em 1 chamada (scripts/audit_db.py); as contagens
+-- por processo vêm paginadas de audit_por_cnj()
+CREATE OR REPLACE FUNCTION audit_resumo()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+SELECT jsonb_build_object(
+    'gerado_em', NOW(),
+    'totais', jsonb_build_object(
+        'processos', (SELECT COUNT(*) FROM processos),
+        'prazos_abertos', (SELECT COUNT(*) FROM prazos_abertos),
+        'eventos', (SELECT COUNT(*) FROM eventos),
+        'documentos', (SELECT COUNT(*) FROM documentos),
+        'bytes', (SELECT COALESCE(SUM(tamanho_bytes), 0) FROM documentos)
+    ),
+    -- % de processos com cada campo preenchido
+    'cobertura_processos', (
+        SELECT jsonb_build_object(
+            'classe',         ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(classe, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'competencia',    ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(competencia, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'data_autuacao',  ROUND(100.0 * COUNT(*) FILTER (WHERE data_autuacao IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'situacao',       ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(situacao, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'orgao_julgador', ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(orgao_julgador, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juiz',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juiz, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juizo',          ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juizo, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'lado_advogado',  ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(lado_advogado, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'assuntos',       ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'array' AND jsonb_array_length(assuntos) > 0) / NULLIF(COUNT(*), 0), 1),
+            'partes',         ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'array' AND jsonb_array_length(partes) > 0) / NULLIF(COUNT(*), 0), 1),
+            'last_synced_at', ROUND(100.0 * COUNT(*) FILTER (WHERE last_synced_at IS NOT NULL) / NULLIF(COUNT(*), 0), 1)
+        ) FROM processos
+    ),
+    -- JSONB gravado como string (double-serialized)
+    'json_string', (
+        SELECT jsonb_build_object(
+            'assuntos', COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'string'),
+            'partes',   COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'string')
+        ) FROM processos
+    ),
+    'lados', (
+        SELECT COALESCE(jsonb_object_agg(lado, n), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(NULLIF(lado_advogado, ''), '(sem lado)') AS lado, COUNT(*) AS n
+            FROM processos GROUP BY 1
+        ) l
+    ),
+    -- % de eventos com cada campo preenchido
+    'cobertura_eventos', (
+        SELECT jsonb_build_object(
+            'usuario',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'prazo_dias',        ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_status',      ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_status IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'evento_referencia', ROUND(100.0 * COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_aberto',      COUNT(*) FILTER (WHERE prazo_aberto),
+            'urgente',           COUNT(*) FILTER (WHERE urgente)
+        ) FROM eventos
+    ),
+    'bytes_por_tipo', (
+        SELECT COALESCE(jsonb_object_agg(tipo, jsonb_build_object('documentos', n, 'bytes', b)), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(tipo, '?') AS tipo, COUNT(*) AS n, COALESCE(SUM(tamanho_bytes), 0) AS b
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    'documentos_sem_storage', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original, 'url_eproc', url_eproc
+        ) ORDER BY cnj, numero_evento), '[]'::jsonb)
+        FROM documentos WHERE status = 'disponivel' AND COALESCE(storage_url, '') = ''
+    ),
+    -- Política de download: documentos por status (adiado = fila do backfill)
+    'documentos_por_status', (
+        SELECT COALESCE(jsonb_object_agg(status, jsonb_build_object('documentos', n, 'solicitados', sol)), '{}'::jsonb)
+        FROM (
+            SELECT status, COUNT(*) AS n, COUNT(*) FILTER (WHERE solicitado_em IS NOT NULL) AS sol
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    -- Fila de retry de documentos: total por tipo de erro e os que continuam
+    -- falhando (3+ tentativas), do mais tentado para o menos
+    'documentos_pendentes', jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM documentos_pendentes),
+        'por_erro', (
+            SELECT COALESCE(jsonb_object_agg(erro_tipo, n), '{}'::jsonb)
+            FROM (SELECT erro_tipo, COUNT(*) AS n FROM documentos_pendentes GROUP BY 1) t
+        ),
+        'persistentes', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original,
+                'erro_tipo', erro_tipo, 'erro', erro, 'tentativas', tentativas,
+                'primeira_falha', primeira_falha, 'proxima_tentativa', proxima_tentativa
+            ) ORDER BY tentativas DESC, cnj, numero_evento), '[]'::jsonb)
+            FROM documentos_pendentes WHERE tentativas >= 3
+        )
+    ),
+    'sync_log', (
+        SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.started_at DESC), '[]'::jsonb)
+        FROM (SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5) s
+    )
+);
+$$;
+
+-- Contagens do audit por processo, em páginas por CNJ (keyset: p_depois = último
+-- CNJ da página anterior). Cada página só agrega os eventos/documentos/prazos
+-- dos seus processos, e o audit_db.py imprime uma enquanto busca a próxima.
+CREATE OR REPLACE FUNCTION audit_por_cnj(p_depois TEXT DEFAULT NULL, p_limite INTEGER DEFAULT 500)
+RETURNS TABLE (
+    cnj TEXT, classe TEXT, lado TEXT, last_synced_at TIMESTAMPTZ,
+    prazos BIGINT, prazo_mais_proximo TIMESTAMPTZ,
+    eventos BIGINT, primeiro_evento INTEGER, ultimo_evento INTEGER,
+    eventos_com_usuario BIGINT, eventos_prazo_aberto BIGINT, eventos_com_prazo_dias BIGINT,
+    eventos_com_referencia BIGINT, eventos_urgentes BIGINT,
+    documentos BIGINT, bytes BIGINT, documentos_sem_storage BIGINT, documentos_nao_disponiveis BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT p.cnj, p.classe, p.lado_advogado, p.last_synced_at,
+           pz.prazos, pz.prazo_mais_proximo,
+           ev.eventos, ev.primeiro_evento, ev.ultimo_evento,
+           ev.com_usuario, ev.prazo_aberto, ev.com_prazo_dias, ev.com_referencia, ev.urgentes,
+           dc.documentos, dc.bytes, dc.sem_storage, dc.nao_disponiveis
+    FROM (
+        SELECT * FROM processos
+        WHERE p_depois IS NULL OR processos.cnj > p_depois
+        ORDER BY processos.cnj
+        LIMIT p_limite
+    ) p
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS prazos, MIN(prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS eventos,
+               COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') AS com_usuario,
+               COUNT(*) FILTER (WHERE prazo_aberto) AS prazo_aberto,
+               COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) AS com_prazo_dias,
+               COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) AS com_referencia,
+               COUNT(*) FILTER (WHERE urgente) AS urgentes,
+               MIN(numero_evento) AS primeiro_evento,
+               MAX(numero_evento) AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS documentos,
+               COALESCE(SUM(tamanho_bytes), 0)::BIGINT AS bytes,
+               COUNT(*) FILTER (WHERE status = 'disponivel' AND COALESCE(storage_url, '') = '') AS sem_storage,
+               COUNT(*) FILTER (WHERE status <> 'disponivel') AS nao_disponiveis
+        FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    ORDER BY p.cnj;
+$$;
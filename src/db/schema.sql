@@ -1,16 +1,30 @@
 -- =============================================
 -- eProc Scraper 2.0 - Schema Supabase (v3)
 -- CNJ como PK, sem UUIDs intermediários
--- 5 tabelas: processos, prazos_abertos, eventos, documentos, sync_log
+-- Tabelas: processos, prazos_abertos, eventos, documentos, sync_log, sync_metrics,
+-- fila_processos (fila distribuída), processo_completo (projeção materializada),
+-- documentos_texto (texto extraído + busca full-text), sync_changes (outbox de mudanças),
+-- documentos_pendentes (retry de documentos que falharam); documentos.status =
+-- política de download (disponivel | adiado | metadados)
 -- =============================================
 
 -- LIMPEZA: Dropar tudo antes de recriar
 DROP VIEW IF EXISTS v_processo_completo;
+DROP VIEW IF EXISTS v_processo_resumo;
+DROP TABLE IF EXISTS processo_completo CASCADE;
+DROP TABLE IF EXISTS fila_processos CASCADE;
+DROP TABLE IF EXISTS documentos_texto CASCADE;
+DROP TABLE IF EXISTS documentos_pendentes CASCADE;
 DROP TABLE IF EXISTS documentos CASCADE;
 DROP TABLE IF EXISTS prazos_abertos CASCADE;
+DROP TABLE IF EXISTS processo_partes CASCADE;
 DROP TABLE IF EXISTS eventos CASCADE;
 DROP TABLE IF EXISTS processos CASCADE;
+DROP TABLE IF EXISTS sync_changes_consumidores CASCADE;
+DROP TABLE IF EXISTS sync_changes CASCADE;
+DROP TABLE IF EXISTS sync_metrics CASCADE;
 DROP TABLE IF EXISTS sync_log CASCADE;
+DROP TABLE IF EXISTS schema_migrations CASCADE;
 
 -- Tabela central: cada processo com prazo aberto
 CREATE TABLE processos (
@@ -23,15 +37,48 @@ CREATE TABLE processos (
     juiz                    TEXT,
     juizo                   TEXT,
     lado_advogado           TEXT,
+    advogados               JSONB DEFAULT '{}',
     processos_relacionados  TEXT[] DEFAULT '{}',
     assuntos                JSONB DEFAULT '[]',
     partes                  JSONB DEFAULT '[]',
     first_seen_at           TIMESTAMPTZ DEFAULT NOW(),
-    last_synced_at          TIMESTAMPTZ DEFAULT NOW(),
+    last_synced_at          TIMESTAMPTZ,
     created_at              TIMESTAMPTZ DEFAULT NOW(),
     updated_at              TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Ordem do tier de processos (nunca scrapeados primeiro, depois os mais antigos)
+CREATE INDEX idx_processos_last_synced ON processos (last_synced_at NULLS FIRST);
+
+-- Partes e representantes de processos.partes normalizados, 1 linha por
+-- (papel, tipo, nome, documento, OAB), para busca por CPF/CNPJ, OAB ou nome
+-- sem varrer o JSONB. Mantida por sync_processo (diff, só quando partes muda).
+-- Colunas ausentes são '' (não NULL) para entrarem na PK.
+CREATE TABLE processo_partes (
+    cnj         TEXT NOT NULL REFERENCES processos(cnj) ON DELETE CASCADE,
+    papel       TEXT NOT NULL CHECK (papel IN ('parte', 'representante')),
+    tipo        TEXT NOT NULL DEFAULT '',   -- AUTOR/RÉU/... (representante: o da parte representada)
+    nome        TEXT NOT NULL,
+    cpf_cnpj    TEXT NOT NULL DEFAULT '',   -- só dígitos (normalizar_documento)
+    oab         TEXT NOT NULL DEFAULT '',   -- UF + número sem zeros à esquerda (normalizar_oab)
+    PRIMARY KEY (cnj, papel, tipo, nome, cpf_cnpj, oab)
+);
+
+CREATE INDEX idx_processo_partes_cpf_cnpj ON processo_partes (cpf_cnpj) WHERE cpf_cnpj <> '';
+CREATE INDEX idx_processo_partes_oab ON processo_partes (oab) WHERE oab <> '';
+
+-- Busca por nome (ILIKE '%...%'): índice trigram, se o pg_trgm existir no servidor
+-- (no Supabase existe; sem ele a busca por nome funciona, mas varre a tabela)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_processo_partes_nome_trgm
+            ON processo_partes USING GIN (nome gin_trgm_ops);
+    END IF;
+END;
+$$;
+
 -- Prazos abertos (N por processo, extraídos da lista do eProc)
 CREATE TABLE prazos_abertos (
     cnj                 TEXT NOT NULL REFERENCES processos(cnj) ON DELETE CASCADE,
@@ -42,7 +89,8 @@ CREATE TABLE prazos_abertos (
     PRIMARY KEY (cnj, evento_descricao, prazo_final)
 );
 
-CREATE INDEX idx_prazos_abertos_final ON prazos_abertos (prazo_final);
+CREATE INDEX idx_prazos_abertos_final
+    ON prazos_abertos (prazo_final) INCLUDE (cnj, evento_descricao, prazo_inicio);
 
 -- Eventos/movimentações do processo
 CREATE TABLE eventos (
@@ -61,6 +109,14 @@ CREATE TABLE eventos (
     PRIMARY KEY (cnj, numero_evento)
 );
 
+-- Parciais: eventos com prazo aberto (por prazo final) e urgentes (mais recentes)
+CREATE INDEX idx_eventos_prazo_aberto
+    ON eventos (prazo_data_final) INCLUDE (cnj, numero_evento)
+    WHERE prazo_aberto;
+CREATE INDEX idx_eventos_urgente
+    ON eventos (data_hora DESC) INCLUDE (cnj, numero_evento)
+    WHERE urgente;
+
 -- Documentos (arquivos anexados aos eventos)
 CREATE TABLE documentos (
     cnj             TEXT NOT NULL,
@@ -72,16 +128,60 @@ CREATE TABLE documentos (
     storage_url     TEXT,
     tamanho_bytes   BIGINT,
     hash_sha256     TEXT,
+    -- disponivel (no Storage) | adiado (backfill) | metadados (só sob demanda)
+    status          TEXT NOT NULL DEFAULT 'disponivel'
+                    CHECK (status IN ('disponivel', 'adiado', 'metadados')),
+    solicitado_em   TIMESTAMPTZ,        -- pedido sob demanda (solicitar_documentos)
     PRIMARY KEY (cnj, numero_evento, url_eproc),
     FOREIGN KEY (cnj, numero_evento) REFERENCES eventos(cnj, numero_evento) ON DELETE CASCADE
 );
 
+CREATE INDEX idx_documentos_hash ON documentos (hash_sha256) WHERE hash_sha256 IS NOT NULL;
+CREATE INDEX idx_documentos_sem_storage ON documentos (cnj, numero_evento) WHERE storage_url IS NULL;
+-- Fila do backfill: só os ainda não disponíveis, solicitados primeiro
+CREATE INDEX idx_documentos_backfill ON documentos (solicitado_em, cnj, numero_evento)
+    WHERE status <> 'disponivel';
+
+-- Texto extraído dos documentos (camada de texto do PDF ou HTML do sistema),
+-- por hash: o mesmo arquivo em vários processos/eventos é extraído uma vez só.
+-- Sem FK para documentos (hash não é único lá); junte por hash_sha256.
+CREATE TABLE documentos_texto (
+    hash_sha256     TEXT PRIMARY KEY,
+    origem          TEXT NOT NULL,          -- pdf | html | sem_texto | erro
+    texto           TEXT NOT NULL DEFAULT '',
+    tsv             TSVECTOR GENERATED ALWAYS AS (to_tsvector('portuguese', texto)) STORED,
+    extracted_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_documentos_texto_tsv ON documentos_texto USING GIN (tsv);
+
+-- Documentos cujo download, render ou upload falhou. Cada sync tenta de novo os
+-- vencidos (proxima_tentativa), sem reabrir o processo, com backoff exponencial;
+-- quem continua falhando aparece no audit_resumo().
+CREATE TABLE documentos_pendentes (
+    cnj                 TEXT NOT NULL,
+    numero_evento       INTEGER NOT NULL,
+    url_eproc           TEXT NOT NULL,
+    nome_original       TEXT NOT NULL,
+    erro_tipo           TEXT NOT NULL,          -- download | render | upload
+    erro                TEXT,
+    tentativas          INTEGER NOT NULL DEFAULT 1,
+    proxima_tentativa   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    primeira_falha      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ultima_falha        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (cnj, numero_evento, url_eproc),
+    FOREIGN KEY (cnj, numero_evento) REFERENCES eventos(cnj, numero_evento) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_documentos_pendentes_proxima ON documentos_pendentes (proxima_tentativa);
+
 -- Log de cada execução do sync
 CREATE TABLE sync_log (
     id                  UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     started_at          TIMESTAMPTZ DEFAULT NOW(),
     finished_at         TIMESTAMPTZ,
     status              TEXT DEFAULT 'running',
+    tipo                TEXT DEFAULT 'full',
     processos_total     INTEGER DEFAULT 0,
     processos_novos     INTEGER DEFAULT 0,
     processos_removidos INTEGER DEFAULT 0,
@@ -90,6 +190,229 @@ CREATE TABLE sync_log (
     error_message       TEXT
 );
 
+CREATE INDEX idx_sync_log_started ON sync_log (started_at DESC);
+
+-- Métricas de cada execução (timers p50/p95/max e contadores por etapa)
+CREATE TABLE sync_metrics (
+    id              UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE CASCADE,
+    tipo            TEXT,
+    created_at      TIMESTAMPTZ DEFAULT NOW(),
+    metrics         JSONB NOT NULL
+);
+
+CREATE INDEX idx_sync_metrics_log ON sync_metrics (sync_log_id);
+
+-- Outbox de mudanças: o que cada execução realmente mudou, para consumidores
+-- (N8N, webhook) lerem só o que veio depois do último `id` visto (cursor).
+-- tipo: processo_novo | processo_removido | prazo_novo | prazo_alterado |
+--       prazo_removido | evento_novo | documento_novo
+CREATE TABLE sync_changes (
+    id              BIGSERIAL PRIMARY KEY,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE SET NULL,
+    tipo            TEXT NOT NULL,
+    cnj             TEXT NOT NULL,          -- sem FK: processo_removido não existe mais
+    dados           JSONB NOT NULL DEFAULT '{}',
+    created_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_sync_changes_created ON sync_changes (created_at);
+
+-- Último id processado por cada consumidor (webhook, N8N, ...)
+CREATE TABLE sync_changes_consumidores (
+    consumidor      TEXT PRIMARY KEY,
+    cursor          BIGINT NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Registra mudanças. p_changes = [{tipo, cnj, dados}], na ordem. Retorna o último id.
+-- O lock (até o commit) serializa quem grava no outbox: ids ficam na ordem de
+-- commit e um consumidor que avançou o cursor não perde linha commitada depois.
+CREATE OR REPLACE FUNCTION sync_changes_registrar(p_sync_log_id UUID, p_changes JSONB)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ultimo BIGINT;
+BEGIN
+    IF jsonb_array_length(COALESCE(p_changes, '[]')) = 0 THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('sync_changes'));
+
+    INSERT INTO sync_changes (sync_log_id, tipo, cnj, dados)
+    SELECT p_sync_log_id, c->>'tipo', c->>'cnj', COALESCE(c->'dados', '{}')
+    FROM jsonb_array_elements(p_changes) WITH ORDINALITY AS t(c, i)
+    ORDER BY i;
+
+    SELECT currval(pg_get_serial_sequence('sync_changes', 'id')) INTO v_ultimo;
+    RETURN v_ultimo;
+END;
+$$;
+
+-- Fila distribuída do tier de processos (1 linha por CNJ, estado da última execução).
+-- O coordenador enfileira, os workers reservam com FOR UPDATE SKIP LOCKED e um
+-- lease; lease vencido (worker caiu) volta a ser reservável.
+CREATE TABLE fila_processos (
+    cnj             TEXT PRIMARY KEY REFERENCES processos(cnj) ON DELETE CASCADE,
+    sync_log_id     UUID REFERENCES sync_log(id) ON DELETE SET NULL,
+    advogados       TEXT[] NOT NULL DEFAULT '{}',   -- contas que veem o processo
+    status          TEXT NOT NULL DEFAULT 'pendente', -- pendente | em_andamento | ok | erro
+    worker          TEXT,
+    tentativas      INTEGER NOT NULL DEFAULT 0,
+    lease_until     TIMESTAMPTZ,
+    documentos      INTEGER NOT NULL DEFAULT 0,
+    error_message   TEXT,
+    enqueued_at     TIMESTAMPTZ DEFAULT NOW(),
+    finished_at     TIMESTAMPTZ
+);
+
+CREATE INDEX idx_fila_processos_ativos ON fila_processos (enqueued_at)
+    WHERE status IN ('pendente', 'em_andamento');
+CREATE INDEX idx_fila_processos_log ON fila_processos (sync_log_id);
+
+-- Enfileira CNJs de um lote. p_itens = [{cnj, advogados: [conta, ...]}].
+-- CNJs ainda pendentes/em andamento de um lote anterior ficam onde estão.
+CREATE OR REPLACE FUNCTION fila_enfileirar(p_sync_log_id UUID, p_itens JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO fila_processos AS f (cnj, sync_log_id, advogados)
+    SELECT i->>'cnj', p_sync_log_id,
+           ARRAY(SELECT jsonb_array_elements_text(COALESCE(i->'advogados', '[]')))
+    FROM jsonb_array_elements(p_itens) i
+    ON CONFLICT (cnj) DO UPDATE SET
+        sync_log_id = EXCLUDED.sync_log_id,
+        advogados = EXCLUDED.advogados,
+        status = 'pendente',
+        worker = NULL,
+        tentativas = 0,
+        lease_until = NULL,
+        documentos = 0,
+        error_message = NULL,
+        enqueued_at = NOW(),
+        finished_at = NULL
+    WHERE f.status IN ('ok', 'erro');
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- Reserva até p_limite CNJs visíveis por alguma das contas do worker.
+-- Pega pendentes e leases vencidos; quem já esgotou as tentativas vira erro.
+CREATE OR REPLACE FUNCTION fila_reservar(
+    p_worker TEXT,
+    p_contas TEXT[],
+    p_limite INTEGER DEFAULT 1,
+    p_lease_sec INTEGER DEFAULT 600,
+    p_max_tentativas INTEGER DEFAULT 3
+)
+RETURNS TABLE (cnj TEXT, advogados TEXT[], tentativas INTEGER, sync_log_id UUID)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE fila_processos f SET
+        status = 'erro',
+        finished_at = NOW(),
+        error_message = COALESCE(f.error_message, 'lease expirado (' || f.worker || ')')
+    WHERE f.status = 'em_andamento'
+      AND f.lease_until < NOW()
+      AND f.tentativas >= p_max_tentativas;
+
+    RETURN QUERY
+    UPDATE fila_processos f SET
+        status = 'em_andamento',
+        worker = p_worker,
+        tentativas = f.tentativas + 1,
+        lease_until = NOW() + make_interval(secs => p_lease_sec)
+    FROM (
+        SELECT q.cnj FROM fila_processos q
+        WHERE (q.status = 'pendente' OR (q.status = 'em_andamento' AND q.lease_until < NOW()))
+          AND q.advogados && p_contas
+        ORDER BY q.enqueued_at, q.cnj
+        LIMIT p_limite
+        FOR UPDATE SKIP LOCKED
+    ) livre
+    WHERE f.cnj = livre.cnj
+    RETURNING f.cnj, f.advogados, f.tentativas, f.sync_log_id;
+END;
+$$;
+
+-- Estende o lease dos CNJs que o worker ainda está processando.
+CREATE OR REPLACE FUNCTION fila_renovar(p_worker TEXT, p_cnjs TEXT[], p_lease_sec INTEGER DEFAULT 600)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH renovados AS (
+        UPDATE fila_processos SET lease_until = NOW() + make_interval(secs => p_lease_sec)
+        WHERE cnj = ANY(p_cnjs) AND worker = p_worker AND status = 'em_andamento'
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM renovados;
+$$;
+
+-- Resultado de um CNJ reservado. Falha volta para pendente até p_max_tentativas.
+-- Retorna FALSE se o lease já não é deste worker (outro reservou após vencer).
+CREATE OR REPLACE FUNCTION fila_concluir(
+    p_worker TEXT,
+    p_cnj TEXT,
+    p_ok BOOLEAN,
+    p_documentos INTEGER DEFAULT 0,
+    p_erro TEXT DEFAULT NULL,
+    p_max_tentativas INTEGER DEFAULT 3
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE fila_processos f SET
+        status = CASE
+            WHEN p_ok THEN 'ok'
+            WHEN f.tentativas < p_max_tentativas THEN 'pendente'
+            ELSE 'erro'
+        END,
+        worker = CASE WHEN p_ok OR f.tentativas >= p_max_tentativas THEN f.worker END,
+        lease_until = NULL,
+        documentos = f.documentos + COALESCE(p_documentos, 0),
+        error_message = CASE WHEN p_ok THEN NULL ELSE LEFT(p_erro, 500) END,
+        finished_at = CASE WHEN p_ok OR f.tentativas >= p_max_tentativas THEN NOW() END
+    WHERE f.cnj = p_cnj AND f.worker = p_worker AND f.status = 'em_andamento';
+    RETURN FOUND;
+END;
+$$;
+
+-- Fecha os sync_log de lotes da fila sem CNJs pendentes/em andamento.
+-- Retorna os lotes finalizados com os totais gravados.
+CREATE OR REPLACE FUNCTION fila_finalizar()
+RETURNS TABLE (id UUID, status TEXT, processos_total INTEGER, documentos_baixados INTEGER, erros INTEGER)
+LANGUAGE sql
+AS $$
+    WITH lotes AS (
+        SELECT f.sync_log_id,
+               COUNT(*)::INTEGER AS total,
+               COALESCE(SUM(f.documentos), 0)::INTEGER AS docs,
+               (COUNT(*) FILTER (WHERE f.status = 'erro'))::INTEGER AS erros,
+               MAX(f.finished_at) AS terminado
+        FROM fila_processos f
+        JOIN sync_log s ON s.id = f.sync_log_id AND s.status = 'running'
+        GROUP BY f.sync_log_id
+        HAVING COUNT(*) FILTER (WHERE f.status IN ('pendente', 'em_andamento')) = 0
+    )
+    UPDATE sync_log s SET
+        finished_at = COALESCE(l.terminado, NOW()),
+        status = CASE WHEN l.erros = 0 THEN 'success' ELSE 'partial' END,
+        processos_total = l.total,
+        documentos_baixados = l.docs,
+        erros = l.erros
+    FROM lotes l
+    WHERE s.id = l.sync_log_id
+    RETURNING s.id, s.status, s.processos_total, s.documentos_baixados, s.erros;
+$$;
+
 -- Trigger para atualizar updated_at automaticamente
 CREATE OR REPLACE FUNCTION update_updated_at()
 RETURNS TRIGGER AS $$
@@ -103,49 +426,777 @@ CREATE TRIGGER trg_processos_updated
     BEFORE UPDATE ON processos
     FOR EACH ROW EXECUTE FUNCTION update_updated_at();
 
--- View completa: 1 query = tudo do processo
+-- Projeção materializada de v_processo_completo (1 linha por processo).
+-- Atualizada só para os CNJs tocados em cada sync via refresh_processo_completo();
+-- as views abaixo leem desta tabela em vez de agregar eventos/documentos a cada request.
+CREATE TABLE processo_completo (
+    cnj                     TEXT PRIMARY KEY REFERENCES processos(cnj) ON DELETE CASCADE,
+    classe                  TEXT,
+    competencia             TEXT,
+    data_autuacao           DATE,
+    situacao                TEXT,
+    orgao_julgador          TEXT,
+    juiz                    TEXT,
+    juizo                   TEXT,
+    lado_advogado           TEXT,
+    advogados               JSONB,
+    assuntos                JSONB,
+    partes                  JSONB,
+    last_synced_at          TIMESTAMPTZ,
+    prazos                  JSON,
+    eventos                 JSON,
+    -- Campos de resumo (cards do Trello / v_processo_resumo)
+    total_prazos            INTEGER DEFAULT 0,
+    prazo_mais_proximo      TIMESTAMPTZ,
+    total_eventos           INTEGER DEFAULT 0,
+    eventos_prazo_aberto    INTEGER DEFAULT 0,
+    ultimo_evento           JSON,
+    total_documentos        INTEGER DEFAULT 0,
+    refreshed_at            TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_processo_completo_prazo ON processo_completo (prazo_mais_proximo);
+
+-- Recalcula a projeção dos CNJs informados (NULL = todos). Retorna linhas gravadas.
+CREATE OR REPLACE FUNCTION refresh_processo_completo(p_cnjs TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO processo_completo AS pc (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz, juizo,
+        lado_advogado, advogados, assuntos, partes, last_synced_at, prazos, eventos,
+        total_prazos, prazo_mais_proximo, total_eventos, eventos_prazo_aberto,
+        ultimo_evento, total_documentos, refreshed_at
+    )
+    SELECT
+        p.cnj,
+        p.classe,
+        p.competencia,
+        p.data_autuacao,
+        p.situacao,
+        p.orgao_julgador,
+        p.juiz,
+        p.juizo,
+        p.lado_advogado,
+        p.advogados,
+        p.assuntos,
+        p.partes,
+        p.last_synced_at,
+        pz.prazos,
+        ev.eventos,
+        pz.total_prazos,
+        pz.prazo_mais_proximo,
+        ev.total_eventos,
+        ev.eventos_prazo_aberto,
+        ev.ultimo_evento,
+        dc.total_documentos,
+        NOW()
+    FROM processos p
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'evento_descricao', pa.evento_descricao,
+                   'data_envio', pa.data_envio,
+                   'prazo_inicio', pa.prazo_inicio,
+                   'prazo_final', pa.prazo_final
+               ) ORDER BY pa.prazo_final ASC), '[]'::json) AS prazos,
+               COUNT(*)::INTEGER AS total_prazos,
+               MIN(pa.prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao,
+                   'usuario', e.usuario,
+                   'prazo_aberto', e.prazo_aberto,
+                   'prazo_status', e.prazo_status,
+                   'prazo_data_final', e.prazo_data_final,
+                   'urgente', e.urgente,
+                   'evento_referencia', e.evento_referencia,
+                   'documentos', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                           'nome', d.nome_original,
+                           'tipo', d.tipo,
+                           'storage_url', d.storage_url,
+                           'status', d.status
+                       )), '[]'::json) FROM documentos d
+                       WHERE d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+                   )
+               ) ORDER BY e.numero_evento DESC), '[]'::json) AS eventos,
+               COUNT(*)::INTEGER AS total_eventos,
+               (COUNT(*) FILTER (WHERE e.prazo_aberto))::INTEGER AS eventos_prazo_aberto,
+               (array_agg(json_build_object(
+                   'numero', e.numero_evento,
+                   'data_hora', e.data_hora,
+                   'descricao', e.descricao
+               ) ORDER BY e.numero_evento DESC))[1] AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::INTEGER AS total_documentos FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    WHERE p_cnjs IS NULL OR p.cnj = ANY(p_cnjs)
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        juizo = EXCLUDED.juizo,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        prazos = EXCLUDED.prazos,
+        eventos = EXCLUDED.eventos,
+        total_prazos = EXCLUDED.total_prazos,
+        prazo_mais_proximo = EXCLUDED.prazo_mais_proximo,
+        total_eventos = EXCLUDED.total_eventos,
+        eventos_prazo_aberto = EXCLUDED.eventos_prazo_aberto,
+        ultimo_evento = EXCLUDED.ultimo_evento,
+        total_documentos = EXCLUDED.total_documentos,
+        refreshed_at = EXCLUDED.refreshed_at;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$;
+
+-- CPF/CNPJ só com dígitos ('' se vazio)
+CREATE OR REPLACE FUNCTION normalizar_documento(p TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT COALESCE(regexp_replace(p, '\D', '', 'g'), '');
+$$;
+
+-- OAB como UF + número sem zeros à esquerda: "RS053253", "OAB/RS 53.253" e
+-- "53253/RS" viram "RS53253"; outros registros (DPE-4594967) só perdem a pontuação
+CREATE OR REPLACE FUNCTION normalizar_oab(p TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT regexp_replace(
+               regexp_replace(
+                   regexp_replace(upper(COALESCE(regexp_replace(p, '[^A-Za-z0-9]', '', 'g'), '')),
+                                  '^OAB', ''),
+                   '^([0-9]+)([A-Z]{2})$', '\2\1'),
+               '^([A-Z]*)0+([0-9])', '\1\2');
+$$;
+
+-- Linhas de processo_partes de um JSONB de partes (formato de extract_partes):
+-- cada parte e cada representante dela. JSONB que não é array = nenhuma linha.
+CREATE OR REPLACE FUNCTION processo_partes_linhas(p_partes JSONB)
+RETURNS TABLE (papel TEXT, tipo TEXT, nome TEXT, cpf_cnpj TEXT, oab TEXT)
+LANGUAGE sql IMMUTABLE
+AS $$
+    WITH partes AS (
+        SELECT p
+        FROM jsonb_array_elements(CASE WHEN jsonb_typeof(p_partes) = 'array' THEN p_partes ELSE '[]' END) p
+        WHERE jsonb_typeof(p) = 'object'
+    ),
+    linhas AS (
+        SELECT 'parte' AS papel, upper(btrim(COALESCE(p->>'tipo', ''))) AS tipo,
+               btrim(COALESCE(p->>'nome', '')) AS nome,
+               normalizar_documento(p->>'cpf_cnpj') AS cpf_cnpj, '' AS oab
+        FROM partes
+        UNION
+        SELECT 'representante', upper(btrim(COALESCE(p->>'tipo', ''))),
+               btrim(COALESCE(r->>'nome', '')), '', normalizar_oab(r->>'oab')
+        FROM partes, jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p->'representantes') = 'array' THEN p->'representantes' ELSE '[]' END) r
+    )
+    SELECT * FROM linhas WHERE nome <> '';
+$$;
+
+-- Diff de processo_partes do CNJ contra p_partes: remove as linhas que saíram e
+-- insere as novas (as que continuam não são tocadas). Retorna linhas alteradas.
+CREATE OR REPLACE FUNCTION processo_partes_atualizar(p_cnj TEXT, p_partes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_removidas INTEGER;
+    v_inseridas INTEGER;
+BEGIN
+    DELETE FROM processo_partes pp
+    WHERE pp.cnj = p_cnj
+      AND NOT EXISTS (
+          SELECT 1 FROM processo_partes_linhas(p_partes) l
+          WHERE (l.papel, l.tipo, l.nome, l.cpf_cnpj, l.oab) = (pp.papel, pp.tipo, pp.nome, pp.cpf_cnpj, pp.oab));
+    GET DIAGNOSTICS v_removidas = ROW_COUNT;
+
+    INSERT INTO processo_partes (cnj, papel, tipo, nome, cpf_cnpj, oab)
+    SELECT p_cnj, l.papel, l.tipo, l.nome, l.cpf_cnpj, l.oab
+    FROM processo_partes_linhas(p_partes) l
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS v_inseridas = ROW_COUNT;
+
+    RETURN v_removidas + v_inseridas;
+END;
+$$;
+
+-- Grava o resultado do scrape completo de um processo numa única transação:
+-- dados do processo, eventos novos, documentos e texto extraído, e atualiza a projeção.
+-- p_payload = {cnj, sync_log_id, processo: {...colunas de processos}, eventos: [...],
+-- documentos: [...], textos: [{hash_sha256, origem, texto}], pendentes: [...]}
+-- (chaves = nomes das colunas). pendentes = documentos que falharam neste scrape
+-- (documentos_pendentes); os que agora foram gravados saem de lá. solicitar =
+-- numero_evento já gravados cujos documentos não disponíveis vão para a frente
+-- do backfill (solicitar_documentos).
+-- synced_at (opcional) = momento dos dados em last_synced_at (reparse de snapshots); padrão NOW().
+-- Eventos e documentos novos vão para o outbox (sync_changes). processo_partes só
+-- é recalculada (diff) quando partes muda.
+-- Retorna os numero_evento efetivamente inseridos.
+CREATE OR REPLACE FUNCTION sync_processo(p_payload JSONB)
+RETURNS INTEGER[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_novos INTEGER[];
+    v_changes JSONB;
+    v_partes_antes JSONB;
+    v_partes JSONB;
+BEGIN
+    SELECT partes INTO v_partes_antes FROM processos WHERE cnj = v_cnj;
+
+    INSERT INTO processos AS p (
+        cnj, classe, competencia, data_autuacao, situacao, orgao_julgador, juiz,
+        lado_advogado, advogados, processos_relacionados, assuntos, partes, last_synced_at, updated_at
+    )
+    SELECT v_cnj, r.classe, r.competencia, r.data_autuacao, r.situacao, r.orgao_julgador, r.juiz,
+           r.lado_advogado, COALESCE(r.advogados, '{}'), COALESCE(r.processos_relacionados, '{}'),
+           COALESCE(r.assuntos, '[]'), COALESCE(r.partes, '[]'),
+           COALESCE((p_payload->>'synced_at')::TIMESTAMPTZ, NOW()), NOW()
+    FROM jsonb_populate_record(NULL::processos, p_payload->'processo') r
+    ON CONFLICT (cnj) DO UPDATE SET
+        classe = EXCLUDED.classe,
+        competencia = EXCLUDED.competencia,
+        data_autuacao = EXCLUDED.data_autuacao,
+        situacao = EXCLUDED.situacao,
+        orgao_julgador = EXCLUDED.orgao_julgador,
+        juiz = EXCLUDED.juiz,
+        lado_advogado = EXCLUDED.lado_advogado,
+        advogados = EXCLUDED.advogados,
+        processos_relacionados = EXCLUDED.processos_relacionados,
+        assuntos = EXCLUDED.assuntos,
+        partes = EXCLUDED.partes,
+        last_synced_at = EXCLUDED.last_synced_at,
+        updated_at = EXCLUDED.updated_at
+    RETURNING partes INTO v_partes;
+
+    IF v_partes IS DISTINCT FROM v_partes_antes THEN
+        PERFORM processo_partes_atualizar(v_cnj, v_partes);
+    END IF;
+
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH gravados AS (
+        INSERT INTO eventos (
+            cnj, numero_evento, data_hora, descricao, usuario, prazo_aberto, prazo_dias,
+            prazo_status, prazo_data_inicial, prazo_data_final, evento_referencia, urgente
+        )
+        SELECT v_cnj, e.numero_evento, e.data_hora, e.descricao, e.usuario,
+               COALESCE(e.prazo_aberto, FALSE), e.prazo_dias, e.prazo_status,
+               e.prazo_data_inicial, e.prazo_data_final, e.evento_referencia,
+               COALESCE(e.urgente, FALSE)
+        FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+        ON CONFLICT (cnj, numero_evento) DO UPDATE SET
+            data_hora = EXCLUDED.data_hora,
+            descricao = EXCLUDED.descricao,
+            usuario = EXCLUDED.usuario,
+            prazo_aberto = EXCLUDED.prazo_aberto,
+            prazo_dias = EXCLUDED.prazo_dias,
+            prazo_status = EXCLUDED.prazo_status,
+            prazo_data_inicial = EXCLUDED.prazo_data_inicial,
+            prazo_data_final = EXCLUDED.prazo_data_final,
+            evento_referencia = EXCLUDED.evento_referencia,
+            urgente = EXCLUDED.urgente
+        RETURNING numero_evento, (xmax = 0) AS inserido
+    )
+    SELECT COALESCE(array_agg(numero_evento ORDER BY numero_evento), '{}')
+    INTO v_novos
+    FROM gravados WHERE inserido;
+
+    -- Outbox: eventos novos (na ordem) ...
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', 'evento_novo', 'cnj', v_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', e.numero_evento, 'data_hora', e.data_hora,
+                   'descricao', e.descricao, 'prazo_aberto', COALESCE(e.prazo_aberto, FALSE),
+                   'prazo_data_final', e.prazo_data_final, 'urgente', COALESCE(e.urgente, FALSE))
+           ) ORDER BY e.numero_evento), '[]')
+    INTO v_changes
+    FROM jsonb_populate_recordset(NULL::eventos, COALESCE(p_payload->'eventos', '[]')) e
+    WHERE e.numero_evento = ANY(v_novos);
+
+    -- ... e documentos novos / que ficaram disponíveis
+    v_changes := v_changes || gravar_documentos(v_cnj, p_payload->'documentos', p_payload->'textos');
+
+    INSERT INTO documentos_pendentes AS dp (
+        cnj, numero_evento, url_eproc, nome_original, erro_tipo, erro, proxima_tentativa
+    )
+    SELECT v_cnj, f.numero_evento, f.url_eproc, f.nome_original, f.erro_tipo, f.erro,
+           COALESCE(f.proxima_tentativa, NOW())
+    FROM jsonb_populate_recordset(NULL::documentos_pendentes, COALESCE(p_payload->'pendentes', '[]')) f
+    ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+        erro_tipo = EXCLUDED.erro_tipo,
+        erro = EXCLUDED.erro,
+        tentativas = dp.tentativas + 1,
+        proxima_tentativa = EXCLUDED.proxima_tentativa,
+        ultima_falha = NOW();
+
+    IF jsonb_array_length(COALESCE(p_payload->'solicitar', '[]')) > 0 THEN
+        PERFORM solicitar_documentos(v_cnj, ARRAY(
+            SELECT jsonb_array_elements_text(p_payload->'solicitar')::INTEGER));
+    END IF;
+
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    -- Por último: o lock do outbox fica preso só até o commit
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN v_novos;
+END;
+$$;
+
+-- Documentos de um processo (upsert em documentos e documentos_texto); os gravados
+-- saem de documentos_pendentes. Linha sem arquivo (status adiado/metadados) não
+-- sobrescreve um documento já disponível. Retorna as mudanças para o outbox:
+-- documento_novo (linha inserida, com o status) e documento_disponivel (adiado ou
+-- metadados que agora foi baixado).
+CREATE OR REPLACE FUNCTION gravar_documentos(p_cnj TEXT, p_documentos JSONB, p_textos JSONB DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_changes JSONB;
+BEGIN
+    -- antes = status anterior (o CTE vê a tabela antes do INSERT);
+    -- xmax = 0 só nas linhas inseridas (não nas atualizadas pelo ON CONFLICT)
+    WITH novos AS (
+        SELECT * FROM jsonb_populate_recordset(NULL::documentos, COALESCE(p_documentos, '[]'))
+    ), antes AS (
+        SELECT d.numero_evento, d.url_eproc, d.status
+        FROM documentos d JOIN novos n USING (numero_evento, url_eproc)
+        WHERE d.cnj = p_cnj
+    ), gravados AS (
+        INSERT INTO documentos AS d (
+            cnj, numero_evento, nome_original, tipo, url_eproc,
+            storage_path, storage_url, tamanho_bytes, hash_sha256, status
+        )
+        SELECT p_cnj, n.numero_evento, n.nome_original, n.tipo, n.url_eproc,
+               n.storage_path, n.storage_url, n.tamanho_bytes, n.hash_sha256,
+               COALESCE(n.status, 'disponivel')
+        FROM novos n
+        ON CONFLICT (cnj, numero_evento, url_eproc) DO UPDATE SET
+            nome_original = EXCLUDED.nome_original,
+            tipo = COALESCE(EXCLUDED.tipo, d.tipo),
+            storage_path = COALESCE(EXCLUDED.storage_path, d.storage_path),
+            storage_url = COALESCE(EXCLUDED.storage_url, d.storage_url),
+            tamanho_bytes = COALESCE(EXCLUDED.tamanho_bytes, d.tamanho_bytes),
+            hash_sha256 = COALESCE(EXCLUDED.hash_sha256, d.hash_sha256),
+            status = CASE WHEN d.status = 'disponivel' THEN d.status ELSE EXCLUDED.status END,
+            solicitado_em = CASE WHEN EXCLUDED.status = 'disponivel' THEN NULL ELSE d.solicitado_em END
+        RETURNING d.numero_evento, d.url_eproc, d.nome_original, d.tipo, d.storage_url, d.status,
+                  (d.xmax = 0) AS inserido
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'tipo', CASE WHEN g.inserido THEN 'documento_novo' ELSE 'documento_disponivel' END,
+               'cnj', p_cnj,
+               'dados', jsonb_build_object(
+                   'numero_evento', g.numero_evento, 'nome_original', g.nome_original,
+                   'tipo', g.tipo, 'storage_url', g.storage_url, 'status', g.status)
+           ) ORDER BY g.numero_evento, g.nome_original), '[]')
+    INTO v_changes
+    FROM gravados g LEFT JOIN antes a USING (numero_evento, url_eproc)
+    WHERE g.inserido OR (g.status = 'disponivel' AND a.status <> 'disponivel');
+
+    INSERT INTO documentos_texto (hash_sha256, origem, texto)
+    SELECT t.hash_sha256, t.origem, t.texto
+    FROM jsonb_populate_recordset(NULL::documentos_texto, COALESCE(p_textos, '[]')) t
+    WHERE t.hash_sha256 IS NOT NULL
+    ON CONFLICT (hash_sha256) DO NOTHING;
+
+    DELETE FROM documentos_pendentes dp
+    USING jsonb_populate_recordset(NULL::documentos, COALESCE(p_documentos, '[]')) d
+    WHERE dp.cnj = p_cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc
+      AND COALESCE(d.status, 'disponivel') = 'disponivel';
+
+    RETURN v_changes;
+END;
+$$;
+
+-- Grava os documentos baixados pelo retry de documentos_pendentes ou pelo backfill
+-- de um processo: p_payload = {cnj, sync_log_id, documentos: [...], textos: [...]}.
+-- Os gravados saem da fila de retry, as mudanças vão para o outbox e a projeção
+-- é atualizada. Retorna quantos documentos ficaram disponíveis.
+CREATE OR REPLACE FUNCTION sync_documentos(p_payload JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cnj TEXT := p_payload->>'cnj';
+    v_changes JSONB;
+BEGIN
+    v_changes := gravar_documentos(v_cnj, p_payload->'documentos', p_payload->'textos');
+    PERFORM refresh_processo_completo(ARRAY[v_cnj]);
+    PERFORM sync_changes_registrar((p_payload->>'sync_log_id')::UUID, v_changes);
+    RETURN jsonb_array_length(v_changes);
+END;
+$$;
+
+-- Documentos a baixar pelo backfill: não disponíveis e fora da fila de retry, os
+-- solicitados primeiro e depois os dos eventos mais recentes. "metadados" só entram
+-- se solicitados ou com p_cnjs (backfill sob demanda de processos específicos).
+-- p_limite NULL = todos.
+CREATE OR REPLACE FUNCTION documentos_backfill(
+    p_limite INTEGER DEFAULT 500,
+    p_cnjs TEXT[] DEFAULT NULL,
+    p_solicitados BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (cnj TEXT, numero_evento INTEGER, url_eproc TEXT, nome_original TEXT,
+               status TEXT, tentativas INTEGER)
+LANGUAGE sql STABLE
+AS $$
+    SELECT d.cnj, d.numero_evento, d.url_eproc, d.nome_original, d.status, 0
+    FROM documentos d
+    JOIN eventos e ON e.cnj = d.cnj AND e.numero_evento = d.numero_evento
+    WHERE d.status <> 'disponivel'
+      AND (d.status = 'adiado' OR d.solicitado_em IS NOT NULL OR p_cnjs IS NOT NULL)
+      AND (p_cnjs IS NULL OR d.cnj = ANY(p_cnjs))
+      AND (NOT p_solicitados OR d.solicitado_em IS NOT NULL)
+      AND NOT EXISTS (
+          SELECT 1 FROM documentos_pendentes dp
+          WHERE dp.cnj = d.cnj AND dp.numero_evento = d.numero_evento AND dp.url_eproc = d.url_eproc
+      )
+    ORDER BY d.solicitado_em NULLS LAST, e.data_hora DESC, d.cnj, d.numero_evento
+    LIMIT p_limite;
+$$;
+
+-- Pedido sob demanda (N8N): os documentos não disponíveis do processo (ou só dos
+-- p_eventos) passam à frente no backfill do próximo ciclo, inclusive os "metadados".
+-- Retorna quantos documentos foram solicitados.
+CREATE OR REPLACE FUNCTION solicitar_documentos(p_cnj TEXT, p_eventos INTEGER[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH solicitados AS (
+        UPDATE documentos SET solicitado_em = NOW()
+        WHERE cnj = p_cnj AND status <> 'disponivel' AND solicitado_em IS NULL
+          AND (p_eventos IS NULL OR numero_evento = ANY(p_eventos))
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM solicitados;
+$$;
+
+-- Busca full-text nos documentos (sintaxe websearch: "frase exata", -termo, OR).
+-- Um documento por linha, com o trecho que casou; p_cnj restringe a um processo.
+CREATE OR REPLACE FUNCTION buscar_documentos(p_query TEXT, p_cnj TEXT DEFAULT NULL, p_limite INTEGER DEFAULT 50)
+RETURNS TABLE (
+    cnj TEXT, numero_evento INTEGER, nome_original TEXT, storage_url TEXT,
+    rank REAL, trecho TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('portuguese', p_query) AS q),
+    top AS (
+        SELECT d.cnj, d.numero_evento, d.nome_original, d.storage_url,
+               ts_rank(t.tsv, q.q) AS rank, t.texto
+        FROM documentos_texto t
+        CROSS JOIN q
+        JOIN documentos d ON d.hash_sha256 = t.hash_sha256
+        WHERE t.tsv @@ q.q AND (p_cnj IS NULL OR d.cnj = p_cnj)
+        ORDER BY rank DESC, d.cnj, d.numero_evento
+        LIMIT p_limite
+    )
+    -- ts_headline só nas linhas devolvidas (é caro em textos longos)
+    SELECT top.cnj, top.numero_evento, top.nome_original, top.storage_url, top.rank,
+           ts_headline('portuguese', top.texto, q.q, 'MaxFragments=2, MaxWords=25, MinWords=10')
+    FROM top CROSS JOIN q
+    ORDER BY top.rank DESC, top.cnj, top.numero_evento;
+$$;
+
+-- Processos onde aparece o CPF/CNPJ, a OAB ou o nome (ILIKE, mín. 3 letras)
+-- informados — qualquer um deles; entradas em qualquer formato (normalizadas
+-- aqui). Uma linha por parte/representante que casou.
+CREATE OR REPLACE FUNCTION buscar_partes(
+    p_cpf_cnpj TEXT DEFAULT NULL, p_oab TEXT DEFAULT NULL, p_nome TEXT DEFAULT NULL,
+    p_limite INTEGER DEFAULT 200
+)
+RETURNS TABLE (
+    cnj TEXT, papel TEXT, tipo TEXT, nome TEXT, cpf_cnpj TEXT, oab TEXT,
+    classe TEXT, situacao TEXT, lado_advogado TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH achados AS (
+        -- Um ramo por critério: cada um usa o seu índice (a condição <> '' é a
+        -- do índice parcial)
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.cpf_cnpj = normalizar_documento(p_cpf_cnpj) AND pp.cpf_cnpj <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.oab = normalizar_oab(p_oab) AND pp.oab <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE length(btrim(p_nome)) >= 3 AND pp.nome ILIKE '%' || btrim(p_nome) || '%'
+    )
+    SELECT a.cnj, a.papel, a.tipo, a.nome, a.cpf_cnpj, a.oab, p.classe, p.situacao, p.lado_advogado
+    FROM achados a
+    JOIN processos p ON p.cnj = a.cnj
+    ORDER BY a.cnj, a.papel, a.tipo, a.nome
+    LIMIT p_limite;
+$$;
+
+-- Checagem de conflito de um cliente novo: processos onde aparece qualquer um
+-- dos documentos, OABs ou nomes (ILIKE) informados, 1 linha por processo com o
+-- que casou em `partes` ([{papel, tipo, nome, cpf_cnpj, oab}]).
+CREATE OR REPLACE FUNCTION conflito_partes(
+    p_documentos TEXT[] DEFAULT '{}', p_oabs TEXT[] DEFAULT '{}', p_nomes TEXT[] DEFAULT '{}'
+)
+RETURNS TABLE (
+    cnj TEXT, classe TEXT, situacao TEXT, lado_advogado TEXT, partes JSONB
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH docs AS (
+        SELECT DISTINCT normalizar_documento(d) AS v FROM unnest(p_documentos) d
+    ),
+    oabs AS (
+        SELECT DISTINCT normalizar_oab(o) AS v FROM unnest(p_oabs) o
+    ),
+    achados AS (
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.cpf_cnpj IN (SELECT v FROM docs WHERE v <> '') AND pp.cpf_cnpj <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp
+        WHERE pp.oab IN (SELECT v FROM oabs WHERE v <> '') AND pp.oab <> ''
+        UNION
+        SELECT pp.* FROM processo_partes pp, unnest(p_nomes) n
+        WHERE length(btrim(n)) >= 3 AND pp.nome ILIKE '%' || btrim(n) || '%'
+    )
+    SELECT a.cnj, p.classe, p.situacao, p.lado_advogado,
+           jsonb_agg(jsonb_build_object('papel', a.papel, 'tipo', a.tipo, 'nome', a.nome,
+                                        'cpf_cnpj', a.cpf_cnpj, 'oab', a.oab)
+                     ORDER BY a.papel, a.tipo, a.nome)
+    FROM achados a
+    JOIN processos p ON p.cnj = a.cnj
+    GROUP BY a.cnj, p.classe, p.situacao, p.lado_advogado
+    ORDER BY a.cnj;
+$$;
+
+-- View completa: 1 query = tudo do processo (lida da projeção materializada)
 CREATE VIEW v_processo_completo AS
 SELECT
-    p.cnj,
-    p.classe,
-    p.competencia,
-    p.data_autuacao,
-    p.situacao,
-    p.orgao_julgador,
-    p.juiz,
-    p.juizo,
-    p.lado_advogado,
-    p.assuntos,
-    p.partes,
-    p.last_synced_at,
-
-    (SELECT COALESCE(json_agg(json_build_object(
-        'evento_descricao', pa.evento_descricao,
-        'data_envio', pa.data_envio,
-        'prazo_inicio', pa.prazo_inicio,
-        'prazo_final', pa.prazo_final
-    ) ORDER BY pa.prazo_final ASC), '[]'::json)
-    FROM prazos_abertos pa WHERE pa.cnj = p.cnj) AS prazos,
-
-    (SELECT COALESCE(json_agg(json_build_object(
-        'numero', e.numero_evento,
-        'data_hora', e.data_hora,
-        'descricao', e.descricao,
-        'usuario', e.usuario,
-        'prazo_aberto', e.prazo_aberto,
-        'prazo_status', e.prazo_status,
-        'prazo_data_final', e.prazo_data_final,
-        'urgente', e.urgente,
-        'evento_referencia', e.evento_referencia,
-        'documentos', (
-            SELECT COALESCE(json_agg(json_build_object(
-                'nome', d.nome_original,
-                'tipo', d.tipo,
-                'storage_url', d.storage_url
-            )), '[]'::json) FROM documentos d
-            WHERE d.cnj = e.cnj AND d.numero_evento = e.numero_evento
+    cnj,
+    classe,
+    competencia,
+    data_autuacao,
+    situacao,
+    orgao_julgador,
+    juiz,
+    juizo,
+    lado_advogado,
+    advogados,
+    assuntos,
+    partes,
+    last_synced_at,
+    prazos,
+    eventos
+FROM processo_completo;
+
+-- View resumo: dados de card, sem a lista de eventos
+CREATE VIEW v_processo_resumo AS
+SELECT
+    cnj,
+    classe,
+    situacao,
+    juizo,
+    lado_advogado,
+    advogados,
+    last_synced_at,
+    prazos,
+    total_prazos,
+    prazo_mais_proximo,
+    total_eventos,
+    eventos_prazo_aberto,
+    ultimo_evento,
+    total_documentos,
+    refreshed_at
+FROM processo_completo;
+
+-- Auditoria: resumo do banco em 1 chamada (scripts/audit_db.py); as contagens
+-- por processo vêm paginadas de audit_por_cnj()
+CREATE OR REPLACE FUNCTION audit_resumo()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+SELECT jsonb_build_object(
+    'gerado_em', NOW(),
+    'totais', jsonb_build_object(
+        'processos', (SELECT COUNT(*) FROM processos),
+        'prazos_abertos', (SELECT COUNT(*) FROM prazos_abertos),
+        'eventos', (SELECT COUNT(*) FROM eventos),
+        'documentos', (SELECT COUNT(*) FROM documentos),
+        'bytes', (SELECT COALESCE(SUM(tamanho_bytes), 0) FROM documentos)
+    ),
+    -- % de processos com cada campo preenchido
+    'cobertura_processos', (
+        SELECT jsonb_build_object(
+            'classe',         ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(classe, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'competencia',    ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(competencia, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'data_autuacao',  ROUND(100.0 * COUNT(*) FILTER (WHERE data_autuacao IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'situacao',       ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(situacao, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'orgao_julgador', ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(orgao_julgador, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juiz',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juiz, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'juizo',          ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(juizo, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'lado_advogado',  ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(lado_advogado, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'assuntos',       ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'array' AND jsonb_array_length(assuntos) > 0) / NULLIF(COUNT(*), 0), 1),
+            'partes',         ROUND(100.0 * COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'array' AND jsonb_array_length(partes) > 0) / NULLIF(COUNT(*), 0), 1),
+            'last_synced_at', ROUND(100.0 * COUNT(*) FILTER (WHERE last_synced_at IS NOT NULL) / NULLIF(COUNT(*), 0), 1)
+        ) FROM processos
+    ),
+    -- JSONB gravado como string (double-serialized)
+    'json_string', (
+        SELECT jsonb_build_object(
+            'assuntos', COUNT(*) FILTER (WHERE jsonb_typeof(assuntos) = 'string'),
+            'partes',   COUNT(*) FILTER (WHERE jsonb_typeof(partes) = 'string')
+        ) FROM processos
+    ),
+    'lados', (
+        SELECT COALESCE(jsonb_object_agg(lado, n), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(NULLIF(lado_advogado, ''), '(sem lado)') AS lado, COUNT(*) AS n
+            FROM processos GROUP BY 1
+        ) l
+    ),
+    -- % de eventos com cada campo preenchido
+    'cobertura_eventos', (
+        SELECT jsonb_build_object(
+            'usuario',           ROUND(100.0 * COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') / NULLIF(COUNT(*), 0), 1),
+            'prazo_dias',        ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_status',      ROUND(100.0 * COUNT(*) FILTER (WHERE prazo_status IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'evento_referencia', ROUND(100.0 * COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) / NULLIF(COUNT(*), 0), 1),
+            'prazo_aberto',      COUNT(*) FILTER (WHERE prazo_aberto),
+            'urgente',           COUNT(*) FILTER (WHERE urgente)
+        ) FROM eventos
+    ),
+    'bytes_por_tipo', (
+        SELECT COALESCE(jsonb_object_agg(tipo, jsonb_build_object('documentos', n, 'bytes', b)), '{}'::jsonb)
+        FROM (
+            SELECT COALESCE(tipo, '?') AS tipo, COUNT(*) AS n, COALESCE(SUM(tamanho_bytes), 0) AS b
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    'documentos_sem_storage', (
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+            'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original, 'url_eproc', url_eproc
+        ) ORDER BY cnj, numero_evento), '[]'::jsonb)
+        FROM documentos WHERE status = 'disponivel' AND COALESCE(storage_url, '') = ''
+    ),
+    -- Política de download: documentos por status (adiado = fila do backfill)
+    'documentos_por_status', (
+        SELECT COALESCE(jsonb_object_agg(status, jsonb_build_object('documentos', n, 'solicitados', sol)), '{}'::jsonb)
+        FROM (
+            SELECT status, COUNT(*) AS n, COUNT(*) FILTER (WHERE solicitado_em IS NOT NULL) AS sol
+            FROM documentos GROUP BY 1
+        ) t
+    ),
+    -- Fila de retry de documentos: total por tipo de erro e os que continuam
+    -- falhando (3+ tentativas), do mais tentado para o menos
+    'documentos_pendentes', jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM documentos_pendentes),
+        'por_erro', (
+            SELECT COALESCE(jsonb_object_agg(erro_tipo, n), '{}'::jsonb)
+            FROM (SELECT erro_tipo, COUNT(*) AS n FROM documentos_pendentes GROUP BY 1) t
+        ),
+        'persistentes', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'cnj', cnj, 'numero_evento', numero_evento, 'nome', nome_original,
+                'erro_tipo', erro_tipo, 'erro', erro, 'tentativas', tentativas,
+                'primeira_falha', primeira_falha, 'proxima_tentativa', proxima_tentativa
+            ) ORDER BY tentativas DESC, cnj, numero_evento), '[]'::jsonb)
+            FROM documentos_pendentes WHERE tentativas >= 3
         )
-    ) ORDER BY e.numero_evento DESC), '[]'::json)
-    FROM eventos e WHERE e.cnj = p.cnj) AS eventos
+    ),
+    'sync_log', (
+        SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.started_at DESC), '[]'::jsonb)
+        FROM (SELECT * FROM sync_log ORDER BY started_at DESC LIMIT 5) s
+    )
+);
+$$;
+
+-- Contagens do audit por processo, em páginas por CNJ (keyset: p_depois = último
+-- CNJ da página anterior). Cada página só agrega os eventos/documentos/prazos
+-- dos seus processos, e o audit_db.py imprime uma enquanto busca a próxima.
+CREATE OR REPLACE FUNCTION audit_por_cnj(p_depois TEXT DEFAULT NULL, p_limite INTEGER DEFAULT 500)
+RETURNS TABLE (
+    cnj TEXT, classe TEXT, lado TEXT, last_synced_at TIMESTAMPTZ,
+    prazos BIGINT, prazo_mais_proximo TIMESTAMPTZ,
+    eventos BIGINT, primeiro_evento INTEGER, ultimo_evento INTEGER,
+    eventos_com_usuario BIGINT, eventos_prazo_aberto BIGINT, eventos_com_prazo_dias BIGINT,
+    eventos_com_referencia BIGINT, eventos_urgentes BIGINT,
+    documentos BIGINT, bytes BIGINT, documentos_sem_storage BIGINT, documentos_nao_disponiveis BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT p.cnj, p.classe, p.lado_advogado, p.last_synced_at,
+           pz.prazos, pz.prazo_mais_proximo,
+           ev.eventos, ev.primeiro_evento, ev.ultimo_evento,
+           ev.com_usuario, ev.prazo_aberto, ev.com_prazo_dias, ev.com_referencia, ev.urgentes,
+           dc.documentos, dc.bytes, dc.sem_storage, dc.nao_disponiveis
+    FROM (
+        SELECT * FROM processos
+        WHERE p_depois IS NULL OR processos.cnj > p_depois
+        ORDER BY processos.cnj
+        LIMIT p_limite
+    ) p
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS prazos, MIN(prazo_final) AS prazo_mais_proximo
+        FROM prazos_abertos pa WHERE pa.cnj = p.cnj
+    ) pz
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS eventos,
+               COUNT(*) FILTER (WHERE COALESCE(usuario, '') <> '') AS com_usuario,
+               COUNT(*) FILTER (WHERE prazo_aberto) AS prazo_aberto,
+               COUNT(*) FILTER (WHERE prazo_dias IS NOT NULL) AS com_prazo_dias,
+               COUNT(*) FILTER (WHERE evento_referencia IS NOT NULL) AS com_referencia,
+               COUNT(*) FILTER (WHERE urgente) AS urgentes,
+               MIN(numero_evento) AS primeiro_evento,
+               MAX(numero_evento) AS ultimo_evento
+        FROM eventos e WHERE e.cnj = p.cnj
+    ) ev
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS documentos,
+               COALESCE(SUM(tamanho_bytes), 0)::BIGINT AS bytes,
+               COUNT(*) FILTER (WHERE status = 'disponivel' AND COALESCE(storage_url, '') = '') AS sem_storage,
+               COUNT(*) FILTER (WHERE status <> 'disponivel') AS nao_disponiveis
+        FROM documentos d WHERE d.cnj = p.cnj
+    ) dc
+    ORDER BY p.cnj;
+$$;
+
+-- Migrações já incorporadas neste schema (ver scripts/migrate.py)
+CREATE TABLE schema_migrations (
+    version     TEXT PRIMARY KEY,
+    applied_at  TIMESTAMPTZ DEFAULT NOW()
+);
 
-FROM processos p;
+INSERT INTO schema_migrations (version) VALUES
+    ('001_tiers_metricas_projecao'),
+    ('002_indices'),
+    ('003_sync_processo'),
+    ('004_multi_contas'),
+    ('005_fila_processos'),
+    ('006_documentos_texto'),
+    ('007_sync_changes'),
+    ('008_sync_processo_synced_at'),
+    ('009_documentos_pendentes'),
+    ('010_documentos_status'),
+    ('011_processo_partes'),
+    ('012_audit_por_cnj');
@@ -2,6 +2,7 @@ import os
 import unicodedata
 from src.config import Config
 from src.db.client import get_supabase
+from src.metrics import metrics
 
 # Mapeamento extensão → content-type para upload
 _CONTENT_TYPES = {
@@ -33,12 +34,13 @@ def upload_document(local_path: str, storage_path: str) -> str:
     ext = os.path.splitext(local_path)[1].lower()
     content_type = _CONTENT_TYPES.get(ext, "application/octet-stream")
 
-    with open(local_path, "rb") as f:
+    with metrics.timer("upload_document"), open(local_path, "rb") as f:
         sb.storage.from_(Config.STORAGE_BUCKET).upload(
             path=storage_path,
             file=f,
             file_options={"content-type": content_type, "upsert": "true"},
         )
+    metrics.incr("upload_document.bytes", os.path.getsize(local_path))
 
     url = sb.storage.from_(Config.STORAGE_BUCKET).get_public_url(storage_path)
 
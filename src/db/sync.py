@@ -1,118 +1,759 @@
 import os
+import time
+import zlib
 import asyncio
-from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from playwright.async_api import Page, BrowserContext
-from src.db.client import get_supabase
-from src.db.storage import upload_document, delete_process_documents, build_storage_path
-from src.scrapers.prazos import scrape_prazos_abertos
-from src.scrapers.processo import open_process_page, extract_header, extract_assuntos, extract_partes, extract_eventos, identify_adv_side
-from src.scrapers.documentos import download_document
 from src.config import Config
+from src.accounts import Account, load_accounts
+from src.browser import Session, build_proxy
+from src.db import fila, changes as sync_changes
+from src.db.client import get_supabase, selecionar_tudo
+from src.db.storage import upload_document, delete_process_documents, build_storage_path
+from src.scrapers.prazos import scrape_prazos_abertos, parse_prazos_snapshot
+from src.scrapers.http_engine import EprocHttp, HtmlInesperado, scrape_prazos_http, fetch_processo_http
+from src.scrapers.processo import (
+    open_process_page, capture_process_page, extract_header, extract_assuntos, extract_partes,
+    extract_eventos, identify_adv_side,
+)
+from src.scrapers.documentos import download_document, render_document
+from src.pdf_otimizar import otimizar_pdf
+from src import politica_documentos as politica
+from src.texto import extrair_texto
+from src import snapshots
+from src.metrics import metrics, flush as flush_metrics
+from src.limitador import Indisponivel
 
 
 async def sync(page: Page, context: BrowserContext):
-    """Sync linear: scrapeia tudo, salva tudo, sem limites."""
+    """Sync linear (conta única do .env): scrapeia tudo, salva tudo, sem limites."""
     sb = get_supabase()
-    log_id = _start_log(sb)
-    stats = {"total": 0, "novos": 0, "removidos": 0, "docs": 0, "erros": 0}
-
-    try:
-        # 1. Scrapear prazos abertos do eProc
-        eproc = await scrape_prazos_abertos(page)
-        eproc_cnjs = set(eproc.keys())
-        stats["total"] = len(eproc_cnjs)
-
-        # 2. CNJs na DB
-        db_rows = sb.table("processos").select("cnj").execute()
-        db_cnjs = {row["cnj"] for row in db_rows.data}
-
-        to_add = eproc_cnjs - db_cnjs
-        to_remove = db_cnjs - eproc_cnjs
-
-        print(f"\n[SYNC] {len(eproc_cnjs)} processos no eProc | +{len(to_add)} novos | -{len(to_remove)} removidos | {len(eproc_cnjs & db_cnjs)} mantidos")
-
-        # 3. Remover processos que saíram (com proteção)
-        if len(eproc_cnjs) == 0 and len(db_cnjs) > 0:
-            print(f"[SYNC] AVISO: eProc retornou 0 processos mas DB tem {len(db_cnjs)}. Pulando remoção.")
-            to_remove = set()
-
-        for cnj in to_remove:
-            print(f"[SYNC] Removendo: {cnj}")
-            delete_process_documents(cnj)
-            sb.table("processos").delete().eq("cnj", cnj).execute()
-            stats["removidos"] += 1
-
-        # 4. Sync rápido: inserir novos + atualizar prazos de TODOS
-        for cnj, prazos_list in eproc.items():
-            first = prazos_list[0]
-            sb.table("processos").upsert({
-                "cnj": cnj,
-                "classe": first.get("classe"),
-                "juizo": first.get("juizo"),
-                "last_synced_at": datetime.now(timezone.utc).isoformat(),
-            }, on_conflict="cnj").execute()
-
-            # Sync prazos_abertos (upsert para evitar duplicatas)
-            sb.table("prazos_abertos").delete().eq("cnj", cnj).execute()
-            seen_prazos = set()
-            for p in prazos_list:
-                key = (p.get("evento_descricao", ""), p.get("prazo_final"))
-                if key in seen_prazos:
-                    continue  # Pular duplicatas (mesma descrição + prazo_final)
-                seen_prazos.add(key)
-                sb.table("prazos_abertos").insert({
-                    "cnj": cnj,
-                    "evento_descricao": p.get("evento_descricao", ""),
-                    "data_envio": p.get("data_envio"),
-                    "prazo_inicio": p.get("prazo_inicio"),
-                    "prazo_final": p.get("prazo_final"),
-                }).execute()
-
-            if cnj in to_add:
-                stats["novos"] += 1
-
-        total_prazos = sum(len(v) for v in eproc.values())
-        print(f"[SYNC] Prazos sincronizados: {total_prazos} prazos para {len(eproc)} processos")
-
-        # 5. Scrape completo de cada processo
-        for i, (cnj, prazos_list) in enumerate(eproc.items(), 1):
-            first = prazos_list[0]
-            print(f"\n[SYNC] [{i}/{len(eproc)}] Processando: {cnj}")
+    log_id = _start_log(sb, "full")
+    stats = _new_stats()
+    session = Session(Account.from_config(), context, page)
 
-            try:
-                await _scrape_full_process(context, page, sb, cnj, first["proc_href"], stats)
-            except Exception as e:
-                print(f"[SYNC] ERRO em {cnj}: {e}")
+    try:
+        if Config.SCRAPER_ENGINE == "http":
+            session.http = await EprocHttp.from_context(context, page, build_proxy())
+        eproc, _ = await _sync_prazos([session], sb, stats, log_id=log_id)
+        await _sync_processos({session.account.nome: session}, sb, eproc, list(eproc), stats, log_id=log_id)
+        sessions = {session.account.nome: session}
+        await _baixar_documentos(sessions, sb, _pendentes_vencidos(sb), stats, log_id=log_id)
+        await _baixar_documentos(sessions, sb, _backfill_candidatos(sb), stats, log_id=log_id,
+                                 orcamento=_Orcamento(), rotulo="Backfill de documentos")
+        return _finish_ok(sb, log_id, stats, "full")
+
+    except Exception as e:
+        _finish_log(sb, log_id, "error", stats, str(e), "full")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+    finally:
+        if session.http is not None:
+            await session.http.close()
+
+
+async def sync_prazos(sessions: list[Session], concurrency: int | None = None,
+                      slots: asyncio.Semaphore | None = None,
+                      dry_run: bool = False) -> tuple[dict[str, list[dict]], set[str]]:
+    """Tier rápido: lista de prazos abertos de cada conta + diff de processos/prazos.
+    Até `concurrency` listagens (contas) ao mesmo tempo, dentro de `slots`.
+    Retorna (eproc, to_add) para o tier de processos agendar os scrapes.
+    `dry_run`: só mostra o diff, sem gravar nada (nem sync_log)."""
+    sb = get_supabase()
+    stats = _new_stats()
+    if dry_run:
+        return await _sync_prazos(sessions, sb, stats, slots, dry_run=True, concurrency=concurrency)
+    log_id = _start_log(sb, "prazos")
+
+    try:
+        eproc, to_add = await _sync_prazos(sessions, sb, stats, slots, log_id, concurrency=concurrency)
+        _finish_log(sb, log_id, "success", stats, tipo="prazos")
+        return eproc, to_add
+
+    except Exception as e:
+        _finish_log(sb, log_id, "error", stats, str(e), "prazos")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+
+
+async def sync_processos(sessions: dict[str, Session], eproc: dict[str, list[dict]],
+                         cnjs: list[str], concurrency: int = 1,
+                         slots: asyncio.Semaphore | None = None):
+    """Tier profundo: scrape completo apenas dos CNJs informados."""
+    sb = get_supabase()
+    log_id = _start_log(sb, "processos")
+    stats = _new_stats()
+    stats["total"] = len(cnjs)
+
+    try:
+        await _sync_processos(sessions, sb, eproc, cnjs, stats, concurrency, slots, log_id)
+        return _finish_ok(sb, log_id, stats, "processos")
+
+    except Exception as e:
+        _finish_log(sb, log_id, "error", stats, str(e), "processos")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+
+
+async def sync_cnjs(sessions: dict[str, Session], cnjs: list[str], concurrency: int = 1,
+                    slots: asyncio.Semaphore | None = None, dry_run: bool = False) -> dict:
+    """Scrape completo só dos CNJs informados (CLI `sync --cnj`, sync_log tipo "cnj").
+    O proc_href de cada um vem da lista de prazos das contas, que não é gravada
+    por inteiro: só os prazos desses CNJs. `dry_run`: mostra os eventos novos e o
+    destino dos documentos, sem baixar nem gravar."""
+    sb = get_supabase()
+    stats = _new_stats()
+    stats["total"] = len(cnjs)
+    log_id = None if dry_run else _start_log(sb, "cnj")
+
+    try:
+        listados, _ = await _scrape_listagens(list(sessions.values()), slots)
+        eproc = {cnj: listados[cnj] for cnj in cnjs if cnj in listados}
+        for cnj in cnjs:
+            if cnj not in eproc:
+                print(f"[SYNC] {cnj}: fora da lista de prazos abertos das contas, sem link para abrir")
                 stats["erros"] += 1
+        if eproc:
+            db_rows = metrics.execute("processos.select", sb.table("processos").select("cnj").in_("cnj", list(eproc)))
+            to_add = set(eproc) - {row["cnj"] for row in db_rows.data}
+            if dry_run:
+                _mostrar_diff_prazos(sb, eproc, to_add, set())
+            else:
+                _gravar_prazos(sb, eproc, to_add, stats, [], log_id)
+            await _sync_processos(sessions, sb, eproc, list(eproc), stats, concurrency, slots, log_id, dry_run)
+        if dry_run:
+            print(f"\n[SYNC] dry-run: {len(eproc)}/{len(cnjs)} processos lidos | {stats['erros']} erros")
+            return stats
+        return _finish_ok(sb, log_id, stats, "cnj")
+
+    except Exception as e:
+        if not dry_run:
+            _finish_log(sb, log_id, "error", stats, str(e), "cnj")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+
+
+async def retentar_documentos(sessions: dict[str, Session], slots: asyncio.Semaphore | None = None,
+                              dry_run: bool = False) -> dict:
+    """Etapa de retry de documentos_pendentes (sync_log tipo "documentos", só se
+    houver algum vencido): total = tentados, docs = recuperados, erros = falharam de novo.
+    `dry_run`: só lista os vencidos."""
+    sb = get_supabase()
+    stats = _new_stats()
+    pendentes = _pendentes_vencidos(sb)
+    if not pendentes or dry_run:
+        _mostrar_fila("Retry de documentos", pendentes, dry_run)
+        return stats
+    log_id = _start_log(sb, "documentos")
 
-            await asyncio.sleep(1)
+    try:
+        stats["total"], stats["erros"] = await _baixar_documentos(sessions, sb, pendentes, stats, slots, log_id)
+        _finish_log(sb, log_id, "success" if stats["erros"] == 0 else "partial", stats, tipo="documentos")
+        return stats
 
-        status = "success" if stats["erros"] == 0 else "partial"
-        _finish_log(sb, log_id, status, stats)
-        print(f"\n[SYNC] Concluído! {stats['total']} processos | {stats['docs']} docs | {stats['erros']} erros")
+    except Exception as e:
+        _finish_log(sb, log_id, "error", stats, str(e), "documentos")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+
+
+async def backfill_documentos(sessions: dict[str, Session], slots: asyncio.Semaphore | None = None,
+                              cnjs: list[str] | None = None, apenas_solicitados: bool = False,
+                              dry_run: bool = False) -> dict:
+    """Backfill dos documentos adiados pela política de download (sync_log tipo
+    "backfill", só se houver algum): os solicitados primeiro, depois os dos eventos
+    mais recentes, até DOCS_BACKFILL_MAX_MB / DOCS_BACKFILL_MAX_MIN. Com `cnjs`
+    (sob demanda): todos os não disponíveis desses processos, inclusive os só de
+    metadados, sem orçamento. Falhas vão para documentos_pendentes.
+    `dry_run`: só lista a fila."""
+    sb = get_supabase()
+    stats = _new_stats()
+    itens = _backfill_candidatos(sb, cnjs, apenas_solicitados)
+    if not itens or dry_run:
+        _mostrar_fila("Backfill de documentos", itens, dry_run)
+        return stats
+    log_id = _start_log(sb, "backfill")
+
+    try:
+        orcamento = None if cnjs else _Orcamento()
+        stats["total"], stats["erros"] = await _baixar_documentos(
+            sessions, sb, itens, stats, slots, log_id, orcamento, "Backfill de documentos")
+        _finish_log(sb, log_id, "success" if stats["erros"] == 0 else "partial", stats, tipo="backfill")
         return stats
 
     except Exception as e:
-        _finish_log(sb, log_id, "error", stats, str(e))
+        _finish_log(sb, log_id, "error", stats, str(e), "backfill")
         print(f"[SYNC] ERRO FATAL: {e}")
         raise
 
 
-async def _scrape_full_process(context, page, sb, cnj, proc_href, stats):
-    """Abre processo, extrai tudo, salva na DB."""
-    proc_page = await open_process_page(context, page, proc_href)
+async def enfileirar_processos(eproc: dict[str, list[dict]], cnjs: list[str]) -> str:
+    """Tier de processos com fila distribuída: publica o lote em fila_processos.
+    O sync_log (tipo "fila") é fechado por finalizar_filas() quando os workers terminam."""
+    sb = get_supabase()
+    log_id = _start_log(sb, "fila")
+    stats = _new_stats()
+
+    try:
+        n = fila.enfileirar(sb, log_id, eproc, cnjs)
+    except Exception as e:
+        _finish_log(sb, log_id, "error", stats, str(e), "fila")
+        print(f"[SYNC] ERRO FATAL: {e}")
+        raise
+
+    print(f"[SYNC] Fila: {n}/{len(cnjs)} processos enfileirados "
+          f"({len(cnjs) - n} ainda pendentes de lotes anteriores)")
+    if n == 0:
+        # Nenhum item neste lote: nada para os workers fecharem depois
+        _finish_log(sb, log_id, "success", stats, tipo="fila")
+    return log_id
+
+
+def finalizar_filas() -> list[dict]:
+    """Fecha os sync_log dos lotes da fila cujos CNJs já foram todos processados."""
+    sb = get_supabase()
+    lotes = fila.finalizar(sb)
+    for lote in lotes:
+        print(f"[SYNC] Lote da fila concluído ({lote['status']}): {lote['processos_total']} processos | "
+              f"{lote['documentos_baixados']} docs | {lote['erros']} erros")
+    return lotes
+
+
+async def scrape_processo(session: Session, cnj: str, proc_href: str,
+                          advogados: dict[str, str] | None = None, log_id: str | None = None) -> dict:
+    """Scrape completo de um único CNJ fora de um lote (workers da fila). Erros sobem.
+    `log_id` = sync_log do lote, para as mudanças em sync_changes."""
+    sb = get_supabase()
+    stats = _new_stats()
+    stats["total"] = 1
+    await _scrape_full_process(session, sb, cnj, proc_href, stats, advogados, log_id)
+    return stats
+
+
+def reparse(cnjs: list[str] | None = None, prazos: bool = False, dry_run: bool = False,
+            workers: int | None = None) -> dict:
+    """
+    Reconstrói a DB a partir dos snapshots HTML (SNAPSHOTS_DIR), sem acessar o
+    eProc: processo + todos os eventos do snapshot mais recente de cada CNJ
+    (eventos existentes são atualizados; documentos ficam como estão) e, com
+    `prazos`, prazos_abertos da última listagem gravada de cada conta.
+    """
+    sb = None if dry_run else get_supabase()
+    log_id = None if dry_run else _start_log(sb, "reparse")
+    stats = _new_stats()
+
+    try:
+        if prazos:
+            _reparse_prazos(sb, stats, log_id, dry_run)
+        _reparse_processos(sb, cnjs, stats, log_id, dry_run, workers or Config.PARSE_WORKERS)
+    except Exception as e:
+        if not dry_run:
+            _finish_log(sb, log_id, "error", stats, str(e), "reparse")
+        print(f"[REPARSE] ERRO FATAL: {e}")
+        raise
+
+    if dry_run:
+        print(f"[REPARSE] dry-run: {stats['total']} processos parseados | {stats['erros']} erros")
+        return stats
+    return _finish_ok(sb, log_id, stats, "reparse")
+
+
+def _reparse_prazos(sb, stats, log_id, dry_run):
+    eproc: dict[str, list[dict]] = {}
+    for conta, paginas in snapshots.ultimas_listagens().items():
+        por_cnj, info = parse_prazos_snapshot([snapshots.ler(p) for p in paginas])
+        print(f"[REPARSE] Prazos de {conta}: {info['linhas']} prazos em {info['paginas']} páginas"
+              + ("" if info["completo"] else " (listagem incompleta)"))
+        for cnj, lista in por_cnj.items():
+            for p in lista:
+                p["advogado"] = conta
+            eproc.setdefault(cnj, []).extend(lista)
+    if dry_run or not eproc:
+        return
+
+    # Sem remoções: o snapshot não diz o que saiu depois dele
+    db_rows = _select_cnjs(sb, "processos.select", "processos", "cnj", eproc)
+    to_add = set(eproc) - {row["cnj"] for row in db_rows}
+    _gravar_prazos(sb, eproc, to_add, stats, [], log_id)
+
+
+def _reparse_processos(sb, cnjs, stats, log_id, dry_run, workers):
+    ultimos = snapshots.ultimos_processos(cnjs)
+    stats["total"] = len(ultimos)
+    print(f"[REPARSE] {len(ultimos)} processos com snapshot | {max(1, workers)} workers de parsing")
+    if not ultimos:
+        return
+
+    # Contas que já viam cada processo (chaves de processos.advogados)
+    try:
+        contas = {a.nome: a.adv_name for a in load_accounts()}
+    except Exception as e:
+        print(f"[REPARSE] Contas indisponíveis, lado do advogado fica em branco: {e}")
+        contas = {}
+    vistos = {}
+    if not dry_run:
+        rows = _select_cnjs(sb, "processos.select", "processos", "cnj,advogados", ultimos)
+        vistos = {r["cnj"]: list(r.get("advogados") or {}) for r in rows}
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        resultados = pool.map(_parse_snapshot, list(ultimos.items()), chunksize=4)
+        for i, (cnj, path, dados, erro) in enumerate(resultados, 1):
+            if erro:
+                print(f"[REPARSE] ERRO em {cnj} ({os.path.basename(path)}): {erro}")
+                stats["erros"] += 1
+                continue
+            nomes = [n for n in vistos.get(cnj) or contas if n in contas]
+            lados = {n: identify_adv_side(dados["partes"], contas[n]) for n in nomes}
+            if not vistos.get(cnj):
+                lados = {n: l for n, l in lados.items() if l}
+            lado = next((l for l in lados.values() if l), "")
+            if dry_run:
+                print(f"[REPARSE] [{i}/{len(ultimos)}] {cnj}: {len(dados['eventos'])} eventos | "
+                      f"{len(dados['partes'])} partes | lado {lado or '?'}")
+                continue
+
+            payload = _processo_payload(cnj, dados["header"], dados["assuntos"], dados["partes"],
+                                        lados, lado, dados["eventos"], log_id=log_id)
+            capturado = snapshots.data_do_carimbo(path)
+            if capturado:
+                payload["synced_at"] = capturado.isoformat()
+            try:
+                result = metrics.execute("processos.sync", sb.rpc("sync_processo", {"p_payload": payload}))
+                metrics.incr("reparse.eventos_inseridos", len(result.data or []))
+            except Exception as e:
+                print(f"[REPARSE] ERRO ao gravar {cnj}: {e}")
+                stats["erros"] += 1
+            if i % 100 == 0:
+                print(f"[REPARSE] {i}/{len(ultimos)} processos")
+
+
+def _parse_snapshot(item: tuple[str, str]) -> tuple[str, str, dict | None, str | None]:
+    """Roda nos workers do pool: (cnj, path, dados, erro)."""
+    cnj, path = item
+    try:
+        return cnj, path, snapshots.parse_arquivo(path), None
+    except Exception as e:
+        return cnj, path, None, str(e)
+
+
+def _new_stats() -> dict:
+    return {"total": 0, "novos": 0, "removidos": 0, "docs": 0, "erros": 0}
+
+
+def _finish_ok(sb, log_id, stats, tipo) -> dict:
+    status = "success" if stats["erros"] == 0 else "partial"
+    _finish_log(sb, log_id, status, stats, tipo=tipo)
+    print(f"\n[SYNC] Concluído! {stats['total']} processos | {stats['docs']} docs | {stats['erros']} erros")
+    return stats
+
+
+async def _sync_prazos(sessions, sb, stats, slots=None, log_id=None,
+                       dry_run=False, concurrency=None) -> tuple[dict[str, list[dict]], set[str]]:
+    """Passos 1-4: lista de prazos, diff de CNJs, remoções e prazos_abertos.
+    As mudanças (processos e prazos) vão para sync_changes numa chamada só.
+    `dry_run`: para depois do diff, mostrando o que seria gravado."""
+    # 1. Scrapear prazos abertos do eProc (uma listagem por conta, unificadas por CNJ)
+    eproc, completo = await _scrape_listagens(sessions, slots, concurrency)
+    eproc_cnjs = set(eproc.keys())
+    stats["total"] = len(eproc_cnjs)
+
+    # 2. CNJs na DB
+    db_rows = selecionar_tudo("processos.select", lambda: sb.table("processos").select("cnj").order("cnj"))
+    db_cnjs = {row["cnj"] for row in db_rows}
+
+    to_add = eproc_cnjs - db_cnjs
+    to_remove = db_cnjs - eproc_cnjs
+
+    print(f"\n[SYNC] {len(eproc_cnjs)} processos no eProc | +{len(to_add)} novos | -{len(to_remove)} removidos | {len(eproc_cnjs & db_cnjs)} mantidos")
+
+    # 3. Remover processos que saíram (com proteção)
+    if len(eproc_cnjs) == 0 and len(db_cnjs) > 0:
+        print(f"[SYNC] AVISO: eProc retornou 0 processos mas DB tem {len(db_cnjs)}. Pulando remoção.")
+        to_remove = set()
+    elif to_remove and not completo:
+        print(f"[SYNC] AVISO: listagem de prazos incompleta. Pulando remoção de {len(to_remove)} processos.")
+        to_remove = set()
+
+    if dry_run:
+        _mostrar_diff_prazos(sb, eproc, to_add, to_remove)
+        return eproc, to_add
+
+    changes = []
+    for cnj in to_remove:
+        print(f"[SYNC] Removendo: {cnj}")
+        delete_process_documents(cnj)
+        metrics.execute("processos.delete", sb.table("processos").delete().eq("cnj", cnj))
+        stats["removidos"] += 1
+        changes.append({"tipo": "processo_removido", "cnj": cnj, "dados": {}})
+
+    # 4. Sync rápido: inserir novos + atualizar prazos de TODOS
+    _gravar_prazos(sb, eproc, to_add, stats, changes, log_id)
 
+    total_prazos = sum(len(v) for v in eproc.values())
+    print(f"[SYNC] Prazos sincronizados: {total_prazos} prazos para {len(eproc)} processos")
+    return eproc, to_add
+
+
+def _gravar_prazos(sb, eproc, to_add, stats, changes, log_id=None):
+    """Upsert dos processos da lista + prazos_abertos reescritos por CNJ, projeção
+    e registro de `changes` (mais o diff de prazos) em sync_changes."""
+    # last_synced_at só é tocado pelo scrape completo: processos novos entram
+    # com NULL para que o tier de processos os priorize.
+    for cnj, prazos_list in eproc.items():
+        first = prazos_list[0]
+        row = {
+            "cnj": cnj,
+            "classe": first.get("classe"),
+            "juizo": first.get("juizo"),
+        }
+        if cnj in to_add:
+            row["last_synced_at"] = None
+            changes.append({"tipo": "processo_novo", "cnj": cnj,
+                            "dados": {"classe": row["classe"], "juizo": row["juizo"]}})
+        metrics.execute("processos.upsert", sb.table("processos").upsert(row, on_conflict="cnj"))
+
+        # Sync prazos_abertos (upsert para evitar duplicatas)
+        # O delete devolve as linhas antigas: base do diff de prazos sem outra consulta
+        antigos = metrics.execute("prazos_abertos.delete", sb.table("prazos_abertos").delete().eq("cnj", cnj))
+        inseridos = _prazos_rows(cnj, prazos_list)
+        for prazo in inseridos:
+            metrics.execute("prazos_abertos.insert", sb.table("prazos_abertos").insert(prazo))
+        changes += sync_changes.diff_prazos(cnj, antigos.data or [], inseridos)
+
+        if cnj in to_add:
+            stats["novos"] += 1
+
+    # prazos_abertos foi reescrito para todos: atualizar a projeção de cada um
+    _refresh_projecao(sb, list(eproc))
+
+    try:
+        sync_changes.registrar(sb, log_id, changes)
+    except Exception as e:
+        print(f"[SYNC] Falha ao registrar {len(changes)} mudanças em sync_changes: {e}")
+
+
+def _prazos_rows(cnj, prazos_list) -> list[dict]:
+    """Linhas de prazos_abertos do CNJ, sem duplicatas (mesma descrição + prazo_final)."""
+    seen_prazos = set()
+    rows = []
+    for p in prazos_list:
+        key = (p.get("evento_descricao", ""), p.get("prazo_final"))
+        if key in seen_prazos:
+            continue
+        seen_prazos.add(key)
+        rows.append({
+            "cnj": cnj,
+            "evento_descricao": p.get("evento_descricao", ""),
+            "data_envio": p.get("data_envio"),
+            "prazo_inicio": p.get("prazo_inicio"),
+            "prazo_final": p.get("prazo_final"),
+        })
+    return rows
+
+
+def _mostrar_diff_prazos(sb, eproc, to_add, to_remove):
+    """dry-run de _gravar_prazos: processos e prazos que mudariam, sem gravar."""
+    # Só os prazos gravados dos CNJs da lista (os removidos não entram no diff)
+    rows = _select_cnjs(sb, "prazos_abertos.select", "prazos_abertos",
+                        "cnj,evento_descricao,data_envio,prazo_inicio,prazo_final", eproc,
+                        ordem=("cnj", "evento_descricao", "prazo_final"))
+    antigos: dict[str, list[dict]] = {}
+    for r in rows:
+        antigos.setdefault(r["cnj"], []).append(r)
+
+    changes = [{"tipo": "processo_removido", "cnj": cnj, "dados": {}} for cnj in sorted(to_remove)]
+    for cnj, prazos_list in eproc.items():
+        if cnj in to_add:
+            changes.append({"tipo": "processo_novo", "cnj": cnj, "dados": {"classe": prazos_list[0].get("classe")}})
+        changes += sync_changes.diff_prazos(cnj, antigos.get(cnj, []), _prazos_rows(cnj, prazos_list))
+
+    for c in changes:
+        d = c["dados"]
+        detalhe = d.get("classe") or " ".join(
+            str(v) for v in (d.get("evento_descricao"), d.get("prazo_final_anterior"), d.get("prazo_final")) if v)
+        print(f"[DRY-RUN] {c['tipo']:<17} {c['cnj']} {detalhe}")
+    print(f"[DRY-RUN] {len(changes)} mudanças (nada foi gravado)")
+
+
+async def _scrape_listagens(sessions, slots=None, concurrency=None) -> tuple[dict[str, list[dict]], bool]:
+    """Lista de prazos de cada conta, unificada por CNJ. Cada prazo leva o nome
+    da conta em "advogado". `completo` só se todas as listagens vieram inteiras.
+    Até `concurrency` listagens simultâneas (None = só o limite de `slots`)."""
+    slots = slots or asyncio.Semaphore(len(sessions))
+    tier = asyncio.Semaphore(max(1, concurrency or len(sessions)))
+
+    async def _one(session):
+        listagem = {"conta": session.account.nome}
+        async with tier, slots:
+            try:
+                por_cnj = await _listar_prazos(session, listagem)
+            except Exception as e:
+                print(f"[SYNC] ERRO na lista de prazos de {session.account.nome}: {e}")
+                session.ok = False
+                return e, {}, False
+        return None, por_cnj, bool(listagem.get("completo"))
+
+    results = await asyncio.gather(*(_one(s) for s in sessions))
+    erros = [erro for erro, _, _ in results if erro is not None]
+    if len(erros) == len(sessions):
+        raise erros[0]
+
+    eproc: dict[str, list[dict]] = {}
+    for session, (_, por_cnj, _) in zip(sessions, results):
+        for cnj, prazos in por_cnj.items():
+            for p in prazos:
+                p["advogado"] = session.account.nome
+            eproc.setdefault(cnj, []).extend(prazos)
+
+    if len(sessions) > 1:
+        compartilhados = sum(1 for prazos in eproc.values() if len({p["advogado"] for p in prazos}) > 1)
+        print(f"[SYNC] {len(sessions)} contas ({len(erros)} com erro) | {len(eproc)} processos distintos | "
+              f"{compartilhados} vistos por mais de uma conta")
+    return eproc, not erros and all(ok for _, _, ok in results)
+
+
+async def _listar_prazos(session, listagem: dict) -> dict[str, list[dict]]:
+    """Lista de prazos da conta: por HTTP com a engine http, senão (ou se o HTML
+    não bater) pelo browser."""
+    if session.http is not None:
+        try:
+            return await scrape_prazos_http(session.http, listagem)
+        except HtmlInesperado as e:
+            print(f"[PRAZOS] (http) {e} — refazendo pelo browser")
+            metrics.incr("http.fallback")
+    return await scrape_prazos_abertos(session.page, listagem)
+
+
+async def _sync_processos(sessions, sb, eproc, cnjs, stats, concurrency=1, slots=None, log_id=None,
+                          dry_run=False):
+    """Passo 5: scrape completo de cada CNJ uma única vez, mesmo se várias contas
+    o veem. Até `concurrency` abas por conta e `slots` abas no total."""
+    concurrency = max(1, concurrency)
+    slots = slots or asyncio.Semaphore(concurrency * len(sessions))
+    por_conta = {nome: asyncio.Semaphore(concurrency) for nome in sessions}
+    ativos = {nome: 0 for nome in sessions}
+    total = len(cnjs)
+
+    async def _one(i, cnj):
+        # Contas (com sessão) que veem o processo, cada uma com o seu proc_href
+        hrefs = {}
+        for p in eproc[cnj]:
+            if p.get("advogado") in sessions:
+                hrefs.setdefault(p["advogado"], p["proc_href"])
+        if not hrefs:
+            print(f"[SYNC] ERRO em {cnj}: nenhuma conta com sessão ativa vê o processo")
+            stats["erros"] += 1
+            return
+
+        async with slots:
+            # A conta menos ocupada entre as que veem o processo faz o scrape
+            nome = min(hrefs, key=lambda n: ativos[n])
+            session = sessions[nome]
+            ativos[nome] += 1
+            try:
+                async with por_conta[nome]:
+                    print(f"\n[SYNC] [{i}/{total}] Processando: {cnj}" + (f" ({nome})" if len(sessions) > 1 else ""))
+                    advogados = {n: sessions[n].account.adv_name for n in hrefs}
+                    desviar = lambda: sessions[nome]
+                    try:
+                        try:
+                            await _scrape_full_process(session, sb, cnj, hrefs[nome], stats, advogados, log_id,
+                                                       dry_run, desviar)
+                        except Indisponivel as e:
+                            # Proxy drenado no meio do scrape (nada foi gravado):
+                            # refaz uma vez pela sessão da conta no proxy mais saudável
+                            print(f"[SYNC] {cnj}: {e} — refazendo por outro proxy")
+                            metrics.incr("proxy.desvios")
+                            await _scrape_full_process(desviar(), sb, cnj, hrefs[nome], stats, advogados,
+                                                       log_id, dry_run)
+                    except Exception as e:
+                        print(f"[SYNC] ERRO em {cnj}: {e}")
+                        stats["erros"] += 1
+            finally:
+                ativos[nome] -= 1
+
+    await asyncio.gather(*(_one(i, cnj) for i, cnj in enumerate(cnjs, 1)))
+
+
+async def _scrape_full_process(session, sb, cnj, proc_href, stats, advogados=None, log_id=None,
+                               dry_run=False, desviar=None):
+    """Abre processo, extrai tudo, salva na DB (uma chamada a sync_processo).
+    `advogados` = {conta: adv_name} de todas as contas que veem o processo.
+    O sync_processo registra os eventos/documentos novos em sync_changes (com `log_id`).
+    `dry_run`: mostra os eventos novos e o destino dos documentos, sem baixar nem gravar.
+    `desviar` () -> Session: a sessão da conta no proxy mais saudável, para os
+    downloads que caírem num proxy drenado (Indisponivel)."""
+    context = session.context
+    # Último evento gravado: a extração lê só os eventos acima dele, exceto no
+    # modo completo (primeiro scrape, snapshots ou dia de verificação)
+    max_evt = metrics.execute("eventos.max", sb.table("eventos")
+                              .select("numero_evento")
+                              .eq("cnj", cnj)
+                              .order("numero_evento", desc=True)
+                              .limit(1))
+    last_known = max_evt.data[0]["numero_evento"] if max_evt.data else 0
+    completo = _extracao_completa(cnj, last_known)
+    metrics.incr("eventos.extracao." + ("completa" if completo else "incremental"))
+    header, assuntos, partes, eventos = await _extrair_processo(
+        session, cnj, proc_href, None if completo else last_known)
+
+    advogados = advogados or {session.account.nome: session.account.adv_name}
+    lados = {nome: identify_adv_side(partes, adv_name) for nome, adv_name in advogados.items()}
+    lado = lados.get(session.account.nome) or next((l for l in lados.values() if l), "")
+
+    print(f"  Header: {header.get('classe')} | Partes: {len(partes)} | Lado: {lado or '?'}")
+    if len(lados) > 1:
+        print("  Advogados: " + " | ".join(f"{n}: {l or '?'}" for n, l in lados.items()))
+
+    # Filtrar apenas eventos novos (que não estão na DB)
+    new_eventos = [e for e in eventos if e["numero"] > last_known]
+    if completo and last_known:
+        new_eventos = _eventos_faltando(sb, cnj, eventos, last_known) + new_eventos
+
+    print(f"  Eventos: {len(eventos)} {'total' if completo else 'lidos'} | "
+          f"{len(new_eventos)} novos (> {last_known})")
+
+    # Download de documentos (antes de gravar: evento só entra na DB junto com seus docs)
+    # A política decide o que baixar agora; o resto entra só como linha (adiado /
+    # metadados) para o backfill. HTMLs do sistema vão para o render pool em
+    # paralelo com os próximos downloads. Os que falharem vão para
+    # documentos_pendentes (retry sem reabrir o processo)
+    prioritarios = politica.eventos_prioritarios(eventos)
+    if dry_run:
+        _mostrar_eventos_novos(new_eventos, prioritarios)
+        return
+    documentos, renders, falhas = [], [], []
+
+    def _desviar_downloads():
+        # Proxy drenado: este e os próximos downloads vão pela nova sessão
+        nonlocal context
+        context = desviar().context
+        return context
+    trocar = _desviar_downloads if desviar is not None else None
+    destinos = dict.fromkeys((politica.BAIXAR, politica.ADIAR, politica.METADADOS), 0)
+    for e in new_eventos:
+        for doc in e.get("documentos", []):
+            destino = politica.destino(e, doc, prioritarios)
+            destinos[destino] += 1
+            if destino != politica.BAIXAR:
+                documentos.append(_documento_sem_arquivo(e["numero"], doc, destino))
+                continue
+            row = await _download_and_upload(context, cnj, e["numero"], doc, stats, renders, falhas, trocar)
+            if row:
+                documentos.append(row)
+    documentos += [row for row in await asyncio.gather(*renders) if row]
+    if destinos[politica.ADIAR] or destinos[politica.METADADOS]:
+        print(f"  Documentos: {destinos[politica.BAIXAR]} agora | {destinos[politica.ADIAR]} adiados | "
+              f"{destinos[politica.METADADOS]} só metadados")
+    for destino, n in destinos.items():
+        metrics.incr(f"documentos.politica.{destino}", n)
+    textos = [t for t in (d.pop("texto", None) for d in documentos) if t]
+
+    # Prazo aberto / URGENTE em evento já gravado (resumo da página padrão no modo
+    # incremental, todos no completo): os documentos dele (e do evento a que se
+    # refere) que tinham ficado para o backfill passam à frente
+    solicitar = sorted(n for n in politica.eventos_urgentes(eventos) if n <= last_known)
+
+    # Processo + eventos + documentos + projeção numa única transação
+    payload = _processo_payload(cnj, header, assuntos, partes, lados, lado, new_eventos,
+                                documentos, textos, log_id, falhas, solicitar)
+    result = metrics.execute("processos.sync", sb.rpc("sync_processo", {"p_payload": payload}))
+    inseridos = result.data or []
+    if len(inseridos) != len(new_eventos):
+        print(f"  Eventos gravados: {len(inseridos)} inseridos, {len(new_eventos) - len(inseridos)} já existiam")
+
+
+def _extracao_completa(cnj: str, last_known: int) -> bool:
+    """Extrair todos os eventos (modo completo) em vez de só os acima de
+    last_known: primeiro scrape, EVENTOS_INCREMENTAL=false, SNAPSHOTS=true (o
+    snapshot precisa da página inteira para o reparse) ou o dia de verificação
+    do processo — um a cada EVENTOS_VERIFICAR_DIAS, espalhados pelo CNJ."""
+    if not last_known or not Config.EVENTOS_INCREMENTAL or Config.SNAPSHOTS:
+        return True
+    dias = Config.EVENTOS_VERIFICAR_DIAS
+    return dias > 0 and zlib.crc32(cnj.encode()) % dias == int(time.time() // 86400) % dias
+
+
+def _eventos_faltando(sb, cnj, eventos, last_known) -> list[dict]:
+    """Verificação do modo completo: eventos do eProc até last_known que não estão
+    na DB (ex: sigiloso que ficou visível depois) e que a extração incremental
+    nunca veria. Compara a partir do menor número devolvido pela consulta
+    (o PostgREST limita as linhas)."""
+    rows = metrics.execute("eventos.numeros", sb.table("eventos")
+                           .select("numero_evento")
+                           .eq("cnj", cnj)
+                           .order("numero_evento", desc=True)).data or []
+    gravados = {r["numero_evento"] for r in rows}
+    piso = min(gravados, default=0)
+    faltando = [e for e in eventos if piso <= e["numero"] <= last_known and e["numero"] not in gravados]
+    if faltando:
+        print(f"  Verificação: {len(faltando)} eventos do eProc faltavam na DB")
+        metrics.incr("eventos.verificacao.faltando", len(faltando))
+    return faltando
+
+
+async def _extrair_processo(session, cnj, proc_href, since_numero=None) -> tuple[dict, list, list, list]:
+    """(header, assuntos, partes, eventos) do processo. Com a engine http a
+    página vem por HTTP, sem aba (fallback para o browser se o HTML não bater).
+    No browser, a aba fecha assim que o conteúdo é lido; com SNAPSHOTS=true isso
+    é logo após capturar o HTML e o parsing roda offline (pool de processos),
+    com o snapshot gravado em disco. Com `since_numero`, só os eventos acima dele
+    (ver extract_eventos)."""
+    if session.http is not None:
+        try:
+            html, dados = await fetch_processo_http(session.http, proc_href, since_numero)
+        except HtmlInesperado as e:
+            print(f"  (http) {e} — abrindo pelo browser")
+            metrics.incr("http.fallback")
+        else:
+            if Config.SNAPSHOTS:
+                _salvar_snapshot(cnj, html)
+            novos = sum(1 for e in dados["eventos"] if not e.get("conhecido"))
+            print(f"[PROCESSO] {novos} eventos extraidos (http)")
+            return dados["header"], dados["assuntos"], dados["partes"], dados["eventos"]
+
+    proc_page = await open_process_page(session.context, session.page, proc_href)
+    try:
+        if not Config.SNAPSHOTS:
+            header = await extract_header(proc_page)
+            assuntos = await extract_assuntos(proc_page)
+            partes = await extract_partes(proc_page)
+            eventos = await extract_eventos(proc_page, since_numero)
+            return header, assuntos, partes, eventos
+        html = await capture_process_page(proc_page)
+    finally:
+        await proc_page.close()
+
+    _salvar_snapshot(cnj, html)
+    dados = await snapshots.parse_processo(html)
+    print(f"[PROCESSO] {len(dados['eventos'])} eventos extraidos (snapshot)")
+    return dados["header"], dados["assuntos"], dados["partes"], dados["eventos"]
+
+
+def _mostrar_eventos_novos(new_eventos, prioritarios):
+    """dry-run do scrape completo: eventos novos e o que a política faria com cada documento."""
+    for e in sorted(new_eventos, key=lambda e: e["numero"]):
+        destinos = [f"{d['nome']}={politica.destino(e, d, prioritarios)}" for d in e.get("documentos", [])]
+        print(f"  [DRY-RUN] evento {e['numero']} {e['data_hora'][:10]} {e['descricao'][:60]}"
+              + (f" | {', '.join(destinos)}" if destinos else ""))
+
+
+def _salvar_snapshot(cnj: str, html: str):
     try:
-        # Header
-        header = await extract_header(proc_page)
+        with metrics.timer("snapshot.gravar"):
+            snapshots.salvar_processo(cnj, html)
+    except Exception as e:
+        print(f"  [snapshot] falha ao gravar {cnj}: {e}")
 
-        # Partes e assuntos
-        assuntos = await extract_assuntos(proc_page)
-        partes = await extract_partes(proc_page)
-        lado = identify_adv_side(partes, Config.ADV_NAME)
 
-        # Atualizar processo com dados completos
-        sb.table("processos").update({
+def _processo_payload(cnj, header, assuntos, partes, lados, lado, eventos,
+                      documentos=(), textos=(), log_id=None, pendentes=(), solicitar=()) -> dict:
+    """Payload de sync_processo (scrape completo e reparse dos snapshots)."""
+    return {
+        "cnj": cnj,
+        "sync_log_id": log_id,
+        "processo": {
             "classe": header.get("classe"),
             "competencia": header.get("competencia"),
             "data_autuacao": header.get("data_autuacao"),
@@ -120,89 +761,307 @@ async def _scrape_full_process(context, page, sb, cnj, proc_href, stats):
             "orgao_julgador": header.get("orgao_julgador"),
             "juiz": header.get("juiz"),
             "lado_advogado": lado,
+            "advogados": lados,
             "processos_relacionados": header.get("processos_relacionados", []),
             "assuntos": assuntos,
             "partes": partes,
-            "last_synced_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("cnj", cnj).execute()
-
-        print(f"  Header: {header.get('classe')} | Partes: {len(partes)} | Lado: {lado or '?'}")
-
-        # Eventos
-        eventos = await extract_eventos(proc_page)
-
-        # Filtrar apenas eventos novos (que não estão na DB)
-        max_evt = sb.table("eventos") \
-            .select("numero_evento") \
-            .eq("cnj", cnj) \
-            .order("numero_evento", desc=True) \
-            .limit(1) \
-            .execute()
-        last_known = max_evt.data[0]["numero_evento"] if max_evt.data else 0
-        new_eventos = [e for e in eventos if e["numero"] > last_known]
-
-        print(f"  Eventos: {len(eventos)} total | {len(new_eventos)} novos (> {last_known})")
-
-        for e in new_eventos:
-            sb.table("eventos").upsert({
-                "cnj": cnj,
-                "numero_evento": e["numero"],
-                "data_hora": e["data_hora"],
-                "descricao": e["descricao"],
-                "usuario": e.get("usuario"),
-                "prazo_aberto": e.get("prazo_aberto", False),
-                "prazo_dias": e.get("prazo_dias"),
-                "prazo_status": e.get("prazo_status"),
-                "prazo_data_inicial": e.get("prazo_data_inicial"),
-                "prazo_data_final": e.get("prazo_data_final"),
-                "evento_referencia": e.get("evento_referencia"),
-                "urgente": e.get("urgente", False),
-            }, on_conflict="cnj,numero_evento").execute()
-
-            # Download de documentos
-            for doc in e.get("documentos", []):
-                await _download_and_upload(context, sb, cnj, e["numero"], doc, stats)
+        },
+        "eventos": [_evento_row(e) for e in eventos],
+        "documentos": list(documentos),
+        "textos": list(textos),
+        "pendentes": list(pendentes),
+        "solicitar": list(solicitar),
+    }
 
-    finally:
-        await proc_page.close()
+
+def _evento_row(e: dict) -> dict:
+    return {
+        "numero_evento": e["numero"],
+        "data_hora": e["data_hora"],
+        "descricao": e["descricao"],
+        "usuario": e.get("usuario"),
+        "prazo_aberto": e.get("prazo_aberto", False),
+        "prazo_dias": e.get("prazo_dias"),
+        "prazo_status": e.get("prazo_status"),
+        "prazo_data_inicial": e.get("prazo_data_inicial"),
+        "prazo_data_final": e.get("prazo_data_final"),
+        "evento_referencia": e.get("evento_referencia"),
+        "urgente": e.get("urgente", False),
+    }
 
 
-async def _download_and_upload(context, sb, cnj, num_evento, doc_info, stats):
-    """Baixa documento do eProc, sobe para Storage, registra na DB."""
+async def _download_and_upload(context, cnj, num_evento, doc_info, stats, renders=None,
+                               falhas=None, desviar=None) -> dict | None:
+    """Baixa documento do eProc e sobe para Storage. Retorna a linha de documentos.
+    Documentos HTML do sistema viram uma task de render em `renders` (se informada).
+    Falhas vão para `falhas` (linhas de documentos_pendentes), se informada.
+    Se o proxy da `context` foi drenado (Indisponivel), refaz uma vez pela
+    context que `desviar()` devolve (sem `desviar`, é uma falha como as outras)."""
+    etapa = "download"
     try:
-        doc_result = await download_document(context, doc_info["url_eproc"])
+        doc_result = await download_document(context, doc_info["url_eproc"], defer_render=renders is not None)
         if not doc_result:
-            return
+            _registrar_falha(falhas, num_evento, doc_info, etapa, "download sem resultado")
+            return None
+        if "html" in doc_result:
+            renders.append(asyncio.create_task(
+                _render_and_upload(context, cnj, num_evento, doc_info, doc_result["html"], stats, falhas)))
+            return None
+        etapa = "upload"
+        texto = await extrair_texto(get_supabase(), doc_result)
+        doc_result = await otimizar_pdf(doc_result)
+        return _upload(cnj, num_evento, doc_info, doc_result, stats, texto)
+
+    except Indisponivel as e:
+        if desviar is None:
+            print(f"    doc: {doc_info['nome']} -> ERRO: {e}")
+            _registrar_falha(falhas, num_evento, doc_info, etapa, e)
+            return None
+        print(f"    doc: {doc_info['nome']} -> {e}, refazendo por outro proxy")
+        metrics.incr("proxy.desvios")
+        return await _download_and_upload(desviar(), cnj, num_evento, doc_info, stats, renders, falhas)
+    except Exception as e:
+        print(f"    doc: {doc_info['nome']} -> ERRO: {e}")
+        _registrar_falha(falhas, num_evento, doc_info, etapa, e)
+        return None
 
-        ext = os.path.splitext(doc_result["local_path"])[1] or ".pdf"
-        storage_path = build_storage_path(cnj, num_evento, doc_info["nome"], ext=ext)
-        storage_url = upload_document(doc_result["local_path"], storage_path)
 
-        sb.table("documentos").upsert({
-            "cnj": cnj,
-            "numero_evento": num_evento,
-            "nome_original": doc_info["nome"],
-            "tipo": doc_result["tipo"],
-            "url_eproc": doc_info["url_eproc"],
-            "storage_path": storage_path,
-            "storage_url": storage_url,
-            "tamanho_bytes": doc_result["tamanho_bytes"],
-            "hash_sha256": doc_result["hash_sha256"],
-        }, on_conflict="cnj,numero_evento,url_eproc").execute()
+async def _render_and_upload(context, cnj, num_evento, doc_info, html, stats, falhas=None) -> dict | None:
+    etapa = "render"
+    try:
+        doc_result = await render_document(context, html)
+        etapa = "upload"
+        texto = await extrair_texto(get_supabase(), doc_result, html)
+        doc_result = await otimizar_pdf(doc_result)
+        return _upload(cnj, num_evento, doc_info, doc_result, stats, texto)
+    except Exception as e:
+        print(f"    doc: {doc_info['nome']} -> ERRO no {etapa}: {e}")
+        _registrar_falha(falhas, num_evento, doc_info, etapa, e)
+        return None
+
+
+def _documento_sem_arquivo(num_evento, doc_info, destino) -> dict:
+    """Linha de documentos sem download (adiado para o backfill ou só metadados)."""
+    return {
+        "numero_evento": num_evento,
+        "nome_original": doc_info["nome"],
+        "url_eproc": doc_info["url_eproc"],
+        "status": politica.STATUS[destino],
+    }
+
 
-        stats["docs"] += 1
-        print(f"    doc: {doc_info['nome']} -> ok ({doc_result['tamanho_bytes']} bytes)")
+def _registrar_falha(falhas, num_evento, doc_info, erro_tipo, erro):
+    if falhas is None:
+        return
+    metrics.incr(f"documentos.falha.{erro_tipo}")
+    falhas.append({
+        "numero_evento": num_evento,
+        "url_eproc": doc_info["url_eproc"],
+        "nome_original": doc_info["nome"],
+        "erro_tipo": erro_tipo,
+        "erro": str(erro)[:500],
+        "proxima_tentativa": _proxima_tentativa(1),
+    })
 
+
+def _proxima_tentativa(tentativas: int) -> str:
+    """Backoff exponencial: DOCS_PENDENTES_BACKOFF_MIN dobrando a cada falha, com teto."""
+    minutos = min(Config.DOCS_PENDENTES_BACKOFF_MIN * 2 ** (tentativas - 1),
+                  Config.DOCS_PENDENTES_BACKOFF_MAX_HORAS * 60)
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutos)).isoformat()
+
+
+def _pendentes_vencidos(sb) -> list[dict]:
+    """documentos_pendentes com retry vencido (até DOCS_PENDENTES_LOTE, com menos
+    de DOCS_PENDENTES_MAX_TENTATIVAS), os mais atrasados primeiro."""
+    agora = datetime.now(timezone.utc).isoformat()
+    try:
+        return metrics.execute("documentos_pendentes.select", sb.table("documentos_pendentes")
+                               .select("cnj,numero_evento,url_eproc,nome_original,tentativas")
+                               .lte("proxima_tentativa", agora)
+                               .lt("tentativas", Config.DOCS_PENDENTES_MAX_TENTATIVAS)
+                               .order("proxima_tentativa")
+                               .limit(Config.DOCS_PENDENTES_LOTE)).data or []
     except Exception as e:
-        print(f"    doc: {doc_info['nome']} -> ERRO: {e}")
+        print(f"[SYNC] Falha ao ler documentos_pendentes: {e}")
+        return []
+
 
+def _mostrar_fila(rotulo, itens, dry_run):
+    if not dry_run:
+        return
+    por_cnj: dict[str, int] = {}
+    for p in itens:
+        por_cnj[p["cnj"]] = por_cnj.get(p["cnj"], 0) + 1
+    print(f"[DRY-RUN] {rotulo}: {len(itens)} documentos em {len(por_cnj)} processos")
+    for cnj, n in sorted(por_cnj.items()):
+        print(f"[DRY-RUN]   {cnj}: {n}")
 
-def _start_log(sb) -> str:
-    result = sb.table("sync_log").insert({"status": "running"}).execute()
+
+def _backfill_candidatos(sb, cnjs=None, solicitados=False) -> list[dict]:
+    """Fila do backfill (documentos_backfill): até DOCS_BACKFILL_LOTE documentos
+    adiados/solicitados, ou todos os não disponíveis de `cnjs`."""
+    try:
+        return metrics.execute("documentos.backfill", sb.rpc("documentos_backfill", {
+            "p_limite": None if cnjs else Config.DOCS_BACKFILL_LOTE,
+            "p_cnjs": cnjs,
+            "p_solicitados": solicitados,
+        })).data or []
+    except Exception as e:
+        print(f"[SYNC] Falha ao ler a fila do backfill: {e}")
+        return []
+
+
+class _Orcamento:
+    """Orçamento do backfill: nenhum download começa depois de DOCS_BACKFILL_MAX_MB
+    baixados ou DOCS_BACKFILL_MAX_MIN minutos (os em andamento terminam)."""
+
+    def __init__(self):
+        self.max_bytes = Config.DOCS_BACKFILL_MAX_MB * 1024 * 1024
+        self.fim = time.monotonic() + Config.DOCS_BACKFILL_MAX_MIN * 60
+        self.bytes = 0
+
+    def esgotado(self) -> bool:
+        return self.bytes >= self.max_bytes or time.monotonic() >= self.fim
+
+
+async def _baixar_documentos(sessions, sb, itens, stats, slots=None, log_id=None,
+                             orcamento: _Orcamento | None = None,
+                             rotulo: str = "Retry de documentos") -> tuple[int, int]:
+    """
+    Baixa os `itens` (documentos_pendentes vencidos ou fila do backfill: cnj,
+    numero_evento, url_eproc, nome_original, tentativas) direto pela url_eproc
+    com a sessão de uma conta que vê o processo, sem reabrir a página do
+    processo. Os baixados vão para a DB numa chamada a sync_documentos por
+    processo (que os tira da fila de retry); os que falham entram/voltam em
+    documentos_pendentes com o backoff dobrado. Com `orcamento`, para de
+    iniciar downloads quando ele se esgota.
+    Retorna (tentados, falharam); os baixados contam em stats["docs"].
+    """
+    ativas = {nome: s for nome, s in sessions.items() if s.ok}
+    if not itens or not ativas:
+        return 0, 0
+
+    por_cnj: dict[str, list[dict]] = {}
+    for p in itens:
+        por_cnj.setdefault(p["cnj"], []).append(p)
+    rows = metrics.execute("processos.select", sb.table("processos")
+                           .select("cnj,advogados").in_("cnj", list(por_cnj))).data or []
+    advogados = {r["cnj"]: r.get("advogados") or {} for r in rows}
+    print(f"\n[SYNC] {rotulo}: {len(itens)} documentos em {len(por_cnj)} processos")
+
+    slots = slots or asyncio.Semaphore(len(ativas))
+
+    async def _one(cnj, itens):
+        # Uma conta que vê o processo (o eProc nega documento de processo alheio)
+        nome = next((n for n in advogados.get(cnj, {}) if n in ativas), next(iter(ativas)))
+        context = ativas[nome].context
+        documentos, renders, falhas = [], [], []
+        tentados = 0
+
+        def _desviar():
+            # Proxy drenado: este e os próximos documentos vão pela nova sessão
+            nonlocal context
+            context = sessions[nome].context
+            return context
+        async with slots:
+            for p in itens:
+                if orcamento is not None and orcamento.esgotado():
+                    break
+                tentados += 1
+                doc_info = {"nome": p["nome_original"], "url_eproc": p["url_eproc"]}
+                row = await _download_and_upload(context, cnj, p["numero_evento"], doc_info, stats, renders,
+                                                 falhas, _desviar)
+                if row:
+                    documentos.append(row)
+                    if orcamento is not None:
+                        orcamento.bytes += row["tamanho_bytes"] or 0
+            documentos += [row for row in await asyncio.gather(*renders) if row]
+
+        try:
+            if documentos:
+                textos = [t for t in (d.pop("texto") for d in documentos) if t]
+                metrics.execute("documentos.sync", sb.rpc("sync_documentos", {"p_payload": {
+                    "cnj": cnj, "sync_log_id": log_id, "documentos": documentos, "textos": textos,
+                }}))
+            if falhas:
+                tentativas = {(p["numero_evento"], p["url_eproc"]): p["tentativas"] for p in itens}
+                for f in falhas:
+                    t = tentativas[(f["numero_evento"], f["url_eproc"])] + 1
+                    f.update(cnj=cnj, tentativas=t, proxima_tentativa=_proxima_tentativa(t),
+                             ultima_falha=datetime.now(timezone.utc).isoformat())
+                metrics.execute("documentos_pendentes.upsert", sb.table("documentos_pendentes")
+                                .upsert(falhas, on_conflict="cnj,numero_evento,url_eproc"))
+        except Exception as e:
+            print(f"[SYNC] ERRO ao gravar documentos de {cnj} ({rotulo.lower()}): {e}")
+        return tentados, len(falhas)
+
+    resultados = await asyncio.gather(*(_one(cnj, itens) for cnj, itens in por_cnj.items()))
+    tentados = sum(t for t, _ in resultados)
+    falharam = sum(f for _, f in resultados)
+    print(f"[SYNC] {rotulo}: {tentados - falharam}/{tentados} baixados"
+          + (f" (orçamento esgotado, {len(itens) - tentados} ficam para o próximo ciclo)"
+             if tentados < len(itens) else ""))
+    return tentados, falharam
+
+
+def _upload(cnj, num_evento, doc_info, doc_result, stats, texto=None) -> dict:
+    ext = os.path.splitext(doc_result["local_path"])[1] or ".pdf"
+    storage_path = build_storage_path(cnj, num_evento, doc_info["nome"], ext=ext)
+    storage_url = upload_document(doc_result["local_path"], storage_path)
+
+    stats["docs"] += 1
+    print(f"    doc: {doc_info['nome']} -> ok ({doc_result['tamanho_bytes']} bytes)")
+    return {
+        "numero_evento": num_evento,
+        "nome_original": doc_info["nome"],
+        "tipo": doc_result["tipo"],
+        "url_eproc": doc_info["url_eproc"],
+        "storage_path": storage_path,
+        "storage_url": storage_url,
+        "tamanho_bytes": doc_result["tamanho_bytes"],
+        "hash_sha256": doc_result["hash_sha256"],
+        "status": politica.DISPONIVEL,
+        "texto": texto,     # linha de documentos_texto (sai do payload.documentos)
+    }
+
+
+def _select_cnjs(sb, nome: str, tabela: str, colunas: str, cnjs, ordem: tuple = ("cnj",),
+                 chunk: int = 200) -> list[dict]:
+    """Linhas de `tabela` só dos `cnjs`: .in_() em lotes de `chunk` CNJs (URL
+    curta), cada lote paginado na ordem única `ordem`."""
+    cnjs = sorted(cnjs)
+    linhas = []
+    for i in range(0, len(cnjs), chunk):
+        lote = cnjs[i:i + chunk]
+
+        def consulta():
+            q = sb.table(tabela).select(colunas).in_("cnj", lote)
+            for col in ordem:
+                q = q.order(col)
+            return q
+        linhas += selecionar_tudo(nome, consulta)
+    return linhas
+
+
+def _refresh_projecao(sb, cnjs: list[str], chunk: int = 500):
+    """Recalcula processo_completo (base de v_processo_completo) só para os CNJs tocados."""
+    for i in range(0, len(cnjs), chunk):
+        try:
+            metrics.execute(
+                "processo_completo.refresh",
+                sb.rpc("refresh_processo_completo", {"p_cnjs": cnjs[i:i + chunk]}),
+            )
+        except Exception as e:
+            print(f"[SYNC] Falha ao atualizar processo_completo: {e}")
+
+
+def _start_log(sb, tipo: str = "full") -> str:
+    result = sb.table("sync_log").insert({"status": "running", "tipo": tipo}).execute()
     return result.data[0]["id"]
 
 
-def _finish_log(sb, log_id, status, stats, error=None):
+def _finish_log(sb, log_id, status, stats, error=None, tipo="full"):
     try:
         sb.table("sync_log").update({
             "finished_at": datetime.now(timezone.utc).isoformat(),
@@ -216,3 +1075,7 @@ def _finish_log(sb, log_id, status, stats, error=None):
         }).eq("id", log_id).execute()
     except Exception as e:
         print(f"[SYNC] Falha ao gravar sync_log: {e}")
+
+    for key in ("total", "novos", "removidos", "docs", "erros"):
+        metrics.incr(f"sync.{key}", stats[key])
+    flush_metrics(sb, log_id, tipo)
@@ -0,0 +1,237 @@
+"""
+Limitador de requisições ao eProc: concorrência adaptativa (AIMD) + disjuntor.
+
+Toda navegação de página (lista de prazos, processo), requisição da engine
+HTTP e download de documento passa por `limitador.requisicao(nome)`:
+
+- o limite de requisições simultâneas sobe +1/limite a cada resposta boa e cai
+  pela metade (no máximo uma vez por latência-alvo) quando a requisição falha
+  ou a latência média (EWMA) passa de LIMITADOR_LATENCIA_ALVO_SEC;
+- se na janela das últimas LIMITADOR_JANELA respostas a fração de erros passa
+  de LIMITADOR_ERRO_MAX (ou há LIMITADOR_FALHAS_SEGUIDAS erros seguidos), o
+  disjuntor abre: novas requisições esperam LIMITADOR_PAUSA_SEC (dobrando a
+  cada reabertura, até LIMITADOR_PAUSA_MAX_SEC) em vez de cada processo falhar
+  por timeout. Depois da pausa passa uma requisição de sonda; se ela responder,
+  o disjuntor fecha e o limite recomeça de LIMITADOR_MIN.
+
+Erro = exceção dentro do bloco ou status 5xx/429 informado com `req.status()`.
+O estado vai para as métricas do ciclo (gauges `limitador.*`, contadores
+`limitador.erros` / `limitador.disjuntor_aberto`, timers `limitador.espera`).
+
+Com `via` (BrowserContext, Page ou EprocHttp da sessão) a requisição também
+passa pelo limitador vinculado àquela sessão com `vincular()` — cada proxy do
+pool tem o seu (src/proxies.py), com as métricas em `proxy.{nome}.*`. Se o
+disjuntor desse limitador está aberto e `desviar()` diz que há outro caminho,
+a requisição levanta Indisponivel na hora em vez de esperar a pausa.
+"""
+import time
+import weakref
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from src.config import Config
+from src.metrics import metrics
+
+_EWMA = 0.2
+
+
+class Indisponivel(Exception):
+    """Disjuntor aberto com alternativa (outro proxy): refazer por ela."""
+
+
+class _Requisicao:
+    __slots__ = ("erro",)
+
+    def __init__(self):
+        self.erro = False
+
+    def status(self, code: int | None):
+        """Status HTTP da resposta: 5xx e 429 contam como erro do eProc."""
+        if code is not None and (code >= 500 or code == 429):
+            self.erro = True
+
+
+class Limitador:
+    def __init__(self, nome: str = "limitador", maximo: int | None = None, rotulo: str = "LIMITADOR"):
+        self.nome = nome            # prefixo das métricas
+        self.maximo = maximo        # None = LIMITADOR_MAX
+        self.rotulo = rotulo        # prefixo dos prints
+        self.desviar = None         # () -> bool: há alternativa com o disjuntor aberto?
+        self.reset()
+
+    def reset(self):
+        self.limite: float | None = None      # lido de Config no primeiro uso
+        self.em_uso = 0
+        self.estado = "fechado"               # fechado | aberto | sonda
+        self.latencia: float | None = None    # EWMA (s)
+        self._janela: deque[bool] | None = None
+        self._seguidas = 0
+        self._ultima_reducao = 0.0
+        self._aberto_ate = 0.0
+        self._pausa = 0.0
+        self._espera: deque[asyncio.Future] = deque()
+
+    def _iniciar(self):
+        if self.limite is None:
+            self.limite = float(max(Config.LIMITADOR_MIN, self._max()))
+            self._janela = deque(maxlen=max(1, Config.LIMITADOR_JANELA))
+            self._pausa = Config.LIMITADOR_PAUSA_SEC
+            self._publicar()
+
+    def _max(self) -> int:
+        return self.maximo or Config.LIMITADOR_MAX
+
+    def taxa_erro(self) -> float:
+        """Fração de erros na janela das últimas respostas."""
+        return sum(self._janela) / len(self._janela) if self._janela else 0.0
+
+    def _vagas(self) -> int:
+        if self.estado == "sonda":
+            return 1
+        return max(1, int(self.limite))
+
+    async def _adquirir(self):
+        self._iniciar()
+        while True:
+            if self.estado == "aberto":
+                restante = self._aberto_ate - time.monotonic()
+                if restante > 0:
+                    if self.desviar is not None and self.desviar():
+                        metrics.incr(f"{self.nome}.desvios")
+                        raise Indisponivel(f"{self.rotulo}: disjuntor aberto")
+                    with metrics.timer(f"{self.nome}.pausa"):
+                        await asyncio.sleep(restante)
+                    continue
+                self.estado = "sonda"
+                print(f"[{self.rotulo}] Pausa encerrada: testando com uma requisição")
+                self._publicar()
+            if self.em_uso < self._vagas():
+                self.em_uso += 1
+                return
+            fut = asyncio.get_running_loop().create_future()
+            self._espera.append(fut)
+            try:
+                await fut
+            finally:
+                if fut in self._espera:
+                    self._espera.remove(fut)
+
+    def _acordar(self):
+        """Libera tantas requisições em espera quantas vagas houver."""
+        livres = self._vagas() - self.em_uso
+        while livres > 0 and self._espera:
+            fut = self._espera.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                livres -= 1
+
+    @asynccontextmanager
+    async def requisicao(self, nome: str, medir_latencia: bool = True, via=None):
+        """Reserva uma vaga (esperando o limite e o disjuntor) e registra o
+        resultado. Sem `medir_latencia` (downloads, cujo tempo depende do
+        tamanho) só erros contam. Com `via`, reserva antes a vaga no limitador
+        vinculado à sessão (o do proxy), que registra o mesmo resultado."""
+        limitadores = [self]
+        extra = _vinculados.get(via) if via is not None else None
+        if extra is not None and extra is not self:
+            limitadores.insert(0, extra)
+
+        t0 = time.perf_counter()
+        reservados = []
+        try:
+            for lim in limitadores:
+                await lim._adquirir()
+                reservados.append(lim)
+        except BaseException:
+            for lim in reservados:
+                lim.em_uso -= 1
+                lim._acordar()
+            raise
+        metrics.observe(f"{self.nome}.espera", time.perf_counter() - t0)
+        req = _Requisicao()
+        t0 = time.perf_counter()
+        try:
+            yield req
+        except Exception:
+            req.erro = True
+            raise
+        finally:
+            latencia = time.perf_counter() - t0 if medir_latencia else None
+            for lim in limitadores:
+                lim.em_uso -= 1
+                # Erro num proxy com o disjuntor aberto é do proxy, não do eProc:
+                # não derruba o limite global (que as outras sessões usam)
+                if not (req.erro and lim is self and extra is not None and extra.estado != "fechado"):
+                    lim._registrar(nome, latencia, req.erro)
+                lim._acordar()
+
+    def _registrar(self, nome: str, latencia: float | None, erro: bool):
+        agora = time.monotonic()
+        if latencia is not None and not erro:
+            self.latencia = latencia if self.latencia is None else (
+                (1 - _EWMA) * self.latencia + _EWMA * latencia)
+        self._janela.append(erro)
+        self._seguidas = self._seguidas + 1 if erro else 0
+        if erro:
+            metrics.incr(f"{self.nome}.erros")
+            metrics.incr(f"{self.nome}.erros.{nome}")
+
+        if self.estado == "sonda":
+            if erro:
+                self._abrir(agora, "sonda falhou")
+            else:
+                print(f"[{self.rotulo}] Sonda respondeu: disjuntor fechado")
+                self.estado = "fechado"
+                self.limite = float(Config.LIMITADOR_MIN)
+                self._pausa = Config.LIMITADOR_PAUSA_SEC
+                self._janela.clear()
+            self._publicar()
+            return
+        if self.estado == "aberto":
+            return
+
+        erros = sum(self._janela)
+        cheia = len(self._janela) >= self._janela.maxlen // 2
+        if self._seguidas >= Config.LIMITADOR_FALHAS_SEGUIDAS or (
+                cheia and erros / len(self._janela) >= Config.LIMITADOR_ERRO_MAX):
+            self._abrir(agora, f"{erros}/{len(self._janela)} erros, {self._seguidas} seguidos")
+        elif erro or (self.latencia or 0) > Config.LIMITADOR_LATENCIA_ALVO_SEC:
+            # Decréscimo multiplicativo, no máximo uma vez por latência-alvo
+            # (várias requisições simultâneas falhando contam como um sinal só)
+            if agora - self._ultima_reducao >= Config.LIMITADOR_LATENCIA_ALVO_SEC:
+                self.limite = max(float(Config.LIMITADOR_MIN), self.limite / 2)
+                self._ultima_reducao = agora
+                metrics.incr(f"{self.nome}.reducoes")
+        else:
+            self.limite = min(float(self._max()), self.limite + 1 / self.limite)
+        self._publicar()
+
+    def _abrir(self, agora: float, motivo: str):
+        if self.estado == "sonda":
+            self._pausa = min(Config.LIMITADOR_PAUSA_MAX_SEC, self._pausa * 2)
+        self.estado = "aberto"
+        self._aberto_ate = agora + self._pausa
+        self.limite = float(Config.LIMITADOR_MIN)
+        self._seguidas = 0
+        metrics.incr(f"{self.nome}.disjuntor_aberto")
+        print(f"[{self.rotulo}] Instável ({motivo}): pausando requisições por {self._pausa:.1f}s")
+
+    def _publicar(self):
+        metrics.gauge(f"{self.nome}.limite", round(self.limite, 2))
+        metrics.gauge(f"{self.nome}.em_uso", self.em_uso)
+        metrics.gauge(f"{self.nome}.latencia_ewma", round(self.latencia or 0.0, 3))
+        metrics.gauge(f"{self.nome}.taxa_erro", round(self.taxa_erro(), 3))
+        metrics.gauge(f"{self.nome}.disjuntor", {"fechado": 0, "sonda": 1, "aberto": 2}[self.estado])
+
+
+# Limitadores extras por sessão (BrowserContext / EprocHttp -> Limitador do proxy)
+_vinculados: "weakref.WeakKeyDictionary[object, Limitador]" = weakref.WeakKeyDictionary()
+
+
+def vincular(via, lim: Limitador):
+    """Requisições com `via=via` passam também por `lim` (ver Limitador.requisicao)."""
+    _vinculados[via] = lim
+
+
+# Instância única: todas as contas batem no mesmo eProc
+limitador = Limitador()
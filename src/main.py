@@ -1,80 +1,99 @@
 import sys
 import asyncio
-from playwright.async_api import async_playwright, Playwright
+import argparse
+from playwright.async_api import async_playwright
 from src.config import Config
-from src.auth.login import login
-from src.db.sync import sync
+from src.browser import build_proxies
+from src.proxies import ProxyPool
+from src.scheduler import Scheduler
+from src.worker import Worker
 
 # Windows console: forçar UTF-8
 if sys.stdout.encoding != "utf-8":
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
     sys.stderr.reconfigure(encoding="utf-8", errors="replace")
 
-WAIT_AFTER_COMPLETE = 24 * 60 * 60  # 24h entre syncs
 
-
-def _build_proxy():
-    if not Config.PROXY_SERVER:
-        return None
-    proxy = {"server": Config.PROXY_SERVER}
-    if Config.PROXY_USERNAME:
-        proxy["username"] = Config.PROXY_USERNAME
-        proxy["password"] = Config.PROXY_PASSWORD
-    return proxy
-
-
-async def _create_session(p: Playwright, proxy: dict | None):
-    browser = await p.chromium.launch(headless=Config.HEADLESS)
-    context = await browser.new_context(
-        viewport={"width": 1366, "height": 900},
-        proxy=proxy,
-    )
-    page = await login(context)
-    return browser, context, page
-
-
-async def _close_session(browser, context):
-    try:
-        await context.close()
-    except Exception:
-        pass
-    try:
-        await browser.close()
-    except Exception:
-        pass
-
-
-async def run():
+async def run(tier: str | None = None, worker: bool = False, once: bool = False,
+              comando: str | None = None, cnjs: list[str] | None = None, dry_run: bool = False) -> bool:
+    """Sem `comando` nem `tier`/`once`: scheduler contínuo. Retorna False se a
+    execução avulsa falhou."""
     Config.validate()
 
     print("=" * 60)
     print("  eProc TJRS Scraper 2.0")
     print("=" * 60)
 
-    proxy = _build_proxy()
-    if proxy:
-        print(f"[PROXY] Usando proxy: {proxy['server']}")
+    proxies = ProxyPool(build_proxies(), Config.PROXY_ATIVOS)
+    if proxies.proxies[0].config:
+        ativos = [p.nome for p in proxies.ativos()]
+        print(f"[PROXY] {len(proxies.proxies)} proxy(s), ativos: {', '.join(ativos)}")
 
     async with async_playwright() as p:
-        while True:
-            try:
-                browser, context, page = await _create_session(p, proxy)
-                print("[OK] Logado no Painel do Advogado\n")
-
-                await sync(page, context)
-
-                await _close_session(browser, context)
-            except Exception as e:
-                print(f"[ERRO] Falha no sync: {e}")
-                try:
-                    await _close_session(browser, context)
-                except Exception:
-                    pass
+        if worker:
+            # Worker da fila distribuída: só scrape completo dos CNJs reservados
+            await Worker(p, proxies).run_forever()
+            return True
+
+        scheduler = Scheduler(p, proxies)
+        try:
+            # Execuções avulsas: uma passada e sai
+            if comando == "sync":
+                return await scheduler.run_cnjs(cnjs, dry_run)
+            if comando == "prazos":
+                return await scheduler.run_prazos(dry_run)
+            if comando == "backfill-docs":
+                return await scheduler.run_backfill(cnjs, dry_run)
+            if tier:
+                return await scheduler.run_tier(tier)
+            if once:
+                return await scheduler.run_once()
+            await scheduler.run_forever()
+            return True
+        finally:
+            await scheduler.close()
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description="eProc TJRS Scraper 2.0",
+        epilog="Sem comando: scheduler contínuo (tiers de prazos e processos).",
+    )
+    parser.add_argument(
+        "--tier",
+        choices=["prazos", "processos"],
+        help="Executa apenas um tier uma vez e sai (padrão: scheduler contínuo)",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Roda como worker da fila distribuída (FILA_PROCESSOS)",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Um ciclo de cada tier (prazos e processos) e sai",
+    )
 
-            hours = WAIT_AFTER_COMPLETE / 3600
-            print(f"\n[OK] Sync completo. Próximo em {hours:.0f}h...")
-            await asyncio.sleep(WAIT_AFTER_COMPLETE)
+    comandos = parser.add_subparsers(dest="comando", metavar="comando")
+    sync = comandos.add_parser("sync", help="Scrape completo só dos CNJs informados (sync_log tipo cnj)")
+    sync.add_argument("--cnj", action="append", required=True, dest="cnjs", metavar="CNJ",
+                      help="CNJ a atualizar (repetível)")
+    comandos.add_parser("prazos", help="Só a lista de prazos abertos e o diff (sync_log tipo prazos)")
+    backfill = comandos.add_parser(
+        "backfill-docs",
+        help="Retry dos documentos pendentes e backfill dos adiados (sync_log tipos documentos/backfill)",
+    )
+    backfill.add_argument("--cnj", action="append", dest="cnjs", metavar="CNJ",
+                          help="Só desses CNJs, incluindo os só-metadados e sem orçamento (repetível)")
+    for sub in (sync, comandos.choices["prazos"], backfill):
+        sub.add_argument("--dry-run", action="store_true",
+                         help="Mostra o que mudaria, sem baixar nem gravar")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    args = _parse_args()
+    ok = asyncio.run(run(args.tier, args.worker, args.once, args.comando,
+                         getattr(args, "cnjs", None), getattr(args, "dry_run", False)))
+    sys.exit(0 if ok else 1)
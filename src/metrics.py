@@ -0,0 +1,180 @@
+import os
+import json
+import math
+import time
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from src.config import Config
+
+
+class Metrics:
+    """
+    Timers e contadores em memória para um ciclo de sync.
+    Cada timer guarda as durações observadas (segundos) para calcular
+    p50/p95/max no resumo; contadores são somas simples.
+    """
+
+    def __init__(self):
+        self.last_summary: dict | None = None
+        self.reset()
+
+    def reset(self):
+        self.timings: dict[str, list[float]] = {}
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, float] = {}
+        self.started_at = datetime.now(timezone.utc)
+
+    def observe(self, name: str, seconds: float):
+        self.timings.setdefault(name, []).append(seconds)
+
+    def incr(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: float):
+        """Valor atual (último gravado) de um estado, ex.: limite do limitador."""
+        self.gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mede o bloco; falhas são contadas em `{name}.erros`."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.incr(f"{name}.erros")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed(self, name: str):
+        """Decorator para funções async: mede cada chamada como `name`."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def execute(self, name: str, query):
+        """Executa uma query do supabase-py medindo o tempo como `db.{name}`."""
+        with self.timer(f"db.{name}"):
+            return query.execute()
+
+    def summary(self) -> dict:
+        timings = {}
+        for name, values in sorted(self.timings.items()):
+            ordered = sorted(values)
+            timings[name] = {
+                "count": len(ordered),
+                "total": round(sum(ordered), 4),
+                "p50": round(_percentile(ordered, 50), 4),
+                "p95": round(_percentile(ordered, 95), 4),
+                "max": round(ordered[-1], 4),
+            }
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "timings": timings,
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": dict(sorted(self.gauges.items())),
+        }
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    """Percentil nearest-rank sobre lista já ordenada."""
+    if not ordered:
+        return 0.0
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+# Instância única do processo (como o client do Supabase)
+metrics = Metrics()
+
+
+def flush(sb, log_id: str | None, tipo: str):
+    """Grava o resumo do ciclo (sync_metrics e/ou JSON), exporta Prometheus
+    se configurado e zera os acumuladores para o próximo ciclo."""
+    summary = metrics.summary()
+    summary["tipo"] = tipo
+    summary["sync_log_id"] = log_id
+
+    if Config.METRICS_BACKEND in ("db", "both"):
+        try:
+            sb.table("sync_metrics").insert({
+                "sync_log_id": log_id,
+                "tipo": tipo,
+                "metrics": summary,
+            }).execute()
+        except Exception as e:
+            print(f"[METRICS] Falha ao gravar sync_metrics: {e}")
+
+    if Config.METRICS_BACKEND in ("json", "both"):
+        try:
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
+            stamp = metrics.started_at.strftime("%Y%m%dT%H%M%S")
+            path = os.path.join(Config.METRICS_DIR, f"sync_{tipo}_{stamp}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"[METRICS] Falha ao gravar JSON: {e}")
+
+    if Config.METRICS_PROM_FILE:
+        try:
+            write_prometheus(summary, Config.METRICS_PROM_FILE)
+        except Exception as e:
+            print(f"[METRICS] Falha ao exportar Prometheus: {e}")
+
+    _print_summary(summary)
+    metrics.last_summary = summary
+    metrics.reset()
+    return summary
+
+
+def write_prometheus(summary: dict, path: str):
+    """Exporta o resumo no formato textfile do node_exporter (escrita atômica)."""
+    tipo = summary.get("tipo", "")
+    lines = [
+        "# TYPE eproc_stage_seconds summary",
+    ]
+    for name, t in summary["timings"].items():
+        labels = f'stage="{name}",tipo="{tipo}"'
+        lines.append(f'eproc_stage_seconds{{{labels},quantile="0.5"}} {t["p50"]}')
+        lines.append(f'eproc_stage_seconds{{{labels},quantile="0.95"}} {t["p95"]}')
+        lines.append(f'eproc_stage_seconds{{{labels},quantile="1"}} {t["max"]}')
+        lines.append(f"eproc_stage_seconds_sum{{{labels}}} {t['total']}")
+        lines.append(f"eproc_stage_seconds_count{{{labels}}} {t['count']}")
+    lines.append("# TYPE eproc_events_total counter")
+    for name, value in summary["counters"].items():
+        lines.append(f'eproc_events_total{{name="{name}",tipo="{tipo}"}} {value}')
+    lines.append("# TYPE eproc_state gauge")
+    for name, value in summary.get("gauges", {}).items():
+        lines.append(f'eproc_state{{name="{name}",tipo="{tipo}"}} {value}')
+    lines.append("# TYPE eproc_last_run_timestamp_seconds gauge")
+    lines.append(f'eproc_last_run_timestamp_seconds{{tipo="{tipo}"}} {time.time():.0f}')
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def _print_summary(summary: dict):
+    if not summary["timings"]:
+        return
+    print("\n[METRICS] etapa                              n     p50     p95     max   total")
+    for name, t in summary["timings"].items():
+        print(f"[METRICS] {name:<32} {t['count']:>5} {t['p50']:>7.2f} {t['p95']:>7.2f} {t['max']:>7.2f} {t['total']:>7.1f}")
+    gauges = summary.get("gauges", {})
+    if "limitador.limite" in gauges:
+        estado = ["fechado", "sonda", "aberto"][int(gauges.get("limitador.disjuntor", 0))]
+        print(f"[METRICS] limitador: limite {gauges['limitador.limite']} | latência "
+              f"{gauges.get('limitador.latencia_ewma', 0):.2f}s | erros {gauges.get('limitador.taxa_erro', 0):.0%} | "
+              f"disjuntor {estado} ({summary['counters'].get('limitador.disjuntor_aberto', 0)} aberturas)")
+    antes = summary["counters"].get("pdf_otimizar.bytes_antes", 0)
+    if antes:
+        depois = summary["counters"].get("pdf_otimizar.bytes_depois", antes)
+        print(f"[METRICS] pdf_otimizar: {antes / 1e6:.1f} MB -> {depois / 1e6:.1f} MB "
+              f"(-{(antes - depois) / 1e6:.1f} MB, {(antes - depois) * 100 / antes:.0f}%)")
@@ -0,0 +1,145 @@
+"""
+Otimização de PDFs entre download_document e upload_document (PDF_OTIMIZAR=true).
+
+- sem perda: recompressão dos streams, object streams, imagens repetidas
+  (logos, carimbos) deduplicadas e recursos não usados removidos;
+- imagens acima de PDF_OTIMIZAR_DPI são reamostradas (JPEG).
+
+Roda num ProcessPoolExecutor para não bloquear o event loop. O hash_sha256 do
+resultado continua sendo o do arquivo original (identidade do documento no
+eProc); tamanho_bytes passa a ser o do arquivo enviado ao Storage.
+"""
+import os
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from src.config import Config
+from src.metrics import metrics
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, Config.PDF_OTIMIZAR_WORKERS))
+    return _executor
+
+
+async def otimizar_pdf(doc_result: dict) -> dict:
+    """Otimiza o PDF de `doc_result` no lugar (se valer a pena). Nunca falha o download."""
+    path = doc_result["local_path"]
+    if (not Config.PDF_OTIMIZAR or not path.endswith(".pdf")
+            or doc_result["tamanho_bytes"] < Config.PDF_OTIMIZAR_MIN_BYTES):
+        return doc_result
+
+    loop = asyncio.get_running_loop()
+    try:
+        with metrics.timer("pdf_otimizar"):
+            antes, depois = await loop.run_in_executor(
+                _get_executor(), otimizar_arquivo, path,
+                Config.PDF_OTIMIZAR_DPI, Config.PDF_OTIMIZAR_JPEG_QUALIDADE,
+            )
+    except Exception as e:
+        print(f"    [pdf] otimização falhou, enviando original: {e}")
+        return doc_result
+
+    metrics.incr("pdf_otimizar.bytes_antes", antes)
+    metrics.incr("pdf_otimizar.bytes_depois", depois)
+    if depois < antes:
+        print(f"    [pdf] {antes} -> {depois} bytes (-{(antes - depois) * 100 // antes}%)")
+    return doc_result | {"tamanho_bytes": depois}
+
+
+def otimizar_arquivo(path: str, max_dpi: float = 0, jpeg_qualidade: int = 80) -> tuple[int, int]:
+    """Reescreve `path` otimizado se ficar menor. Retorna (bytes antes, bytes depois)."""
+    import pikepdf
+
+    antes = os.path.getsize(path)
+    tmp = f"{path}.otim"
+    with pikepdf.open(path) as pdf:
+        _dedup_imagens(pdf)
+        if max_dpi > 0:
+            _reamostrar_imagens(pdf, max_dpi, jpeg_qualidade)
+        pdf.remove_unreferenced_resources()
+        pdf.save(
+            tmp,
+            compress_streams=True,
+            recompress_flate=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+        )
+
+    depois = os.path.getsize(tmp)
+    if depois < antes:
+        os.replace(tmp, path)
+        return antes, depois
+    os.remove(tmp)
+    return antes, antes
+
+
+def _imagens(page):
+    """(nome, objeto) das imagens no /XObject da página."""
+    import pikepdf
+
+    xobjects = page.obj.get("/Resources", {}).get("/XObject", {})
+    for nome, obj in list(xobjects.items()):
+        if isinstance(obj, pikepdf.Stream) and obj.get("/Subtype") == pikepdf.Name.Image:
+            yield xobjects, nome, obj
+
+
+def _dedup_imagens(pdf):
+    """Aponta imagens com bytes idênticos para um único objeto; as cópias somem no save."""
+    vistas: dict[str, object] = {}
+    for page in pdf.pages:
+        for xobjects, nome, obj in _imagens(page):
+            h = hashlib.sha256(obj.read_raw_bytes())
+            h.update(repr(sorted((k, str(v)) for k, v in obj.items())).encode())
+            chave = h.hexdigest()
+            if chave not in vistas:
+                vistas[chave] = obj
+            elif vistas[chave].objgen != obj.objgen:
+                xobjects[nome] = vistas[chave]
+
+
+def _reamostrar_imagens(pdf, max_dpi: float, qualidade: int):
+    """
+    Reduz imagens 8 bits (RGB/cinza) acima de `max_dpi`. O DPI é estimado pela
+    largura da página — bom para digitalizações, que ocupam a página inteira.
+    Imagens 1 bit (CCITT/JBIG2) e com transparência ficam como estão.
+    """
+    import io
+    import pikepdf
+    from PIL import Image
+
+    feitas = set()
+    for page in pdf.pages:
+        largura_pol = float(page.mediabox[2] - page.mediabox[0]) / 72
+        if largura_pol <= 0:
+            continue
+        for _, _, obj in _imagens(page):
+            if obj.objgen in feitas:
+                continue
+            feitas.add(obj.objgen)
+            if obj.get("/BitsPerComponent") != 8 or "/SMask" in obj or "/Mask" in obj:
+                continue
+            if obj.get("/ColorSpace") not in (pikepdf.Name.DeviceRGB, pikepdf.Name.DeviceGray):
+                continue
+            dpi = int(obj.Width) / largura_pol
+            if dpi <= max_dpi:
+                continue
+
+            img = pikepdf.PdfImage(obj).as_pil_image()
+            escala = max_dpi / dpi
+            img = img.resize((max(1, round(img.width * escala)), max(1, round(img.height * escala))),
+                             Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=qualidade, optimize=True)
+            data = buf.getvalue()
+            if len(data) >= len(obj.read_raw_bytes()):
+                continue
+            obj.write(data, filter=pikepdf.Name.DCTDecode)
+            obj.Width, obj.Height = img.width, img.height
+            obj.ColorSpace = pikepdf.Name.DeviceGray if img.mode == "L" else pikepdf.Name.DeviceRGB
+            obj.BitsPerComponent = 8
+            if "/DecodeParms" in obj:
+                del obj.DecodeParms
@@ -0,0 +1,77 @@
+"""
+Política de download dos documentos de eventos novos (DOCS_POLITICA).
+
+Com "niveis" (padrão) cada documento tem um de três destinos no scrape:
+- baixar: na hora, junto com o evento — eventos com prazo aberto (e o evento a
+  que eles se referem), URGENTE ou dos últimos DOCS_RECENTES_DIAS dias;
+- adiar: a linha entra em documentos com status "adiado", sem arquivo, e o
+  backfill (sync.backfill_documentos) baixa depois do trabalho urgente do
+  ciclo, dentro de DOCS_BACKFILL_MAX_MB / DOCS_BACKFILL_MAX_MIN;
+- metadados: só a linha (status "metadados") — nomes que começam com um dos
+  DOCS_METADADOS_NOMES ou eventos mais antigos que DOCS_METADADOS_DIAS. Só é
+  baixado sob demanda (solicitar_documentos / backfill com --cnj).
+
+Com "todos" tudo é baixado na hora, como antes.
+"""
+from datetime import datetime, timedelta, timezone
+from src.config import Config
+
+BAIXAR, ADIAR, METADADOS = "baixar", "adiar", "metadados"
+
+# Status em documentos.status
+DISPONIVEL = "disponivel"
+STATUS = {ADIAR: "adiado", METADADOS: "metadados"}
+
+
+def _data(evento: dict) -> datetime | None:
+    try:
+        data = datetime.fromisoformat(evento["data_hora"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return data if data.tzinfo else data.replace(tzinfo=timezone.utc)
+
+
+def eventos_urgentes(eventos: list[dict]) -> set[int]:
+    """Eventos com prazo aberto ou URGENTE, mais os eventos a que os de prazo
+    aberto se referem (a decisão intimada costuma estar no evento referido)."""
+    urgentes = set()
+    for e in eventos:
+        if e.get("prazo_aberto") or e.get("urgente"):
+            urgentes.add(e["numero"])
+            if e.get("prazo_aberto") and e.get("evento_referencia"):
+                urgentes.add(e["evento_referencia"])
+    return urgentes
+
+
+def eventos_prioritarios(eventos: list[dict], agora: datetime | None = None) -> set[int]:
+    """Números dos eventos cujos documentos são baixados na hora: urgentes e dos
+    últimos DOCS_RECENTES_DIAS dias. Recebe os eventos lidos, não só os novos,
+    para seguir evento_referencia: no modo incremental são os novos mais o resumo
+    (resumo_evento) dos já gravados da página padrão; os gravados mais antigos só
+    entram nos dias de verificação completa."""
+    if Config.DOCS_POLITICA == "todos":
+        return {e["numero"] for e in eventos}
+    agora = agora or datetime.now(timezone.utc)
+    recentes = agora - timedelta(days=Config.DOCS_RECENTES_DIAS)
+    prioritarios = eventos_urgentes(eventos)
+    for e in eventos:
+        data = _data(e)
+        if data is None or data >= recentes:
+            prioritarios.add(e["numero"])
+    return prioritarios
+
+
+def destino(evento: dict, doc: dict, prioritarios: set[int], agora: datetime | None = None) -> str:
+    """BAIXAR, ADIAR ou METADADOS para um documento de `evento`."""
+    if Config.DOCS_POLITICA == "todos":
+        return BAIXAR
+    nome = (doc.get("nome") or "").upper()
+    if any(nome.startswith(p) for p in Config.DOCS_METADADOS_NOMES):
+        return METADADOS
+    if evento["numero"] in prioritarios:
+        return BAIXAR
+    data = _data(evento)
+    agora = agora or datetime.now(timezone.utc)
+    if Config.DOCS_METADADOS_DIAS and data is not None and data < agora - timedelta(days=Config.DOCS_METADADOS_DIAS):
+        return METADADOS
+    return ADIAR
@@ -0,0 +1,212 @@
+import math
+import random
+import asyncio
+from dataclasses import dataclass
+from playwright.async_api import Playwright
+from src.config import Config
+from src.accounts import Account, load_accounts
+from src.browser import SessionPool, Sessoes
+from src.db import changes
+from src.db.client import get_supabase, selecionar_tudo
+from src.proxies import ProxyPool
+from src.db.sync import (
+    sync_prazos, sync_processos, sync_cnjs, enfileirar_processos, finalizar_filas, retentar_documentos,
+    backfill_documentos,
+)
+from src import webhook
+
+
+@dataclass
+class Tier:
+    name: str
+    interval: float      # segundos entre execuções
+    jitter: float        # ± segundos aleatórios somados ao intervalo
+    concurrency: int     # abas simultâneas que o tier pode usar
+
+    def next_delay(self) -> float:
+        return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+
+def default_tiers() -> dict[str, Tier]:
+    return {
+        "prazos": Tier(
+            "prazos",
+            Config.PRAZOS_INTERVAL_MIN * 60,
+            Config.PRAZOS_JITTER_SEC,
+            Config.PRAZOS_CONCURRENCY,
+        ),
+        "processos": Tier(
+            "processos",
+            Config.PROCESSOS_INTERVAL_MIN * 60,
+            Config.PROCESSOS_JITTER_SEC,
+            Config.PROCESSOS_CONCURRENCY,
+        ),
+    }
+
+
+class Scheduler:
+    """
+    Agenda dois tiers sobre as sessões logadas de uma ou mais contas:
+    - prazos: lista de prazos abertos + diff, a cada poucos minutos (barato)
+    - processos: scrape completo de uma fatia dos processos por execução,
+      dimensionada para que todos sejam atualizados dentro de
+      PROCESSOS_REFRESH_HOURS — a carga no eProc fica distribuída no dia.
+
+    Cada conta tem o seu BrowserContext dentro de um único Chromium. Processos
+    vistos por várias contas são scrapeados uma vez só; MAX_TABS limita as
+    abas simultâneas somando todas as contas. Com um pool de proxies (PROXIES)
+    cada conta tem uma sessão por proxy ativo e cada processo vai para o proxy
+    mais saudável; os que falham são trocados no ciclo seguinte.
+
+    Com FILA_PROCESSOS=true o scheduler vira coordenador: o tier de processos
+    só publica o lote em fila_processos (workers em outros containers fazem o
+    scrape) e cada execução fecha os sync_log dos lotes já concluídos.
+
+    Todo ciclo do tier de processos termina com o retry dos documentos que
+    falharam antes (documentos_pendentes), baixados sem reabrir o processo, e
+    com o backfill dos documentos que a política de download adiou (dentro do
+    orçamento DOCS_BACKFILL_MAX_MB / DOCS_BACKFILL_MAX_MIN). Os solicitados sob
+    demanda (solicitar_documentos) são baixados já no fim do tier de prazos.
+    """
+
+    def __init__(self, p: Playwright, proxies: ProxyPool, tiers: dict[str, Tier] | None = None,
+                 accounts: list[Account] | None = None):
+        self.tiers = tiers or default_tiers()
+        self.pool = SessionPool(p, proxies, accounts or load_accounts())
+        # Os tiers compartilham as mesmas sessões: execuções serializadas
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max(1, Config.MAX_TABS))
+        # Último snapshot da lista de prazos (proc_href de cada CNJ, por conta)
+        self._eproc: dict[str, list[dict]] = {}
+
+    @property
+    def sessions(self) -> Sessoes:
+        return self.pool.sessions
+
+    async def close(self):
+        await self.pool.reset()
+
+    async def run_tier(self, name: str) -> bool:
+        """Executa um tier uma única vez (usado pelo loop e pela CLI)."""
+        if name not in self.tiers:
+            raise ValueError(f"Tier desconhecido: {name}")
+        etapa = self._tier_prazos if name == "prazos" else self._run_processos
+        return await self._executar(f"tier {name}", etapa)
+
+    async def run_once(self) -> bool:
+        """Um ciclo de cada tier (prazos e depois processos) e sai."""
+        ok = await self.run_tier("prazos")
+        return await self.run_tier("processos") and ok
+
+    async def run_prazos(self, dry_run: bool = False) -> bool:
+        """Só a lista de prazos (CLI `prazos`). Com `dry_run`, só o diff."""
+        if not dry_run:
+            return await self.run_tier("prazos")
+        return await self._executar("prazos", lambda: sync_prazos(
+            list(self.sessions.values()), self.tiers["prazos"].concurrency, self._slots, dry_run=True),
+            dry_run=True)
+
+    async def run_cnjs(self, cnjs: list[str], dry_run: bool = False) -> bool:
+        """Scrape completo só dos CNJs informados (CLI `sync --cnj`)."""
+        tier = self.tiers["processos"]
+        return await self._executar("sync", lambda: sync_cnjs(
+            self.sessions, cnjs, tier.concurrency, self._slots, dry_run), dry_run)
+
+    async def run_backfill(self, cnjs: list[str] | None = None, dry_run: bool = False) -> bool:
+        """Fila de documentos (CLI `backfill-docs`): retry dos pendentes vencidos e
+        backfill dos adiados. Com `cnjs`, tudo o que falta deles, sem orçamento."""
+        async def _etapa():
+            await retentar_documentos(self.sessions, self._slots, dry_run)
+            await backfill_documentos(self.sessions, self._slots, cnjs, dry_run=dry_run)
+        return await self._executar("backfill-docs", _etapa, dry_run)
+
+    async def _executar(self, nome: str, etapa, dry_run: bool = False) -> bool:
+        """Roda `etapa` com as sessões prontas; False se falhou. Fora do dry-run
+        fecha os lotes da fila antes e publica as mudanças depois."""
+        async with self._lock:
+            ok = True
+            try:
+                if Config.FILA_PROCESSOS and not dry_run:
+                    finalizar_filas()
+                await self.pool.ensure()
+                await etapa()
+            except Exception as e:
+                ok = False
+                print(f"[SCHED] Falha no {nome}: {e}")
+                # Sessões podem ter expirado/caído: recriar na próxima execução
+                await self.pool.reset()
+            # Fora do try do tier: falha no webhook não derruba as sessões
+            if not dry_run:
+                await asyncio.to_thread(self._publicar_mudancas)
+            return ok
+
+    def _publicar_mudancas(self):
+        """Envia as mudanças novas ao webhook (se configurado) e expira as antigas."""
+        try:
+            webhook.despachar()
+            removidas = changes.purgar(get_supabase(), Config.SYNC_CHANGES_RETENCAO_DIAS)
+            if removidas:
+                print(f"[SCHED] sync_changes: {removidas} mudanças antigas removidas")
+        except Exception as e:
+            print(f"[SCHED] Falha ao publicar mudanças: {e}")
+
+    async def _run_prazos(self):
+        self._eproc, _ = await sync_prazos(list(self.sessions.values()), self.tiers["prazos"].concurrency,
+                                           self._slots)
+
+    async def _tier_prazos(self):
+        await self._run_prazos()
+        await backfill_documentos(self.sessions, self._slots, apenas_solicitados=True)
+
+    async def _run_processos(self):
+        if not self._eproc:
+            # Sem snapshot (ex: execução avulsa): buscar a lista antes
+            await self._run_prazos()
+        batch = self._select_batch()
+        tier = self.tiers["processos"]
+        if not batch:
+            print("[SCHED] Nenhum processo a atualizar neste ciclo")
+        else:
+            print(f"[SCHED] Tier processos: {len(batch)}/{len(self._eproc)} processos neste ciclo")
+            if Config.FILA_PROCESSOS:
+                await enfileirar_processos(self._eproc, batch)
+            else:
+                await sync_processos(self.sessions, self._eproc, batch, tier.concurrency, self._slots)
+        # Documentos que falharam em ciclos anteriores (só os com retry vencido)
+        await retentar_documentos(self.sessions, self._slots)
+        # Trabalho urgente feito: documentos adiados, dentro do orçamento
+        await backfill_documentos(self.sessions, self._slots)
+
+    def _select_batch(self) -> list[str]:
+        """Fatia de CNJs para o ciclo atual: nunca scrapeados primeiro, depois
+        os de last_synced_at mais antigo. Tamanho = total / ciclos por janela."""
+        sb = get_supabase()
+        rows = selecionar_tudo("processos.lote", lambda: sb.table("processos")
+                               .select("cnj,last_synced_at")
+                               .order("last_synced_at", nullsfirst=True)
+                               .order("cnj"))
+        ordered = [r["cnj"] for r in rows if r["cnj"] in self._eproc]
+        never = sum(1 for r in rows if r["cnj"] in self._eproc and not r["last_synced_at"])
+
+        tier = self.tiers["processos"]
+        runs_per_window = max(1.0, Config.PROCESSOS_REFRESH_HOURS * 3600 / max(tier.interval, 1))
+        quota = math.ceil(len(ordered) / runs_per_window)
+        return ordered[:max(quota, never)]
+
+    async def _loop(self, tier: Tier, initial_delay: float = 0.0):
+        await asyncio.sleep(initial_delay)
+        while True:
+            await self.run_tier(tier.name)
+            delay = tier.next_delay()
+            print(f"\n[SCHED] Tier {tier.name}: próximo em {delay / 60:.1f} min")
+            await asyncio.sleep(delay)
+
+    async def run_forever(self):
+        prazos = self.tiers["prazos"]
+        processos = self.tiers["processos"]
+        # O tier de processos começa logo após o primeiro ciclo de prazos
+        # (o lock serializa), com jitter para não alinhar os dois tiers.
+        await asyncio.gather(
+            self._loop(prazos),
+            self._loop(processos, initial_delay=random.uniform(0, processos.jitter)),
+        )
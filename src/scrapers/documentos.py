@@ -1,8 +1,12 @@
 import os
+import time
 import hashlib
 from uuid import uuid4
 from playwright.async_api import BrowserContext, Download
 from src.config import Config
+from src.metrics import metrics
+from src.limitador import limitador
+from src.scrapers.render import capture_html, render_pool
 
 # Timeouts generosos para proxy lento com documentos grandes
 _GOTO_TIMEOUT = 120_000       # 2 min para navegar
@@ -55,6 +59,11 @@ def _sha256_file(filepath: str) -> str:
     return h.hexdigest()
 
 
+def _record(strategy: str, t0: float):
+    """Registra duração total do download, rotulada pela estratégia que funcionou."""
+    metrics.observe(f"download_document.{strategy}", time.perf_counter() - t0)
+
+
 def _build_result(temp_path: str, tipo: str = "PDF") -> dict:
     return {
         "local_path": temp_path,
@@ -64,10 +73,21 @@ def _build_result(temp_path: str, tipo: str = "PDF") -> dict:
     }
 
 
-async def download_document(context: BrowserContext, url_eproc: str) -> dict | None:
+async def download_document(context: BrowserContext, url_eproc: str,
+                            defer_render: bool = False) -> dict | None:
+    """Download de um documento sob o limitador (só erros contam: o tempo
+    depende do tamanho do arquivo). Ver _download_document."""
+    async with limitador.requisicao("documento", medir_latencia=False, via=context) as req:
+        return await _download_document(context, url_eproc, defer_render, req)
+
+
+async def _download_document(context: BrowserContext, url_eproc: str,
+                             defer_render: bool, req) -> dict | None:
     """
     Faz download de um documento do eProc.
     Retorna {local_path, tipo, tamanho_bytes, hash_sha256} ou None se falhar.
+    Com `defer_render`, documentos HTML do sistema voltam como {tipo, html}
+    e o PDF fica para render_document (a aba já foi liberada).
 
     Suporta PDF, imagens, vídeo, áudio e outros formatos.
 
@@ -76,8 +96,9 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
     2. Botão de download no PDF viewer do eProc (canto superior direito)
     3. Extrair URL do conteúdo embedded (embed/iframe/object src)
     4. Link direto para download na página
-    5. Documento HTML do sistema → renderizar para PDF
+    5. Documento HTML do sistema → capturar HTML e renderizar no render pool
     """
+    t0 = time.perf_counter()
     full_url = f"{Config.EPROC_BASE_URL}/eproc/{url_eproc}"
     doc_page = await context.new_page()
     temp_id = str(uuid4())
@@ -92,6 +113,7 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
             await download.save_as(temp_path)
             temp_path, tipo = _detect_and_rename(temp_path, temp_id)
             print(f"    [download direto] {tipo}")
+            _record("direto", t0)
             await doc_page.close()
             return _build_result(temp_path, tipo)
         except Exception:
@@ -129,6 +151,7 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
                 await download.save_as(temp_path)
                 temp_path, tipo = _detect_and_rename(temp_path, temp_id)
                 print(f"    [botao download] {tipo}")
+                _record("botao", t0)
                 await doc_page.close()
                 return _build_result(temp_path, tipo)
             except Exception as e:
@@ -166,6 +189,7 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
                         with open(final_path, "wb") as f:
                             f.write(body)
                         print(f"    [embed src] {label}")
+                        _record("embed", t0)
                         await doc_page.close()
                         return _build_result(final_path, tipo)
 
@@ -183,47 +207,40 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
                 await download.save_as(temp_path)
                 temp_path, tipo = _detect_and_rename(temp_path, temp_id)
                 print(f"    [link download] {tipo}")
+                _record("link", t0)
                 await doc_page.close()
                 return _build_result(temp_path, tipo)
             except Exception:
                 pass
 
         # === Tentativa 5: Documento HTML do sistema (certidões, mandados, despachos) ===
+        # A aba só captura o HTML limpo; o PDF sai do render pool (src/scrapers/render.py)
         content_area = doc_page.locator("#divInfraAreaTelaD, #divDocumento, .infraAreaTelaD, body")
         if await content_area.first.count() > 0:
-            await doc_page.evaluate("""
-                () => {
-                    const hide = ['#divInfraBarraNavegacao', '#divInfraBarraSistema',
-                                  '#divInfraBarraComandosSuperior', '#divInfraBarraLocalizacao',
-                                  '.infraBarraComandos', '#divInfraAreaMenu', 'header', 'nav',
-                                  '#fldAnexos', '#divInfraBarraComandosInferior'];
-                    hide.forEach(sel => {
-                        document.querySelectorAll(sel).forEach(el => el.style.display = 'none');
-                    });
-                }
-            """)
-            pdf_path = os.path.join(Config.TEMP_DIR, f"{temp_id}.pdf")
-            await doc_page.pdf(
-                path=pdf_path,
-                format="A4",
-                print_background=True,
-                margin={"top": "1cm", "bottom": "1cm", "left": "1cm", "right": "1cm"},
-            )
-            print(f"    [html->pdf]")
+            html = await capture_html(doc_page)
             await doc_page.close()
-            # Limpar .bin temporário se existir
             if os.path.exists(temp_path):
                 os.remove(temp_path)
-            return _build_result(pdf_path, tipo="HTML")
+            if defer_render:
+                print(f"    [html capturado]")
+                _record("html", t0)
+                return {"tipo": "HTML", "html": html}
+            result = await render_document(context, html, temp_id)
+            print(f"    [html->pdf]")
+            _record("html_pdf", t0)
+            return result
 
         print(f"    [FALHA] Nenhum método de download funcionou")
         print(f"    URL: {full_url}")
         print(f"    Título: {await doc_page.title()}")
+        _record("falha", t0)
         await doc_page.close()
         return None
 
     except Exception as e:
         print(f"[DOC] Erro ao baixar documento: {e}")
+        req.erro = True
+        _record("erro", t0)
         try:
             await doc_page.close()
         except Exception:
@@ -233,6 +250,13 @@ async def download_document(context: BrowserContext, url_eproc: str) -> dict | N
         return None
 
 
+async def render_document(context: BrowserContext, html: str, temp_id: str | None = None) -> dict:
+    """Renderiza no render pool o HTML capturado pela tentativa 5."""
+    pdf_path = os.path.join(Config.TEMP_DIR, f"{temp_id or uuid4()}.pdf")
+    await render_pool.render(html, pdf_path, context)
+    return _build_result(pdf_path, tipo="HTML")
+
+
 def _detect_and_rename(filepath: str, temp_id: str) -> tuple[str, str]:
     """Detecta formato do arquivo e renomeia com extensão correta.
     Retorna (novo_path, tipo)."""
@@ -0,0 +1,246 @@
+"""
+Engine HTTP do scraper (SCRAPER_ENGINE=http).
+
+Depois do login no Playwright, os cookies do BrowserContext vão para um
+httpx.AsyncClient com pool de conexões e a lista de prazos e as páginas dos
+processos são baixadas direto, sem renderizar, e parseadas com lxml
+(src/scrapers/offline.py). Login e download de documentos continuam no browser.
+
+Qualquer coisa fora do esperado — sessão expirada (redirect para o login),
+tabela ausente, total de registros que não bate, expansão que só existe em
+JavaScript ("e outros", "Carregar TODOS os eventos" sem URL) — levanta
+HtmlInesperado e o chamador refaz aquela página pelo Playwright.
+"""
+import re
+from urllib.parse import urljoin, urlsplit
+import httpx
+from playwright.async_api import BrowserContext, Page
+from src.config import Config
+from src.metrics import metrics
+from src.limitador import limitador
+from src import snapshots
+from src.scrapers import offline
+from src.scrapers.parsing import MAX_PAGES, collect_rows, eventos_alcancam, parse_registros
+
+_CARREGAR_TODOS_XP = "//a[contains(., 'Carregar TODOS os eventos')]"
+_E_OUTROS_XP = "//*[@id='tblPartesERepresentantes']//a[contains(., 'e outros')]"
+_PROXIMA_XP = "//a[starts-with(@id, 'lnkInfraProximaPagina') or contains(@id, 'ProximaPagina')]"
+_PAGINA_ATUAL_XP = "//input[@type='hidden' and contains(@id, 'PaginaAtual')]"
+_OCULTO_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+
+
+class HtmlInesperado(Exception):
+    """Página fora do formato esperado pela engine HTTP: refazer pelo Playwright."""
+
+
+def _proxy_url(proxy: dict | None) -> str | None:
+    if not proxy:
+        return None
+    if not proxy.get("username"):
+        return proxy["server"]
+    partes = urlsplit(proxy["server"])
+    return f"{partes.scheme}://{proxy['username']}:{proxy.get('password', '')}@{partes.netloc}"
+
+
+class EprocHttp:
+    """Cliente HTTP com os cookies da sessão logada de uma conta."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+
+    @classmethod
+    async def from_context(cls, context: BrowserContext, page: Page | None = None,
+                           proxy: dict | None = None) -> "EprocHttp":
+        cookies = httpx.Cookies()
+        for c in await context.cookies():
+            cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        headers = {"Accept-Language": "pt-BR,pt;q=0.9"}
+        if page is not None:
+            headers["User-Agent"] = await page.evaluate("navigator.userAgent")
+        client = httpx.AsyncClient(
+            cookies=cookies,
+            headers=headers,
+            proxy=_proxy_url(proxy),
+            follow_redirects=True,
+            timeout=Config.HTTP_TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=Config.HTTP_CONEXOES,
+                                max_keepalive_connections=Config.HTTP_CONEXOES),
+        )
+        return cls(client)
+
+    @staticmethod
+    def url(href: str) -> str:
+        """URL absoluta de um href relativo a /eproc/ (como os links do eProc)."""
+        return urljoin(f"{Config.EPROC_BASE_URL}/eproc/", href)
+
+    async def get(self, href: str) -> tuple[str, str]:
+        """(url final, html). Levanta HtmlInesperado se a sessão caiu ou status != 200."""
+        with metrics.timer("http.get"):
+            resp = await self._enviar("GET", href)
+        return self._verificar(resp)
+
+    async def post(self, href: str, dados: dict) -> tuple[str, str]:
+        with metrics.timer("http.post"):
+            resp = await self._enviar("POST", href, data=dados)
+        return self._verificar(resp)
+
+    async def _enviar(self, metodo: str, href: str, **kwargs) -> httpx.Response:
+        try:
+            async with limitador.requisicao("http", via=self) as req:
+                resp = await self.client.request(metodo, self.url(href), **kwargs)
+                req.status(resp.status_code)
+                return resp
+        except httpx.HTTPError as e:
+            raise HtmlInesperado(f"falha de rede: {e!r}") from e
+
+    @staticmethod
+    def _verificar(resp: httpx.Response) -> tuple[str, str]:
+        metrics.incr("http.bytes", len(resp.content))
+        url = str(resp.url)
+        if "keycloak" in url or "/login" in url:
+            raise HtmlInesperado(f"sessão expirada (redirecionado para {url})")
+        if resp.status_code != 200:
+            raise HtmlInesperado(f"HTTP {resp.status_code} em {url}")
+        return url, resp.text
+
+    async def close(self):
+        try:
+            await self.client.aclose()
+        except Exception:
+            pass
+
+
+def _oculto(el) -> bool:
+    """Equivalente estático do is_visible(): style/hidden no elemento ou ancestrais."""
+    while el is not None:
+        if el.get("hidden") is not None or _OCULTO_RE.search(el.get("style") or ""):
+            return True
+        el = el.getparent()
+    return False
+
+
+async def _proxima_pagina(http: EprocHttp, doc, url: str) -> tuple[str, str] | None:
+    """Próxima página da listagem: segue o href do link ou, quando o link é só
+    JavaScript (infraAcaoPaginar), reenvia o formulário com a página seguinte
+    em hdnInfraPaginaAtual. None na última página."""
+    links = [a for a in doc.xpath(_PROXIMA_XP) if not _oculto(a)]
+    if not links:
+        return None
+    href = (links[0].get("href") or "").strip()
+    if href and not href.startswith(("#", "javascript")):
+        return await http.get(urljoin(url, href))
+
+    campos = doc.xpath(_PAGINA_ATUAL_XP)
+    form = campos[0].xpath("ancestor::form[1]") if campos else []
+    if not form:
+        raise HtmlInesperado("paginação só em JavaScript, sem formulário infra")
+    form = form[0]
+    dados = dict(form.form_values())
+    nome = campos[0].get("name") or campos[0].get("id")
+    dados[nome] = str(int(campos[0].get("value") or 0) + 1)
+    return await http.post(urljoin(url, form.get("action") or url), dados)
+
+
+@metrics.timed("http.scrape_prazos")
+async def scrape_prazos_http(http: EprocHttp, info: dict | None = None) -> dict[str, list[dict]]:
+    """
+    Mesmo resultado de scrape_prazos_abertos (inclusive `info` e snapshots),
+    baixando as páginas da listagem por HTTP. Levanta HtmlInesperado se a lista
+    não puder ser lida por completo — o chamador refaz pelo browser.
+    """
+    info = info if info is not None else {}
+    info.update({"paginas": 0, "linhas": 0, "registros_esperados": None, "completo": False})
+
+    print("[PRAZOS] (http) Painel do advogado...")
+    _, html = await http.get("controlador.php?acao=painel_adv_listar")
+    links = offline.documento(html).xpath("//a[contains(@href, 'citacao_intimacao_prazo_aberto_listar')]")
+    if not links:
+        raise HtmlInesperado("link de prazos abertos não encontrado no painel")
+    url, html = await http.get(links[0].get("href"))
+
+    processos = {}
+    seen_pages = set()
+    execucao = snapshots.carimbo()
+    while info["paginas"] < MAX_PAGES:
+        doc = offline.documento(html)
+        data = offline.parse_prazos_doc(doc)
+        if not data:
+            if info["paginas"] == 0:
+                raise HtmlInesperado("tabela principal não encontrada")
+            break
+
+        signature = tuple(r["cells"][1] for r in data["rows"] if len(r["cells"]) >= 5)[:3]
+        if signature in seen_pages:
+            break
+        seen_pages.add(signature)
+
+        info["paginas"] += 1
+        if Config.SNAPSHOTS:
+            try:
+                snapshots.salvar_prazos(info.get("conta", ""), execucao, info["paginas"], html)
+            except Exception as e:
+                print(f"[PRAZOS] Falha ao gravar snapshot da página {info['paginas']}: {e}")
+        if info["registros_esperados"] is None:
+            info["registros_esperados"] = parse_registros(data["caption"])
+        collect_rows(data["rows"], processos, info)
+
+        proxima = await _proxima_pagina(http, doc, url)
+        if proxima is None:
+            info["completo"] = True
+            break
+        url, html = proxima
+
+    esperado = info["registros_esperados"]
+    if esperado is not None and info["linhas"] != esperado:
+        raise HtmlInesperado(f"{info['linhas']} prazos lidos, eProc informa {esperado} registros")
+
+    total_prazos = sum(len(v) for v in processos.values())
+    print(f"[PRAZOS] (http) {len(processos)} processos extraidos ({total_prazos} prazos no total, "
+          f"{info['paginas']} páginas)")
+    return processos
+
+
+def analisar_processo(html: str, since_numero: int | None = None) -> dict:
+    """
+    Valida e parseia a página do processo baixada por HTTP (roda no pool de
+    parsing). Devolve {erro, carregar_todos, header, assuntos, partes, eventos}:
+    `carregar_todos` é o href do link "Carregar TODOS os eventos" quando ele é
+    uma URL de verdade (a engine baixa e reanalisa); `erro` ≠ None = usar o browser.
+    Com `since_numero` os eventos acima dele vêm completos e os já gravados da
+    página só como resumo_evento; o link é ignorado se a página já chega até
+    ele (eventos_alcancam).
+    """
+    doc = offline.documento(html)
+    if not doc.xpath("//*[@id='divCapaProcesso']") or not doc.xpath("//*[@id='tblEventos']"):
+        return {"erro": "capa ou tabela de eventos ausente"}
+    if doc.xpath(_E_OUTROS_XP):
+        return {"erro": "partes recolhidas ('e outros')"}
+
+    carregar_todos = None
+    alcanca = eventos_alcancam(offline.numeros_eventos(doc), since_numero)
+    for a in ([] if alcanca else doc.xpath(_CARREGAR_TODOS_XP)):
+        href = (a.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript")):
+            return {"erro": "'Carregar TODOS os eventos' só em JavaScript"}
+        carregar_todos = href
+    return {"erro": None, "carregar_todos": carregar_todos, **offline.parse_processo_doc(doc, since_numero)}
+
+
+@metrics.timed("http.processo")
+async def fetch_processo_http(http: EprocHttp, proc_href: str,
+                              since_numero: int | None = None) -> tuple[str, dict]:
+    """(html, {header, assuntos, partes, eventos}) da página do processo por
+    HTTP, com todos os eventos (ou, com `since_numero`, os acima dele e o resumo
+    dos já gravados da página, sem baixar a página completa se a inicial já
+    chega até ele). Levanta HtmlInesperado para
+    cair no browser."""
+    url, html = await http.get(proc_href)
+    dados = await snapshots.no_pool(analisar_processo, html, since_numero)
+    if not dados["erro"] and dados["carregar_todos"]:
+        url, html = await http.get(urljoin(url, dados["carregar_todos"]))
+        dados = await snapshots.no_pool(analisar_processo, html, since_numero)
+        if not dados["erro"] and dados["carregar_todos"]:
+            dados["erro"] = "'Carregar TODOS os eventos' continua na página"
+    if dados["erro"]:
+        raise HtmlInesperado(dados["erro"])
+    return html, dados
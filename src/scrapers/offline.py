@@ -0,0 +1,274 @@
+"""
+Parsing offline (lxml) dos snapshots HTML capturados do eProc.
+
+Produz os mesmos dicts que extract_header / extract_assuntos / extract_partes /
+extract_eventos (processo.py) e que o _ROWS_JS da lista de prazos, a partir do
+HTML salvo por capture_process_page ou baixado pela engine HTTP — sem browser,
+em processos separados. A cor de fundo das células de eventos (prazo aberto)
+vem do atributo data-eproc-bg gravado na captura; sem ele (engine HTTP, HTML
+salvo à mão), do background do atributo style ou de uma classe cuja regra nos
+<style> da página (ou em HTTP_CLASSES_PRAZO) pinta o fundo de amarelo.
+"""
+import re
+from lxml import html as lhtml
+from src.config import Config
+from src.scrapers.parsing import (
+    CNJ_RE, NUMERO_RE, TIPO_PARTE_MAP, is_yellow, parse_capa, parse_cpf_cnpj,
+    parse_datetime_br, parse_evento_descricao, parse_qualificacao, parse_representantes, resumo_evento,
+)
+
+BG_ATTR = "data-eproc-bg"
+_BG_STYLE_RE = re.compile(r"background(?:-color)?\s*:\s*([^;]+)", re.IGNORECASE)
+_HEX_RE = re.compile(r"#([0-9a-f]{3}|[0-9a-f]{6})\b", re.IGNORECASE)
+_CSS_REGRA_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_CSS_CLASSE_RE = re.compile(r"\.([\w-]+)")
+_CSS_COMBINADOR_RE = re.compile(r"\s*[>+~]\s*|\s+")
+
+
+def _classe(*nomes: str) -> str:
+    """Predicado XPath equivalente ao seletor CSS .a.b.c"""
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {n} ')" for n in nomes)
+
+
+_ASSUNTOS_XP = f"//table[{_classe('infraTable', 'table-not-hover', 'mb-0')}]"
+_NOME_PARTE_XP = f".//a[{_classe('infraNomeParte')} or @data-parte]"
+_INFRA_TABLE_XP = f"//table[{_classe('infraTable')}]"
+
+
+def documento(html: str):
+    return lhtml.document_fromstring(html)
+
+
+def _texto(el) -> str:
+    return el.text_content() if el is not None else ""
+
+
+def _por_id(doc, id_: str):
+    found = doc.xpath(f"//*[@id='{id_}']")
+    return found[0] if found else None
+
+
+def _cor(declaracoes: str) -> str:
+    """background(-color) de um style/regra CSS, com hex convertido para rgb(...)."""
+    match = _BG_STYLE_RE.search(declaracoes or "")
+    if not match:
+        return ""
+    valor = match.group(1).strip()
+    hexa = _HEX_RE.search(valor)
+    if hexa:
+        h = hexa.group(1)
+        if len(h) == 3:
+            h = "".join(c * 2 for c in h)
+        return f"rgb({int(h[0:2], 16)}, {int(h[2:4], 16)}, {int(h[4:6], 16)})"
+    return valor
+
+
+def classes_amarelas(doc) -> tuple[set[str], set[str]]:
+    """
+    (classes de td, classes de tr) que pintam a célula de amarelo segundo os
+    <style> da página: `.x`, `td.x` → td; `tr.x td` → tr. `tr.x` sozinho pinta
+    a linha, não a célula (getComputedStyle do td fica transparente).
+    """
+    td, tr = set(Config.HTTP_CLASSES_PRAZO), set()
+    for style in doc.xpath("//style"):
+        for seletores, declaracoes in _CSS_REGRA_RE.findall(style.text_content()):
+            if not is_yellow(_cor(declaracoes)):
+                continue
+            for seletor in seletores.split(","):
+                partes = [p for p in _CSS_COMBINADOR_RE.split(seletor.strip()) if p]
+                if not partes:
+                    continue
+                ultimo = partes[-1]
+                if ultimo.lower().startswith("tr"):
+                    continue
+                classes = _CSS_CLASSE_RE.findall(ultimo)
+                if classes:
+                    td.update(classes)
+                elif len(partes) > 1 and partes[-2].lower().startswith("tr"):
+                    tr.update(_CSS_CLASSE_RE.findall(partes[-2]))
+    return td, tr
+
+
+def _amarela(td, amarelas: tuple[set[str], set[str]]) -> bool:
+    """A célula tem fundo amarelo (como o getComputedStyle veria no browser)?"""
+    bg = td.get(BG_ATTR)
+    if bg is not None:
+        return is_yellow(bg)
+    if is_yellow(_cor(td.get("style"))):
+        return True
+    classes_td, classes_tr = amarelas
+    if classes_td and classes_td.intersection((td.get("class") or "").split()):
+        return True
+    tr = td.getparent()
+    return bool(classes_tr and tr is not None and tr.tag == "tr"
+                and classes_tr.intersection((tr.get("class") or "").split()))
+
+
+# --- Página do processo ------------------------------------------------------
+
+def parse_header(doc) -> dict:
+    def _campo(id_):
+        return _texto(_por_id(doc, id_)).strip()
+
+    rel = _por_id(doc, "tableRelacionado")
+    return {
+        "cnj": _campo("txtNumProcesso"),
+        "classe": _campo("txtClasse"),
+        "competencia": _campo("txtCompetencia"),
+        **parse_capa(_texto(_por_id(doc, "divCapaProcesso"))),
+        "processos_relacionados": CNJ_RE.findall(_texto(rel)) if rel is not None else [],
+    }
+
+
+def parse_assuntos(doc) -> list[dict]:
+    assuntos = []
+    for table in doc.xpath(_ASSUNTOS_XP):
+        for row in table.xpath(".//tr"):
+            cells = row.xpath(".//td")
+            if len(cells) >= 2:
+                codigo = _texto(cells[0]).strip()
+                descricao = _texto(cells[1]).strip()
+                if codigo and descricao:
+                    assuntos.append({"codigo": codigo, "descricao": descricao})
+    return assuntos
+
+
+def parse_partes(doc) -> list[dict]:
+    table = _por_id(doc, "tblPartesERepresentantes")
+    if table is None:
+        return []
+
+    partes = []
+    for link in table.xpath(_NOME_PARTE_XP):
+        nome = _texto(link).strip()
+        if not nome:
+            continue
+        tipo = (link.get("data-parte") or "").strip().upper()
+        tipo = TIPO_PARTE_MAP.get(tipo, tipo)
+
+        container = link.xpath("ancestor::td[1]") or link.xpath("ancestor::div[1]")
+        cpf_cnpj, td_text = "", ""
+        if container:
+            td = container[0]
+            for span in td.xpath(".//span[starts-with(@id, 'spnCpfParte')]"):
+                cpf_text = _texto(span).strip()
+                if cpf_text:
+                    cpf_cnpj = cpf_text
+                    break
+            td_text = _texto(td)
+        if not cpf_cnpj:
+            cpf_cnpj = parse_cpf_cnpj(td_text)
+
+        partes.append({
+            "tipo": tipo,
+            "nome": nome,
+            "cpf_cnpj": cpf_cnpj,
+            "qualificacao": parse_qualificacao(td_text, cpf_cnpj),
+            "representantes": parse_representantes(td_text, nome),
+        })
+    return partes
+
+
+def numeros_eventos(doc) -> list[int]:
+    """Números dos eventos na ordem da tabela (para eventos_alcancam)."""
+    table = _por_id(doc, "tblEventos")
+    if table is None:
+        return []
+    numeros = []
+    for row in table.xpath(".//tr"):
+        cells = row.xpath(".//td")
+        num_match = NUMERO_RE.search(_texto(cells[0]).strip()) if len(cells) >= 4 else None
+        if num_match:
+            numeros.append(int(num_match.group(1)))
+    return numeros
+
+
+def parse_eventos(doc, since_numero: int | None = None) -> list[dict]:
+    """Eventos da tabela; com `since_numero`, os de número maior completos e os
+    já gravados que estão na página só como resumo_evento."""
+    table = _por_id(doc, "tblEventos")
+    if table is None:
+        return []
+
+    amarelas = classes_amarelas(doc)
+    eventos = []
+    for row in table.xpath(".//tr"):
+        cells = row.xpath(".//td")
+        if len(cells) < 4:
+            continue
+        num_match = NUMERO_RE.search(_texto(cells[0]).strip())
+        if not num_match:
+            continue
+        numero = int(num_match.group(1))
+        # Prazo aberto: só a célula da descrição amarela (linha toda amarela é outra coisa)
+        prazo_aberto = _amarela(cells[2], amarelas) and not _amarela(cells[0], amarelas)
+        if since_numero is not None and numero <= since_numero:
+            resumo = resumo_evento(numero, _texto(cells[1]), _texto(cells[2]), prazo_aberto)
+            if resumo:
+                eventos.append(resumo)
+            continue
+        data_hora = parse_datetime_br(_texto(cells[1]).strip())
+        if not data_hora:
+            continue
+        descricao = _texto(cells[2]).strip()
+
+        docs = []
+        if len(cells) > 4:
+            for a in cells[4].xpath(".//a[contains(@href, 'acessar_documento')]"):
+                doc_nome = _texto(a).strip()
+                doc_href = a.get("href") or ""
+                if doc_nome and doc_href:
+                    docs.append({"nome": doc_nome, "url_eproc": doc_href})
+
+        eventos.append({
+            "numero": numero,
+            "data_hora": data_hora.isoformat(),
+            "descricao": descricao,
+            "usuario": _texto(cells[3]).strip(),
+            "prazo_aberto": prazo_aberto,
+            **parse_evento_descricao(descricao),
+            "documentos": docs,
+        })
+    return eventos
+
+
+def parse_processo_html(html: str) -> dict:
+    """{header, assuntos, partes, eventos} de um snapshot da página do processo."""
+    return parse_processo_doc(documento(html))
+
+
+def parse_processo_doc(doc, since_numero: int | None = None) -> dict:
+    return {
+        "header": parse_header(doc),
+        "assuntos": parse_assuntos(doc),
+        "partes": parse_partes(doc),
+        "eventos": parse_eventos(doc, since_numero),
+    }
+
+
+# --- Lista de prazos ---------------------------------------------------------
+
+def parse_prazos_html(html: str) -> dict | None:
+    """{rows: [{cells, href}], caption} da tabela principal, como o _ROWS_JS."""
+    return parse_prazos_doc(documento(html))
+
+
+def parse_prazos_doc(doc) -> dict | None:
+    main, maximo = None, 0
+    for table in doc.xpath(_INFRA_TABLE_XP):
+        n = len(table.xpath(".//tr"))
+        if n > maximo:
+            main, maximo = table, n
+    if main is None:
+        return None
+
+    rows = []
+    for tr in main.xpath(".//tr"):
+        cells = tr.xpath(".//td")
+        link = cells[1].xpath(".//a[contains(@href, 'processo_selecionar')]") if len(cells) > 1 else []
+        rows.append({
+            "cells": [_texto(td) for td in cells],
+            "href": (link[0].get("href") or "") if link else "",
+        })
+    caption = main.find("caption")
+    return {"rows": rows, "caption": _texto(caption)}
@@ -0,0 +1,285 @@
+"""
+Parsing puro (sem Playwright) dos textos extraídos do eProc, compartilhado
+pelos scrapers. Regex compiladas uma vez no import; datas dd/mm/yyyy
+[hh:mm:ss] lidas por posição, com o offset de America/Sao_Paulo memoizado.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+BR_TZ = ZoneInfo("America/Sao_Paulo")
+
+CNJ_RE = re.compile(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}")
+REGISTROS_RE = re.compile(r"([\d\.]+)\s+registros?")
+JUIZO_RE = re.compile(r"Ju[ií]zo:\s*(.+?)(?:\n|Cadastrar)")
+
+# Capa do processo
+AUTUACAO_RE = re.compile(r"Data de autua[çc][aã]o:\s*(\d{2}/\d{2}/\d{4})")
+SITUACAO_RE = re.compile(r"Situa[çc][aã]o\s*(.+?)(?:\n|Ó)")
+ORGAO_RE = re.compile(r"[OÓ]rg[aã]o Julgador:\s*\n?\s*(.+?)(?:\n|Juiz)")
+JUIZ_RE = re.compile(r"Juiz\(a\):\s*\n?\s*(.+?)(?:\n|Processos)")
+
+# Partes e representantes
+_ESTADOS = (
+    "RS|SC|PR|SP|RJ|MG|BA|PE|CE|GO|MT|MS|PA|AM|MA|PI|RN|PB|SE|AL|ES|"
+    "RO|AC|AP|RR|TO|DF|OAB"
+)
+# Procuradores/advogados: NOME   REGISTRO (RS053253, OAB12345, DPE-4594967, SC099999...)
+REP_RE = re.compile(
+    rf"([A-ZÀ-Ú][A-ZÀ-Ú\s\.]+?)"            # nome (somente MAIÚSCULAS, sem IGNORECASE)
+    rf"\s{{2,}}"                            # 2+ espaços separadores
+    rf"((?:{_ESTADOS}|DPE)[-]?\d+)",        # registro (OAB ou DPE)
+    re.UNICODE,
+)
+REP_PREFIXO_RE = re.compile(
+    r"^(?:Procurador\(es\):\s*|ADVOGADO\s*|ADVOGADA\s*|"
+    r"Pessoa\s+F[ií]sica\s*|Pessoa\s+Jur[ií]dica\s*)",
+    re.IGNORECASE,
+)
+CPF_RE = re.compile(r"\((\d{3}\.\d{3}\.\d{3}-\d{2})\)")
+CNPJ_RE = re.compile(r"\((\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})\)")
+QUALIFICACAO_RE = re.compile(r"\((\w+(?:\s+\w+)?)\)\s*-\s*Pessoa")
+TIPO_PARTE_MAP = {"REU": "RÉU", "A": "AUTOR", "R": "RÉU"}
+
+# Eventos
+NUMERO_RE = re.compile(r"(\d+)")
+PRAZO_DIAS_RE = re.compile(r"Prazo:\s*(\d+)\s*dias?")
+STATUS_RE = re.compile(r"Status:\s*(\w+)")
+DATA_INICIAL_RE = re.compile(r"Data inicial[^:]*:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})")
+DATA_FINAL_RE = re.compile(r"Data final:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})")
+REFER_RE = re.compile(r"Refer\.\s*ao\s*Evento:?\s*(\d+)")
+
+# Teto de páginas da lista de prazos (as duas engines), contra laço infinito
+MAX_PAGES = 1000
+
+
+@lru_cache(maxsize=4096)
+def _br_offset(y: int, m: int, d: int, h: int) -> timezone:
+    """Offset de America/Sao_Paulo (horário de verão até 2019) como tz fixo.
+    As transições ocorrem em hora cheia: (dia, hora) determina o offset."""
+    return timezone(datetime(y, m, d, h, tzinfo=BR_TZ).utcoffset() or timedelta(0))
+
+
+def parse_datetime_br(text: str) -> datetime | None:
+    """'06/02/2026 09:09:00' ou '06/02/2026' → datetime com offset de Brasília."""
+    text = text.strip()
+    n = len(text)
+    if n == 10 or (n == 19 and text[10] == " " and text[13] == ":" and text[16] == ":"):
+        if text[2] == "/" and text[5] == "/":
+            try:
+                d, m, y = int(text[0:2]), int(text[3:5]), int(text[6:10])
+                if n == 10:
+                    return datetime(y, m, d, tzinfo=_br_offset(y, m, d, 0))
+                hh, mi, ss = int(text[11:13]), int(text[14:16]), int(text[17:19])
+                return datetime(y, m, d, hh, mi, ss, tzinfo=_br_offset(y, m, d, hh))
+            except ValueError:
+                return None
+    if not text:
+        return None
+    # Formatos fora do padrão (dia/mês com 1 dígito, espaços extras): strptime
+    for fmt in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=BR_TZ)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date_br_iso(text: str) -> str | None:
+    """'06/02/2026' → '2026-02-06' (None se inválida)."""
+    dt = parse_datetime_br(text)
+    return dt.strftime("%Y-%m-%d") if dt else None
+
+
+def extract_cnj(text: str) -> str | None:
+    """Número CNJ do texto (formato NNNNNNN-NN.NNNN.N.NN.NNNN)."""
+    match = CNJ_RE.search(text)
+    return match.group(0) if match else None
+
+
+def parse_registros(text: str) -> int | None:
+    """Total de registros do caption: 'Lista (1.234 registros - 1 a 100)'."""
+    match = REGISTROS_RE.search(text or "")
+    if not match:
+        return None
+    try:
+        return int(match.group(1).replace(".", ""))
+    except ValueError:
+        return None
+
+
+def _grupo(regex: re.Pattern, text: str) -> str:
+    match = regex.search(text)
+    return match.group(1).strip() if match else ""
+
+
+def parse_capa(body_text: str) -> dict:
+    """Campos de texto da capa do processo (#divCapaProcesso)."""
+    autuacao = AUTUACAO_RE.search(body_text)
+    return {
+        "data_autuacao": parse_date_br_iso(autuacao.group(1)) if autuacao else None,
+        "situacao": _grupo(SITUACAO_RE, body_text),
+        "orgao_julgador": _grupo(ORGAO_RE, body_text),
+        "juiz": _grupo(JUIZ_RE, body_text),
+    }
+
+
+def parse_cpf_cnpj(td_text: str) -> str:
+    match = CPF_RE.search(td_text) or CNPJ_RE.search(td_text)
+    return match.group(1) if match else ""
+
+
+def parse_qualificacao(td_text: str, cpf_cnpj: str = "") -> str:
+    """Qualificação da parte (Inventariante, Espólio, ...)."""
+    match = QUALIFICACAO_RE.search(td_text)
+    if match and match.group(1) != cpf_cnpj:
+        return match.group(1).strip()
+    return ""
+
+
+def parse_representantes(td_text: str, nome_parte: str) -> list[dict]:
+    """Advogados/procuradores listados na célula da parte."""
+    representantes = []
+    nome_upper = nome_parte.upper()
+    for match in REP_RE.finditer(td_text):
+        # Limpar prefixos espúrios capturados pelo regex
+        rep_nome = REP_PREFIXO_RE.sub("", match.group(1).strip()).strip()
+        rep_registro = match.group(2).strip()
+        # Não incluir o nome da própria parte como representante
+        if rep_nome and rep_nome.upper() != nome_upper:
+            representantes.append({
+                "nome": rep_nome,
+                "oab": rep_registro,
+                "tipo": "DPE" if "DPE" in rep_registro.upper() else "Advogado",
+            })
+    return representantes
+
+
+def parse_evento_descricao(descricao: str) -> dict:
+    """Campos de prazo e referência embutidos na descrição de um evento."""
+    campos = {
+        "prazo_dias": None,
+        "prazo_status": None,
+        "prazo_data_inicial": None,
+        "prazo_data_final": None,
+        "evento_referencia": None,
+        "urgente": "URGENTE" in descricao,
+    }
+    # Detectar se é evento de prazo (por texto, complementar à cor)
+    if "Prazo:" in descricao and "Status:" in descricao:
+        match = PRAZO_DIAS_RE.search(descricao)         # Prazo: 5 dias
+        if match:
+            campos["prazo_dias"] = int(match.group(1))
+        match = STATUS_RE.search(descricao)             # Status:ABERTO
+        if match:
+            campos["prazo_status"] = match.group(1)
+        match = DATA_INICIAL_RE.search(descricao)       # Data inicial ...: 11/02/2026 00:00:00
+        if match:
+            dt = parse_datetime_br(match.group(1))
+            campos["prazo_data_inicial"] = dt.isoformat() if dt else None
+        match = DATA_FINAL_RE.search(descricao)         # Data final: 19/02/2026 23:59:59
+        if match:
+            dt = parse_datetime_br(match.group(1))
+            campos["prazo_data_final"] = dt.isoformat() if dt else None
+
+    if "Refer" in descricao:                            # Refer. ao Evento NNN
+        match = REFER_RE.search(descricao)
+        if match:
+            campos["evento_referencia"] = int(match.group(1))
+    return campos
+
+
+def resumo_evento(numero: int, data_text: str, descricao: str, prazo_aberto: bool) -> dict | None:
+    """Evento já gravado (<= since_numero) que está na página: só o que a
+    política de documentos usa (data, prazo aberto, URGENTE, evento_referencia),
+    sem usuário nem documentos. `conhecido` o distingue dos eventos novos."""
+    data_hora = parse_datetime_br(data_text.strip())
+    if not data_hora:
+        return None
+    descricao = descricao.strip()
+    return {
+        "numero": numero,
+        "data_hora": data_hora.isoformat(),
+        "descricao": descricao,
+        "prazo_aberto": prazo_aberto,
+        **parse_evento_descricao(descricao),
+        "conhecido": True,
+    }
+
+
+def parse_prazo_row(cells: list[str], href: str) -> dict | None:
+    """Converte os textos de uma linha da tabela em um prazo (ou None)."""
+    # Pular linhas de header ou com menos de 5 colunas
+    if len(cells) < 5:
+        return None
+
+    # Coluna do processo (contém CNJ, juízo, partes)
+    proc_text = cells[1].strip()
+    cnj = extract_cnj(proc_text)
+    if not cnj:
+        return None
+
+    # Extrair juízo do texto do processo
+    juizo = ""
+    juizo_match = JUIZO_RE.search(proc_text)
+    if juizo_match:
+        juizo = juizo_match.group(1).strip()
+
+    # [checkbox, Processo, Classe, Assunto, Evento e Prazo, Data envio, Inicio Prazo, Final Prazo]
+    if len(cells) < 8:
+        cells = cells + [""] * (8 - len(cells))
+    data_envio = parse_datetime_br(cells[5])
+    prazo_inicio = parse_datetime_br(cells[6])
+    prazo_final = parse_datetime_br(cells[7])
+
+    return {
+        "cnj": cnj,
+        "classe": cells[2].strip(),
+        "assunto": cells[3].strip(),
+        "juizo": juizo,
+        "evento_descricao": cells[4].strip(),
+        "data_envio": data_envio.isoformat() if data_envio else None,
+        "prazo_inicio": prazo_inicio.isoformat() if prazo_inicio else None,
+        "prazo_final": prazo_final.isoformat() if prazo_final else None,
+        "proc_href": href,
+        "partes_raw": proc_text,
+    }
+
+
+def collect_rows(rows: list[dict], processos: dict, info: dict):
+    """Linhas {cells, href} da tabela de prazos -> `processos` {cnj: [prazos]}
+    (usada pelas duas engines); conta as válidas em info["linhas"]."""
+    for i, row in enumerate(rows):
+        try:
+            prazo_entry = parse_prazo_row(row["cells"], row["href"])
+        except Exception as e:
+            print(f"[PRAZOS] Erro ao processar linha {i}: {e}")
+            continue
+        if not prazo_entry:
+            continue
+        info["linhas"] += 1
+        processos.setdefault(prazo_entry["cnj"], []).append(prazo_entry)
+
+
+def eventos_alcancam(numeros: list[int], since_numero: int | None) -> bool:
+    """A tabela de eventos (números na ordem da página) já tem todos os eventos
+    acima de `since_numero`, sem "Carregar TODOS": ordem decrescente (mais novos
+    primeiro, o padrão do eProc) chegando a um evento <= since_numero. Em ordem
+    crescente a página mostra os mais antigos: nunca alcança."""
+    if since_numero is None or not numeros:
+        return False
+    return numeros[0] >= numeros[-1] and numeros[-1] <= since_numero
+
+
+def is_yellow(bg_color: str) -> bool:
+    """Verifica se uma cor de fundo é amarela."""
+    if not bg_color:
+        return False
+    bg = bg_color.lower()
+    return (
+        "yellow" in bg
+        or "rgb(255, 255, 0" in bg
+        or "rgb(255, 255, 1" in bg
+        or "rgb(255, 255, 2" in bg
+    )
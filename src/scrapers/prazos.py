@@ -1,46 +1,106 @@
-import re
-from datetime import datetime
-from zoneinfo import ZoneInfo
 from playwright.async_api import Page
 from src.config import Config
-
-BR_TZ = ZoneInfo("America/Sao_Paulo")
-
-
-def _parse_datetime_br(text: str) -> datetime | None:
-    """Converte data brasileira '06/02/2026 09:09:00' para datetime UTC."""
-    text = text.strip()
-    if not text:
-        return None
+from src.metrics import metrics
+from src.limitador import limitador
+from src import snapshots
+from src.scrapers.offline import parse_prazos_html
+from src.scrapers.parsing import MAX_PAGES, collect_rows, parse_registros
+
+
+# Controles de paginação do framework "infra" do eProc
+_NEXT_PAGE_SELECTOR = (
+    "#lnkInfraProximaPaginaSuperior, "
+    "#lnkInfraProximaPaginaInferior, "
+    "a[id*='ProximaPagina']"
+)
+# Select de "registros por página" (varia entre versões do eProc)
+_PAGE_SIZE_SELECTOR = (
+    "select[id*='QtdRegistros'], "
+    "select[id*='NumRegistros'], "
+    "select[id*='RegistrosPorPagina'], "
+    "select[id*='NroItens'], "
+    "select[name*='paginacao' i]"
+)
+
+# Lê a tabela principal (infraTable com mais linhas) em uma única chamada:
+# texto de cada td + href do link do processo + caption com total de registros
+_ROWS_JS = """
+() => {
+    let main = null, max = 0;
+    for (const t of document.querySelectorAll('table.infraTable')) {
+        const n = t.querySelectorAll('tr').length;
+        if (n > max) { max = n; main = t; }
+    }
+    if (!main) return null;
+    const rows = Array.from(main.querySelectorAll('tr')).map(tr => {
+        const cells = Array.from(tr.querySelectorAll('td'));
+        const link = cells.length > 1
+            ? cells[1].querySelector("a[href*='processo_selecionar']") : null;
+        return {
+            cells: cells.map(td => td.textContent || ''),
+            href: link ? (link.getAttribute('href') || '') : '',
+        };
+    });
+    const caption = main.caption ? main.caption.textContent : '';
+    return {rows, caption};
+}
+"""
+
+
+async def _maximize_page_size(page: Page):
+    """Seleciona a maior opção de 'registros por página', se a UI permitir."""
+    select = page.locator(_PAGE_SIZE_SELECTOR).first
     try:
-        dt = datetime.strptime(text, "%d/%m/%Y %H:%M:%S")
-        return dt.replace(tzinfo=BR_TZ)
-    except ValueError:
-        try:
-            dt = datetime.strptime(text, "%d/%m/%Y")
-            return dt.replace(tzinfo=BR_TZ)
-        except ValueError:
-            return None
-
-
-def _extract_cnj(text: str) -> str | None:
-    """Extrai número CNJ do texto (formato NNNNNNN-NN.NNNN.N.NN.NNNN)."""
-    match = re.search(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}", text)
-    return match.group(0) if match else None
+        if await select.count() == 0:
+            return
+        options = await select.evaluate(
+            "el => ({current: el.value, values: Array.from(el.options).map(o => o.value)})"
+        )
+        numeric = [v for v in options["values"] if v.isdigit()]
+        if not numeric:
+            return
+        best = max(numeric, key=int)
+        if best == options["current"]:
+            return
+        print(f"[PRAZOS] Aumentando registros por página: {options['current']} -> {best}")
+        async with limitador.requisicao("prazos", via=page.context):
+            await select.select_option(best)
+            await page.wait_for_load_state("networkidle", timeout=60_000)
+    except Exception as e:
+        print(f"[PRAZOS] Não foi possível alterar registros por página: {e}")
+
+
+async def _next_page_link(page: Page):
+    """Retorna o link de 'próxima página' ou None na última página."""
+    link = page.locator(_NEXT_PAGE_SELECTOR).first
+    if await link.count() == 0 or not await link.is_visible():
+        return None
+    return link
 
 
-async def scrape_prazos_abertos(page: Page) -> dict[str, list[dict]]:
+@metrics.timed("scrape_prazos_abertos")
+async def scrape_prazos_abertos(page: Page, info: dict | None = None) -> dict[str, list[dict]]:
     """
-    Navega para a tabela de prazos abertos e extrai todos os registros.
+    Navega para a tabela de prazos abertos e extrai todos os registros,
+    percorrendo todas as páginas da listagem.
     Retorna dict {cnj: [prazo1, prazo2, ...]} — um CNJ pode ter N prazos.
+
+    Se `info` for passado, é preenchido com {paginas, linhas, registros_esperados,
+    completo} para o chamador decidir se a lista é confiável (ex: remoções).
+    Com SNAPSHOTS=true cada página é gravada em snapshots/prazos/{info["conta"]}/.
     """
+    info = info if info is not None else {}
+    info.update({"paginas": 0, "linhas": 0, "registros_esperados": None, "completo": False})
+
     # Voltar ao painel do advogado antes de buscar o link de prazos
     # (após um sync, a page pode estar em qualquer página do eProc)
     print("[PRAZOS] Navegando para o painel do advogado...")
-    await page.goto(
-        f"{Config.EPROC_BASE_URL}/eproc/controlador.php?acao=painel_adv_listar",
-        wait_until="networkidle",
-    )
+    async with limitador.requisicao("prazos", via=page.context) as req:
+        resp = await page.goto(
+            f"{Config.EPROC_BASE_URL}/eproc/controlador.php?acao=painel_adv_listar",
+            wait_until="networkidle",
+        )
+        req.status(resp.status if resp else None)
 
     # Navegar para prazos abertos
     print("[PRAZOS] Navegando para prazos abertos...")
@@ -49,113 +109,88 @@ async def scrape_prazos_abertos(page: Page) -> dict[str, list[dict]]:
         print("[PRAZOS] ERRO: Link de prazos abertos não encontrado no painel")
         return {}
     href = await link.get_attribute("href")
-    await page.goto(f"{Config.EPROC_BASE_URL}/eproc/{href}", wait_until="networkidle")
+    async with limitador.requisicao("prazos", via=page.context) as req:
+        resp = await page.goto(f"{Config.EPROC_BASE_URL}/eproc/{href}", wait_until="networkidle")
+        req.status(resp.status if resp else None)
 
     title = await page.title()
     print(f"[PRAZOS] Pagina carregada: {title}")
 
-    # Encontrar a tabela principal (infraTable com mais linhas)
-    tables = page.locator("table.infraTable")
-    table_count = await tables.count()
-
-    main_table = None
-    max_rows = 0
-    for i in range(table_count):
-        t = tables.nth(i)
-        rows = await t.locator("tr").count()
-        if rows > max_rows:
-            max_rows = rows
-            main_table = t
-
-    if not main_table:
-        print("[PRAZOS] ERRO: Tabela principal nao encontrada")
-        return {}
-
-    print(f"[PRAZOS] Tabela encontrada com {max_rows} linhas")
-
-    # Extrair linhas de dados
-    # Cada processo ocupa 1 linha na tabela com colunas:
-    # [checkbox, Processo, Classe, Assunto, Evento e Prazo, Data envio, Inicio Prazo, Final Prazo]
-    rows = main_table.locator("tr")
-    row_count = await rows.count()
+    await _maximize_page_size(page)
 
     processos = {}
-
-    for i in range(row_count):
-        row = rows.nth(i)
-        cells = row.locator("td")
-        cell_count = await cells.count()
-
-        # Pular linhas de header ou com menos de 5 colunas
-        if cell_count < 5:
-            continue
-
+    seen_pages = set()
+    execucao = snapshots.carimbo()
+
+    while info["paginas"] < MAX_PAGES:
+        data = await page.evaluate(_ROWS_JS)
+        if not data:
+            if info["paginas"] == 0:
+                print("[PRAZOS] ERRO: Tabela principal nao encontrada")
+                return {}
+            break
+
+        # Proteção contra loop: mesma página devolvida duas vezes
+        signature = tuple(r["cells"][1] for r in data["rows"] if len(r["cells"]) >= 5)[:3]
+        if signature in seen_pages:
+            break
+        seen_pages.add(signature)
+
+        info["paginas"] += 1
+        if Config.SNAPSHOTS:
+            try:
+                snapshots.salvar_prazos(info.get("conta", ""), execucao, info["paginas"], await page.content())
+            except Exception as e:
+                print(f"[PRAZOS] Falha ao gravar snapshot da página {info['paginas']}: {e}")
+        if info["registros_esperados"] is None:
+            info["registros_esperados"] = parse_registros(data["caption"])
+        print(f"[PRAZOS] Página {info['paginas']}: tabela com {len(data['rows'])} linhas")
+
+        next_link = await _next_page_link(page)
+        if next_link is None:
+            collect_rows(data["rows"], processos, info)
+            info["completo"] = True
+            break
+
+        # Prefetch: o clique dispara a navegação e o Chromium carrega a próxima
+        # página enquanto as linhas da atual (já capturadas) são parseadas
         try:
-            # Coluna do processo (contém CNJ, juízo, partes)
-            proc_cell = cells.nth(1)
-            proc_text = (await proc_cell.text_content() or "").strip()
-            cnj = _extract_cnj(proc_text)
-
-            if not cnj:
-                continue
-
-            # Extrair juízo do texto do processo
-            juizo = ""
-            juizo_match = re.search(r"Ju[ií]zo:\s*(.+?)(?:\n|Cadastrar)", proc_text)
-            if juizo_match:
-                juizo = juizo_match.group(1).strip()
-
-            # Extrair partes
-            partes_raw = proc_text
-
-            # Classe
-            classe = (await cells.nth(2).text_content() or "").strip()
-
-            # Assunto
-            assunto = (await cells.nth(3).text_content() or "").strip()
-
-            # Evento e Prazo
-            evento_prazo = (await cells.nth(4).text_content() or "").strip()
-
-            # Data envio requisição
-            data_envio_text = (await cells.nth(5).text_content() or "").strip()
-            data_envio = _parse_datetime_br(data_envio_text)
-
-            # Início Prazo
-            inicio_text = (await cells.nth(6).text_content() or "").strip()
-            prazo_inicio = _parse_datetime_br(inicio_text)
-
-            # Final Prazo
-            final_text = (await cells.nth(7).text_content() or "").strip()
-            prazo_final = _parse_datetime_br(final_text)
-
-            # Extrair link do processo para navegação posterior
-            proc_link = proc_cell.locator("a[href*='processo_selecionar']")
-            proc_href = ""
-            if await proc_link.count() > 0:
-                proc_href = await proc_link.first.get_attribute("href") or ""
-
-            prazo_entry = {
-                "cnj": cnj,
-                "classe": classe,
-                "assunto": assunto,
-                "juizo": juizo,
-                "evento_descricao": evento_prazo,
-                "data_envio": data_envio.isoformat() if data_envio else None,
-                "prazo_inicio": prazo_inicio.isoformat() if prazo_inicio else None,
-                "prazo_final": prazo_final.isoformat() if prazo_final else None,
-                "proc_href": proc_href,
-                "partes_raw": partes_raw,
-            }
-
-            if cnj not in processos:
-                processos[cnj] = []
-            processos[cnj].append(prazo_entry)
-
+            async with limitador.requisicao("prazos", via=page.context) as req:
+                async with page.expect_navigation(wait_until="networkidle", timeout=60_000) as nav:
+                    await next_link.click()
+                    collect_rows(data["rows"], processos, info)
+                resp = await nav.value
+                req.status(resp.status if resp else None)
         except Exception as e:
-            print(f"[PRAZOS] Erro ao processar linha {i}: {e}")
-            continue
+            print(f"[PRAZOS] Erro ao avançar página: {e}")
+            break
+
+    esperado = info["registros_esperados"]
+    if esperado is not None and info["linhas"] != esperado:
+        info["completo"] = False
+        print(f"[PRAZOS] AVISO: {info['linhas']} prazos lidos, eProc informa {esperado} registros")
 
     total_prazos = sum(len(v) for v in processos.values())
-    print(f"[PRAZOS] {len(processos)} processos extraidos ({total_prazos} prazos no total)")
+    print(f"[PRAZOS] {len(processos)} processos extraidos ({total_prazos} prazos no total, {info['paginas']} páginas)")
     return processos
+
+
+def parse_prazos_snapshot(paginas: list[str]) -> tuple[dict[str, list[dict]], dict]:
+    """Mesmo resultado de scrape_prazos_abertos a partir do HTML das páginas
+    gravadas (snapshots), sem browser. Retorna (processos, info)."""
+    info = {"paginas": 0, "linhas": 0, "registros_esperados": None, "completo": bool(paginas)}
+    processos = {}
+    for html in paginas:
+        data = parse_prazos_html(html)
+        if not data:
+            info["completo"] = False
+            continue
+        info["paginas"] += 1
+        if info["registros_esperados"] is None:
+            info["registros_esperados"] = parse_registros(data["caption"])
+        collect_rows(data["rows"], processos, info)
+
+    esperado = info["registros_esperados"]
+    if esperado is not None and info["linhas"] != esperado:
+        info["completo"] = False
+    return processos, info
@@ -1,35 +1,104 @@
-import re
-from datetime import datetime
-from zoneinfo import ZoneInfo
 from playwright.async_api import Page, BrowserContext
 from src.config import Config
-
-BR_TZ = ZoneInfo("America/Sao_Paulo")
-
-
-def _parse_datetime_br(text: str) -> datetime | None:
-    text = text.strip()
-    if not text:
-        return None
-    try:
-        dt = datetime.strptime(text, "%d/%m/%Y %H:%M:%S")
-        return dt.replace(tzinfo=BR_TZ)
-    except ValueError:
-        try:
-            dt = datetime.strptime(text, "%d/%m/%Y")
-            return dt.replace(tzinfo=BR_TZ)
-        except ValueError:
-            return None
+from src.metrics import metrics
+from src.limitador import limitador
+from src.scrapers.offline import BG_ATTR
+from src.scrapers.parsing import (
+    CNJ_RE, NUMERO_RE, TIPO_PARTE_MAP, eventos_alcancam, is_yellow, parse_capa, parse_cpf_cnpj,
+    parse_datetime_br, parse_evento_descricao, parse_qualificacao, parse_representantes, resumo_evento,
+)
 
 
+@metrics.timed("open_process_page")
 async def open_process_page(context: BrowserContext, page: Page, proc_href: str) -> Page:
     """Abre a pagina do processo em nova aba e retorna a Page."""
     full_url = f"{Config.EPROC_BASE_URL}/eproc/{proc_href}"
     proc_page = await context.new_page()
-    await proc_page.goto(full_url, wait_until="networkidle")
+    async with limitador.requisicao("processo", via=context) as req:
+        resp = await proc_page.goto(full_url, wait_until="networkidle")
+        req.status(resp.status if resp else None)
     return proc_page
 
 
+# Grava o backgroundColor calculado das células de eventos (prazo aberto =
+# célula amarela) no próprio HTML, para o parsing offline do snapshot
+_MARK_BG_JS = """
+(attr) => {
+    document.querySelectorAll('#tblEventos td').forEach(td => {
+        td.setAttribute(attr, getComputedStyle(td).backgroundColor);
+    });
+    return '<!DOCTYPE html>' + document.documentElement.outerHTML;
+}
+"""
+
+
+async def _expand_partes(page: Page):
+    """Clica em "e outros" para carregar todas as partes (se existir)."""
+    outros_links = page.locator("#tblPartesERepresentantes a:has-text('e outros')")
+    outros_count = await outros_links.count()
+    for i in range(outros_count):
+        try:
+            await outros_links.nth(i).click()
+            await page.wait_for_timeout(1000)
+        except Exception:
+            pass
+
+
+# Textos das colunas 0-3 e cor de fundo do número e da descrição de cada linha
+# da tabela de eventos (null = não é evento), numa chamada só
+_LINHAS_JS = """
+rows => rows.map(r => {
+    const tds = r.querySelectorAll('td');
+    if (tds.length < 4) return null;
+    return {
+        numero: tds[0].textContent, data: tds[1].textContent,
+        descricao: tds[2].textContent, usuario: tds[3].textContent,
+        numero_bg: getComputedStyle(tds[0]).backgroundColor,
+        descricao_bg: getComputedStyle(tds[2]).backgroundColor,
+    };
+})
+"""
+
+
+async def _linhas_eventos(rows) -> list[dict | None]:
+    """Linha de cada tr (None = não é evento) com "numero" já convertido."""
+    linhas = []
+    for linha in await rows.evaluate_all(_LINHAS_JS):
+        num_match = NUMERO_RE.search((linha or {}).get("numero") or "")
+        if num_match:
+            linha["numero"] = int(num_match.group(1))
+        linhas.append(linha if num_match else None)
+    return linhas
+
+
+async def _load_all_eventos(page: Page) -> bool:
+    """Clica em "Carregar TODOS os eventos" se existir (paginação). True se clicou."""
+    load_all = page.locator("a:has-text('Carregar TODOS os eventos')")
+    if await load_all.count() == 0:
+        return False
+    # Os waits fixos não dizem nada sobre o eProc: só erros contam
+    async with limitador.requisicao("processo.eventos", medir_latencia=False, via=page.context):
+        await load_all.click()
+        # Aguardar carregamento dos eventos adicionais
+        await page.wait_for_timeout(3000)
+        try:
+            await page.wait_for_load_state("networkidle", timeout=15000)
+        except Exception:
+            pass
+    return True
+
+
+@metrics.timed("capture_process_page")
+async def capture_process_page(page: Page) -> str:
+    """HTML da página do processo com todas as partes e eventos carregados
+    (snapshot para src/scrapers/offline.py). Só expande; não extrai nada."""
+    await _expand_partes(page)
+    if await page.locator("#tblEventos").count() > 0:
+        await _load_all_eventos(page)
+    return await page.evaluate(_MARK_BG_JS, BG_ATTR)
+
+
+@metrics.timed("extract_header")
 async def extract_header(page: Page) -> dict:
     """Extrai dados do cabecalho do processo."""
     cnj = ""
@@ -47,55 +116,27 @@ async def extract_header(page: Page) -> dict:
     if await el.count() > 0:
         competencia = (await el.text_content() or "").strip()
 
-    # Data de autuacao
-    data_autuacao = None
+    # Data de autuacao, situacao, orgao julgador e juiz (texto da capa)
     body_text = await page.locator("#divCapaProcesso").text_content() or ""
-    match = re.search(r"Data de autua[çc][aã]o:\s*(\d{2}/\d{2}/\d{4})", body_text)
-    if match:
-        # Converter de DD/MM/YYYY para YYYY-MM-DD (ISO)
-        try:
-            dt = datetime.strptime(match.group(1), "%d/%m/%Y")
-            data_autuacao = dt.strftime("%Y-%m-%d")
-        except ValueError:
-            data_autuacao = None
-
-    # Situacao
-    situacao = ""
-    match = re.search(r"Situa[çc][aã]o\s*(.+?)(?:\n|Ó)", body_text)
-    if match:
-        situacao = match.group(1).strip()
-
-    # Orgao julgador
-    orgao_julgador = ""
-    match = re.search(r"[OÓ]rg[aã]o Julgador:\s*\n?\s*(.+?)(?:\n|Juiz)", body_text)
-    if match:
-        orgao_julgador = match.group(1).strip()
-
-    # Juiz
-    juiz = ""
-    match = re.search(r"Juiz\(a\):\s*\n?\s*(.+?)(?:\n|Processos)", body_text)
-    if match:
-        juiz = match.group(1).strip()
+    capa = parse_capa(body_text)
 
     # Processos relacionados
     relacionados = []
     rel_table = page.locator("#tableRelacionado")
     if await rel_table.count() > 0:
         rel_text = await rel_table.text_content() or ""
-        relacionados = re.findall(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}", rel_text)
+        relacionados = CNJ_RE.findall(rel_text)
 
     return {
         "cnj": cnj,
         "classe": classe,
         "competencia": competencia,
-        "data_autuacao": data_autuacao,
-        "situacao": situacao,
-        "orgao_julgador": orgao_julgador,
-        "juiz": juiz,
+        **capa,
         "processos_relacionados": relacionados,
     }
 
 
+@metrics.timed("extract_assuntos")
 async def extract_assuntos(page: Page) -> list[dict]:
     """Extrai assuntos da tabela de assuntos."""
     assuntos = []
@@ -116,6 +157,7 @@ async def extract_assuntos(page: Page) -> list[dict]:
     return assuntos
 
 
+@metrics.timed("extract_partes")
 async def extract_partes(page: Page) -> list[dict]:
     """Extrai partes e representantes via DOM da tabela de partes."""
     partes = []
@@ -123,15 +165,7 @@ async def extract_partes(page: Page) -> list[dict]:
     if await table.count() == 0:
         return partes
 
-    # Clicar em "e outros" para carregar todas as partes (se existir)
-    outros_links = table.locator("a:has-text('e outros')")
-    outros_count = await outros_links.count()
-    for i in range(outros_count):
-        try:
-            await outros_links.nth(i).click()
-            await page.wait_for_timeout(1000)
-        except Exception:
-            pass
+    await _expand_partes(page)
 
     # Seletor amplo: a.infraNomeParte OU a[data-parte] para pegar todos os tipos
     # (REQUERENTE, REQUERIDO, EXEQUENTE, EXECUTADO, HERDEIRO,
@@ -139,19 +173,6 @@ async def extract_partes(page: Page) -> list[dict]:
     nome_links = table.locator("a.infraNomeParte, a[data-parte]")
     count = await nome_links.count()
 
-    # Regex para procuradores/advogados: NOME   REGISTRO
-    # Suporta: RS053253, OAB12345, DPE-4594967, SC099999, etc.
-    _ESTADOS = (
-        "RS|SC|PR|SP|RJ|MG|BA|PE|CE|GO|MT|MS|PA|AM|MA|PI|RN|PB|SE|AL|ES|"
-        "RO|AC|AP|RR|TO|DF|OAB"
-    )
-    rep_regex = re.compile(
-        rf"([A-ZÀ-Ú][A-ZÀ-Ú\s\.]+?)"         # nome (somente MAIÚSCULAS, sem IGNORECASE)
-        rf"\s{{2,}}"                             # 2+ espaços separadores
-        rf"((?:{_ESTADOS}|DPE)[-]?\d+)",         # registro (OAB ou DPE, case-insensitive no estado)
-        re.UNICODE
-    )
-
     for i in range(count):
         link = nome_links.nth(i)
         nome = (await link.text_content() or "").strip()
@@ -161,8 +182,7 @@ async def extract_partes(page: Page) -> list[dict]:
             continue
 
         # Mapear tipos curtos/variantes
-        tipo_map = {"REU": "RÉU", "A": "AUTOR", "R": "RÉU"}
-        tipo = tipo_map.get(tipo, tipo)
+        tipo = TIPO_PARTE_MAP.get(tipo, tipo)
 
         # Buscar CPF/CNPJ no elemento pai (td ou container mais próximo)
         td = link.locator("xpath=ancestor::td[1]")
@@ -179,47 +199,16 @@ async def extract_partes(page: Page) -> list[dict]:
                         cpf_cnpj = cpf_text
                         break
 
-            # Fallback: extrair CPF/CNPJ do texto se span não encontrado
-            if not cpf_cnpj:
-                td_text = await td.text_content() or ""
-                cpf_match = re.search(r"\((\d{3}\.\d{3}\.\d{3}-\d{2})\)", td_text)
-                if not cpf_match:
-                    cpf_match = re.search(r"\((\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})\)", td_text)
-                if cpf_match:
-                    cpf_cnpj = cpf_match.group(1)
-
-        # Extrair qualificação (Inventariante, Espólio, etc.)
-        qualificacao = ""
-        if await td.count() > 0:
-            td_text_full = await td.text_content() or ""
-            qual_match = re.search(r"\((\w+(?:\s+\w+)?)\)\s*-\s*Pessoa", td_text_full)
-            if qual_match and qual_match.group(1) not in [cpf_cnpj]:
-                qualificacao = qual_match.group(1).strip()
-
-        # Extrair advogados/procuradores do mesmo td
-        representantes = []
+        # Texto da célula: CPF/CNPJ (fallback), qualificação e representantes
+        td_text = ""
         if await td.count() > 0:
             td_text = await td.text_content() or ""
+        if not cpf_cnpj:
+            cpf_cnpj = parse_cpf_cnpj(td_text)
 
-            for rep_match in rep_regex.finditer(td_text):
-                rep_nome = rep_match.group(1).strip()
-                rep_registro = rep_match.group(2).strip()
-
-                # Limpar prefixos espúrios capturados pelo regex
-                rep_nome = re.sub(
-                    r"^(?:Procurador\(es\):\s*|ADVOGADO\s*|ADVOGADA\s*|"
-                    r"Pessoa\s+F[ií]sica\s*|Pessoa\s+Jur[ií]dica\s*)",
-                    "", rep_nome, flags=re.IGNORECASE
-                ).strip()
-
-                # Não incluir o nome da própria parte como representante
-                if rep_nome and rep_nome.upper() != nome.upper():
-                    tipo_rep = "DPE" if "DPE" in rep_registro.upper() else "Advogado"
-                    representantes.append({
-                        "nome": rep_nome,
-                        "oab": rep_registro,
-                        "tipo": tipo_rep,
-                    })
+        # Qualificação (Inventariante, Espólio, etc.) e advogados/procuradores do mesmo td
+        qualificacao = parse_qualificacao(td_text, cpf_cnpj)
+        representantes = parse_representantes(td_text, nome)
 
         partes.append({
             "tipo": tipo,
@@ -253,84 +242,51 @@ def identify_adv_side(partes: list[dict], adv_name: str) -> str:
     return ""
 
 
-def _is_yellow(bg_color: str) -> bool:
-    """Verifica se uma cor de fundo é amarela."""
-    if not bg_color:
-        return False
-    bg = bg_color.lower()
-    return (
-        "yellow" in bg
-        or "rgb(255, 255, 0" in bg
-        or "rgb(255, 255, 1" in bg
-        or "rgb(255, 255, 2" in bg
-    )
-
-
-async def extract_eventos(page: Page) -> list[dict]:
-    """Extrai todos os eventos da tabela de eventos."""
+@metrics.timed("extract_eventos")
+async def extract_eventos(page: Page, since_numero: int | None = None) -> list[dict]:
+    """
+    Extrai os eventos da tabela de eventos. Sem `since_numero` (modo completo),
+    todos. Com ele (último evento já gravado), só os de número maior: o
+    "Carregar TODOS os eventos" só é clicado se a página inicial (mais novos
+    primeiro) não chega até ele. Os já gravados que estão na página entram só
+    como resumo_evento (prazo aberto / URGENTE para a política de documentos):
+    as colunas de texto e as cores vêm de uma chamada só, e só as linhas novas
+    têm os links de documentos lidos.
+    """
     eventos = []
     table = page.locator("#tblEventos")
     if await table.count() == 0:
         return eventos
 
-    # Clicar em "Carregar TODOS os eventos" se existir (paginação)
-    load_all = page.locator("a:has-text('Carregar TODOS os eventos')")
-    if await load_all.count() > 0:
-        await load_all.click()
-        # Aguardar carregamento dos eventos adicionais
-        await page.wait_for_timeout(3000)
-        try:
-            await page.wait_for_load_state("networkidle", timeout=15000)
-        except Exception:
-            pass
-
     rows = table.locator("tr")
-    row_count = await rows.count()
-
-    for i in range(row_count):
-        row = rows.nth(i)
-        cells = row.locator("td")
-        cell_count = await cells.count()
+    linhas = await _linhas_eventos(rows)
+    if not eventos_alcancam([l["numero"] for l in linhas if l], since_numero):
+        if await _load_all_eventos(page):
+            linhas = await _linhas_eventos(rows)
 
-        if cell_count < 4:
+    for i, linha in enumerate(linhas):
+        if linha is None:
             continue
-
+        numero = linha["numero"]
         try:
-            # Coluna 0: Número do evento
-            num_text = (await cells.nth(0).text_content() or "").strip()
-            num_match = re.search(r"(\d+)", num_text)
-            if not num_match:
+            # Detectar prazo aberto: APENAS a célula de descrição é amarela
+            # (linha inteira amarela = outro significado, não é prazo aberto)
+            prazo_aberto_visual = is_yellow(linha["descricao_bg"]) and not is_yellow(linha["numero_bg"])
+            if since_numero is not None and numero <= since_numero:
+                resumo = resumo_evento(numero, linha["data"] or "", linha["descricao"] or "", prazo_aberto_visual)
+                if resumo:
+                    eventos.append(resumo)
                 continue
-            numero = int(num_match.group(1))
 
-            # Coluna 1: Data/Hora
-            data_text = (await cells.nth(1).text_content() or "").strip()
-            data_hora = _parse_datetime_br(data_text)
+            data_hora = parse_datetime_br((linha["data"] or "").strip())
             if not data_hora:
                 continue
-
-            # Coluna 2: Descrição + detecção de prazo aberto (fundo amarelo)
-            desc_cell = cells.nth(2)
-            descricao = (await desc_cell.text_content() or "").strip()
-
-            # Detectar prazo aberto: APENAS a célula de descrição é amarela
-            # (linha inteira amarela = outro significado, não é prazo aberto)
-            desc_bg = await desc_cell.evaluate(
-                "el => getComputedStyle(el).backgroundColor"
-            )
-            row_bg = await cells.nth(0).evaluate(
-                "el => getComputedStyle(el).backgroundColor"
-            )
-            desc_is_yellow = _is_yellow(desc_bg)
-            row_is_yellow = _is_yellow(row_bg)
-            prazo_aberto_visual = desc_is_yellow and not row_is_yellow
-
-            # Coluna 3: Usuário
-            usuario = (await cells.nth(3).text_content() or "").strip()
+            descricao = (linha["descricao"] or "").strip()
 
             # Coluna 4: Documentos (links)
             docs = []
-            if cell_count > 4:
+            cells = rows.nth(i).locator("td")
+            if await cells.count() > 4:
                 doc_links = cells.nth(4).locator("a[href*='acessar_documento']")
                 doc_count = await doc_links.count()
                 for d in range(doc_count):
@@ -343,59 +299,14 @@ async def extract_eventos(page: Page) -> list[dict]:
                             "url_eproc": doc_href,
                         })
 
-            # Detectar se é evento de prazo (por texto, complementar à cor)
-            tem_prazo_texto = "Prazo:" in descricao and "Status:" in descricao
-            prazo_dias = None
-            prazo_status = None
-            prazo_data_inicial = None
-            prazo_data_final = None
-            evento_referencia = None
-            urgente = "URGENTE" in descricao
-
-            if tem_prazo_texto:
-                # Prazo: 5 dias
-                dias_match = re.search(r"Prazo:\s*(\d+)\s*dias?", descricao)
-                if dias_match:
-                    prazo_dias = int(dias_match.group(1))
-
-                # Status:ABERTO ou Status:FECHADO (34 - RÉPLICA)
-                status_match = re.search(r"Status:\s*(\w+)", descricao)
-                if status_match:
-                    prazo_status = status_match.group(1)
-
-                # Data inicial da contagem do prazo: 11/02/2026 00:00:00
-                inicio_match = re.search(
-                    r"Data inicial[^:]*:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})",
-                    descricao
-                )
-                if inicio_match:
-                    prazo_data_inicial = _parse_datetime_br(inicio_match.group(1))
-
-                # Data final: 19/02/2026 23:59:59
-                final_match = re.search(
-                    r"Data final:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})",
-                    descricao
-                )
-                if final_match:
-                    prazo_data_final = _parse_datetime_br(final_match.group(1))
-
-            # Refer. ao Evento NNN
-            ref_match = re.search(r"Refer\.\s*ao\s*Evento:?\s*(\d+)", descricao)
-            if ref_match:
-                evento_referencia = int(ref_match.group(1))
-
             eventos.append({
                 "numero": numero,
                 "data_hora": data_hora.isoformat(),
                 "descricao": descricao,
-                "usuario": usuario,
+                "usuario": (linha["usuario"] or "").strip(),
                 "prazo_aberto": prazo_aberto_visual,
-                "prazo_dias": prazo_dias,
-                "prazo_status": prazo_status,
-                "prazo_data_inicial": prazo_data_inicial.isoformat() if prazo_data_inicial else None,
-                "prazo_data_final": prazo_data_final.isoformat() if prazo_data_final else None,
-                "evento_referencia": evento_referencia,
-                "urgente": urgente,
+                # prazo_dias, prazo_status, datas do prazo, evento_referencia, urgente
+                **parse_evento_descricao(descricao),
                 "documentos": docs,
             })
 
@@ -403,5 +314,7 @@ async def extract_eventos(page: Page) -> list[dict]:
             print(f"[PROCESSO] Erro ao processar evento na linha {i}: {e}")
             continue
 
-    print(f"[PROCESSO] {len(eventos)} eventos extraidos")
+    novos = sum(1 for e in eventos if not e.get("conhecido"))
+    print(f"[PROCESSO] {novos} eventos extraidos"
+          + (f" (> {since_numero}, de {len(linhas)} linhas)" if since_numero is not None else ""))
     return eventos
@@ -0,0 +1,139 @@
+"""
+Render HTML → PDF dos documentos gerados pelo sistema (certidões, mandados,
+despachos) fora da aba do eProc.
+
+A aba do documento só captura o HTML já limpo (barras/menus escondidos, CSS e
+imagens embutidos) e é fechada; o PDF é gerado por um pool de páginas
+dedicadas, num Chromium headless próprio, com limite de concorrência próprio
+(RENDER_CONCURRENCY). O HTML capturado não depende da sessão logada.
+"""
+import asyncio
+from playwright.async_api import Browser, BrowserContext, Page
+from src.config import Config
+from src.metrics import metrics
+
+_RENDER_TIMEOUT = 60_000
+
+# Esconde o que não é documento, embute CSS e imagens (data: URLs) e remove
+# scripts: o resultado renderiza igual sem cookies nem acesso ao eProc.
+_CAPTURE_JS = """
+(hide) => {
+    hide.forEach(sel => {
+        document.querySelectorAll(sel).forEach(el => el.remove());
+    });
+    document.querySelectorAll('script, noscript').forEach(el => el.remove());
+
+    let css = '';
+    for (const sheet of document.styleSheets) {
+        try {
+            for (const rule of sheet.cssRules) css += rule.cssText + '\\n';
+        } catch (e) { /* folha de outra origem: fica sem */ }
+    }
+    document.querySelectorAll('link[rel="stylesheet"], style').forEach(el => el.remove());
+    const style = document.createElement('style');
+    style.textContent = css;
+    document.head.appendChild(style);
+
+    document.querySelectorAll('img').forEach(img => {
+        try {
+            if (!img.complete || !img.naturalWidth || img.src.startsWith('data:')) return;
+            const canvas = document.createElement('canvas');
+            canvas.width = img.naturalWidth;
+            canvas.height = img.naturalHeight;
+            canvas.getContext('2d').drawImage(img, 0, 0);
+            img.src = canvas.toDataURL('image/png');
+        } catch (e) { /* imagem "tainted": mantém a URL */ }
+    });
+    return '<!DOCTYPE html>' + document.documentElement.outerHTML;
+}
+"""
+
+
+async def capture_html(page: Page) -> str:
+    """HTML autocontido do documento aberto em `page` (para o render pool)."""
+    with metrics.timer("render.captura"):
+        return await page.evaluate(_CAPTURE_JS, Config.RENDER_HIDE_SELECTORS)
+
+
+class RenderPool:
+    """
+    Páginas dedicadas ao page.pdf(). Aberto sob demanda no primeiro render, a
+    partir do browser da sessão que capturou o HTML: um Chromium headless
+    separado (RENDER_BROWSER_PROPRIO=true) ou um context isolado no mesmo.
+    """
+
+    def __init__(self):
+        self.browser: Browser | None = None
+        self.context: BrowserContext | None = None
+        self._idle: asyncio.Queue[Page] = asyncio.Queue()
+        self._pages: list[Page] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._own_browser = False
+        self._lock = asyncio.Lock()
+
+    async def _start(self, source: BrowserContext):
+        async with self._lock:
+            if self.context is not None:
+                return
+            browser = source.browser
+            if Config.RENDER_BROWSER_PROPRIO and browser is not None:
+                self.browser = await browser.browser_type.launch(headless=True)
+                self._own_browser = True
+            else:
+                self.browser = browser
+            self.context = await self.browser.new_context(java_script_enabled=False)
+            self._idle = asyncio.Queue()
+            self._pages = []
+            self._slots = asyncio.Semaphore(max(1, Config.RENDER_CONCURRENCY))
+
+    async def _acquire(self) -> Page:
+        if not self._idle.empty():
+            return self._idle.get_nowait()
+        page = await self.context.new_page()
+        self._pages.append(page)
+        return page
+
+    async def render(self, html: str, pdf_path: str, source: BrowserContext):
+        """Gera `pdf_path` a partir do HTML capturado por capture_html."""
+        if self.context is None:
+            await self._start(source)
+        async with self._slots:
+            page = await self._acquire()
+            try:
+                with metrics.timer("render.pdf"):
+                    await page.set_content(html, wait_until="load", timeout=_RENDER_TIMEOUT)
+                    await page.pdf(
+                        path=pdf_path,
+                        format="A4",
+                        print_background=True,
+                        margin={"top": "1cm", "bottom": "1cm", "left": "1cm", "right": "1cm"},
+                    )
+            except Exception:
+                # Página em estado desconhecido: descarta em vez de devolver ao pool
+                self._pages.remove(page)
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                raise
+            self._idle.put_nowait(page)
+
+    async def close(self):
+        if self.context is None:
+            return
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+        if self._own_browser:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.context = None
+        self._own_browser = False
+        self._pages = []
+
+
+render_pool = RenderPool()
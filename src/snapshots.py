@@ -0,0 +1,148 @@
+"""
+Snapshots HTML das páginas do eProc (SNAPSHOTS=true) e pool de parsing offline.
+
+Com a captura ligada, a lista de prazos (cada página) e a página de cada
+processo (depois de "e outros" e "Carregar TODOS os eventos") são gravadas
+comprimidas em SNAPSHOTS_DIR:
+
+    processos/{cnj}/{AAAAMMDDTHHMMSSZ}.html.zst
+    prazos/{conta}/{AAAAMMDDTHHMMSSZ}/p001.html.zst
+
+A aba do processo fecha logo após a captura e o parsing (src/scrapers/offline.py)
+roda num ProcessPoolExecutor, também usado pela engine HTTP. `scripts/reparse.py`
+reconstrói a DB a partir dos snapshots, sem acessar o eProc. zstd requer o
+pacote `zstandard`; sem ele (ou com SNAPSHOTS_COMPRESSAO=gzip) os arquivos
+saem em gzip.
+"""
+import os
+import gzip
+import asyncio
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from src.config import Config
+from src.metrics import metrics
+from src.scrapers.offline import parse_processo_html
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_executor: ProcessPoolExecutor | None = None
+_FORMATO_TS = "%Y%m%dT%H%M%SZ"
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, Config.PARSE_WORKERS))
+    return _executor
+
+
+def carimbo(dt: datetime | None = None) -> str:
+    return (dt or datetime.now(timezone.utc)).strftime(_FORMATO_TS)
+
+
+def data_do_carimbo(path: str) -> datetime | None:
+    """Momento da captura a partir do nome do arquivo (ou da pasta, nos prazos)."""
+    for parte in reversed(path.replace("\\", "/").split("/")):
+        try:
+            return datetime.strptime(parte.split(".")[0], _FORMATO_TS).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def _extensao() -> str:
+    if Config.SNAPSHOTS_COMPRESSAO == "zstd" and zstandard is not None:
+        return ".html.zst"
+    return ".html.gz"
+
+
+def _gravar(path: str, html: str) -> str:
+    data = html.encode("utf-8")
+    if path.endswith(".zst"):
+        data = zstandard.ZstdCompressor(level=6).compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=6)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    metrics.incr("snapshot.bytes", len(data))
+    return path
+
+
+def ler(path: str) -> str:
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: instale o pacote zstandard para ler snapshots .zst")
+        data = zstandard.ZstdDecompressor().decompress(data, max_output_size=512 * 1024 * 1024)
+    elif path.endswith(".gz"):
+        data = gzip.decompress(data)
+    return data.decode("utf-8")
+
+
+def salvar_processo(cnj: str, html: str) -> str:
+    path = os.path.join(Config.SNAPSHOTS_DIR, "processos", cnj, carimbo() + _extensao())
+    return _gravar(path, html)
+
+
+def salvar_prazos(conta: str, execucao: str, pagina: int, html: str) -> str:
+    """Página `pagina` da listagem de prazos da `execucao` (carimbo do início)."""
+    path = os.path.join(Config.SNAPSHOTS_DIR, "prazos", conta or "default", execucao,
+                        f"p{pagina:03d}{_extensao()}")
+    return _gravar(path, html)
+
+
+def _snapshots(pasta: str) -> list[str]:
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(n for n in os.listdir(pasta) if n.endswith((".html.zst", ".html.gz", ".html")))
+
+
+def ultimos_processos(cnjs: list[str] | None = None) -> dict[str, str]:
+    """{cnj: caminho do snapshot mais recente} (todos os CNJs ou só os informados)."""
+    base = os.path.join(Config.SNAPSHOTS_DIR, "processos")
+    if not os.path.isdir(base):
+        return {}
+    ultimos = {}
+    for cnj in cnjs or sorted(os.listdir(base)):
+        arquivos = _snapshots(os.path.join(base, cnj))
+        if arquivos:
+            ultimos[cnj] = os.path.join(base, cnj, arquivos[-1])
+    return ultimos
+
+
+def ultimas_listagens() -> dict[str, list[str]]:
+    """{conta: páginas da execução mais recente da lista de prazos, em ordem}."""
+    base = os.path.join(Config.SNAPSHOTS_DIR, "prazos")
+    if not os.path.isdir(base):
+        return {}
+    listagens = {}
+    for conta in sorted(os.listdir(base)):
+        execucoes = sorted(os.listdir(os.path.join(base, conta)))
+        if execucoes:
+            pasta = os.path.join(base, conta, execucoes[-1])
+            listagens[conta] = [os.path.join(pasta, n) for n in _snapshots(pasta)]
+    return listagens
+
+
+async def no_pool(fn, *args):
+    """fn(*args) no pool de parsing (não bloqueia o event loop)."""
+    loop = asyncio.get_running_loop()
+    with metrics.timer("snapshot.parse"):
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+async def parse_processo(html: str) -> dict:
+    """parse_processo_html no pool de processos."""
+    return await no_pool(parse_processo_html, html)
+
+
+def parse_arquivo(path: str) -> dict:
+    """Lê e parseia um snapshot de processo (roda dentro dos workers do pool)."""
+    return parse_processo_html(ler(path))
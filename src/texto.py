@@ -0,0 +1,132 @@
+"""
+Extração de texto dos documentos para documentos_texto (busca full-text).
+
+Roda num ProcessPoolExecutor logo após o download, com o arquivo ainda local:
+camada de texto dos PDFs (pypdf) ou o HTML capturado dos documentos do
+sistema. A chave é o hash_sha256 — hash já indexado não é extraído de novo.
+PDFs só com imagem (digitalizações sem OCR) entram como `sem_texto` e
+arquivos ilegíveis como `erro` (apague a linha para reextrair).
+"""
+import re
+import asyncio
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from src.config import Config
+from src.metrics import metrics
+
+_executor: ProcessPoolExecutor | None = None
+# Hashes já gravados em documentos_texto (evita repetir a consulta ao banco)
+_indexados: set[str] = set()
+
+_ESPACOS = re.compile(r"[ \t\r\f\v]+")
+_LINHAS = re.compile(r"\n\s*\n+")
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, Config.TEXTO_WORKERS))
+    return _executor
+
+
+async def extrair_texto(sb, doc_result: dict, html: str | None = None) -> dict | None:
+    """
+    Linha de documentos_texto ({hash_sha256, origem, texto}) do documento, ou
+    None se o hash já está indexado, o tipo não tem texto ou a extração falhou.
+    """
+    h = doc_result["hash_sha256"]
+    path = doc_result["local_path"]
+    if not Config.TEXTO_EXTRAIR or h in _indexados:
+        return None
+    if html is None and not path.endswith((".pdf", ".html")):
+        return None
+
+    try:
+        existe = metrics.execute("documentos_texto.existe", sb.table("documentos_texto")
+                                 .select("hash_sha256").eq("hash_sha256", h).limit(1))
+    except Exception as e:
+        print(f"    [texto] consulta de documentos_texto falhou: {e}")
+        return None
+    if existe.data:
+        # Só memoriza o que já está gravado: texto extraído agora só existe
+        # depois que o sync_processo do processo der certo
+        if len(_indexados) > 100_000:
+            _indexados.clear()
+        _indexados.add(h)
+        metrics.incr("texto.reaproveitado")
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        with metrics.timer("texto.extrair"):
+            if html is not None:
+                origem, texto = await loop.run_in_executor(_get_executor(), texto_de_html, html)
+            else:
+                origem, texto = await loop.run_in_executor(_get_executor(), texto_de_arquivo, path)
+    except Exception as e:
+        # Arquivo ilegível: registra como erro para não tentar de novo a cada aparição
+        print(f"    [texto] extração falhou: {e}")
+        return {"hash_sha256": h, "origem": "erro", "texto": ""}
+
+    metrics.incr("texto.caracteres", len(texto))
+    return {"hash_sha256": h, "origem": origem if texto else "sem_texto",
+            "texto": texto[:Config.TEXTO_MAX_CHARS]}
+
+
+def texto_de_arquivo(path: str) -> tuple[str, str]:
+    """(origem, texto) de um PDF ou HTML local."""
+    if path.endswith(".html"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return texto_de_html(f.read())
+
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    partes = []
+    for page in reader.pages:
+        try:
+            partes.append(page.extract_text() or "")
+        except Exception:
+            partes.append("")     # página corrompida: segue com as demais
+    return "pdf", _normalizar("\n\n".join(partes))
+
+
+class _TextoHTML(HTMLParser):
+    """Texto visível: ignora script/style e quebra linha nos blocos."""
+
+    _BLOCOS = {"p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "table", "section"}
+    _IGNORAR = {"script", "style", "noscript", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.partes: list[str] = []
+        self._ignorando = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._IGNORAR:
+            self._ignorando += 1
+        elif tag in self._BLOCOS:
+            self.partes.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._IGNORAR:
+            self._ignorando = max(0, self._ignorando - 1)
+        elif tag in self._BLOCOS:
+            self.partes.append("\n")
+
+    def handle_data(self, data):
+        if not self._ignorando:
+            self.partes.append(data)
+
+
+def texto_de_html(html: str) -> tuple[str, str]:
+    parser = _TextoHTML()
+    parser.feed(html)
+    parser.close()
+    return "html", _normalizar("".join(parser.partes))
+
+
+def _normalizar(texto: str) -> str:
+    texto = texto.replace("\x00", "")     # Postgres não aceita NUL em TEXT
+    texto = _ESPACOS.sub(" ", texto)
+    return _LINHAS.sub("\n\n", texto).strip()
@@ -0,0 +1,80 @@
+"""
+Dispatcher de sync_changes por webhook (WEBHOOK_URL): em vez de o consumidor
+fazer polling, as mudanças novas são enviadas em lotes de WEBHOOK_LOTE, em
+ordem de id, via POST JSON:
+
+    {"consumidor": "webhook", "cursor_de": 120, "cursor_ate": 170,
+     "changes": [{"id": 121, "tipo": "prazo_novo", "cnj": "...", "dados": {...}}, ...]}
+
+O cursor do consumidor (sync_changes_consumidores) só avança depois de uma
+resposta 2xx; falha de rede ou status != 2xx interrompe o envio e o mesmo lote
+é reenviado no próximo ciclo. Entrega é "pelo menos uma vez": o receptor deve
+ignorar ids <= último cursor_ate recebido. Com WEBHOOK_SECRET o corpo é
+assinado (HMAC-SHA256 em X-Eproc-Signature).
+"""
+import hmac
+import json
+import hashlib
+import urllib.error
+import urllib.request
+from src.config import Config
+from src.db import changes
+from src.db.client import get_supabase
+from src.metrics import metrics
+
+
+def despachar(sb=None, url: str | None = None, consumidor: str | None = None,
+              max_lotes: int | None = None) -> int:
+    """Envia as mudanças pendentes do consumidor. Retorna quantas foram entregues."""
+    url = url or Config.WEBHOOK_URL
+    if not url:
+        return 0
+    sb = sb or get_supabase()
+    consumidor = consumidor or Config.WEBHOOK_CONSUMIDOR
+
+    cursor = changes.cursor(sb, consumidor)
+    entregues, lotes = 0, 0
+    while max_lotes is None or lotes < max_lotes:
+        rows = changes.ler(sb, cursor, max(1, Config.WEBHOOK_LOTE))
+        if not rows:
+            break
+        ate = rows[-1]["id"]
+        corpo = json.dumps({
+            "consumidor": consumidor,
+            "cursor_de": cursor,
+            "cursor_ate": ate,
+            "changes": rows,
+        }, ensure_ascii=False, default=str).encode("utf-8")
+
+        try:
+            with metrics.timer("webhook.post"):
+                _post(url, corpo, ate)
+        except Exception as e:
+            metrics.incr("webhook.falhas")
+            print(f"[WEBHOOK] Falha ao enviar mudanças {cursor + 1}..{ate}: {e}")
+            break
+
+        changes.avancar(sb, consumidor, ate)
+        cursor = ate
+        entregues += len(rows)
+        lotes += 1
+        metrics.incr("webhook.entregues", len(rows))
+
+    if entregues:
+        print(f"[WEBHOOK] {entregues} mudanças entregues em {lotes} lote(s) (cursor {cursor})")
+    return entregues
+
+
+def _post(url: str, corpo: bytes, cursor: int):
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "X-Eproc-Cursor": str(cursor),
+    }
+    if Config.WEBHOOK_SECRET:
+        assinatura = hmac.new(Config.WEBHOOK_SECRET.encode(), corpo, hashlib.sha256).hexdigest()
+        headers["X-Eproc-Signature"] = f"sha256={assinatura}"
+    req = urllib.request.Request(url, data=corpo, headers=headers, method="POST")
+    # urlopen levanta HTTPError para 4xx/5xx; 3xx não seguido também conta como falha
+    with urllib.request.urlopen(req, timeout=Config.WEBHOOK_TIMEOUT_SEC) as resp:
+        if not 200 <= resp.status < 300:
+            raise urllib.error.HTTPError(url, resp.status, "status inesperado", resp.headers, None)
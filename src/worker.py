@@ -0,0 +1,169 @@
+import os
+import time
+import socket
+import asyncio
+from playwright.async_api import Playwright
+from src.config import Config
+from src.accounts import Account, load_accounts
+from src.browser import Session, SessionPool, Sessoes
+from src.db import fila
+from src.db.client import get_supabase
+from src.proxies import ProxyPool
+from src.db.sync import scrape_processo, _scrape_listagens
+from src.metrics import flush as flush_metrics
+
+
+class Worker:
+    """
+    Worker da fila distribuída (FILA_PROCESSOS=true): reserva CNJs de
+    fila_processos, faz o scrape completo com as sessões das suas contas e
+    reporta o resultado. Qualquer número de containers pode rodar workers:
+    FOR UPDATE SKIP LOCKED garante um único dono por CNJ, e o lease (renovado
+    enquanto o scrape roda) devolve à fila os CNJs de um worker que caiu.
+    """
+
+    def __init__(self, p: Playwright, proxies: ProxyPool, accounts: list[Account] | None = None,
+                 worker_id: str | None = None):
+        self.pool = SessionPool(p, proxies, accounts or load_accounts())
+        self.worker_id = worker_id or Config.WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = asyncio.Semaphore(max(1, Config.MAX_TABS))
+        # proc_href depende da sessão: cada conta lê a própria lista de prazos
+        self._hrefs: dict[str, dict[str, str]] = {}
+        self._hrefs_at = 0.0
+        self._hrefs_completo = False   # todas as listagens vieram inteiras
+        self._carga: dict[str, int] = {}
+        self._ativos: set[str] = set()
+        self._log_metricas = None   # sync_log do último lote (para gravar as métricas)
+
+    async def run_forever(self):
+        print(f"[WORKER] {self.worker_id} | contas: {', '.join(a.nome for a in self.pool.accounts)}")
+        renovador = asyncio.create_task(self._renovar_leases())
+        try:
+            while True:
+                if not await self.run_once():
+                    self._flush()
+                    await asyncio.sleep(Config.FILA_POLL_SEC)
+        finally:
+            renovador.cancel()
+            self._flush()
+            await self.pool.reset()
+
+    async def run_once(self) -> int:
+        """Reserva até MAX_TABS CNJs, processa e reporta. Retorna quantos reservou."""
+        sb = get_supabase()
+        try:
+            sessions = await self.pool.ensure()
+        except Exception as e:
+            print(f"[WORKER] Sem sessão: {e}")
+            await self.pool.reset()
+            return 0
+
+        itens = fila.reservar(sb, self.worker_id, list(sessions), Config.MAX_TABS)
+        if not itens:
+            return 0
+        print(f"\n[WORKER] {len(itens)} processos reservados")
+
+        def faltando():
+            return any(self._escolher(i["cnj"], i["advogados"]) is None for i in itens)
+
+        vencido = time.monotonic() - self._hrefs_at > Config.PRAZOS_INTERVAL_MIN * 60
+        if vencido or faltando():
+            await self._refresh_hrefs(sessions)
+            if not self._hrefs_completo and faltando():
+                # Listagem parcial: relista antes de dar algum CNJ como não listado
+                await self._refresh_hrefs(sessions)
+
+        await asyncio.gather(*(self._processar(sb, item) for item in itens))
+        self._log_metricas = itens[-1].get("sync_log_id")
+        return len(itens)
+
+    async def _refresh_hrefs(self, sessions: Sessoes):
+        """proc_href de cada conta pela lista de prazos (engine http com fallback
+        para o browser), todas as contas em paralelo. Conta cuja listagem falhou
+        fica com os hrefs anteriores; com listagem incompleta os novos só somam."""
+        listadas = list(sessions.values())
+        try:
+            eproc, self._hrefs_completo = await _scrape_listagens(
+                listadas, self._slots, Config.PRAZOS_CONCURRENCY)
+        except Exception as e:
+            print(f"[WORKER] ERRO na lista de prazos: {e}")
+            self._hrefs_completo = False
+            return
+        hrefs = {session.account.nome: {} for session in listadas if session.ok}
+        for cnj, prazos in eproc.items():
+            for p in prazos:
+                if p["advogado"] in hrefs:
+                    hrefs[p["advogado"]].setdefault(cnj, p["proc_href"])
+        for nome, novos in hrefs.items():
+            if self._hrefs_completo:
+                self._hrefs[nome] = novos
+            else:
+                self._hrefs.setdefault(nome, {}).update(novos)
+        self._hrefs_at = time.monotonic()
+
+    def _escolher(self, cnj: str, advogados: list[str]) -> tuple[Session, str] | None:
+        """Conta menos ocupada, entre as deste worker, que vê o processo."""
+        nomes = [n for n in advogados
+                 if n in self.pool.sessions and cnj in self._hrefs.get(n, {})]
+        if not nomes:
+            return None
+        nome = min(nomes, key=lambda n: self._carga.get(n, 0))
+        return self.pool.sessions[nome], self._hrefs[nome][cnj]
+
+    async def _processar(self, sb, item: dict):
+        cnj = item["cnj"]
+        escolha = self._escolher(cnj, item["advogados"])
+        if escolha is None and not self._hrefs_completo:
+            # Lista de prazos incompleta: não gasta tentativa; o lease vence e o
+            # CNJ volta para a fila
+            print(f"[WORKER] {cnj}: fora da lista de prazos (listagem incompleta), devolvido pelo lease")
+            return
+        if escolha is None:
+            print(f"[WORKER] {cnj}: fora da lista de prazos das contas deste worker")
+            fila.concluir(sb, self.worker_id, cnj, False,
+                          erro=f"não listado para {', '.join(item['advogados']) or 'nenhuma conta'} em {self.worker_id}")
+            return
+
+        session, href = escolha
+        nome = session.account.nome
+        advogados = {n: self.pool.sessions[n].account.adv_name
+                     for n in item["advogados"] if n in self.pool.sessions}
+
+        async with self._slots:
+            self._carga[nome] = self._carga.get(nome, 0) + 1
+            self._ativos.add(cnj)
+            print(f"[WORKER] Processando: {cnj} ({nome}, tentativa {item['tentativas']})")
+            try:
+                stats = await scrape_processo(session, cnj, href, advogados, item.get("sync_log_id"))
+                ok, docs, erro = True, stats["docs"], None
+            except Exception as e:
+                print(f"[WORKER] ERRO em {cnj}: {e}")
+                ok, docs, erro = False, 0, str(e)
+            finally:
+                self._carga[nome] -= 1
+                self._ativos.discard(cnj)
+
+            try:
+                if not fila.concluir(sb, self.worker_id, cnj, ok, docs, erro):
+                    print(f"[WORKER] {cnj}: lease vencido, outro worker reservou o processo")
+            except Exception as e:
+                # Sem o concluir, o lease vence e o CNJ volta para a fila
+                print(f"[WORKER] Falha ao reportar {cnj}: {e}")
+
+    async def _renovar_leases(self):
+        """Heartbeat: estende o lease dos CNJs em andamento a cada 1/3 do lease."""
+        while True:
+            await asyncio.sleep(max(5, Config.FILA_LEASE_SEC / 3))
+            if not self._ativos:
+                continue
+            try:
+                fila.renovar(get_supabase(), self.worker_id, list(self._ativos))
+            except Exception as e:
+                print(f"[WORKER] Falha ao renovar leases: {e}")
+
+    def _flush(self):
+        """Grava as métricas acumuladas quando a fila esvazia."""
+        if self._log_metricas is None:
+            return
+        flush_metrics(get_supabase(), self._log_metricas, "worker")
+        self._log_metricas = None